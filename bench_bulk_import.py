@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+表格批量导入基准 - 10 万行 CSV 的吞吐（rows/s）与内存占用
+"""
+
+import argparse
+import csv
+import os
+import resource
+import tempfile
+import time
+
+from logistics_agent import agent
+from logistics_agent.bulk_import import import_orders
+
+HEADER = ["起运城市", "目的城市", "客户参考号", "收件国家", "收件人", "收件地址", "城市", "邮编", "省州", "物品类别", "报关类型", "重量"]
+
+
+def write_csv(path: str, rows: int) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            zipcode = "9000" if i % 100 == 99 else f"{90001 + i % 80}"  # 1% 行邮编不合法
+            writer.writerow(["深圳", "洛杉矶", f"XLS-{i:08d}", "US", f"Consignee {i}", f"{i} Main St", "Los Angeles", zipcode, "CA", "普货", "不需报关", 1 + i % 5])
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "orders.csv")
+        out = os.path.join(tmp, "orders.results.csv")
+        write_csv(src, args.rows)
+        size_mb = os.path.getsize(src) / 1e6
+
+        rss_before = _rss_mb()
+        started = time.perf_counter()
+        summary = import_orders(src, out, concurrency=args.concurrency)
+        elapsed = time.perf_counter() - started
+        rss_after = _rss_mb()
+
+    print(f"📦 rows={summary['rows']} file={size_mb:.1f} MB concurrency={args.concurrency}")
+    print(f"succeeded={summary['succeeded']} failed={summary['failed']}")
+    print(f"吞吐: {summary['rows'] / elapsed:.0f} rows/s ({elapsed:.1f} s)")
+    print(f"RSS: {rss_before:.0f} MB -> {rss_after:.0f} MB (+{rss_after - rss_before:.0f} MB)")
+    print(f"其中幂等缓存条目: {len(agent._IDEMPOTENT_CACHE)}, mock 订单: {len(agent._api._orders_by_customernumber)}")
+
+
+if __name__ == "__main__":
+    main()
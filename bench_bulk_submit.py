@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+批量预报下单基准 - 多进程分片提交从 1 核扩展到 N 核
+"""
+
+import argparse
+import os
+import time
+
+from logistics_agent.bulk_submit import submit_orders_bulk
+
+
+def make_orders(count: int) -> list[dict]:
+    orders = []
+    for i in range(count):
+        orders.append(
+            {
+                "origin_city": "深圳",
+                "destination_city": "洛杉矶",
+                "customernumber1": f"BULK-{i:08d}",
+                "consignee_countrycode": "US",
+                "consigneename": f"Consignee {i}",
+                "consigneeaddress1": f"{i} Main St",
+                "consigneecity": "Los Angeles",
+                "consigneezipcode": "90001",
+                "consigneeprovince": "CA",
+                "insurance_enabled": i % 2 == 0,
+                "insurance_value": 100 + i % 50,
+                "insurance_type_name": "货物运输险",
+                "insurance_currency_code": "USD",
+                "product_type_name": "普货",
+                "declare_type_name": "不需报关",
+                "forecastweight": 1 + (i % 7) * 0.5,
+            }
+        )
+    return orders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=64)
+    args = parser.parse_args()
+
+    orders = make_orders(args.orders)
+    workers_list = sorted({w for w in (1, 2, 4, 8, 16, 32, args.max_workers) if w <= args.max_workers})
+
+    print(f"📦 orders={args.orders} chunk_size={args.chunk_size} cpu_count={os.cpu_count()}")
+    print(f"{'workers':>8} {'seconds':>9} {'orders/s':>10} {'speedup':>8} {'errors':>7}")
+    baseline = None
+    for workers in workers_list:
+        started = time.perf_counter()
+        errors = 0
+        done = 0
+        for _, resp in submit_orders_bulk(orders, workers=workers, chunk_size=args.chunk_size):
+            done += 1
+            if resp.get("status") != "success":
+                errors += 1
+        elapsed = time.perf_counter() - started
+        rate = done / elapsed
+        baseline = baseline or rate
+        print(f"{workers:>8} {elapsed:>9.2f} {rate:>10.0f} {rate / baseline:>7.2f}x {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+录制回放基准 - 录制 typical 画像下的真实耗时后按原速/加速回放，对比延迟分布；大 cassette 上的索引构建、回放 QPS 与内存占用（对比整体加载）
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from logistics_agent.cassette import Cassette, CassetteWriter, RecordingApi, ReplayApi, build_index
+from logistics_agent.mock_logistics_api import FaultInjectingApi, MockLogisticsApi
+
+
+def _pct(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000
+
+
+def _drive(api, orders: int, threads: int) -> tuple[list[float], float]:
+    """Each thread creates orders and tracks them; returns per-call latencies and wall time."""
+
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def worker(t: int):
+        local = []
+        for i in range(orders):
+            number = f"BC-{t}-{i}"
+            for method, kwargs in (
+                ("create_order", {"origin_city": "深圳", "destination_city": "洛杉矶", "customernumber1": number}),
+                ("track", {"waybillnumber": number}),
+            ):
+                t0 = time.perf_counter()
+                try:
+                    getattr(api, method)(**kwargs)
+                except ConnectionError:
+                    pass
+                local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return latencies, time.perf_counter() - started
+
+
+def _load_all(path: str) -> dict[bytes, list[dict]]:
+    """对照组：把整个 cassette 解析进内存"""
+
+    loaded: dict[bytes, list[dict]] = {}
+    with open(path, "rb") as f:
+        for line in f:
+            key, _, body = line.partition(b"\t")
+            loaded.setdefault(key, []).append(json.loads(body))
+    return loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--orders", type=int, default=25, help="录制阶段每个线程的订单数")
+    parser.add_argument("--records", type=int, default=100_000, help="大 cassette 的记录数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "typical.cassette")
+        writer = CassetteWriter(path)
+        recorded, rec_s = _drive(RecordingApi(FaultInjectingApi(MockLogisticsApi(), "typical", seed=1), writer), args.orders, args.threads)
+        writer.close()
+        cassette = Cassette(path)
+        print(f"录制 {cassette.records} 次调用 ({cassette.size / 1024:.0f} KiB)，{rec_s:.2f}s")
+        print(f"{'':<14} {'wall s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        print(f"{'recorded':<14} {rec_s:>8.2f} {_pct(recorded, 0.5):>8.1f} {_pct(recorded, 0.99):>8.1f}")
+        for speed in (1.0, 10.0):
+            lat, wall = _drive(ReplayApi(cassette, speed=speed), args.orders, args.threads)
+            print(f"{f'replay x{speed:g}':<14} {wall:>8.2f} {_pct(lat, 0.5):>8.1f} {_pct(lat, 0.99):>8.1f}")
+
+        # 大 cassette：每条记录一个不同的 track 请求
+        big = os.path.join(tmp, "big.cassette")
+        writer = CassetteWriter(big)
+        response = MockLogisticsApi().track(waybillnumber="12345")
+        now = time.monotonic()
+        for i in range(args.records):
+            writer.append("track", {"waybillnumber": f"BIG-{i}"}, now, 0.04, response=response)
+        writer.close()
+        size_mib = os.path.getsize(big) / 2**20
+
+        t0 = time.perf_counter()
+        build_index(big)
+        index_s = time.perf_counter() - t0
+
+        n = 50_000
+        replay = ReplayApi(Cassette(big), speed=0)
+        t0 = time.perf_counter()
+        for i in range(n):
+            replay.track(waybillnumber=f"BIG-{(i * 7919) % args.records}")
+        qps = n / (time.perf_counter() - t0)
+
+        tracemalloc.start()
+        replay = ReplayApi(Cassette(big), speed=0)
+        for i in range(n):
+            replay.track(waybillnumber=f"BIG-{(i * 7919) % args.records}")
+        indexed_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        t0 = time.perf_counter()
+        loaded = _load_all(big)
+        load_s = time.perf_counter() - t0
+        del loaded
+        tracemalloc.start()
+        loaded = _load_all(big)
+        loaded_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del loaded
+
+        print(f"\n大 cassette: {args.records} 条, {size_mib:.1f} MiB；建索引 {index_s:.2f}s "
+              f"({os.path.getsize(big + '.idx') / 2**20:.1f} MiB)")
+        print(f"indexed 回放 (speed=0): {qps:,.0f} 次/秒，Python 堆峰值 {indexed_peak / 2**20:.1f} MiB")
+        print(f"整体加载: {load_s:.2f}s 后才能开始回放，Python 堆峰值 {loaded_peak / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+草稿增量校验基准 - 脚本化对话中达到有效订单所需的轮数（逐字段校验 vs 仅提交时校验）
+"""
+
+import time
+
+from logistics_agent import agent
+
+
+# 每段对话：按顺序发送的消息 + 用户在被指出错误后给出的更正
+CONVERSATIONS = [
+    {
+        "name": "一次性正确输入",
+        "messages": [
+            "从深圳到洛杉矶；customernumber1=D-1001；收件国家=US；收件人=John；收件地址=1 Main St；城市=Los Angeles；邮编=90001；省州=CA",
+        ],
+        "corrections": {},
+    },
+    {
+        "name": "险种写错",
+        "messages": [
+            "从深圳到洛杉矶；customernumber1=D-1002；投保=是；保额=100；险种=火星险；币别=USD",
+            "收件国家=US；收件人=Jane；收件地址=2 Oak Ave",
+            "城市=Los Angeles；邮编=90002；省州=CA",
+        ],
+        "corrections": {"insurance_type_name": "险种=货物运输险"},
+    },
+    {
+        "name": "邮编与报关类型都有问题",
+        "messages": [
+            "从深圳到纽约；customernumber1=D-1003；报关类型=需要报关",
+            "收件国家=US；收件人=Mike；收件地址=3 Broadway；城市=New York",
+            "邮编=1001；省州=NY；物品类别=普货",
+        ],
+        "corrections": {"declare_type_name": "报关类型=买单报关", "consigneezipcode": "邮编=10001"},
+    },
+    {
+        "name": "物品类别与币别写错",
+        "messages": [
+            "从深圳到旧金山；customernumber1=D-1004；物品类别=危险品",
+            "收件国家=US；收件人=Amy；收件地址=4 Market St；城市=San Francisco；邮编=94103；省州=CA",
+            "投保=是；保额=300；险种=综合险；币别=欧元",
+        ],
+        "corrections": {"product_type_name": "物品类别=普货", "insurance_currency_code": "币别=USD"},
+    },
+]
+
+_ERROR_FIELD_HINTS = {
+    "declaretype": "declare_type_name",
+    "报关类型": "declare_type_name",
+    "producttype": "product_type_name",
+    "产品类型": "product_type_name",
+    "保险类型": "insurance_type_name",
+    "insurance name": "insurance_type_name",
+    "insurancecurrency": "insurance_currency_code",
+}
+
+
+def _field_from_submit_error(resp: dict) -> str | None:
+    error = resp.get("error") or {}
+    text = f"{error.get('message', '')} {error.get('reason', '')}"
+    for hint, field in _ERROR_FIELD_HINTS.items():
+        if hint in text:
+            return field
+    return None
+
+
+def run_submit_time_validation(conv: dict) -> tuple[int, list[str]]:
+    """旧流程：只累积字段，提交时才发现错误，每轮只能暴露一个错误"""
+
+    draft: dict = {}
+    turns = 0
+    for msg in conv["messages"]:
+        turns += 1
+        draft.update({k: v for k, v in agent._extract_partial_order_fields(msg).items() if v is not None})
+    corrections = dict(conv["corrections"])
+    while True:
+        resp = agent.submit_forecast_order(dict(draft))
+        if resp["status"] == "success":
+            # 提交成功但仍有未更正的字段：错误值被直接下单
+            return turns, list(corrections)
+        field = _field_from_submit_error(resp)
+        if field is None or field not in corrections:
+            return turns, list(corrections)
+        turns += 1
+        draft.update(agent._extract_partial_order_fields(corrections.pop(field)))
+
+
+def run_incremental_validation(conv: dict) -> tuple[int, list[str]]:
+    """新流程：每条消息即时校验，更正可以随下一条消息一起发送"""
+
+    agent.update_forecast_order_draft("-", reset=True)
+    pending_fix: list[str] = []
+    turns = 0
+    queue = list(conv["messages"])
+    while queue or pending_fix:
+        msg = queue.pop(0) if queue else ""
+        if pending_fix:
+            msg = "；".join([*pending_fix, msg]) if msg else "；".join(pending_fix)
+            pending_fix = []
+        turns += 1
+        resp = agent.update_forecast_order_draft(msg)
+        for field in resp["data"]["field_errors"]:
+            if field in conv["corrections"]:
+                pending_fix.append(conv["corrections"][field])
+    resp = agent.submit_forecast_order_draft()
+    return turns, [] if resp["status"] == "success" else ["submit failed"]
+
+
+def main():
+    print(f"{'conversation':<20} {'submit-time':>12} {'incremental':>12} {'undetected(old)':>16}")
+    total_old = total_new = 0
+    started = time.perf_counter()
+    for conv in CONVERSATIONS:
+        old_turns, undetected = run_submit_time_validation(conv)
+        new_turns, failures = run_incremental_validation(conv)
+        assert not failures, failures
+        total_old += old_turns
+        total_new += new_turns
+        print(f"{conv['name']:<20} {old_turns:>12} {new_turns:>12} {','.join(undetected) or '-':>16}")
+    elapsed = time.perf_counter() - started
+    print(f"{'total':<20} {total_old:>12} {total_new:>12}")
+    print(f"节省轮数: {total_old - total_new} ({(total_old - total_new) / total_old:.0%}), 用时 {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
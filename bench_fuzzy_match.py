@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+字典名称容错匹配基准 - n-gram 索引查询延迟
+"""
+
+import time
+
+from logistics_agent import agent
+from logistics_agent.fuzzy_match import auto_select
+
+QUERIES = [
+    ("insurance", "货运运输险"),
+    ("insurance", "高价值险"),
+    ("producttype", "genral goods"),
+    ("producttype", "带电池"),
+    ("declaretype", "贸易报光"),
+    ("currency", "美金"),
+    ("currency", "港园"),
+]
+
+
+def main():
+    catalog = agent._catalog_manager.get()
+    rounds = 20000
+    print(f"{'dictionary':<12} {'query':<14} {'µs/lookup':>10}  top candidates")
+    for dictionary, query in QUERIES:
+        index = catalog.fuzzy_index(dictionary)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            ranked = index.search(query)
+        micros = (time.perf_counter() - started) / rounds * 1e6
+        picked = auto_select(ranked)
+        top = ", ".join(f"{text}({score:.2f})" for _, score, text in ranked[:3])
+        mark = "✅" if picked is not None else "❓"
+        print(f"{dictionary:<12} {query:<14} {micros:>10.1f}  {mark} {top}")
+
+
+if __name__ == "__main__":
+    main()
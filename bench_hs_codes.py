@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+HS 编码索引基准 - 随附数据与扩展到约 1 万个编码（模拟 10 位国家编码）时的建索引耗时与内存、归类与前缀查询延迟，对比逐条描述扫描
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from logistics_agent.fuzzy_match import char_ngrams
+from logistics_agent.hs_codes import DEFAULT_PATH, MIN_CLASSIFIABLE_DIGITS, HsCodeIndex
+
+QUERIES = [
+    "蓝牙耳机", "wireless earbuds", "手机壳", "男士纯棉T恤", "women's dress", "毛绒玩具", "瑜伽垫",
+    "不锈钢保温杯", "laptop", "充电宝", "USB-C 数据线", "陶瓷马克杯", "香水", "running shoes", "backpack",
+]
+VARIANTS = ["黑色", "白色", "儿童", "男式", "女式", "大号", "小号", "black", "kids", "large", "mini", "pro"]
+
+
+def _expand(target: int, path: str) -> int:
+    """把随附数据的每个 6 位子目扩展成若干 10 位国家编码，描述与关键词加上变体词"""
+
+    with open(DEFAULT_PATH, encoding="utf-8") as f:
+        rows = [line.rstrip("\n").split("\t") for line in f if line.strip() and not line.startswith("#")]
+    leaves = [r for r in rows if len(r[0]) >= MIN_CLASSIFIABLE_DIGITS]
+    per_leaf = max(1, target // len(leaves))
+    rng = random.Random(1)
+    lines = ["\t".join(r) for r in rows]
+    for code, cnname, enname, *rest in leaves:
+        keywords = rest[0].split("|") if rest else []
+        for i in range(per_leaf):
+            v = rng.choice(VARIANTS)
+            kw = "|".join(f"{v}{k}" for k in rng.sample(keywords, min(2, len(keywords))))
+            lines.append(f"{code}{i + 1:04d}\t{cnname}（{v}）\t{enname} ({v})\t{kw}")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return len(lines)
+
+
+def _scan(rows: list[tuple[str, list[str]]], query: str) -> tuple[str, float]:
+    """对照组：逐条计算 Dice 分数"""
+
+    q = char_ngrams(query)
+    best = ("", 0.0)
+    for code, texts in rows:
+        for t in texts:
+            g = char_ngrams(t)
+            score = 2 * len(q & g) / (len(q) + len(g))
+            if score > best[1]:
+                best = (code, score)
+    return best
+
+
+def _pct(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1e6
+
+
+def _report(label: str, path: str, rounds: int) -> None:
+    # 建索引耗时不开 tracemalloc 测；内存另建一次测
+    index = HsCodeIndex(path)
+    index.lookup("85")
+    stats = index.stats()
+    tracemalloc.start()
+    measured = HsCodeIndex(path)
+    measured.lookup("85")
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del measured
+
+    classify, prefix, exact = [], [], []
+    for _ in range(rounds):
+        for q in QUERIES:
+            t0 = time.perf_counter()
+            index.classify(q)
+            classify.append(time.perf_counter() - t0)
+        for p in ("85", "8517", "6109", "9503"):
+            t0 = time.perf_counter()
+            index.by_prefix(p, limit=20)
+            prefix.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            index.lookup(p + "10")
+            exact.append(time.perf_counter() - t0)
+
+    with open(path, encoding="utf-8") as f:
+        rows = [
+            (r[0], [x for x in (r[1], r[2], *(r[3].split("|") if len(r) > 3 else [])) if x])
+            for r in (line.rstrip("\n").split("\t") for line in f if line.strip() and not line.startswith("#"))
+            if len(r[0]) >= MIN_CLASSIFIABLE_DIGITS
+        ]
+    t0 = time.perf_counter()
+    for q in QUERIES:
+        _scan(rows, q)
+    scan_us = (time.perf_counter() - t0) / len(QUERIES) * 1e6
+
+    print(f"{label}: {stats['codes']} 个编码（可归类 {stats['classifiable']}，检索文本 {stats['search_texts']}）")
+    print(f"  建索引 {stats['build_ms']:.1f} ms，内存 {current / 1024:.0f} KiB（峰值 {peak / 1024:.0f} KiB）")
+    print(f"  {'µs':<22} {'p50':>8} {'p99':>8}")
+    print(f"  {'classify':<22} {_pct(classify, 0.5):>8.1f} {_pct(classify, 0.99):>8.1f}")
+    print(f"  {'by_prefix (limit 20)':<22} {_pct(prefix, 0.5):>8.1f} {_pct(prefix, 0.99):>8.1f}")
+    print(f"  {'lookup':<22} {_pct(exact, 0.5):>8.1f} {_pct(exact, 0.99):>8.1f}")
+    print(f"  逐条扫描对照 {scan_us:,.0f} µs/次")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--codes", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    _report("随附数据", DEFAULT_PATH, args.rounds)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "hs_codes.tsv")
+        _expand(args.codes, path)
+        _report("扩展数据", path, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
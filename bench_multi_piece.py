@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+多件货基准 - 5000 件订单：下单延迟、mock 记录与响应大小、子单翻页延迟，对比逐件预生成子单
+"""
+
+import argparse
+import json
+import time
+
+from logistics_agent.mock_logistics_api import MockLogisticsApi, _child, child_page
+from soak_memory import deep_size
+
+
+def _eager_children(record: dict) -> list[dict]:
+    """旧实现：下单时为每一件生成子单（两次 SHA-256），并随记录一起保存、整体返回"""
+
+    parent = (record["customernumber"], record["systemnumber"], record["waybillnumber"])
+    return [_child(*parent, i) for i in range(1, record["child_count"] + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pieces", type=int, default=5000)
+    parser.add_argument("--orders", type=int, default=20)
+    args = parser.parse_args()
+
+    api = MockLogisticsApi()
+    t0 = time.perf_counter()
+    responses = [
+        api.create_order(origin_city="深圳", destination_city="洛杉矶", customernumber1=f"BMP-{i}", number=args.pieces)
+        for i in range(args.orders)
+    ]
+    lazy_ms = (time.perf_counter() - t0) / args.orders * 1000
+    record = api._orders_by_customernumber["BMP-0"]
+
+    t0 = time.perf_counter()
+    eager = [_eager_children(api._orders_by_customernumber[f"BMP-{i}"]) for i in range(args.orders)]
+    eager_ms = lazy_ms + (time.perf_counter() - t0) / args.orders * 1000
+    eager_record = {**record, "childs": eager[0]}
+
+    lazy_resp = len(json.dumps(responses[0], ensure_ascii=False))
+    eager_resp = len(json.dumps({**responses[0]["data"][0], "childs": eager[0]}, ensure_ascii=False))
+
+    t0 = time.perf_counter()
+    pages = 0
+    offset: int | None = 0
+    while offset is not None:
+        _, offset = child_page(record, offset, 100)
+        pages += 1
+    page_ms = (time.perf_counter() - t0) / pages * 1000
+
+    t0 = time.perf_counter()
+    api.track(waybillnumber=record["systemnumber"], child_offset=args.pieces - 20, child_limit=20)
+    track_ms = (time.perf_counter() - t0) * 1000
+
+    print(f"{args.pieces} 件/单, {args.orders} 单")
+    print(f"{'':<22} {'lazy':>12} {'eager':>12}")
+    print(f"{'下单 ms/单':<20} {lazy_ms:>12.2f} {eager_ms:>12.2f}")
+    print(f"{'mock 记录 KiB/单':<19} {deep_size(record) / 1024:>12.1f} {deep_size(eager_record) / 1024:>12.1f}")
+    print(f"{'下单响应 KiB':<20} {lazy_resp / 1024:>12.1f} {eager_resp / 1024:>12.1f}")
+    print(f"翻页：每页 100 件 {page_ms:.3f} ms（共 {pages} 页）；track 末页 20 件 {track_ms:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+列式台账分组汇总基准 - 千万行下 NumPy 向量化分组 vs 纯 Python 循环（逐单 dict）
+"""
+
+import argparse
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from logistics_agent.order_ledger import OrderLedger
+
+T0 = 1_767_225_600.0
+CHANNELS = np.array(["HK_TNT", "US_UPS", "CN_EMS", "DHL_EXP", "FEDEX_IP", "SF_INTL", "YUN_EXP", "4PX_STD"])
+COUNTRIES = np.array(["US", "GB", "AU", "CA", "DE", "FR", "JP", "AE", "BR", "MX", "NL", "IT"])
+
+
+def make_columns(n: int, seed: int) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    return {
+        "timestamp": T0 + np.sort(rng.uniform(0, 90 * 86400, n)),
+        "channelid": CHANNELS[rng.integers(0, len(CHANNELS), n)],
+        "countrycode": COUNTRIES[rng.integers(0, len(COUNTRIES), n)],
+        "forecastweight": rng.uniform(0.1, 30, n).round(2),
+        "number": rng.integers(1, 6, n),
+        "is_remote": rng.random(n) < 0.15,
+        "insurance_value": np.where(rng.random(n) < 0.3, rng.uniform(50, 500, n), 0.0),
+    }
+
+
+def python_group_by(rows: list[dict], *, country: str | None = None, since: float | None = None) -> dict:
+    """逐单 dict 的循环写法：按渠道累计单数、重量、偏远单数"""
+
+    out: dict[str, list[float]] = defaultdict(lambda: [0, 0.0, 0])
+    for r in rows:
+        if country is not None and r["countrycode"] != country:
+            continue
+        if since is not None and r["timestamp"] < since:
+            continue
+        acc = out[r["channelid"]]
+        acc[0] += 1
+        acc[1] += r["forecastweight"]
+        acc[2] += r["is_remote"]
+    return out
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--python-rows", type=int, default=1_000_000,
+                        help="纯 Python 基线的行数（逐单 dict 在千万行时需要数 GB 内存，按行数线性外推）")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    cols = make_columns(args.rows, args.seed)
+    ledger = OrderLedger()
+    t0 = time.perf_counter()
+    ledger.extend(**cols)
+    print(f"rows={args.rows:,} load={time.perf_counter() - t0:.1f}s ledger={ledger.stats()['bytes'] / 2**20:.0f} MiB")
+
+    last_week = T0 + 83 * 86400
+    queries = {
+        "total": dict(),
+        "by channel": dict(group_by="channelid"),
+        "by country, sort weight": dict(group_by="countrycode", sort_by="weight_kg"),
+        "US last week by channel": dict(group_by="channelid", countrycode="US", since=last_week),
+        "remote by channel": dict(group_by="channelid", is_remote=True, sort_by="remote_orders"),
+        "by day": dict(group_by="day"),
+    }
+    for label, kwargs in queries.items():
+        print(f"  numpy  {label:<28} {timed(lambda: ledger.aggregate(**kwargs)):>9.1f} ms")
+
+    m = min(args.python_rows, args.rows)
+    keys = list(cols)
+    rows = [dict(zip(keys, values)) for values in zip(*(cols[k][:m].tolist() for k in keys))]
+    for label, py_kwargs, np_kwargs in (
+        ("by channel", {}, dict(group_by="channelid")),
+        ("US last week by channel", dict(country="US", since=last_week),
+         dict(group_by="channelid", countrycode="US", since=last_week)),
+    ):
+        py_ms = timed(lambda: python_group_by(rows, **py_kwargs), repeat=1) * args.rows / m
+        np_ms = timed(lambda: ledger.aggregate(**np_kwargs))
+        print(f"  python {label:<28} {py_ms:>9.1f} ms (measured on {m:,} rows, scaled)  speedup {py_ms / np_ms:,.0f}x")
+
+if __name__ == "__main__":
+    main()
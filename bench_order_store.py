@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+订单库分页基准 - 百万级订单下各类过滤组合的单页延迟（首页与深翻页）
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from logistics_agent.order_store import OrderStore
+from logistics_agent.shipment_lifecycle import VirtualClock
+
+T0 = 1_767_225_600.0
+DESTINATIONS = [
+    ("洛杉矶", "Los Angeles", "US"), ("纽约", "New York", "US"), ("芝加哥", "Chicago", "US"),
+    ("伦敦", "London", "GB"), ("悉尼", "Sydney", "AU"), ("东京", "Tokyo", "JP"),
+    ("多伦多", "Toronto", "CA"), ("柏林", "Berlin", "DE"), ("巴黎", "Paris", "FR"), ("迪拜", "Dubai", "AE"),
+]
+STATUSES = ["Created", "PickedUp", "InTransit", "Arrived", "Delivered"]
+
+
+def build(n: int, seed: int) -> OrderStore:
+    rng = random.Random(seed)
+    store = OrderStore(VirtualClock(T0))
+    for i in range(n):
+        dest, city, country = rng.choice(DESTINATIONS)
+        store.add(
+            order_id=str(10_000_000_000_000 + i),
+            customernumber=f"B-{i:08d}",
+            origin_city="深圳",
+            destination_city=dest,
+            consigneecity=city,
+            countrycode=country,
+            created_at=T0 + i * 2.0,  # 每 2 秒一单，100 万单约 23 天
+        )
+    # 每 50 单有一单已更新轨迹状态，状态索引较稀疏
+    for i in range(0, n, 50):
+        store.update_status(str(10_000_000_000_000 + i), rng.choice(STATUSES[1:4]))
+    return store
+
+
+def measure(store: OrderStore, label: str, pages: int, **filters) -> None:
+    latencies = []
+    cursor = None
+    fetched = 0
+    for _ in range(pages):
+        t0 = time.perf_counter()
+        page = store.query(cursor=cursor, **filters)
+        latencies.append((time.perf_counter() - t0) * 1e3)
+        fetched += len(page["orders"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    p50 = statistics.median(latencies)
+    p99 = sorted(latencies)[max(0, int(len(latencies) * 0.99) - 1)]
+    print(f"{label:<38} pages={len(latencies):>4} rows={fetched:>6} first={latencies[0]:>7.3f}ms p50={p50:>7.3f}ms p99={p99:>7.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    store = build(args.orders, args.seed)
+    elapsed = time.perf_counter() - t0
+    print(f"orders={args.orders} insert={elapsed:.1f}s ({args.orders / elapsed:,.0f}/s) stats={store.stats()}")
+
+    last_day = T0 + args.orders * 2.0 - 86400
+    measure(store, "no filter", args.pages, limit=args.limit)
+    measure(store, "city=Los Angeles", args.pages, destination_city="Los Angeles", limit=args.limit)
+    measure(store, "city+country+last day", args.pages, destination_city="洛杉矶", countrycode="US",
+            created_after=last_day, limit=args.limit)
+    measure(store, "status=InTransit (rare)", args.pages, status="InTransit", limit=args.limit)
+    measure(store, "country=GB + status=Arrived", args.pages, countrycode="GB", status="Arrived", limit=args.limit)
+    measure(store, "first week only", args.pages, created_before=T0 + 7 * 86400, limit=args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+本地邮编索引基准 - 冷启动与单次查询延迟、索引大小，以及脚本化对话中因补齐城市/州省掉的追问轮数
+"""
+
+import os
+import random
+import time
+
+from logistics_agent import agent
+from logistics_agent.postal_codes import PostalCodeDirectory
+
+# 用户只给了邮编、没给城市/州的对话（被追问时的回答放在 answer 里）
+CONVERSATIONS = [
+    {
+        "messages": ["从深圳到洛杉矶；customernumber1=PB-1；收件国家=US；收件人=John；收件地址=1 Main St；邮编=90001"],
+        "answer": "城市=Los Angeles；省州=CA",
+    },
+    {
+        "messages": ["从深圳到纽约；customernumber1=PB-2", "收件国家=US；收件人=Mike；收件地址=3 Broadway；邮编=10007"],
+        "answer": "城市=New York；省州=NY",
+    },
+    {
+        "messages": ["从深圳到西雅图；customernumber1=PB-3；收件国家=US；收件人=Ann；收件地址=9 Pine St；邮编=98101；城市=Seattle"],
+        "answer": "省州=WA",
+    },
+    {
+        "messages": ["从深圳到芝加哥；customernumber1=PB-4；收件国家=US；收件人=Lee；收件地址=5 Lake St；邮编=60601；省州=IL"],
+        "answer": "城市=Chicago",
+    },
+    {
+        # 数据只覆盖到州：仍需追问城市
+        "messages": ["从深圳到纽约；customernumber1=PB-5；收件国家=US；收件人=Kim；收件地址=7 Elm St；邮编=12207"],
+        "answer": "城市=Albany；省州=NY",
+    },
+    {
+        "messages": ["从深圳到洛杉矶；customernumber1=PB-6；收件国家=US；收件人=Roy；收件地址=2 Oak Ave；城市=Los Angeles；邮编=90002；省州=CA"],
+        "answer": "",
+    },
+]
+
+
+def _turns(conv: dict) -> int:
+    agent.update_forecast_order_draft("-", reset=True)
+    turns = 0
+    resp = None
+    for msg in conv["messages"]:
+        turns += 1
+        resp = agent.update_forecast_order_draft(msg)
+    if {"consigneecity", "consigneeprovince"} & set(resp["data"]["missing_fields"]):
+        turns += 1
+        resp = agent.update_forecast_order_draft(conv["answer"])
+    assert resp["data"]["ready"], resp
+    return turns
+
+
+def main():
+    directory = PostalCodeDirectory()
+    t0 = time.perf_counter()
+    directory.lookup("US", "90001")
+    cold_us = (time.perf_counter() - t0) * 1e6
+
+    rng = random.Random(1)
+    codes = [f"{rng.randrange(0, 100000):05d}" for _ in range(100_000)]
+    t0 = time.perf_counter()
+    hits = sum(1 for c in codes if directory.lookup("US", c) is not None)
+    warm_us = (time.perf_counter() - t0) / len(codes) * 1e6
+    stats = directory.stats()["US"]
+    print(f"US 索引: {stats['records']} 条区间, {stats['bytes'] / 1024:.1f} KiB (mmap, 按需换页)")
+    print(f"冷启动首查 {cold_us:.0f} µs, 随机查询 {warm_us:.2f} µs/次, 命中 {hits / len(codes):.0%}")
+
+    agent._POSTAL_AUTOFILL = False
+    before = [_turns(c) for c in CONVERSATIONS]
+    agent._POSTAL_AUTOFILL = os.environ.get("LOGISTICS_POSTAL_AUTOFILL", "1") != "0"
+    after = [_turns(c) for c in CONVERSATIONS]
+    print(f"{'conversation':<14} {'no autofill':>12} {'autofill':>10}")
+    for i, (b, a) in enumerate(zip(before, after), 1):
+        print(f"{'PB-' + str(i):<14} {b:>12} {a:>10}")
+    saved = sum(before) - sum(after)
+    print(f"{'total':<14} {sum(before):>12} {sum(after):>10}  省掉 {saved} 轮 ({saved / sum(before):.0%})")
+
+
+if __name__ == "__main__":
+    main()
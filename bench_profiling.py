@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+工具剖析开销基准 - 关闭时包装层的额外开销，以及开启时单次剖析的代价
+"""
+
+import argparse
+import tempfile
+import timeit
+
+from logistics_agent import agent
+from logistics_agent.profiling import ToolProfiler
+
+
+def _per_call_ns(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    tool = agent.get_last_order_reference  # 很轻量的工具，最能放大包装开销
+    with tempfile.TemporaryDirectory() as out_dir:
+        prof = ToolProfiler(output_dir=out_dir)
+        wrapped = prof.wrap(tool)
+
+        direct = _per_call_ns(tool, args.calls)
+        disabled = _per_call_ns(wrapped, args.calls)
+        prof.enable(tools="submit_forecast_order")  # 开启但未选中当前工具
+        unselected = _per_call_ns(wrapped, args.calls)
+        prof.enable(tools="get_last_order_reference")
+        profiled = _per_call_ns(wrapped, 50)
+        prof.disable()
+
+    print(f"tool=get_last_order_reference calls={args.calls}")
+    print(f"{'mode':<22} {'ns/call':>12} {'overhead':>12}")
+    print(f"{'direct':<22} {direct:>12.0f} {'-':>12}")
+    print(f"{'wrapped, disabled':<22} {disabled:>12.0f} {disabled - direct:>+9.0f} ns")
+    print(f"{'enabled, unselected':<22} {unselected:>12.0f} {unselected - direct:>+9.0f} ns")
+    print(f"{'profiled':<22} {profiled:>12.0f} {profiled / direct:>11.0f}x")
+
+
+if __name__ == "__main__":
+    main()
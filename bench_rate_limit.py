@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+出站限流基准 - 多线程压向有容量上限的后端（throttled 画像），对比不限流与 AIMD 自适应并发的吞吐、繁忙响应与排队延迟
+"""
+
+import argparse
+import threading
+import time
+
+from logistics_agent.mock_logistics_api import FaultInjectingApi, MockLogisticsApi
+from logistics_agent.rate_limit import RateLimitedApi
+
+
+def _run(api, threads: int, calls_per_thread: int) -> dict:
+    busy = 0
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def worker():
+        nonlocal busy
+        local_busy = 0
+        local_lat = []
+        for _ in range(calls_per_thread):
+            t0 = time.perf_counter()
+            resp = api.insurance()
+            local_lat.append(time.perf_counter() - t0)
+            if resp.get("code") == -1:
+                local_busy += 1
+        with lock:
+            busy += local_busy
+            latencies.extend(local_lat)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+    total = threads * calls_per_thread
+    latencies.sort()
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "ok_per_s": round((total - busy) / elapsed, 1),
+        "busy": busy,
+        "busy_rate": round(busy / total, 3),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--calls", type=int, default=40, help="calls per thread")
+    parser.add_argument("--max-concurrency", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"threads={args.threads} calls/thread={args.calls} backend=throttled (capacity 8)")
+
+    raw = FaultInjectingApi(MockLogisticsApi(), "throttled", seed=args.seed)
+    print("no limiter:", _run(raw, args.threads, args.calls))
+
+    backend = FaultInjectingApi(MockLogisticsApi(), "throttled", seed=args.seed)
+    limited = RateLimitedApi(backend, max_concurrency=args.max_concurrency)
+    result = _run(limited, args.threads, args.calls)
+    stats = limited.limiter_stats()["insurance"]
+    print("aimd limiter:", result)
+    print("  final limit:", stats["concurrency"]["limit"], "decreases:", stats["concurrency"]["decreases"])
+    print("  queue wait ms:", stats["queue_wait_ms"])
+
+
+if __name__ == "__main__":
+    main()
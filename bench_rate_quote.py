@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+运价报价基准 - 50 个渠道的运价表上，单票报价与 1 万票批量报价的延迟；对比逐渠道 Python 循环
+"""
+
+import argparse
+import copy
+import json
+import math
+import time
+
+import numpy as np
+
+from logistics_agent.rate_quote import DEFAULT_PATH, RateCard
+
+
+def _card(channels: int, seed: int = 1) -> dict:
+    """以随附运价表的渠道为模板，按随机系数扩展到 ``channels`` 个渠道"""
+
+    with open(DEFAULT_PATH, encoding="utf-8") as f:
+        card = json.load(f)
+    rng = np.random.default_rng(seed)
+    templates = card["channels"]
+    out = []
+    for i in range(channels):
+        ch = copy.deepcopy(templates[i % len(templates)])
+        factor = float(rng.uniform(0.85, 1.15))
+        ch["channelid"] = f"{ch['channelid']}_{i:02d}"
+        ch["rates"] = [None if r is None else [round(x * factor, 2) for x in r] for r in ch["rates"]]
+        ch["fuel_surcharge"] = round(ch["fuel_surcharge"] * factor, 3)
+        out.append(ch)
+    card["channels"] = out
+    return card
+
+
+def _loop_quote(card: dict, rc: RateCard, country: str, weight: float, volume: float, postal_code: str) -> dict:
+    """对照组：逐渠道 Python 循环"""
+
+    zone = rc.zone_of(country)
+    remote = rc.is_remote(country, postal_code)
+    totals = {}
+    for ch in card["channels"]:
+        rates = ch["rates"][zone - 1]
+        if rates is None or (ch.get("countries") and country not in ch["countries"]):
+            continue
+        inc = ch.get("increment", 0.5)
+        chg = math.ceil(round(max(weight, volume / ch.get("volumetric_divisor", 5000)) / inc, 9)) * inc
+        if chg > ch.get("max_weight", ch["weight_breaks"][-1]) or chg > ch["weight_breaks"][-1]:
+            continue
+        b = sum(1 for x in ch["weight_breaks"] if chg > x)
+        base = max(ch["min_charge"][zone - 1] or 0.0, rates[b] * chg)
+        fee = 0.0
+        if remote:
+            if ch.get("remote_fee") is None:
+                continue
+            fee = max(ch["remote_fee"]["min"], ch["remote_fee"]["per_kg"] * chg)
+        totals[ch["channelid"]] = round(base * (1 + ch["fuel_surcharge"]) + fee, 2)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--channels", type=int, default=50)
+    parser.add_argument("--shipments", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    card = _card(args.channels)
+    rc = RateCard(card=card)
+    rng = np.random.default_rng(2)
+    n = args.shipments
+    countries = rng.choice(["US", "GB", "DE", "JP", "AU", "CA", "FR", "BR", "AE", "SG"], n)
+    weights = np.round(rng.lognormal(0.8, 0.9, n), 2).clip(0.1, 68)
+    volumes = rng.uniform(0, 120_000, n)
+    zips = rng.choice(["90001", "99501", "10115", "HS1 2AA", "0870", "75001", ""], n)
+    rc.quote("US", 1.0)
+
+    t0 = time.perf_counter()
+    for i in range(args.repeat):
+        rc.quote(countries[i], weights[i], volume_cm3=volumes[i], postal_code=zips[i])
+    one_ms = (time.perf_counter() - t0) / args.repeat * 1000
+    t0 = time.perf_counter()
+    for i in range(args.repeat):
+        _loop_quote(card, rc, countries[i], weights[i], volumes[i], zips[i])
+    loop_one_ms = (time.perf_counter() - t0) / args.repeat * 1000
+
+    t0 = time.perf_counter()
+    batch = rc.quote_batch(countries, weights, volumes_cm3=volumes, postal_codes=zips)
+    batch_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    looped = [_loop_quote(card, rc, countries[i], weights[i], volumes[i], zips[i]) for i in range(n)]
+    loop_batch_ms = (time.perf_counter() - t0) * 1000
+
+    mismatches = sum(
+        1
+        for i in range(0, n, 97)
+        for cid, total in looped[i].items()
+        if abs(batch["total"][i, rc.channel_ids.index(cid)] - total) > 0.011
+    )
+    print(f"{args.channels} 个渠道, 批量 {n} 票（抽样核对逐渠道循环，超过 1 分的差异 {mismatches}）")
+    print(f"{'':<24} {'numpy':>10} {'python loop':>12}")
+    print(f"{'1 票 × 渠道 ms':<22} {one_ms:>10.3f} {loop_one_ms:>12.3f}")
+    print(f"{f'{n} 票 × 渠道 ms':<22} {batch_ms:>10.1f} {loop_batch_ms:>12.1f}")
+    print(f"批量每票 {batch_ms / n * 1000:.1f} µs，可用组合 {int(batch['available'].sum())} / {batch['available'].size}")
+
+
+if __name__ == "__main__":
+    main()
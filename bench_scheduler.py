@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+优先级调度基准 - 批量导入压满后端（throttled 画像，容量 8）时，交互查询 query_order_status 的 p50/p99，
+对比不调度与启用调度器（交互优先、批量限并发、排队超时丢弃）
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("LOGISTICS_MOCK_PROFILE", "throttled")
+
+from bench_bulk_import import HEADER  # noqa: E402
+from logistics_agent import agent  # noqa: E402
+from logistics_agent.bulk_import import import_orders  # noqa: E402
+from logistics_agent.scheduler import PriorityScheduler  # noqa: E402
+
+
+def _write_csv(path: str, rows: int, prefix: str) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            writer.writerow(["深圳", "洛杉矶", f"{prefix}-{i:08d}", "US", f"Consignee {i}", f"{i} Main St", "Los Angeles", "90001", "CA", "普货", "不需报关", 1])
+
+
+def _pct(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * q))] * 1000, 1) if values else 0.0
+
+
+def _scenario(name: str, sched: PriorityScheduler, tmp: str, rows: int, concurrency: int, order_no: str) -> None:
+    agent._scheduler = sched
+    src = os.path.join(tmp, f"{name}.csv")
+    _write_csv(src, rows, name.upper())
+    summary: dict = {}
+
+    def bulk():
+        summary.update(import_orders(src, os.path.join(tmp, f"{name}.results.csv"), concurrency=concurrency))
+
+    t = threading.Thread(target=bulk)
+    t.start()
+    latencies: list[float] = []
+    while t.is_alive():
+        t0 = time.perf_counter()
+        agent.query_order_status(order_no)
+        latencies.append(time.perf_counter() - t0)
+        time.sleep(0.02)
+    t.join()
+
+    stats = sched.stats() if sched.enabled else None
+    print(
+        f"{name:>10}: interactive n={len(latencies)} p50={_pct(latencies, 0.5)}ms p99={_pct(latencies, 0.99)}ms | "
+        f"bulk rows={summary['rows']} ok={summary['succeeded']} failed={summary['failed']} rows/s={summary['rows_per_sec']}"
+        + (f" shed={stats['bulk']['shed']}" if stats else "")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1500)
+    parser.add_argument("--concurrency", type=int, default=16, help="bulk import workers")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="scheduler slots (backend capacity)")
+    parser.add_argument("--bulk-deadline", type=float, default=5.0)
+    args = parser.parse_args()
+    # 每次交互查询都要打到后端：关闭本地轨迹时间线
+    agent._tracking_store.max_age_seconds = 0
+
+    created = agent.create_forecast_order_with_preferences(
+        origin_city="深圳",
+        destination_city="洛杉矶",
+        customernumber1="SCHED-PROBE",
+        consignee_countrycode="US",
+        consigneename="Probe",
+        consigneeaddress1="1 Main St",
+        consigneecity="Los Angeles",
+        consigneezipcode="90001",
+        consigneeprovince="CA",
+    )
+    order_no = created["data"].get("tracking_id") or "SCHED-PROBE"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _scenario("baseline", PriorityScheduler(0), tmp, args.rows, args.concurrency, order_no)
+        _scenario(
+            "scheduled",
+            PriorityScheduler(args.max_concurrency, bulk_queue_deadline=args.bulk_deadline),
+            tmp,
+            args.rows,
+            args.concurrency,
+            order_no,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+多租户基准 - 数百个活跃租户并发调用工具，统计吞吐、池内租户数与空闲淘汰
+"""
+
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from logistics_agent import agent
+from logistics_agent.mock_logistics_api import MockLogisticsApi
+from logistics_agent.tenant_pool import TenantPool
+
+
+def _order(customernumber: str) -> dict:
+    return {
+        "origin_city": "深圳",
+        "destination_city": "洛杉矶",
+        "customernumber1": customernumber,
+        "consignee_countrycode": "US",
+        "consigneename": "Bench",
+        "consigneeaddress1": "1 Main St",
+        "consigneecity": "Los Angeles",
+        "consigneezipcode": "90001",
+        "consigneeprovince": "CA",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tenants", type=int, default=500)
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--idle-ttl", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    pool = TenantPool(
+        lambda code, token: MockLogisticsApi(customer_code=code, token=token),
+        idle_ttl_seconds=args.idle_ttl,
+    )
+    agent.tenant_pool = pool
+    rng = random.Random(args.seed)
+    # 长尾分布：少数大客户占大部分调用
+    weights = [1.0 / (i + 1) for i in range(args.tenants)]
+    picks = rng.choices(range(args.tenants), weights=weights, k=args.ops)
+
+    def work(i: int) -> None:
+        code = f"T{picks[i]:04d}"
+        with pool.lease(code, f"tok-{code}"):
+            resp = agent.submit_order_fields_idempotent(_order(f"MT-{code}-{i:07d}"))
+            agent.query_order_status(str(resp["data"]["order_id"]))
+            agent.get_last_order_reference()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        for _ in executor.map(work, range(args.ops), chunksize=64):
+            pass
+    elapsed = time.perf_counter() - started
+    peak = pool.stats()
+
+    time.sleep(args.idle_ttl)
+    evicted = pool.evict_idle()
+    print(
+        f"tenants={args.tenants} ops={args.ops} threads={args.threads} "
+        f"elapsed={elapsed:.2f}s ops_per_s={args.ops / elapsed:,.0f}"
+    )
+    print(f"pool: created={peak['created']} live={peak['tenants']} evicted_after_idle={evicted} live_now={len(pool)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+多线程扩展性基准 - 同一进程内用线程池驱动混合工具调用（自由线程构建 python3.13t 下可用满多核）
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from logistics_agent import agent
+
+
+def _order(customernumber: str) -> dict:
+    return {
+        "origin_city": "深圳",
+        "destination_city": "洛杉矶",
+        "customernumber1": customernumber,
+        "consignee_countrycode": "US",
+        "consigneename": "Bench",
+        "consigneeaddress1": "1 Main St",
+        "consigneecity": "Los Angeles",
+        "consigneezipcode": "90001",
+        "consigneeprovince": "CA",
+    }
+
+
+def run(threads: int, ops: int, tag: str) -> float:
+    def work(i: int) -> None:
+        resp = agent.submit_order_fields_idempotent(_order(f"TH-{tag}-{i:07d}"))
+        agent.query_order_status(str(resp["data"]["order_id"]))
+        agent.get_last_order_reference()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for _ in pool.map(work, range(ops), chunksize=64):
+            pass
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--max-threads", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"python={sys.version.split()[0]} gil_enabled={gil} cpus={os.cpu_count()} ops={args.ops}")
+    counts = [1]
+    while counts[-1] * 2 <= args.max_threads:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != args.max_threads:
+        counts.append(args.max_threads)
+
+    base = None
+    print(f"{'threads':>8} {'seconds':>9} {'ops/s':>10} {'speedup':>8}")
+    for n in counts:
+        seconds = run(n, args.ops, tag=f"T{n}")
+        base = base or seconds
+        print(f"{n:>8} {seconds:>9.2f} {args.ops / seconds:>10.0f} {base / seconds:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
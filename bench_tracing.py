@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Span 追踪开销基准 - 关闭时的包装开销，以及开启时每次工具调用（工具/_tool_call/API 三层 span）的代价
+"""
+
+import argparse
+import os
+import tempfile
+import timeit
+
+from logistics_agent import agent
+from logistics_agent.tracing import InMemoryExporter, JsonlExporter, tracer
+
+
+def _per_call_us(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    tool = next(t for t in agent.root_agent.tools if t.__name__ == "get_insurance_types")
+    disabled = _per_call_us(tool, args.calls)
+
+    tracer.enable(InMemoryExporter(max_spans=10000))
+    in_memory = _per_call_us(tool, args.calls)
+    with tempfile.TemporaryDirectory() as out_dir:
+        exporter = JsonlExporter(os.path.join(out_dir, "traces.jsonl"))
+        tracer.enable(exporter)
+        jsonl = _per_call_us(tool, args.calls)
+        exporter.close()
+    tracer.disable()
+
+    print(f"tool=get_insurance_types calls={args.calls} (3 spans per call when enabled)")
+    print(f"{'mode':<22} {'us/call':>10} {'overhead':>12}")
+    print(f"{'disabled':<22} {disabled:>10.1f} {'-':>12}")
+    print(f"{'in-memory collector':<22} {in_memory:>10.1f} {in_memory - disabled:>+9.1f} us")
+    print(f"{'jsonl file':<22} {jsonl:>10.1f} {jsonl - disabled:>+9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
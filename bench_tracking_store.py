@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+本地轨迹时间线基准 - Python 与 HTTP 推送的事件摄入速率（含重复事件），以及 query_order_status 本地回答与调用轨迹接口（typical 画像）的延迟
+"""
+
+import argparse
+import http.client
+import json
+import random
+import time
+
+from logistics_agent import agent
+from logistics_agent.mock_logistics_api import FaultInjectingApi, MockLogisticsApi
+from logistics_agent.shipment_lifecycle import MILESTONES
+from logistics_agent.tracking_store import PUSH_PATH, TrackingIngestServer, TrackingStore
+
+
+def _events(orders: int, dup_rate: float, seed: int = 1) -> list[dict]:
+    rng = random.Random(seed)
+    events = []
+    for o in range(orders):
+        for day, (_, info, location, status, status_name, code, _, _) in enumerate(MILESTONES):
+            event = {
+                "waybillnumber": f"BT{o:08d}",
+                "systemnumber": f"SYSBT{o:08d}",
+                "trackdate_utc8": f"2025-12-{10 + day:02d} 10:00:00",
+                "info": info,
+                "location": location,
+                "responsecode": code,
+                "orderstatus": status,
+                "orderstatusName": status_name,
+            }
+            events.append(event)
+            if rng.random() < dup_rate:
+                events.append(dict(event))
+    rng.shuffle(events)
+    return events
+
+
+def _pct(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * q))] * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--dup-rate", type=float, default=0.2)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    events = _events(args.orders, args.dup_rate)
+    batches = [events[i:i + args.batch] for i in range(0, len(events), args.batch)]
+
+    store = TrackingStore()
+    t0 = time.perf_counter()
+    for batch in batches:
+        store.ingest(batch)
+    py_s = time.perf_counter() - t0
+    stats = store.stats()
+    print(f"Python ingest: {len(events)} 个事件（{stats['duplicates']} 个重复）/ {args.orders} 单，"
+          f"{len(events) / py_s:,.0f} 事件/秒")
+
+    store = TrackingStore()
+    server = TrackingIngestServer(store, port=0)
+    server.start_in_thread()
+    conn = http.client.HTTPConnection(server.host, server.port)
+    bodies = [json.dumps({"events": b}, ensure_ascii=False).encode("utf-8") for b in batches]
+    t0 = time.perf_counter()
+    for body in bodies:
+        conn.request("POST", PUSH_PATH, body=body, headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        resp.read()
+        assert resp.status == 200
+    http_s = time.perf_counter() - t0
+    conn.close()
+    server.stop()
+    print(f"HTTP push（每批 {args.batch} 个，keep-alive）: {len(events) / http_s:,.0f} 事件/秒，"
+          f"时间线 {store.stats()['orders']} 单 / {store.stats()['events']} 个事件")
+
+    # query_order_status：本地回答 vs 调接口（typical 画像，约 40 ms）
+    agent._api = FaultInjectingApi(MockLogisticsApi(), "typical", seed=1)
+    agent._tracking_store = store
+    numbers = [f"SYSBT{random.randrange(args.orders):08d}" for _ in range(args.queries)]
+    local: list[float] = []
+    for n in numbers:
+        t0 = time.perf_counter()
+        resp = agent.query_order_status(n)
+        local.append(time.perf_counter() - t0)
+        assert resp["data"]["source"] == "local"
+    created = agent._api.create_order(origin_city="深圳", destination_city="洛杉矶", customernumber1="BT-API")
+    store.max_age_seconds = 0
+    remote: list[float] = []
+    for _ in range(args.queries // 4):
+        t0 = time.perf_counter()
+        agent.query_order_status(created["data"][0]["systemnumber"])
+        remote.append(time.perf_counter() - t0)
+    print(f"{'query_order_status':<20} {'p50 ms':>8} {'p99 ms':>8}")
+    print(f"{'local':<20} {_pct(local, 0.5):>8} {_pct(local, 0.99):>8}")
+    print(f"{'api (typical)':<20} {_pct(remote, 0.5):>8} {_pct(remote, 0.99):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+轨迹订阅基准 - 共享批量轮询 + 增量推送 vs 每个客户端各自全量轮询
+"""
+
+import argparse
+import json
+import time
+
+from logistics_agent.mock_logistics_api import MockLogisticsApi
+from logistics_agent.tracking_subscriptions import TrackingHub
+
+
+class MeteredApi(MockLogisticsApi):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self.bytes = 0
+
+    def _meter(self, resp):
+        self.calls += 1
+        self.bytes += len(json.dumps(resp, ensure_ascii=False).encode("utf-8"))
+        return resp
+
+    def metered_track(self, waybillnumber):
+        return self._meter(self.track(waybillnumber=waybillnumber))
+
+    def track_many(self, *, waybillnumbers):
+        return self._meter(super().track_many(waybillnumbers=waybillnumbers))
+
+
+def _size(obj) -> int:
+    return len(json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--waybills", type=int, default=10000)
+    parser.add_argument("--poll-interval", type=float, default=60.0, help="模拟的轮询间隔（秒）")
+    parser.add_argument("--ticks", type=int, default=5, help="实际执行的轮询次数，结果按每小时外推")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    api = MeteredApi()
+    waybills = []
+    for i in range(args.waybills):
+        resp = api.create_order(origin_city="深圳", destination_city="洛杉矶", customernumber1=f"SUB-{i:07d}")
+        waybills.append(resp["data"][0]["systemnumber"])
+    ticks_per_hour = 3600 / args.poll_interval
+    scale = ticks_per_hour / args.ticks
+
+    # 朴素轮询：每个客户端每个周期都拿到完整 trackItems
+    api.calls = api.bytes = 0
+    started = time.perf_counter()
+    for _ in range(args.ticks):
+        for wb in waybills:
+            api.metered_track(wb)
+    naive_seconds = time.perf_counter() - started
+    naive_calls, naive_bytes = api.calls, api.bytes
+
+    # 共享轮询：一个循环批量查询，客户端只收到新增事件
+    api.calls = api.bytes = 0
+    hub = TrackingHub(api, poll_interval=args.poll_interval, batch_size=args.batch_size)
+    subs = [hub.subscribe([wb], prime=False) for wb in waybills]
+    delivered_bytes = 0
+    started = time.perf_counter()
+    for _ in range(args.ticks):
+        hub.poll_once()
+        for sub in subs:
+            events = sub.poll()
+            if events:
+                delivered_bytes += _size(events)
+    hub_seconds = time.perf_counter() - started
+
+    print(f"📦 waybills={args.waybills} poll_interval={args.poll_interval}s ticks={args.ticks} (外推到 1 小时)")
+    print(f"{'mode':<12} {'calls/h':>12} {'backend MB/h':>13} {'client MB/h':>12} {'cpu s/tick':>11}")
+    print(
+        f"{'naive':<12} {naive_calls * scale:>12.0f} {naive_bytes * scale / 1e6:>13.1f} "
+        f"{naive_bytes * scale / 1e6:>12.1f} {naive_seconds / args.ticks:>11.3f}"
+    )
+    print(
+        f"{'subscribed':<12} {api.calls * scale:>12.0f} {api.bytes * scale / 1e6:>13.1f} "
+        f"{delivered_bytes / 1e6:>12.1f} {hub_seconds / args.ticks:>11.3f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+件组尺寸基准 - 数千个件组的订单：解析（列表 / CSV / 文本）、生成 volumes 行、按全部渠道除数计算体积重与计费重，对比逐件 Python 循环
+"""
+
+import argparse
+import random
+import time
+
+from logistics_agent import agent
+from logistics_agent.rate_quote import rate_card
+from logistics_agent.volumes import Pieces
+
+
+def _groups(n: int, seed: int = 1) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "length": rng.randint(10, 120),
+            "width": rng.randint(10, 100),
+            "height": rng.randint(5, 80),
+            "weight": round(rng.uniform(0.2, 30), 2),
+            "count": rng.randint(1, 4),
+        }
+        for _ in range(n)
+    ]
+
+
+def _loop_weights(groups: list[dict], divisors: list[float]) -> list[dict]:
+    """对照组：逐件、逐渠道计算体积重与计费重"""
+
+    out = []
+    for d in divisors:
+        actual = dimensional = 0.0
+        for g in groups:
+            dim = g["length"] * g["width"] * g["height"] / d
+            actual += g["weight"] * g["count"]
+            dimensional += dim * g["count"]
+        out.append({"dimensional_weight": dimensional, "chargeable_weight": max(actual, dimensional)})
+    return out
+
+
+def _best_ms(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--groups", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    groups = _groups(args.groups)
+    csv_text = "length,width,height,weight,count\n" + "\n".join(
+        f"{g['length']},{g['width']},{g['height']},{g['weight']},{g['count']}" for g in groups
+    )
+    text = "\n".join(f"{g['length']}x{g['width']}x{g['height']}cm {g['weight']}kg x{g['count']}" for g in groups)
+    rate_card.zone_of("US")
+    divisors = [rate_card.volumetric_divisor(c) for c in rate_card.channel_ids]
+    pieces = Pieces.from_groups(groups)
+
+    print(f"{args.groups} 个件组 / {pieces.pieces} 件, {len(divisors)} 个渠道除数")
+    print(f"{'':<26} {'ms':>10}")
+    for label, fn in [
+        ("解析 列表", lambda: Pieces.from_groups(groups)),
+        ("解析 CSV", lambda: Pieces.parse(csv_text)),
+        ("解析 文本", lambda: Pieces.parse(text)),
+        ("volumes 行", lambda: pieces.volume_rows("BV-1")),
+        ("计费重 numpy", lambda: pieces.chargeable_weights(divisors)),
+        ("计费重 逐件循环", lambda: _loop_weights(groups, divisors)),
+    ]:
+        print(f"{label:<24} {_best_ms(fn, args.repeat):>10.2f}")
+
+    fields = dict(
+        customernumber1="BV-1", consignee_countrycode="US", consigneename="Warehouse", consigneeaddress1="9 Port Ave",
+        consigneecity="Los Angeles", consigneezipcode="90001", consigneeprovince="CA",
+    )
+    resp = agent.build_create_forecast_payload(volumes=csv_text, **fields)
+    assert resp["status"] == "success", resp
+    ms = _best_ms(lambda: agent.build_create_forecast_payload(volumes=csv_text, **fields), args.repeat)
+    print(f"{'完整下单载荷（CSV）':<24} {ms:>10.2f}")
+    print(f"计费重 {resp['data']['weights']['chargeable_weight']} kg（实重 {resp['data']['weights']['actual_weight']} kg）")
+
+
+if __name__ == "__main__":
+    main()
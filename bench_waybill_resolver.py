@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+空运单号补齐基准 - 后台批量解析 vs 逐单调用 get_waybillnumbers
+"""
+
+import argparse
+import time
+
+from logistics_agent.mock_logistics_api import MockLogisticsApi
+from logistics_agent.waybill_resolver import WaybillResolver
+
+
+class CountingApi(MockLogisticsApi):
+    def __init__(self):
+        super().__init__()
+        self.waybill_calls = 0
+
+    def waybillnumber(self, *, customernumber):
+        self.waybill_calls += 1
+        return super().waybillnumber(customernumber=customernumber)
+
+
+def create_deferred(api: MockLogisticsApi, count: int) -> list[str]:
+    deferred = []
+    for i in range(count):
+        resp = api.create_order(origin_city="深圳", destination_city="洛杉矶", customernumber1=f"WB-{i:07d}")
+        first = resp["data"][0]
+        if not first["waybillnumber"]:
+            deferred.append(first["customernumber"])
+    return deferred
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--flush-interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    per_order_api = CountingApi()
+    deferred = create_deferred(per_order_api, args.orders)
+    started = time.perf_counter()
+    for cn in deferred:
+        per_order_api.waybillnumber(customernumber=[cn])
+    per_order_seconds = time.perf_counter() - started
+
+    batched_api = CountingApi()
+    deferred = create_deferred(batched_api, args.orders)
+    resolver = WaybillResolver(batched_api, batch_size=args.batch_size, flush_interval=args.flush_interval)
+    started = time.perf_counter()
+    futures = [resolver.enqueue(cn) for cn in deferred]
+    for f in futures:
+        f.result(timeout=10)
+    batched_seconds = time.perf_counter() - started
+    resolver.close()
+
+    scale = 1000 / args.orders
+    print(f"📦 orders={args.orders} deferred={len(deferred)} ({len(deferred) / args.orders:.1%})")
+    print(f"逐单调用: {per_order_api.waybill_calls * scale:.1f} calls / 1k orders, {per_order_seconds * 1000:.1f} ms")
+    print(
+        f"批量解析: {batched_api.waybill_calls * scale:.1f} calls / 1k orders, {batched_seconds * 1000:.1f} ms "
+        f"(batch_size={args.batch_size}, flush_interval={args.flush_interval}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,43 @@
+import copy
 import json
 import hashlib
 import logging
+import os
 import re
+import threading
 from typing import Any
 
 from google.adk.agents import Agent
 
-from .mock_logistics_api import MockLogisticsApi
+from .cassette import cassette_stats, wrap_from_env as _cassette_from_env
+from .dictionary_catalog import NAME_KEYS as DICTIONARY_NAME_KEYS, DictionaryCatalog, DictionaryCatalogManager
+from .fuzzy_match import auto_select, build_option_index
+from .hs_codes import has_cjk, hs_codes as _hs_codes, normalize_code as normalize_hs_code
+from .http_api import HttpLogisticsApi
+from .mock_logistics_api import FaultInjectingApi, MockLogisticsApi
+from .order_ledger import OrderLedger
+from .order_store import DEFAULT_PAGE_SIZE as DEFAULT_ORDER_PAGE_SIZE, OrderStore, parse_time_bound
+from .postal_codes import postal_codes as _postal_codes
+from .profiling import profiler as _profiler
+from .rate_limit import limiter_stats, wrap_from_env
+from .rate_quote import rate_card as _rate_card
+from .scheduler import BULK, LoadShedError, scheduler as _scheduler
 from .schemas import validate_create_forecast_payload
+from .tenant_pool import Tenant, TenantPool, current_tenant
+from .tracing import tracer as _tracer
+from .shipment_lifecycle import format_utc8
+from .tracking_store import DEFAULT_MAX_AGE_SECONDS as DEFAULT_TRACKING_MAX_AGE, TrackingIngestServer, TrackingStore
+from .tracking_subscriptions import (
+    DEFAULT_POLL_INTERVAL_SECONDS as DEFAULT_TRACKING_POLL_INTERVAL,
+    DEFAULT_SUBSCRIPTION_TTL_SECONDS as DEFAULT_TRACKING_SUBSCRIPTION_TTL,
+    TrackingHub,
+)
+from .volumes import Pieces, parse_groups as _parse_volume_groups
+from .waybill_resolver import (
+    DEFAULT_BATCH_SIZE as DEFAULT_WAYBILL_BATCH_SIZE,
+    DEFAULT_FLUSH_INTERVAL_SECONDS as DEFAULT_WAYBILL_FLUSH_INTERVAL,
+    WaybillResolver,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -17,24 +47,161 @@ logger.setLevel(logging.INFO)
 logging.getLogger().info("logistics_agent.agent loaded from %s", __file__)
 
 
-_api = MockLogisticsApi()
+def _build_api() -> Any:
+    """LOGISTICS_API_BASE_URL 指向 HTTP 服务（如 mock_http_server）；否则用进程内 mock，可叠加延迟/故障画像。"""
+
+    base_url = os.environ.get("LOGISTICS_API_BASE_URL")
+    if base_url:
+        api = HttpLogisticsApi(base_url)
+    else:
+        profile = os.environ.get("LOGISTICS_MOCK_PROFILE", "none")
+        api = FaultInjectingApi(MockLogisticsApi(), profile) if profile != "none" else MockLogisticsApi()
+    # LOGISTICS_CASSETTE_RECORD / LOGISTICS_CASSETTE_REPLAY：录制后端调用，或离线按录制回放
+    api = _cassette_from_env(api)
+    # LOGISTICS_API_RATE_LIMITS / LOGISTICS_API_MAX_CONCURRENCY：按接口的令牌桶与自适应并发上限
+    return wrap_from_env(api)
+
+
+_api = _build_api()
+
+
+# 字典缓存：设置 LOGISTICS_DICTIONARY_SNAPSHOT 后，启动时优先从本地快照加载，后台再与 API 校验
+_catalog_manager = DictionaryCatalogManager(
+    _api,
+    snapshot_path=os.environ.get("LOGISTICS_DICTIONARY_SNAPSHOT") or None,
+)
 
 
 _IDEMPOTENT_CACHE: dict[str, dict] = {}
 
 
-_ORDER_DRAFT: dict[str, Any] = {}
+# 按 request_id 分片的锁：同一请求并发到达时只下单一次，不同请求互不阻塞
+_IDEMPOTENT_LOCK_SHARDS = 64
+_IDEMPOTENT_LOCKS = [threading.Lock() for _ in range(_IDEMPOTENT_LOCK_SHARDS)]
 
 
+class _OrderDraft:
+    """One conversation's order draft and its incremental validation state."""
+
+    def __init__(self):
+        self.fields: dict[str, Any] = {}
+        # 草稿的增量状态：仍缺失的必填字段，以及尚未纠正的字段校验错误
+        self.missing: set[str] = set()
+        self.errors: dict[str, str] = {}
+        # 由邮编自动补齐（而非用户填写）的草稿字段；邮编变化时随之重新补齐
+        self.autofilled: set[str] = set()
+        # 草稿的读改写必须作为整体执行（可重入：提交时会重置草稿）
+        self.lock = threading.RLock()
+
+
+# 未绑定租户时的草稿；租户各有自己的草稿，不能用别的租户的凭据提交
+_order_draft = _OrderDraft()
+
+
+# 写时复制：每次更新都换成新 dict，读者拿到的引用不会被再修改；_LAST_ORDER_LOCK 只串行化写者
 _LAST_ORDER: dict[str, Any] = {}
 
 
+_LAST_ORDER_LOCK = threading.Lock()
+
+
+def _last_order() -> dict[str, Any]:
+    tenant = current_tenant()
+    return tenant.last_order if tenant is not None else _LAST_ORDER
+
+
+def _set_last_order(last: dict[str, Any]) -> None:
+    global _LAST_ORDER
+    tenant = current_tenant()
+    with _LAST_ORDER_LOCK:
+        if tenant is not None:
+            tenant.last_order = dict(last)
+        else:
+            _LAST_ORDER = dict(last)
+
+
+# 经本 agent 创建的订单：list_orders 按城市/国家/状态/创建时间分页检索
+_order_store = OrderStore()
+
+
+# 同一批订单的列式台账：get_shipping_stats 做向量化分组汇总
+_order_ledger = OrderLedger()
+
+# 租户的订单库与台账按 customer_code 保存在模块级：租户被淘汰或令牌轮换只换掉 API 客户端，订单历史仍在
+_tenant_order_stores: dict[str, OrderStore] = {}
+_tenant_order_ledgers: dict[str, OrderLedger] = {}
+_TENANT_HISTORY_LOCK = threading.Lock()
+
+
+def _tenant_order_store(customer_code: str) -> OrderStore:
+    store = _tenant_order_stores.get(customer_code)
+    if store is None:
+        with _TENANT_HISTORY_LOCK:
+            store = _tenant_order_stores.setdefault(customer_code, OrderStore())
+    return store
+
+
+def _tenant_order_ledger(customer_code: str) -> OrderLedger:
+    ledger = _tenant_order_ledgers.get(customer_code)
+    if ledger is None:
+        with _TENANT_HISTORY_LOCK:
+            ledger = _tenant_order_ledgers.setdefault(customer_code, OrderLedger())
+    return ledger
+
+
+# 同一订单可能在嵌套的下单路径里被记录多次：查重与写入台账必须原子完成
+_RECORD_ORDER_LOCK = threading.Lock()
+
+
+def _on_waybill_resolved(customernumber: str, waybillnumber: str) -> None:
+    global _LAST_ORDER
+    _order_store.set_waybillnumber(customernumber, waybillnumber)
+    with _LAST_ORDER_LOCK:
+        last = _LAST_ORDER
+        if last.get("customernumber") == customernumber and not last.get("waybillnumber"):
+            _LAST_ORDER = {**last, "waybillnumber": waybillnumber}
+
+
+def _tenant_waybill_callback(tenant: Tenant):
+    def _on_resolved(customernumber: str, waybillnumber: str) -> None:
+        _tenant_order_store(tenant.customer_code).set_waybillnumber(customernumber, waybillnumber)
+        with _LAST_ORDER_LOCK:
+            last = tenant.last_order
+            if last.get("customernumber") == customernumber and not last.get("waybillnumber"):
+                tenant.last_order = {**last, "waybillnumber": waybillnumber}
+
+    return _on_resolved
+
+
+# createForecast 可能返回空 waybillnumber；后台按批次调用 /api/order/waybillnumber 补齐（后台任务，走 BULK 优先级）
+_waybill_resolver = WaybillResolver(
+    _scheduler.wrap(_api, priority=BULK),
+    batch_size=int(os.environ.get("LOGISTICS_WAYBILL_BATCH_SIZE", DEFAULT_WAYBILL_BATCH_SIZE)),
+    flush_interval=float(os.environ.get("LOGISTICS_WAYBILL_FLUSH_INTERVAL", DEFAULT_WAYBILL_FLUSH_INTERVAL)),
+    on_resolved=_on_waybill_resolved,
+)
+
+
 DEFAULT_CHANNEL_ID = "HK_TNT"
 DEFAULT_PACKAGE_TYPE_CODE = "O"
 DEFAULT_GOODS_TYPE_CODE = "WPX"
 DEFAULT_DECLARE_CURRENCY = "USD"
 
 
+_REQUIRED_ORDER_KEYS = (
+    "origin_city",
+    "destination_city",
+    "customernumber1",
+    "consignee_countrycode",
+    "consigneename",
+    "consigneeaddress1",
+    "consigneecity",
+    "consigneezipcode",
+    "consigneeprovince",
+)
+
+
+@_tracer.traced("tool_call")
 def _tool_call(func, *, tool_name: str, **kwargs) -> dict:
     try:
         logging.getLogger().info("TOOL_CALL %s kwargs=%s", tool_name, kwargs)
@@ -54,6 +221,11 @@ def _err(message: str, **details) -> dict:
     return {"status": "error", "data": None, "error": {"message": message, **details}}
 
 
+@_tracer.traced("dictionary options")
+def _dictionary_options(name: str) -> list[dict]:
+    return _active_catalog().options(name)
+
+
 def _normalize_text(s: str) -> str:
     return " ".join(s.strip().lower().split())
 
@@ -127,13 +299,60 @@ def _save_last_order_from_response(resp: dict) -> None:
             last["request_id"] = data.get("request_id")
 
         if last:
-            _LAST_ORDER.clear()
-            _LAST_ORDER.update(last)
+            _set_last_order(last)
+            _record_order(result if isinstance(result, dict) else raw, data.get("request_payload"))
     except Exception:
         # Never block main flow due to bookkeeping
         return
 
 
+def _record_order(result: Any, request_payload: Any = None) -> None:
+    """Add a createForecast/create response to the order store (re-recording the same order is a no-op)."""
+
+    if not isinstance(result, dict) or not isinstance(result.get("data"), list) or not result["data"]:
+        return
+    first = result["data"][0]
+    if not isinstance(first, dict) or not first.get("systemnumber"):
+        return
+    meta = first.get("meta") if isinstance(first.get("meta"), dict) else {}
+    payload = request_payload if isinstance(request_payload, dict) else meta.get("request_payload")
+    order: dict[str, Any] = {}
+    if isinstance(payload, dict) and isinstance(payload.get("datas"), list) and payload["datas"]:
+        order = payload["datas"][0].get("order") or {}
+    order_id = str(first["systemnumber"])
+    store = _active_order_store()
+    with _RECORD_ORDER_LOCK:
+        if store.get(order_id) is not None:
+            return
+        record = store.add(
+            order_id=order_id,
+            waybillnumber=first.get("waybillnumber") or None,
+            customernumber=first.get("customernumber"),
+            origin_city=meta.get("origin_city"),
+            destination_city=meta.get("destination_city"),
+            consigneecity=order.get("consigneecity"),
+            countrycode=order.get("countrycode"),
+        )
+        childs = first.get("childs")
+        _active_order_ledger().append(
+            timestamp=record.created_at,
+            channelid=order.get("channelid"),
+            countrycode=order.get("countrycode"),
+            forecastweight=float(order.get("forecastweight") or 0.0),
+            number=int(order.get("number") or (len(childs) if isinstance(childs, list) and childs else 1)),
+            is_remote=bool(first.get("isRemote")),
+            insurance_value=float(order.get("insurancevalue") or 0.0),
+        )
+
+
+def _record_order_response(resp: Any) -> None:
+    """Add the order behind a successful tool response to the order store (used for orders created elsewhere)."""
+
+    data = resp.get("data") if isinstance(resp, dict) and resp.get("status") == "success" else None
+    if isinstance(data, dict):
+        _record_order(data.get("result"), data.get("request_payload"))
+
+
 def _extract_order_identifiers_from_result(result: Any) -> dict[str, Any]:
     out: dict[str, Any] = {}
     if not isinstance(result, dict):
@@ -151,6 +370,9 @@ def _extract_order_identifiers_from_result(result: Any) -> dict[str, Any]:
         out["order_id"] = systemnumber
     if waybillnumber is not None:
         out["tracking_id"] = waybillnumber
+    if isinstance(first.get("childCount"), int) and first["childCount"] > 1:
+        # childs 只是第一页；其余件用 query_order_status 的 child_offset 翻页
+        out["child_count"] = first["childCount"]
 
     childs = first.get("childs")
     if isinstance(childs, list) and childs:
@@ -166,6 +388,116 @@ def _extract_order_identifiers_from_result(result: Any) -> dict[str, Any]:
     return out
 
 
+# 轨迹订阅：所有订阅共享一个后台轮询循环，只推送新增轨迹事件
+_tracking_hub = TrackingHub(
+    _scheduler.wrap(_api, priority=BULK),
+    poll_interval=float(os.environ.get("LOGISTICS_TRACKING_POLL_INTERVAL", DEFAULT_TRACKING_POLL_INTERVAL)),
+    subscription_ttl=float(os.environ.get("LOGISTICS_TRACKING_SUBSCRIPTION_TTL", DEFAULT_TRACKING_SUBSCRIPTION_TTL)),
+)
+
+
+def _on_tracking_status(numbers: list[str], status: str, customer_code: str | None) -> None:
+    """Move the order to a pushed/refreshed status in the order store of the tenant that owns it."""
+
+    store = _tenant_order_store(customer_code) if customer_code else _order_store
+    for number in numbers:
+        if store.get(number) is not None:
+            store.update_status(number, status)
+            return
+
+
+# 本地轨迹时间线：承运商推送与最近一次接口查询都写入这里，query_order_status 优先从本地回答
+# （运单号全局唯一，各租户共用一份；带 customer_code 的订单只对该租户可见）；状态变化同步到订单库的状态索引
+_tracking_store = TrackingStore(
+    max_age_seconds=float(os.environ.get("LOGISTICS_TRACKING_MAX_AGE", DEFAULT_TRACKING_MAX_AGE)),
+    on_status=_on_tracking_status,
+)
+_tracking_ingest: TrackingIngestServer | None = None
+if os.environ.get("LOGISTICS_TRACKING_INGEST_PORT"):
+    _tracking_ingest = TrackingIngestServer(
+        _tracking_store,
+        host=os.environ.get("LOGISTICS_TRACKING_INGEST_HOST", "127.0.0.1"),
+        port=int(os.environ["LOGISTICS_TRACKING_INGEST_PORT"]),
+        token=os.environ.get("LOGISTICS_TRACKING_INGEST_TOKEN") or None,
+        customer_code=os.environ.get("LOGISTICS_TRACKING_INGEST_CUSTOMER_CODE") or None,
+    )
+    _tracking_ingest.start_in_thread()
+    logging.getLogger().info("tracking ingest listening on %s", _tracking_ingest.base_url)
+
+# 多租户：宿主在 tenant_pool.lease(customer_code, token) 内调用工具时，API、字典缓存、
+# 运单号补齐与轨迹订阅都切换到该租户；未绑定租户时使用上面的默认实例
+tenant_pool = TenantPool(
+    idle_ttl_seconds=float(os.environ.get("LOGISTICS_TENANT_IDLE_TTL", 600)),
+    max_concurrency_per_tenant=int(os.environ.get("LOGISTICS_TENANT_MAX_CONCURRENCY", 8)),
+    snapshot_dir=os.environ.get("LOGISTICS_TENANT_SNAPSHOT_DIR") or None,
+)
+
+
+def _active_api() -> Any:
+    tenant = current_tenant()
+    # 调度器按上下文的优先级（交互 / 批量）放行调用；未启用时原样返回
+    return _tracer.instrument_api(_scheduler.wrap(tenant.api if tenant is not None else _api))
+
+
+def _active_catalog():
+    tenant = current_tenant()
+    return (tenant.catalog if tenant is not None else _catalog_manager).get()
+
+
+def _active_waybill_resolver() -> WaybillResolver:
+    tenant = current_tenant()
+    if tenant is None:
+        return _waybill_resolver
+    return tenant.service(
+        "waybill_resolver",
+        lambda api: WaybillResolver(
+            _scheduler.wrap(api, priority=BULK),
+            batch_size=_waybill_resolver.batch_size,
+            flush_interval=_waybill_resolver.flush_interval,
+            on_resolved=_tenant_waybill_callback(tenant),
+        ),
+    )
+
+
+def _active_order_store() -> OrderStore:
+    tenant = current_tenant()
+    return _order_store if tenant is None else _tenant_order_store(tenant.customer_code)
+
+
+def _active_order_ledger() -> OrderLedger:
+    tenant = current_tenant()
+    return _order_ledger if tenant is None else _tenant_order_ledger(tenant.customer_code)
+
+
+def _active_tracking_hub() -> TrackingHub:
+    tenant = current_tenant()
+    if tenant is None:
+        return _tracking_hub
+    return tenant.service(
+        "tracking_hub",
+        lambda api: TrackingHub(
+            _scheduler.wrap(api, priority=BULK),
+            poll_interval=_tracking_hub.poll_interval,
+            subscription_ttl=_tracking_hub.subscription_ttl,
+        ),
+    )
+
+
+def _schedule_waybill_resolution(result: Any) -> dict[str, Any]:
+    """Queue orders created without a waybillnumber for background resolution."""
+
+    if not isinstance(result, dict) or not isinstance(result.get("data"), list) or not result["data"]:
+        return {}
+    first = result["data"][0]
+    if not isinstance(first, dict) or first.get("waybillnumber"):
+        return {}
+    customernumber = first.get("customernumber")
+    if not isinstance(customernumber, str) or customernumber.strip() == "":
+        return {}
+    _active_waybill_resolver().enqueue(customernumber)
+    return {"waybill_pending": True}
+
+
 def _extract_partial_order_fields(text: str) -> dict[str, Any]:
     t = text.strip()
 
@@ -263,6 +595,14 @@ def _extract_partial_order_fields(text: str) -> dict[str, Any]:
     if number_raw:
         out["number"] = int(number_raw)
 
+    # 尺寸=40x30x20cm 5kg x3；60x40x40cm 12kg（多个件组用分号分隔）
+    volumes_raw = _find([r"(?:尺寸|箱规|volumes)\s*[:：=]\s*([^\n]+)"])
+    if volumes_raw:
+        try:
+            out["volumes"] = _parse_volume_groups(volumes_raw)
+        except ValueError:
+            out["volumes"] = volumes_raw
+
     insurance_enabled_raw = _find([r"投保\s*[:：=]\s*([^\s，,；;\n]+)"])
     if insurance_enabled_raw is not None:
         out["insurance_enabled"] = _to_bool(insurance_enabled_raw)
@@ -322,17 +662,56 @@ def _extract_partial_order_fields(text: str) -> dict[str, Any]:
     return out
 
 
+def _owning_catalog(options: list[dict]) -> tuple[DictionaryCatalog, str] | None:
+    """The active catalog and dictionary name when ``options`` is one of its lists (so its indexes apply)."""
+
+    catalog = _active_catalog()
+    for name, dictionary_options in catalog.dictionaries.items():
+        if dictionary_options is options:
+            return catalog, name
+    return None
+
+
 def _pick_by_code_or_default(options: list[dict], code, *, label: str) -> dict:
     if code is None or code == "":
         if not options:
             raise ValueError(f"No options available for {label}")
         return options[0]
-    for opt in options:
-        if str(opt.get("code")) == str(code):
-            return opt
+    owner = _owning_catalog(options)
+    if owner is not None:
+        catalog, dictionary = owner
+        picked = catalog.by_code(dictionary, code)
+        if picked is not None:
+            return picked
+    else:
+        for opt in options:
+            if str(opt.get("code")) == str(code):
+                return opt
     raise ValueError(f"Invalid {label} code: {code}")
 
 
+_FUZZY_DICTIONARY_BY_LABEL = {
+    "insurance": "insurance",
+    "producttype": "producttype",
+    "declaretype": "declaretype",
+    "insurancecurrency": "currency",
+}
+
+
+def _fuzzy_candidates(
+    options: list[dict], name: str, *, label: str, name_keys: tuple[str, ...]
+) -> list[tuple[dict, float, str]]:
+    dictionary = _FUZZY_DICTIONARY_BY_LABEL.get(label)
+    index = None
+    if dictionary is not None:
+        catalog = _active_catalog()
+        if catalog.options(dictionary) is options:
+            index = catalog.fuzzy_index(dictionary)
+    if index is None:
+        index = build_option_index(options, name_keys=name_keys)
+    return index.search(name, limit=5)
+
+
 def _pick_by_name_or_default(
     options: list[dict],
     name: str | None,
@@ -362,7 +741,16 @@ def _pick_by_name_or_default(
     contains_matches: list[dict] = []
     seen_exact: set[int] = set()
     seen_contains: set[int] = set()
-    for opt in options:
+    # 字典自带的名称索引覆盖精确匹配；命中时不必逐项扫描
+    owner = _owning_catalog(options) if set(name_keys) <= set(DICTIONARY_NAME_KEYS) else None
+    if owner is not None:
+        catalog, dictionary = owner
+        exact_matches = [
+            opt
+            for opt in catalog.by_name(dictionary, name)
+            if any(isinstance(opt.get(k), str) and _normalize_text(opt[k]) == needle for k in name_keys)
+        ]
+    for opt in options if not exact_matches else ():
         for k in name_keys:
             v = opt.get(k)
             if not isinstance(v, str):
@@ -392,35 +780,53 @@ def _pick_by_name_or_default(
             f"Ambiguous {label} name: {name}. Candidates: {[m.get('name') or m.get('cnname') or m.get('enname') for m in contains_matches]}"
         )
 
+    # Typo-tolerant fallback over the n-gram index (names + aliases).
+    ranked = _fuzzy_candidates(options, name, label=label, name_keys=name_keys)
+    # "需要报关" style input never auto-selects a concrete declare type.
+    ambiguous_declare = label == "declaretype" and ("要报关" in needle or needle == "报关")
+    if not ambiguous_declare:
+        picked = auto_select(ranked)
+        if picked is not None:
+            return picked
+    suggestion = ""
+    if ranked:
+        suggestion = "最接近的选项：" + ", ".join(
+            f"{opt.get('name') or opt.get('cnname') or opt.get('enname') or opt.get('code')}({score:.2f})"
+            for opt, score, _ in ranked[:3]
+        ) + "。"
+
     # Enhanced error message with available options for better user experience
     if label == "declaretype":
         available_options = [opt.get("name") for opt in options if opt.get("name")]
         raise ValueError(
             f"报关类型(declaretype) 必须从以下选项中选择：{', '.join(available_options)}。"
-            f"您输入的 '{name}' 无法识别，请使用准确的选项名称。"
+            f"您输入的 '{name}' 无法识别，请使用准确的选项名称。{suggestion}"
         )
     elif label == "producttype":
         available_options = [opt.get("cnname") or opt.get("enname") or opt.get("name") for opt in options if opt.get("cnname") or opt.get("enname") or opt.get("name")]
         raise ValueError(
             f"产品类型(producttype) 必须从以下选项中选择：{', '.join(available_options)}。"
-            f"您输入的 '{name}' 无法识别，请使用准确的选项名称。"
+            f"您输入的 '{name}' 无法识别，请使用准确的选项名称。{suggestion}"
         )
     elif label == "insurance":
         available_options = [opt.get("name") for opt in options if opt.get("name")]
         raise ValueError(
             f"保险类型(insurance) 必须从以下选项中选择：{', '.join(available_options)}。"
-            f"您输入的 '{name}' 无法识别，请使用准确的选项名称。"
+            f"您输入的 '{name}' 无法识别，请使用准确的选项名称。{suggestion}"
         )
     else:
-        raise ValueError(f"Invalid {label} name: {name}. Available options: {[opt.get('name') or opt.get('cnname') or opt.get('enname') for opt in options]}")
+        raise ValueError(
+            f"Invalid {label} name: {name}. Available options: {[opt.get('name') or opt.get('cnname') or opt.get('enname') for opt in options]}"
+            + (f" {suggestion}" if suggestion else "")
+        )
 
 
 def get_insurance_types() -> dict:
-    return _tool_call(_api.insurance, tool_name="get_insurance_types")
+    return _tool_call(_active_api().insurance, tool_name="get_insurance_types")
 
 
 def get_currencies() -> dict:
-    return _tool_call(_api.currency, tool_name="get_currencies")
+    return _tool_call(_active_api().currency, tool_name="get_currencies")
 
 
 def get_waybillnumbers(customernumber: Any) -> dict:
@@ -452,31 +858,130 @@ def get_waybillnumbers(customernumber: Any) -> dict:
                 hint='Pass a list like ["T620200611-1001"] or JSON like {"customernumber":["T..."]}',
             )
 
-        return _tool_call(_api.waybillnumber, tool_name="get_waybillnumbers", customernumber=nums)
+        return _tool_call(_active_api().waybillnumber, tool_name="get_waybillnumbers", customernumber=nums)
     except Exception as e:
         return _err("failed to get waybillnumbers", reason=str(e))
 
 
 def get_declare_types() -> dict:
-    return _tool_call(_api.declaretype, tool_name="get_declare_types")
+    return _tool_call(_active_api().declaretype, tool_name="get_declare_types")
 
 
 def get_customs_types() -> dict:
-    return _tool_call(_api.customstype, tool_name="get_customs_types")
+    return _tool_call(_active_api().customstype, tool_name="get_customs_types")
 
 
 def get_terms_of_sale() -> dict:
-    return _tool_call(_api.termsofsalecode, tool_name="get_terms_of_sale")
+    return _tool_call(_active_api().termsofsalecode, tool_name="get_terms_of_sale")
 
 
 def get_export_reasons() -> dict:
-    return _tool_call(_api.exportreasoncode, tool_name="get_export_reasons")
+    return _tool_call(_active_api().exportreasoncode, tool_name="get_export_reasons")
 
 
 def get_product_types() -> dict:
-    return _tool_call(_api.get_product_type, tool_name="get_product_types")
+    return _tool_call(_active_api().get_product_type, tool_name="get_product_types")
+
+
+def _build_volumes(customernumber1: str, volumes: Any, number: int, forecastweight: float) -> tuple[list[dict], int, float, Pieces | None]:
+    """Volume rows for the payload plus the resulting (number, forecastweight) and parsed pieces.
 
+    ``volumes`` lists piece groups ``{"length", "width", "height", "weight", "count"}`` (cm / kg per
+    piece, count defaults to 1), or gives them as JSON, CSV or text (see volumes.py). Pieces of one
+    group share a row whose ``prenum`` is the count, so a pallet of identical cartons stays one row
+    however many pieces it has.
+    """
 
+    if not volumes:
+        row = {
+            "customerchildnumber": f"{customernumber1}-CH1",
+            "prenum": str(number),
+            "prewidth": "1",
+            "prelength": "1",
+            "preheight": "1",
+            "prerweight": str(forecastweight),
+        }
+        return [row], number, forecastweight, None
+
+    pieces = Pieces.parse(volumes)
+    if number not in (1, pieces.pieces):
+        raise ValueError(f"number={number} does not match the {pieces.pieces} pieces listed in volumes")
+    # 与单行时一致：prerweight 为该行所有件的总重
+    return pieces.volume_rows(customernumber1), pieces.pieces, pieces.actual_weight, pieces
+
+
+_PLACEHOLDER_ITEM = {
+    "skucode": "MOCK-SKU-001",
+    "cnname": "物品",
+    "enname": "item",
+    "hscode": "",
+    "quantity": "1",
+    "quantityunit": "PCS",
+    "price": "1.00",
+    "declarecurrency": DEFAULT_DECLARE_CURRENCY,
+    "weight": "0.1",
+    "origin": "CN",
+    "model": "",
+    "note": "",
+    "material": "",
+    "brand": "",
+    "usage": "",
+}
+
+
+def _coerce_item_list(value: Any) -> list[Any]:
+    """Items as a list, a JSON array string, or names separated by newlines / ; / , / 、."""
+
+    if isinstance(value, str):
+        s = value.strip()
+        if s.startswith("[") or s.startswith("{"):
+            value = json.loads(s)
+        else:
+            value = [x.strip() for x in re.split(r"[\n;；,，、]+", s) if x.strip()]
+    if isinstance(value, dict):
+        value = value.get("items", [value])
+    if not isinstance(value, list):
+        raise ValueError("items must be a list of item names or objects")
+    return value
+
+
+def _build_items(items: Any) -> list[dict]:
+    """Declaration items with hscode / cnname / enname filled from the local HS code index.
+
+    Each item is a name or an object with ``name`` (or ``cnname`` / ``enname``), optional
+    ``hscode`` and the payload's own fields (quantity, price, weight, ...). Without items
+    the payload keeps the single placeholder item.
+    """
+
+    if not items:
+        return [dict(_PLACEHOLDER_ITEM)]
+
+    rows = []
+    for i, item in enumerate(_coerce_item_list(items)):
+        item = {"name": item} if isinstance(item, str) else item
+        if not isinstance(item, dict):
+            raise ValueError(f"items[{i}] must be a name or an object")
+        name = str(item.get("name") or item.get("cnname") or item.get("enname") or "").strip()
+        if item.get("hscode"):
+            match = _hs_codes.lookup(item["hscode"]) or {"hscode": normalize_hs_code(item["hscode"])}
+        elif name:
+            match = _hs_codes.classify(name)
+            if match["hscode"] is None:
+                options = ", ".join(f"{c['hscode']} {c['cnname']}" for c in match["candidates"])
+                raise ValueError(f"items[{i}] could not classify '{name}'; pass hscode (candidates: {options or 'none'})")
+        else:
+            raise ValueError(f"items[{i}] needs a name or hscode")
+        # 用户给的品名优先，缺的一侧用编码的描述补齐
+        cnname = item.get("cnname") or (name if has_cjk(name) else match.get("cnname"))
+        enname = item.get("enname") or (name if name and not has_cjk(name) else match.get("enname"))
+        row = dict(_PLACEHOLDER_ITEM, skucode=str(item.get("skucode") or f"SKU-{i + 1:03d}"))
+        row.update({k: str(item[k]) for k in _PLACEHOLDER_ITEM if k in item and item[k] is not None})
+        row.update({"cnname": cnname or name, "enname": enname or name, "hscode": match["hscode"]})
+        rows.append(row)
+    return rows
+
+
+@_tracer.traced("payload build_create_forecast_payload")
 def build_create_forecast_payload(
     customernumber1: str,
     consignee_countrycode: str,
@@ -494,8 +999,17 @@ def build_create_forecast_payload(
     insurancecurrency: str | None = None,
     declaretypepkid: int | None = None,
     producttypepkid: int | None = None,
+    volumes: list[dict] | str | None = None,
+    items: list[Any] | str | None = None,
 ) -> dict:
-    """Build a complete createForecast request payload and auto-fill dependent fields."""
+    """Build a complete createForecast request payload and auto-fill dependent fields.
+
+    With ``volumes`` (per-piece dimensions, see _build_volumes) number and
+    forecastweight are derived from the pieces, and ``weights`` reports the
+    dimensional and chargeable weight with the channel's volumetric divisor.
+    ``items`` (names or objects, see _build_items) replace the placeholder
+    declaration item; hscode, cnname and enname are filled from the HS code index.
+    """
     try:
         if not customernumber1:
             raise ValueError("customernumber1 is required")
@@ -514,10 +1028,15 @@ def build_create_forecast_payload(
         if not consigneeprovince:
             raise ValueError("consigneeprovince is required")
 
-        insurance_options = _api.insurance().get("data", [])
-        currency_options = _api.currency().get("data", [])
-        declare_options = _api.declaretype().get("data", [])
-        product_options = _api.get_product_type().get("data", [])
+        volume_rows, number, forecastweight, pieces = _build_volumes(
+            customernumber1, volumes, int(number), float(forecastweight)
+        )
+        item_rows = _build_items(items)
+
+        insurance_options = _dictionary_options("insurance")
+        currency_options = _dictionary_options("currency")
+        declare_options = _dictionary_options("declaretype")
+        product_options = _dictionary_options("producttype")
 
         selected_declare = _pick_by_code_or_default(
             declare_options, declaretypepkid, label="declaretypepkid"
@@ -571,40 +1090,14 @@ def build_create_forecast_payload(
                 }
             )
 
+        api = _active_api()
         payload = {
-            "authorization": {"code": _api.customer_code, "token": _api.token},
+            "authorization": {"code": api.customer_code, "token": api.token},
             "datas": [
                 {
                     "order": order,
-                    "volumes": [
-                        {
-                            "customerchildnumber": f"{customernumber1}-CH1",
-                            "prenum": str(number),
-                            "prewidth": "1",
-                            "prelength": "1",
-                            "preheight": "1",
-                            "prerweight": str(forecastweight),
-                        }
-                    ],
-                    "items": [
-                        {
-                            "skucode": "MOCK-SKU-001",
-                            "cnname": "物品",
-                            "enname": "item",
-                            "hscode": "",
-                            "quantity": "1",
-                            "quantityunit": "PCS",
-                            "price": "1.00",
-                            "declarecurrency": DEFAULT_DECLARE_CURRENCY,
-                            "weight": "0.1",
-                            "origin": "CN",
-                            "model": "",
-                            "note": "",
-                            "material": "",
-                            "brand": "",
-                            "usage": "",
-                        }
-                    ],
+                    "volumes": volume_rows,
+                    "items": item_rows,
                 }
             ],
             "meta": {"endpoint": "/api/order/createForecast"},
@@ -614,7 +1107,9 @@ def build_create_forecast_payload(
         if validation_errors:
             return _err("payload validation failed", validation_errors=validation_errors)
 
-        return _ok(payload=payload)
+        if pieces is None:
+            return _ok(payload=payload)
+        return _ok(payload=payload, weights=pieces.summary(_rate_card.volumetric_divisor(channelid)))
     except Exception as e:
         return _err("failed to build createForecast payload", reason=str(e))
 
@@ -639,6 +1134,8 @@ def create_forecast_order_with_preferences(
     channelid: str = "HK_TNT",
     number: int = 1,
     forecastweight: float = 1.0,
+    volumes: list[dict] | str | None = None,
+    items: list[Any] | str | None = None,
 ) -> dict:
     """Auto map user-friendly selections to codes and submit a mocked createForecast order.
 
@@ -646,13 +1143,18 @@ def create_forecast_order_with_preferences(
     - insurance_currency_code: matches Currency.data[].code
     - declare_type_name: matches DeclareType.data[].name
     - product_type_name: matches ProductType.data[].cnname/enname/productname
+    - volumes: optional per-piece groups [{"length", "width", "height", "weight", "count"}] (cm/kg)
+      for multi-piece shipments, or the same as CSV / text ("40x30x20cm 5kg x3"); number and
+      forecastweight then follow from the pieces
+    - items: optional declaration items, names or {"name", "hscode", "quantity", "price", "weight"};
+      hscode / cnname / enname are filled from the local HS code index (see classify_hs_codes)
     """
 
     try:
-        insurance_options = _api.insurance().get("data", [])
-        currency_options = _api.currency().get("data", [])
-        declare_options = _api.declaretype().get("data", [])
-        product_options = _api.get_product_type().get("data", [])
+        insurance_options = _dictionary_options("insurance")
+        currency_options = _dictionary_options("currency")
+        declare_options = _dictionary_options("declaretype")
+        product_options = _dictionary_options("producttype")
 
         declare_selected = _pick_by_name_or_default(
             declare_options, declare_type_name, label="declaretype"
@@ -709,6 +1211,8 @@ def create_forecast_order_with_preferences(
             insurancecurrency=cur_code,
             declaretypepkid=declare_selected.get("code"),
             producttypepkid=product_selected.get("code"),
+            volumes=volumes,
+            items=items,
         )
 
         if built.get("status") != "success":
@@ -716,7 +1220,7 @@ def create_forecast_order_with_preferences(
 
         request_payload = built["data"]["payload"]
 
-        result = _api.create_forecast_order(
+        result = _active_api().create_forecast_order(
             origin_city=origin_city,
             destination_city=destination_city,
             request_payload=request_payload,
@@ -724,11 +1228,16 @@ def create_forecast_order_with_preferences(
 
         extras = _extract_order_identifiers_from_result(result)
         resp = _ok(request_payload=request_payload, result=result, **extras)
+        # 先记下最近一单与订单库，再排队补运单号：补齐回调可能在本函数返回前就触发
         _save_last_order_from_response(resp)
+        resp["data"].update(_schedule_waybill_resolution(result))
         return resp
     except ValueError as e:
         # Preserve detailed validation error messages (like declare type options)
         return _err(str(e))
+    except LoadShedError as e:
+        # 批量下单在调度队列里等待超时：未提交到后端，可以原样重试
+        return _err("order shed under load, retry later", reason=str(e), retryable=True)
     except Exception as e:
         return _err("failed to create forecast order", reason=str(e))
 
@@ -807,12 +1316,155 @@ def submit_forecast_order_json(order_json: str) -> dict:
     return resp
 
 
-def submit_forecast_order_from_text(text: str) -> dict:
+# LOGISTICS_POSTAL_AUTOFILL=0 关闭按邮编补齐收件城市/州
+_POSTAL_AUTOFILL = os.environ.get("LOGISTICS_POSTAL_AUTOFILL", "1") != "0"
+
+
+def _postal_code_check(fields: dict[str, Any]) -> dict[str, Any] | None:
+    """Look up the consignee zipcode locally; None when disabled or the code is not covered."""
+
+    if not _POSTAL_AUTOFILL or not fields.get("consignee_countrycode") or not fields.get("consigneezipcode"):
+        return None
+    return _postal_codes.check(
+        fields["consignee_countrycode"],
+        fields["consigneezipcode"],
+        city=fields.get("consigneecity"),
+        province=fields.get("consigneeprovince"),
+    )
+
+
+def _postal_code_warnings(fields: dict[str, Any], mismatches: dict[str, str]) -> dict[str, str]:
+    return {
+        k: f"邮编 {fields.get('consigneezipcode')} 对应 {expected}，与填写的 '{fields.get(k)}' 不一致，请确认"
+        for k, expected in mismatches.items()
+    }
+
+
+def _canonical_order(fields: dict[str, Any]) -> dict[str, Any]:
+    """Normalize order fields into the canonical shape used for idempotency hashing."""
+
+    insurance_value = fields.get("insurance_value")
+    return {
+        "origin_city": fields.get("origin_city"),
+        "destination_city": fields.get("destination_city"),
+        "customernumber1": fields.get("customernumber1"),
+        "consignee_countrycode": fields.get("consignee_countrycode"),
+        "consigneename": fields.get("consigneename"),
+        "consigneeaddress1": fields.get("consigneeaddress1"),
+        "consigneecity": fields.get("consigneecity"),
+        "consigneezipcode": fields.get("consigneezipcode"),
+        "consigneeprovince": fields.get("consigneeprovince"),
+        "insurance_enabled": _to_bool(fields.get("insurance_enabled")),
+        "insurance_value": float(insurance_value) if insurance_value not in (None, "") else None,
+        "insurance_type_name": fields.get("insurance_type_name"),
+        "insurance_currency_code": fields.get("insurance_currency_code"),
+        "product_type_name": fields.get("product_type_name"),
+        "declare_type_name": fields.get("declare_type_name"),
+        "channelid": fields.get("channelid") or DEFAULT_CHANNEL_ID,
+        "forecastweight": float(fields.get("forecastweight") or 1.0),
+        "number": int(fields.get("number") or 1),
+        # 文本/CSV/JSON 件组统一成数值列表，同一批货换种写法仍是同一个幂等键
+        "volumes": Pieces.parse(fields["volumes"]).groups() if fields.get("volumes") else None,
+        "items": _coerce_item_list(fields["items"]) if fields.get("items") else None,
+    }
+
+
+def _missing_order_fields(canonical: dict[str, Any]) -> list[str]:
+    return [k for k in _REQUIRED_ORDER_KEYS if not canonical.get(k)]
+
+
+def _submit_canonical_order(canonical: dict[str, Any]) -> dict:
+    """Create the order once per request_id; replays return the cached response."""
+
+    tenant = current_tenant()
+    # 不同租户的相同订单不能互相重放
+    key_material = canonical if tenant is None else {**canonical, "_tenant": tenant.customer_code}
+    request_id = hashlib.sha256(
+        json.dumps(key_material, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()[:16]
+
+    cached = _IDEMPOTENT_CACHE.get(request_id)
+    if cached is None:
+        with _IDEMPOTENT_LOCKS[int(request_id[:8], 16) % _IDEMPOTENT_LOCK_SHARDS]:
+            cached = _IDEMPOTENT_CACHE.get(request_id)
+            if cached is None:
+                resp = create_forecast_order_with_preferences(**canonical)
+                if isinstance(resp, dict) and resp.get("status") == "success" and isinstance(resp.get("data"), dict):
+                    resp["data"]["request_id"] = request_id
+                    resp["data"]["idempotent_replay"] = False
+                    # Publish only after the response is complete; cached entries are never mutated.
+                    _IDEMPOTENT_CACHE[request_id] = resp
+                    _save_last_order_from_response(resp)
+                    # 调用方可能改动返回值：首个调用方也拿副本，缓存条目保持不变
+                    return copy.deepcopy(resp)
+                return resp
+
+    # Return the first successful result without re-submitting.
+    cached2 = json.loads(json.dumps(cached, ensure_ascii=False))
+    if isinstance(cached2, dict) and isinstance(cached2.get("data"), dict):
+        cached2["data"]["request_id"] = request_id
+        cached2["data"]["idempotent_replay"] = True
+    return cached2
+
+
+def submit_order_fields_idempotent(fields: dict[str, Any]) -> dict:
+    """Submit already-structured order fields through the idempotency path.
+
+    Used by bulk engines; keys match submit_forecast_order.
+    """
+
+    try:
+        canonical = _canonical_order(fields)
+        missing = _missing_order_fields(canonical)
+        if missing:
+            return _err("missing required fields", missing_fields=missing)
+        return _submit_canonical_order(canonical)
+    except Exception as e:
+        return _err("failed to submit forecast order", reason=str(e))
+
+
+def import_orders_file(path: str, output_path: str | None = None, concurrency: int = 8) -> dict:
+    """Bulk-import forecast orders from a CSV or XLSX file on the server.
+
+    path and output_path are relative to the import directory
+    (LOGISTICS_IMPORT_DIR); anything resolving outside it is rejected.
+    Rows are streamed, validated and submitted with bounded concurrency via the
+    idempotent submit path; per-row results are written to output_path
+    (default: <path>.results.csv). Returns a summary, not per-row results.
+    """
+
+    from .bulk_import import confine_path, default_output_path, import_orders
+
+    try:
+        if not isinstance(path, str) or path.strip() == "":
+            return _err("path is required")
+        # 工具参数来自对话：只允许读写配置的导入目录
+        root = os.environ.get("LOGISTICS_IMPORT_DIR")
+        if not root:
+            return _err("file import is not enabled", hint="Set LOGISTICS_IMPORT_DIR to the directory orders are imported from")
+        try:
+            source = confine_path(root, path.strip())
+            target = confine_path(root, output_path.strip() if output_path else default_output_path(source))
+        except ValueError as e:
+            return _err("path is outside the import directory", reason=str(e))
+        if not os.path.isfile(source):
+            return _err("file not found", path=path)
+        summary = import_orders(source, target, concurrency=max(1, min(int(concurrency), 64)))
+        return _ok(**summary)
+    except Exception as e:
+        return _err("failed to import orders file", reason=str(e))
+
+
+def submit_forecast_order_from_text(text: str, confirm_postal_mismatch: bool = False) -> dict:
     """Submit a forecast order from natural language text.
 
     This is a terminal-friendly tool that avoids LLM-driven slot-filling loops by
     extracting fields using simple patterns and then calling
     create_forecast_order_with_preferences.
+
+    When the zipcode disagrees with the given city/state nothing is submitted and
+    postal_code_warnings is returned; pass confirm_postal_mismatch=True only after
+    the user confirmed the address as written.
     """
 
     try:
@@ -820,220 +1472,389 @@ def submit_forecast_order_from_text(text: str) -> dict:
             return _err("text is required")
 
         t = text.strip()
-        extracted = _extract_partial_order_fields(t)
-        origin_city = extracted.get("origin_city")
-        destination_city = extracted.get("destination_city")
-        customernumber1 = extracted.get("customernumber1")
-        consignee_countrycode = extracted.get("consignee_countrycode")
-        consigneename = extracted.get("consigneename")
-        consigneeaddress1 = extracted.get("consigneeaddress1")
-        consigneecity = extracted.get("consigneecity")
-        consigneezipcode = extracted.get("consigneezipcode")
-        consigneeprovince = extracted.get("consigneeprovince")
-        channelid = extracted.get("channelid") or DEFAULT_CHANNEL_ID
-        forecastweight = float(extracted.get("forecastweight") or 1.0)
-        number = int(extracted.get("number") or 1)
-        insurance_enabled = bool(extracted.get("insurance_enabled") or False)
-        insurance_value = extracted.get("insurance_value")
-        insurance_type_name = extracted.get("insurance_type_name")
-        insurance_currency_code = extracted.get("insurance_currency_code")
-        product_type_name = extracted.get("product_type_name")
-        declare_type_name = extracted.get("declare_type_name")
-
-        missing = []
-        if not origin_city:
-            missing.append("origin_city")
-        if not destination_city:
-            missing.append("destination_city")
-        if not customernumber1:
-            missing.append("customernumber1")
-        if not consignee_countrycode:
-            missing.append("consignee_countrycode")
-        if not consigneename:
-            missing.append("consigneename")
-        if not consigneeaddress1:
-            missing.append("consigneeaddress1")
-        if not consigneecity:
-            missing.append("consigneecity")
-        if not consigneezipcode:
-            missing.append("consigneezipcode")
-        if not consigneeprovince:
-            missing.append("consigneeprovince")
-
+        canonical = _canonical_order(_extract_partial_order_fields(t))
+        # 邮编能确定城市和州时直接补齐，省去一轮追问
+        postal = _postal_code_check(canonical)
+        autofilled = postal["fill"] if postal else {}
+        warnings = _postal_code_warnings(canonical, postal["mismatches"]) if postal else {}
+        canonical.update(autofilled)
+
+        missing = _missing_order_fields(canonical)
         if missing:
             return _err(
                 "missing required fields from text",
                 missing_fields=missing,
                 received_excerpt=t[:500],
+                autofilled=autofilled,
+                postal_code_warnings=warnings,
+            )
+        # 邮编与城市/州不一致时先让用户确认，不把可能错误的地址发出去
+        if warnings and not confirm_postal_mismatch:
+            return _err(
+                "zipcode does not match city or state",
+                postal_code_warnings=warnings,
+                autofilled=autofilled,
+                hint="Ask the user which is correct; resubmit the corrected text, or pass confirm_postal_mismatch=True if the address is right as written",
             )
 
-        canonical = {
-            "origin_city": origin_city,
-            "destination_city": destination_city,
-            "customernumber1": customernumber1,
-            "consignee_countrycode": consignee_countrycode,
-            "consigneename": consigneename,
-            "consigneeaddress1": consigneeaddress1,
-            "consigneecity": consigneecity,
-            "consigneezipcode": consigneezipcode,
-            "consigneeprovince": consigneeprovince,
-            "insurance_enabled": insurance_enabled,
-            "insurance_value": insurance_value,
-            "insurance_type_name": insurance_type_name,
-            "insurance_currency_code": insurance_currency_code,
-            "product_type_name": product_type_name,
-            "declare_type_name": declare_type_name,
-            "channelid": channelid,
-            "forecastweight": forecastweight,
-            "number": number,
-        }
-        request_id = hashlib.sha256(
-            json.dumps(canonical, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
-        ).hexdigest()[:16]
-
-        cached = _IDEMPOTENT_CACHE.get(request_id)
-        if cached is not None:
-            # Return the first successful result without re-submitting.
-            cached2 = json.loads(json.dumps(cached, ensure_ascii=False))
-            if isinstance(cached2, dict) and isinstance(cached2.get("data"), dict):
-                cached2["data"]["request_id"] = request_id
-                cached2["data"]["idempotent_replay"] = True
-            return cached2
-
-        resp = create_forecast_order_with_preferences(
-            origin_city=origin_city,
-            destination_city=destination_city,
-            customernumber1=customernumber1,
-            consignee_countrycode=consignee_countrycode,
-            consigneename=consigneename,
-            consigneeaddress1=consigneeaddress1,
-            consigneecity=consigneecity,
-            consigneezipcode=consigneezipcode,
-            consigneeprovince=consigneeprovince,
-            insurance_enabled=insurance_enabled,
-            insurance_value=insurance_value,
-            insurance_type_name=insurance_type_name,
-            insurance_currency_code=insurance_currency_code,
-            declare_type_name=declare_type_name,
-            product_type_name=product_type_name,
-            channelid=channelid,
-            number=number,
-            forecastweight=forecastweight,
-        )
-        if isinstance(resp, dict) and resp.get("status") == "success" and isinstance(resp.get("data"), dict):
-            resp["data"]["request_id"] = request_id
-            resp["data"]["idempotent_replay"] = False
-            _IDEMPOTENT_CACHE[request_id] = resp
-            _save_last_order_from_response(resp)
+        resp = _submit_canonical_order(canonical)
+        if (autofilled or warnings) and isinstance(resp.get("data"), dict):
+            # 幂等缓存里的响应不可修改：返回副本
+            resp = {**resp, "data": {**resp["data"], "autofilled": autofilled, "postal_code_warnings": warnings}}
         return resp
     except Exception as e:
         return _err("failed to submit forecast order from text", reason=str(e))
 
 
-def update_forecast_order_draft(text: str, *, reset: bool = False, auto_submit: bool = False) -> dict:
-    try:
-        if reset:
-            _ORDER_DRAFT.clear()
+_ZIPCODE_PATTERNS = {
+    "US": r"\d{5}(?:-\d{4})?",
+    "CN": r"\d{6}",
+    "CA": r"[A-Za-z]\d[A-Za-z] ?\d[A-Za-z]\d",
+    "GB": r"[A-Za-z]{1,2}\d[A-Za-z\d]? ?\d[A-Za-z]{2}",
+    "DE": r"\d{5}",
+    "FR": r"\d{5}",
+    "JP": r"\d{3}-?\d{4}",
+    "AU": r"\d{4}",
+}
+_GENERIC_ZIPCODE_PATTERN = r"[A-Za-z0-9][A-Za-z0-9 -]{1,9}"
+
+
+def _validate_draft_field(key: str, value: Any, draft: dict[str, Any]) -> str | None:
+    """Validate a single draft value; return an error message or None."""
+
+    if key == "consignee_countrycode":
+        if not re.fullmatch(r"[A-Z]{2}", str(value)):
+            return f"收件国家代码必须是两位字母（如 US），收到 '{value}'"
+    elif key == "consigneezipcode":
+        country = str(draft.get("consignee_countrycode") or "").upper()
+        pattern = _ZIPCODE_PATTERNS.get(country, _GENERIC_ZIPCODE_PATTERN)
+        if not re.fullmatch(pattern, str(value).strip()):
+            return f"邮编 '{value}' 不符合 {country or '通用'} 邮编格式"
+    elif key in ("forecastweight", "insurance_value"):
+        try:
+            num = float(value)
+        except (TypeError, ValueError):
+            return f"{key} 必须是数字，收到 '{value}'"
+        if num <= 0:
+            return f"{key} 必须大于 0，收到 '{value}'"
+    elif key == "number":
+        if not isinstance(value, int) or value < 1:
+            return f"number 必须是正整数，收到 '{value}'"
+    elif key == "volumes":
+        try:
+            Pieces.parse(value)
+        except ValueError as e:
+            return f"尺寸无法识别：{e}"
+    elif key in ("insurance_type_name", "product_type_name", "declare_type_name", "insurance_currency_code"):
+        try:
+            if key == "insurance_type_name":
+                _pick_by_name_or_default(_dictionary_options("insurance"), value, label="insurance", name_keys=("name",))
+            elif key == "product_type_name":
+                _pick_by_name_or_default(_dictionary_options("producttype"), value, label="producttype")
+            elif key == "declare_type_name":
+                _pick_by_name_or_default(_dictionary_options("declaretype"), value, label="declaretype")
+            elif _active_catalog().by_code("currency", _normalize_currency_code(value)) is None:
+                _pick_by_name_or_default(
+                    _dictionary_options("currency"),
+                    value,
+                    label="insurancecurrency",
+                    name_keys=("cnname", "enname", "code"),
+                )
+        except ValueError as e:
+            return str(e)
+    return None
+
+
+def _active_order_draft() -> _OrderDraft:
+    tenant = current_tenant()
+    return _order_draft if tenant is None else tenant.service("order_draft", lambda api: _OrderDraft())
+
+
+def _reset_order_draft(draft: _OrderDraft) -> None:
+    draft.fields.clear()
+    draft.errors.clear()
+    draft.autofilled.clear()
+    draft.missing.clear()
+    draft.missing.update(_REQUIRED_ORDER_KEYS)
+
+
+def _apply_draft_delta(draft: _OrderDraft, extracted: dict[str, Any]) -> tuple[dict[str, Any], dict[str, str]]:
+    """Merge newly extracted fields, validating only the values that changed."""
+
+    if not draft.fields and not draft.errors:
+        _reset_order_draft(draft)
+
+    delta: dict[str, Any] = {}
+    errors: dict[str, str] = {}
+    changed = {k: v for k, v in extracted.items() if v is not None and draft.fields.get(k) != v}
+    # A new country changes which zipcode format applies.
+    if "consignee_countrycode" in changed and "consigneezipcode" not in changed and draft.fields.get("consigneezipcode"):
+        changed["consigneezipcode"] = draft.fields["consigneezipcode"]
+
+    context = {**draft.fields, **changed}
+    for k, v in changed.items():
+        error = _validate_draft_field(k, v, context)
+        if error is not None:
+            errors[k] = error
+            draft.errors[k] = error
+            draft.fields.pop(k, None)
+            if k in _REQUIRED_ORDER_KEYS:
+                draft.missing.add(k)
+            continue
+        draft.errors.pop(k, None)
+        draft.fields[k] = v
+        draft.missing.discard(k)
+        draft.autofilled.discard(k)
+        delta[k] = v
+    return delta, errors
+
+
+def _autofill_draft_from_postal_code(draft: _OrderDraft) -> tuple[dict[str, str], dict[str, str]]:
+    """Fill missing city/province from the draft's zipcode; returns (filled, mismatch warnings)."""
+
+    # 之前自动补齐的值不算用户输入：先移除，按当前邮编重新判断
+    current = {k: v for k, v in draft.fields.items() if k not in draft.autofilled}
+    postal = _postal_code_check(current)
+    filled = postal["fill"] if postal else {}
+    for k in draft.autofilled - set(filled):
+        draft.fields.pop(k, None)
+        draft.missing.add(k)
+    draft.autofilled.clear()
+    for k, v in filled.items():
+        draft.fields[k] = v
+        draft.missing.discard(k)
+        draft.errors.pop(k, None)
+        draft.autofilled.add(k)
+    return filled, _postal_code_warnings(current, postal["mismatches"]) if postal else {}
+
+
+def _draft_with_defaults(draft: _OrderDraft) -> dict[str, Any]:
+    fields = dict(draft.fields)
+    fields.setdefault("channelid", DEFAULT_CHANNEL_ID)
+    fields.setdefault("forecastweight", 1.0)
+    fields.setdefault("number", 1)
+    return fields
 
-        if not isinstance(text, str) or text.strip() == "":
-            return _err("text is required")
 
-        extracted = _extract_partial_order_fields(text)
-        for k, v in extracted.items():
-            if v is None:
-                continue
-            _ORDER_DRAFT[k] = v
+def update_forecast_order_draft(text: str, *, reset: bool = False, auto_submit: bool = False) -> dict:
+    """Add fields from one user message to the current order draft.
 
-        draft = dict(_ORDER_DRAFT)
-        draft.setdefault("channelid", DEFAULT_CHANNEL_ID)
-        draft.setdefault("forecastweight", 1.0)
-        draft.setdefault("number", 1)
+    Only the fields in this message are extracted and validated. The result
+    holds the delta that was accepted, per-field errors, and the running
+    missing_fields; the full draft is returned once it is ready.
+    """
 
-        required_keys = [
-            "origin_city",
-            "destination_city",
-            "customernumber1",
-            "consignee_countrycode",
-            "consigneename",
-            "consigneeaddress1",
-            "consigneecity",
-            "consigneezipcode",
-            "consigneeprovince",
-        ]
-        missing = [k for k in required_keys if not draft.get(k)]
-        if missing:
-            return _ok(draft=draft, missing_fields=missing, ready=False)
+    try:
+        extracted = _extract_partial_order_fields(text) if isinstance(text, str) and text.strip() else None
+        order_draft = _active_order_draft()
+        with order_draft.lock:
+            if reset:
+                _reset_order_draft(order_draft)
+
+            if extracted is None:
+                return _err("text is required")
+
+            delta, errors = _apply_draft_delta(order_draft, extracted)
+            autofilled, postal_warnings = _autofill_draft_from_postal_code(order_draft)
+
+            missing = [k for k in _REQUIRED_ORDER_KEYS if k in order_draft.missing]
+            pending_errors = dict(order_draft.errors)
+            ready = not missing and not pending_errors
+            if not ready:
+                return _ok(
+                    delta=delta,
+                    field_errors=errors,
+                    pending_field_errors=pending_errors,
+                    missing_fields=missing,
+                    autofilled=autofilled,
+                    postal_code_warnings=postal_warnings,
+                    ready=False,
+                )
 
-        if auto_submit:
-            resp = submit_forecast_order(draft)
-            if resp.get("status") == "success":
-                _ORDER_DRAFT.clear()
-            return resp
+            draft = _draft_with_defaults(order_draft)
+            if auto_submit and postal_warnings:
+                return _err(
+                    "zipcode does not match city or state",
+                    postal_code_warnings=postal_warnings,
+                    hint="Ask the user which is correct and update the draft, or call submit_forecast_order_draft once they confirm the address as written",
+                )
+            if auto_submit:
+                resp = submit_forecast_order(draft)
+                if resp.get("status") == "success":
+                    _reset_order_draft(order_draft)
+                return resp
 
-        return _ok(draft=draft, missing_fields=[], ready=True)
+        return _ok(
+            delta=delta,
+            field_errors={},
+            pending_field_errors={},
+            missing_fields=[],
+            autofilled=autofilled,
+            postal_code_warnings=postal_warnings,
+            ready=True,
+            draft=draft,
+        )
     except Exception as e:
         return _err("failed to update forecast order draft", reason=str(e))
 
 
 def submit_forecast_order_draft() -> dict:
     try:
-        if not _ORDER_DRAFT:
-            if _LAST_ORDER:
-                return _ok(last_order=_LAST_ORDER, hint="No active draft. Use query_last_order_status to query the most recent order.")
-            return _err("no active draft", hint="Call update_forecast_order_draft first")
-        draft = dict(_ORDER_DRAFT)
-        draft.setdefault("channelid", DEFAULT_CHANNEL_ID)
-        draft.setdefault("forecastweight", 1.0)
-        draft.setdefault("number", 1)
-
-        resp = submit_forecast_order(draft)
-        if resp.get("status") == "success":
-            _ORDER_DRAFT.clear()
-            _save_last_order_from_response(resp)
-        return resp
+        order_draft = _active_order_draft()
+        with order_draft.lock:
+            if not order_draft.fields:
+                last = _last_order()
+                if last:
+                    return _ok(last_order=last, hint="No active draft. Use query_last_order_status to query the most recent order.")
+                return _err("no active draft", hint="Call update_forecast_order_draft first")
+            # 校验失败的字段已从草稿移除：直接提交会悄悄丢掉用户填过的值
+            if order_draft.errors:
+                return _err(
+                    "draft has invalid fields",
+                    field_errors=dict(order_draft.errors),
+                    missing_fields=[k for k in _REQUIRED_ORDER_KEYS if k in order_draft.missing],
+                    hint="Ask the user to correct these fields, then call update_forecast_order_draft",
+                )
+            draft = _draft_with_defaults(order_draft)
+
+            resp = submit_forecast_order(draft)
+            if resp.get("status") == "success":
+                _reset_order_draft(order_draft)
+                _save_last_order_from_response(resp)
+            return resp
     except Exception as e:
         return _err("failed to submit forecast order draft", reason=str(e))
 
 
 def get_last_order_reference() -> dict:
-    if not _LAST_ORDER:
+    last = _last_order()
+    if not last:
         return _err("no last order", hint="Create an order first")
-    return _ok(last_order=_LAST_ORDER)
+    return _ok(last_order=last)
 
 
 def query_last_order_status() -> dict:
     """Query tracking/status for the most recent order when user doesn't have an order number."""
 
-    if not _LAST_ORDER:
+    last = _last_order()
+    if not last:
         return _err("no last order", hint="Create an order first")
-    waybill = _LAST_ORDER.get("waybillnumber")
+    waybill = last.get("waybillnumber")
+    customernumber = last.get("customernumber")
+    if not waybill and customernumber:
+        try:
+            waybill = _active_waybill_resolver().result(str(customernumber), timeout=2.0)
+        except Exception:
+            waybill = None
     if not waybill:
-        return _err("last order has no waybillnumber", last_order=_LAST_ORDER)
+        return _err("last order has no waybillnumber", last_order=last)
     return query_order_status(str(waybill))
 
 
+def wait_for_waybillnumber(customernumber: str, timeout_seconds: float = 2.0) -> dict:
+    """Wait for the background resolver to fill an empty waybillnumber.
+
+    Use this when createForecast returned waybill_pending=true.
+    """
+
+    try:
+        if not isinstance(customernumber, str) or customernumber.strip() == "":
+            return _err("customernumber is required")
+        key = customernumber.strip()
+        waybill = _active_waybill_resolver().poll(key)
+        if waybill is None:
+            try:
+                waybill = _active_waybill_resolver().result(key, timeout=max(0.0, float(timeout_seconds)))
+            except TimeoutError:
+                return _ok(customernumber=key, waybillnumber=None, pending=True)
+        return _ok(customernumber=key, waybillnumber=waybill, pending=False)
+    except Exception as e:
+        return _err("failed to resolve waybillnumber", reason=str(e))
+
+
 def debug_runtime_info() -> dict:
     try:
         logging.getLogger().info("TOOL_CALL debug_runtime_info")
+        api = getattr(current_tenant(), "api", _api)
         return _ok(
             agent_file=__file__,
-            mock_api_file=getattr(_api.__class__, "__module__", None),
-            insurance_raw=_api.insurance(),
+            mock_api_file=getattr(api.__class__, "__module__", None),
+            insurance_raw=_active_api().insurance(),
+            dictionary_catalog=_active_catalog().info(),
+            waybill_resolver=_active_waybill_resolver().stats(),
+            tracking_hub=_active_tracking_hub().stats(),
+            tenant=getattr(current_tenant(), "customer_code", None),
+            tenant_pool=tenant_pool.stats(),
+            order_store=_active_order_store().stats(),
+            order_ledger=_active_order_ledger().stats(),
+            postal_codes=_postal_codes.stats(),
+            hs_codes=_hs_codes.stats(),
+            rate_card=_rate_card.stats(),
+            tracking_store=_tracking_store.stats(),
+            tracking_ingest=_tracking_ingest.base_url if _tracking_ingest is not None else None,
+            api_limits=limiter_stats(api),
+            cassette=cassette_stats(api),
+            scheduler=_scheduler.stats() if _scheduler.enabled else None,
+            profiling=_profiler.status(),
+            tracing=_tracer.status(),
         )
     except Exception as e:
         logging.getLogger().exception("TOOL_ERROR debug_runtime_info")
         return _err("failed to collect runtime info", reason=str(e))
 
 
-def query_order_status(order_no: str) -> dict:
-    """查询物流状态 - 支持运单号、订单号、客户参考号等多种查询方式"""
+DEFAULT_CHILD_PAGE_SIZE = 20
+
+
+def ingest_tracking_events(events: list[dict]) -> dict:
+    """承运商推送的轨迹事件批量写入本地时间线（按运单、按事件去重）；供宿主调用，不注册为模型工具。"""
+
+    try:
+        customer_code = getattr(current_tenant(), "customer_code", None)
+        return _ok(**_tracking_store.ingest(events, customer_code=customer_code))
+    except Exception as e:
+        logging.getLogger().exception("TOOL_ERROR ingest_tracking_events")
+        return _err("failed to ingest tracking events", reason=str(e))
+
+
+def query_order_status(order_no: str, child_offset: int = 0, child_limit: int = DEFAULT_CHILD_PAGE_SIZE) -> dict:
+    """查询物流状态 - 支持运单号、订单号、客户参考号等多种查询方式
+
+    本地轨迹时间线足够新时（承运商推送或最近一次查询，见 LOGISTICS_TRACKING_MAX_AGE）直接从本地回答，
+    source 为 "local"；否则调用轨迹接口并刷新本地时间线，source 为 "api"。
+    多件货的子单（subOrderList）按页返回：subOrderCount 为总件数，subOrderNextOffset 为下一页的 child_offset；
+    翻页（child_offset > 0）总是走接口。
+    """
     normalized = order_no.strip()
     if normalized.startswith("#"):
         normalized = normalized[1:]
-    
-    # 直接使用输入的订单号进行查询，mock API 现在支持多种查询方式
-    resp = _tool_call(_api.track, tool_name="query_order_status", waybillnumber=normalized)
-    
+    customer_code = getattr(current_tenant(), "customer_code", None)
+    try:
+        child_offset = max(0, int(child_offset))
+        child_limit = max(1, min(int(child_limit), 200))
+    except (TypeError, ValueError) as e:
+        return _err("invalid child page", reason=str(e), child_offset=child_offset, child_limit=child_limit)
+
+    local = _tracking_store.fresh(normalized, customer_code=customer_code) if child_offset == 0 else None
+    if local is not None:
+        resp = _ok(
+            raw={"msg": "success", "code": 0, "data": [{k: v for k, v in local.items() if k not in ("updated_at", "source", "age_seconds")}]},
+            source="local",
+            as_of=format_utc8(local["updated_at"]),
+            age_seconds=local["age_seconds"],
+        )
+    else:
+        # 直接使用输入的订单号进行查询，mock API 现在支持多种查询方式
+        resp = _tool_call(
+            _active_api().track,
+            tool_name="query_order_status",
+            waybillnumber=normalized,
+            child_offset=child_offset,
+            child_limit=child_limit,
+        )
+        if isinstance(resp.get("data"), dict):
+            resp["data"]["source"] = "api"
+
     # 检查是否查询成功
     try:
         raw = resp.get("data", {}).get("raw") if isinstance(resp, dict) else None
@@ -1077,15 +1898,216 @@ def query_order_status(order_no: str) -> dict:
                             "systemnumber": systemnumber,
                             "waybillnumber": waybillnumber
                         }
+                    # 订单库的状态索引随查询结果更新
+                    if first.get("orderstatus") and systemnumber:
+                        _active_order_store().update_status(str(systemnumber), first["orderstatus"])
+                    if resp["data"]["source"] == "api":
+                        _tracking_store.record_snapshot(first, customer_code=customer_code)
     except Exception:
         pass
     
     return resp
 
 
+def list_orders(
+    destination_city: str | None = None,
+    countrycode: str | None = None,
+    status: str | None = None,
+    created_after: str | None = None,
+    created_before: str | None = None,
+    limit: int = DEFAULT_ORDER_PAGE_SIZE,
+    cursor: str | None = None,
+) -> dict:
+    """列出经本 agent 创建的订单（最新在前），支持过滤与游标分页。
+
+    destination_city 同时匹配目的城市与收件城市（如 洛杉矶 / Los Angeles）；countrycode 如 US；
+    status 为轨迹状态（Created、InTransit、Delivered 等，随轨迹查询与承运商推送更新）；
+    created_after / created_before 接受 YYYY-MM-DD、YYYY-MM-DD HH:MM:SS（UTC+8）或 today / yesterday。
+    有更多结果时返回 next_cursor，原样传回 cursor 获取下一页。
+    """
+
+    try:
+        store = _active_order_store()
+        now = store.clock.now()
+        page = store.query(
+            destination_city=destination_city,
+            countrycode=countrycode,
+            status=status,
+            created_after=parse_time_bound(created_after, now=now),
+            created_before=parse_time_bound(created_before, now=now, end=True),
+            limit=limit,
+            cursor=cursor,
+        )
+        return _ok(count=len(page["orders"]), **page)
+    except ValueError as e:
+        return _err(str(e))
+    except Exception as e:
+        return _err("failed to list orders", reason=str(e))
+
+
+def get_shipping_stats(
+    group_by: str | None = None,
+    countrycode: str | None = None,
+    channelid: str | None = None,
+    is_remote: bool | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    sort_by: str = "orders",
+    limit: int = 20,
+) -> dict:
+    """汇总经本 agent 创建的订单：单数、件数、预估重量(kg)、偏远单数、保额。
+
+    group_by 可选 channelid、countrycode、isRemote、day（UTC+8 日期），为空时返回总计；
+    countrycode / channelid / is_remote 过滤；since / until 接受 YYYY-MM-DD、YYYY-MM-DD HH:MM:SS、
+    today / yesterday 或 this week / this month（until 取该时段的结束）；
+    sort_by 可选 orders、pieces、weight_kg、remote_orders、insurance_value（按天分组时按日期排序）。
+    """
+
+    try:
+        now = _active_order_store().clock.now()
+        stats = _active_order_ledger().aggregate(
+            group_by=group_by or None,
+            countrycode=countrycode,
+            channelid=channelid,
+            is_remote=is_remote,
+            since=parse_time_bound(since, now=now),
+            until=parse_time_bound(until, now=now, end=True),
+            sort_by=sort_by,
+            limit=limit,
+        )
+        return _ok(**stats)
+    except ValueError as e:
+        return _err(str(e))
+    except Exception as e:
+        return _err("failed to compute shipping stats", reason=str(e))
+
+
+def quote_shipping_rates(
+    consignee_countrycode: str,
+    weight: float | None = None,
+    consigneezipcode: str | None = None,
+    length: float | None = None,
+    width: float | None = None,
+    height: float | None = None,
+    volumes: list[dict] | str | None = None,
+    sort_by: str = "price",
+    limit: int = 10,
+) -> dict:
+    """按本地运价表一次比较所有渠道：计费重（实重与体积重取大）、基础运费、燃油附加费、偏远费、总价(CNY)与时效。
+
+    weight 为总重(kg)，length/width/height 为外箱尺寸(cm)；多件货传 volumes（与下单相同的件组，也可以是 CSV 或 "40x30x20cm 5kg x3" 这样的文本）。
+    邮编落在偏远地区时加收偏远费（不派送偏远地区的渠道不报价）；sort_by 可选 price、transit。
+    结果给出 cheapest / fastest，下单时把选中的 channelid 传给下单工具。
+    """
+
+    try:
+        total_weight = float(weight or 0.0)
+        volume_cm3 = 0.0
+        if volumes:
+            pieces = Pieces.parse(volumes)
+            total_weight, volume_cm3 = pieces.actual_weight, pieces.volume_cm3
+        elif length and width and height:
+            volume_cm3 = float(length) * float(width) * float(height)
+        if _rate_card.zone_of(consignee_countrycode) is None:
+            raise ValueError(f"no rates for country {consignee_countrycode}")
+        quote = _rate_card.quote(
+            consignee_countrycode,
+            total_weight,
+            volume_cm3=volume_cm3,
+            postal_code=consigneezipcode,
+            sort_by=sort_by,
+            limit=max(1, int(limit)),
+        )
+        return _ok(weight=round(total_weight, 3), volume_cm3=round(volume_cm3, 1), **quote)
+    except ValueError as e:
+        return _err(str(e))
+    except Exception as e:
+        return _err("failed to quote shipping rates", reason=str(e))
+
+
+def classify_hs_codes(item_names: list[str] | str, limit: int = 3) -> dict:
+    """按本地 HS 编码库为报关品名归类，补齐 hscode、cnname、enname。
+
+    item_names 为品名列表（中文或英文，也可以直接给编码如 "8518.30"）。每个品名给出匹配结果与候选；
+    hscode 为空表示没有足够明确的匹配，请让用户从 candidates 中选择。
+    下单时把品名放进 items（可带 hscode、quantity、price、weight），报关字段会自动补齐。
+    """
+
+    try:
+        names = [str(x.get("name") if isinstance(x, dict) else x).strip() for x in _coerce_item_list(item_names)]
+        names = [n for n in names if n and n != "None"]
+        if not names:
+            return _err("item_names is required", hint='Pass a list like ["蓝牙耳机", "phone case"]')
+        results = [_hs_codes.classify(n, limit=max(1, min(int(limit), 10))) for n in names]
+        return _ok(items=results, unmatched=[r["name"] for r in results if r["hscode"] is None])
+    except Exception as e:
+        return _err("failed to classify hs codes", reason=str(e))
+
+
+def _coerce_str_list(value: Any, *, key: str) -> list[str]:
+    """Accept a list, a JSON array string, a JSON object {key: [...]} or a comma-separated string."""
+
+    if isinstance(value, str):
+        s = value.strip()
+        if s.startswith("[") or s.startswith("{"):
+            value = json.loads(s)
+        else:
+            value = [x for x in re.split(r"[,，\s]+", s) if x]
+    if isinstance(value, dict):
+        value = value.get(key)
+    if not isinstance(value, list):
+        return []
+    return [str(x).strip() for x in value if str(x).strip()]
+
+
+def subscribe_tracking(waybillnumbers: Any) -> dict:
+    """Subscribe to track updates for one or more waybillnumbers.
+
+    Returns a subscription_id and the events already known; call
+    get_tracking_updates later to receive only new events.
+    """
+
+    try:
+        numbers = _coerce_str_list(waybillnumbers, key="waybillnumbers")
+        if not numbers:
+            return _err("waybillnumbers is required", hint='Pass a list like ["EV...CN"]')
+        hub = _active_tracking_hub()
+        sub = hub.subscribe(numbers)
+        hub.start()
+        events, cursor = sub.updates()
+        return _ok(subscription_id=sub.id, waybillnumbers=sorted(sub.waybillnumbers), events=events, cursor=cursor)
+    except Exception as e:
+        return _err("failed to subscribe tracking", reason=str(e))
+
+
+def get_tracking_updates(subscription_id: str, cursor: int | None = None) -> dict:
+    """Return only the track events that arrived after cursor for a subscription.
+
+    Passing an earlier cursor again replays the (recent) events after it.
+    Subscriptions not read for LOGISTICS_TRACKING_SUBSCRIPTION_TTL seconds expire.
+    """
+
+    try:
+        sub = _active_tracking_hub().get(subscription_id)
+        if sub is None:
+            return _err("unknown subscription_id", hint="Call subscribe_tracking first (subscriptions expire when not read)")
+        events, new_cursor = sub.updates(None if cursor is None else int(cursor))
+        return _ok(subscription_id=sub.id, events=events, cursor=new_cursor, has_updates=bool(events))
+    except Exception as e:
+        return _err("failed to get tracking updates", reason=str(e))
+
+
+def unsubscribe_tracking(subscription_id: str) -> dict:
+    hub = _active_tracking_hub()
+    if hub.get(subscription_id) is None:
+        return _err("unknown subscription_id")
+    hub.unsubscribe(subscription_id)
+    return _ok(subscription_id=subscription_id, unsubscribed=True)
+
+
 def create_shipment(origin: str, destination: str) -> dict:
     """创建新货运单（按文档 Create Order 接口结构 mock 返回）。"""
-    result = _api.create_forecast_order(
+    result = _active_api().create_forecast_order(
         origin_city=origin,
         destination_city=destination,
     )
@@ -1094,6 +2116,7 @@ def create_shipment(origin: str, destination: str) -> dict:
     extras = _extract_order_identifiers_from_result(result)
     resp = _ok(raw=result, **extras)
     _save_last_order_from_response(resp)
+    resp["data"].update(_schedule_waybill_resolution(result))
     return resp
 
 
@@ -1106,6 +2129,7 @@ root_agent = Agent(
         "CRITICAL TOOL SELECTION RULES: "
         "1. When user provides Chinese text with order details (containing 从...到... or order fields), ALWAYS use submit_forecast_order_from_text FIRST. "
         "2. When user provides JSON string, use submit_forecast_order_json. "
+        "When the user provides a CSV/XLSX file path with many shipments, call import_orders_file once instead of submitting rows one by one. "
         "3. NEVER use create_forecast_order_with_preferences unless user explicitly provides individual parameters. "
         "4. If submit_forecast_order_from_text fails due to missing fields, then ask for those specific fields. "
         "CRITICAL DATA ACCURACY RULES: "
@@ -1129,19 +2153,35 @@ root_agent = Agent(
         "- Customer Number (客户单号): Use result.data[0].customernumber "
         "NEVER display only the tracking number without the order number. Both numbers are essential for the user. "
         "ALWAYS include both numbers in your success message, for example: 'Order created successfully! Order Number: 12345, Tracking Number: EV67890CN' "
-        "For step-by-step input, use update_forecast_order_draft to accumulate fields and ask for missing_fields from its JSON result; when ready, call submit_forecast_order_draft (or update_forecast_order_draft with auto_submit=true). "
+        "For step-by-step input, use update_forecast_order_draft to accumulate fields and ask for missing_fields from its JSON result; if field_errors is not empty, ask the user to correct exactly those fields (the error lists valid options); when ready, call submit_forecast_order_draft (or update_forecast_order_draft with auto_submit=true). "
+        "Consignee city and state are filled from the zipcode when it is known (see autofilled); do not ask for them in that case. If postal_code_warnings is not empty (the order is not submitted then), tell the user the zipcode and the given city/state disagree and ask which is correct. "
+        "For multi-piece shipments (cartons, pallets) pass volumes as piece groups [{length, width, height, weight, count}] in cm/kg to submit_forecast_order (a CSV or text like '40x30x20cm 5kg x3; 60x40x40cm 12kg' also works); number and forecastweight follow from them. "
+        "Orders with many pieces return only the first page of child parcels; query_order_status takes child_offset (use subOrderNextOffset) to page through the rest. "
         "If the user doesn't have an order number, use get_last_order_reference to fetch the latest identifiers, or query_last_order_status to query tracking for the latest order. "
-        "If waybillnumber is empty in the createForecast result, call get_waybillnumbers with customernumber to retrieve waybillnumber. "
+        "If waybillnumber is empty in the createForecast result (data.waybill_pending=true), it is resolved in the background; call wait_for_waybillnumber with customernumber to get it (get_waybillnumbers also works). "
         "Never claim an order was created unless an order-creation tool returned status=success. "
         "Do not call order-creation tools more than once per user request unless the user explicitly asks to retry. "
         "If the user asks for raw JSON or says 'do not summarize', output ONLY the tool JSON as-is (no extra text, no markdown fences, no additional keys), including when status=error. "
-        "Use query_order_status to query tracking/status for an order number. "
+        "Use query_order_status to query tracking/status for an order number; source \"local\" means it was answered from pushed events (as_of gives the time), no need to query again. "
+        "When the user asks which channel is cheapest or fastest, or what shipping will cost, call quote_shipping_rates (country, weight or dimensions/volumes, zipcode if known) and pass the chosen channelid when creating the order; the default channel is HK_TNT. "
+        "For customs declaration (买单报关 / 贸易报关), pass the goods as items (names, optionally with quantity, price, weight) when creating the order; hscode, cnname and enname are filled from the local HS code index. Use classify_hs_codes to check names first, and ask the user to choose among the candidates when no hscode is matched. "
+        "For totals and rankings over created orders (kilos shipped to a country this week, which channel has the most remote deliveries), call get_shipping_stats with group_by/filters instead of listing orders. "
+        "When the user asks to see or search past orders (e.g. today's orders to Los Angeles), call list_orders with filters instead of guessing numbers; pass next_cursor back as cursor for the next page. "
+        "When the user wants to follow an order over time, call subscribe_tracking once and then get_tracking_updates with the subscription_id; it returns only new events. "
         "Use create_shipment to create a new shipment. "
     ),
-    tools=[
+    # LOGISTICS_TRACE_FILE 开启 span 追踪：一轮对话一条 trace，模型调用、工具、API 调用为嵌套 span
+    before_agent_callback=_tracer.before_agent_callback,
+    after_agent_callback=_tracer.after_agent_callback,
+    before_model_callback=_tracer.before_model_callback,
+    after_model_callback=_tracer.after_model_callback,
+    before_tool_callback=_tracer.before_tool_callback,
+    # LOGISTICS_PROFILE_TOOLS 开启按工具的 cProfile/tracemalloc 采样；关闭时包装几乎无开销
+    tools=_profiler.wrap_tools(_tracer.wrap_tools([
         get_insurance_types,
         get_currencies,
         get_waybillnumbers,
+        wait_for_waybillnumber,
         get_declare_types,
         get_customs_types,
         get_terms_of_sale,
@@ -1152,12 +2192,20 @@ root_agent = Agent(
         submit_forecast_order,
         submit_forecast_order_json,
         submit_forecast_order_from_text,
+        import_orders_file,
         update_forecast_order_draft,
         submit_forecast_order_draft,
         get_last_order_reference,
         query_last_order_status,
         debug_runtime_info,
         query_order_status,
+        list_orders,
+        get_shipping_stats,
+        quote_shipping_rates,
+        classify_hs_codes,
+        subscribe_tracking,
+        get_tracking_updates,
+        unsubscribe_tracking,
         create_shipment,
-    ],
+    ])),
 )
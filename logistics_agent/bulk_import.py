@@ -0,0 +1,297 @@
+"""Stream CSV/XLSX shipment rows into forecast orders.
+
+CLI::
+
+    python -m logistics_agent.bulk_import orders.csv -o results.csv -c 8
+"""
+
+import argparse
+import csv
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterator
+
+from .scheduler import BULK, priority
+from .tracing import propagate
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CONCURRENCY = 8
+
+
+# 表头（规范化后）-> submit_forecast_order 的字段名
+COLUMN_ALIASES: dict[str, str] = {
+    "origin_city": "origin_city",
+    "起运城市": "origin_city",
+    "始发城市": "origin_city",
+    "发货城市": "origin_city",
+    "destination_city": "destination_city",
+    "目的城市": "destination_city",
+    "customernumber1": "customernumber1",
+    "客户参考号": "customernumber1",
+    "客户单号": "customernumber1",
+    "consignee_countrycode": "consignee_countrycode",
+    "countrycode": "consignee_countrycode",
+    "收件国家": "consignee_countrycode",
+    "consigneename": "consigneename",
+    "收件人": "consigneename",
+    "consigneeaddress1": "consigneeaddress1",
+    "收件地址": "consigneeaddress1",
+    "地址": "consigneeaddress1",
+    "consigneecity": "consigneecity",
+    "收件城市": "consigneecity",
+    "城市": "consigneecity",
+    "consigneezipcode": "consigneezipcode",
+    "邮编": "consigneezipcode",
+    "zip": "consigneezipcode",
+    "consigneeprovince": "consigneeprovince",
+    "省州": "consigneeprovince",
+    "州": "consigneeprovince",
+    "channelid": "channelid",
+    "渠道": "channelid",
+    "forecastweight": "forecastweight",
+    "预报重量": "forecastweight",
+    "重量": "forecastweight",
+    "number": "number",
+    "件数": "number",
+    "insurance_enabled": "insurance_enabled",
+    "投保": "insurance_enabled",
+    "insurance_value": "insurance_value",
+    "保额": "insurance_value",
+    "insurance_type_name": "insurance_type_name",
+    "险种": "insurance_type_name",
+    "insurance_currency_code": "insurance_currency_code",
+    "币别": "insurance_currency_code",
+    "product_type_name": "product_type_name",
+    "物品类别": "product_type_name",
+    "declare_type_name": "declare_type_name",
+    "报关类型": "declare_type_name",
+}
+
+RESULT_COLUMNS = [
+    "row",
+    "status",
+    "customernumber1",
+    "order_id",
+    "tracking_id",
+    "request_id",
+    "idempotent_replay",
+    "error",
+]
+
+
+def _normalize_header(h: Any) -> str:
+    return " ".join(str(h or "").strip().lower().split())
+
+
+def map_columns(headers: list[Any]) -> dict[int, str]:
+    """Map header positions to order keys; unknown columns are ignored."""
+
+    mapping: dict[int, str] = {}
+    for pos, h in enumerate(headers):
+        key = COLUMN_ALIASES.get(_normalize_header(h))
+        if key is not None and key not in mapping.values():
+            mapping[pos] = key
+    return mapping
+
+
+def _iter_csv(path: str) -> Iterator[list[Any]]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        yield from csv.reader(f)
+
+
+def _iter_xlsx(path: str) -> Iterator[list[Any]]:
+    try:
+        import openpyxl
+    except ImportError as e:
+        raise RuntimeError("reading .xlsx files requires openpyxl (pip install openpyxl)") from e
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in wb.active.iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        wb.close()
+
+
+def iter_order_rows(path: str) -> Iterator[tuple[int, dict[str, Any]]]:
+    """Yield (row_number, order_fields) without loading the whole file."""
+
+    rows = _iter_xlsx(path) if path.lower().endswith((".xlsx", ".xlsm")) else _iter_csv(path)
+    header = next(rows, None)
+    if header is None:
+        return
+    mapping = map_columns(header)
+    if not mapping:
+        raise ValueError("no recognizable columns in header")
+    for row_number, row in enumerate(rows, start=2):
+        fields: dict[str, Any] = {}
+        for pos, key in mapping.items():
+            if pos >= len(row):
+                continue
+            v = row[pos]
+            if v is None or (isinstance(v, str) and v.strip() == ""):
+                continue
+            fields[key] = v.strip() if isinstance(v, str) else v
+        if fields:
+            yield row_number, fields
+
+
+def validate_row(fields: dict[str, Any]) -> tuple[dict[str, Any], dict[str, str]]:
+    """Coerce spreadsheet values and run the per-field draft validators."""
+
+    from . import agent
+
+    order = dict(fields)
+    errors: dict[str, str] = {}
+    for key, cast in (("forecastweight", float), ("insurance_value", float), ("number", int)):
+        if key in order:
+            try:
+                order[key] = cast(float(order[key])) if cast is int else cast(order[key])
+            except (TypeError, ValueError):
+                errors[key] = f"{key} 必须是数字，收到 '{order[key]}'"
+                order.pop(key)
+    if "consignee_countrycode" in order:
+        order["consignee_countrycode"] = str(order["consignee_countrycode"]).upper()
+    for key in ("consigneezipcode", "customernumber1"):
+        if key in order and not isinstance(order[key], str):
+            order[key] = str(order[key])
+
+    for key in agent._REQUIRED_ORDER_KEYS:
+        if not order.get(key):
+            errors.setdefault(key, "missing required field")
+    for key, value in order.items():
+        if key in errors:
+            continue
+        error = agent._validate_draft_field(key, value, order)
+        if error is not None:
+            errors[key] = error
+    return order, errors
+
+
+def _result_row(row_number: int, fields: dict[str, Any], resp: dict) -> dict[str, Any]:
+    data = resp.get("data") if isinstance(resp.get("data"), dict) else {}
+    error = resp.get("error") or {}
+    message = error.get("message", "")
+    details = error.get("field_errors") or error.get("missing_fields") or error.get("reason")
+    if details:
+        message = f"{message}: {details}"
+    return {
+        "row": row_number,
+        "status": resp.get("status"),
+        "customernumber1": fields.get("customernumber1", ""),
+        "order_id": data.get("order_id", ""),
+        "tracking_id": data.get("tracking_id", ""),
+        "request_id": data.get("request_id", ""),
+        "idempotent_replay": data.get("idempotent_replay", ""),
+        "error": message,
+    }
+
+
+def _submit_row(fields: dict[str, Any]) -> dict:
+    from . import agent
+
+    order, errors = validate_row(fields)
+    if errors:
+        return agent._err("row validation failed", field_errors=errors)
+    return agent.submit_order_fields_idempotent(order)
+
+
+def import_orders(
+    path: str,
+    output_path: str,
+    *,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    submit: Callable[[dict[str, Any]], dict] | None = None,
+) -> dict[str, Any]:
+    """Import a CSV/XLSX file; per-row results stream to ``output_path`` as they complete."""
+
+    if concurrency < 1:
+        raise ValueError("concurrency must be >= 1")
+    submit = submit or _submit_row
+    started = time.perf_counter()
+    counts = {"rows": 0, "succeeded": 0, "failed": 0}
+    write_lock = threading.Lock()
+
+    out_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(out_dir, exist_ok=True)
+    # 行以批量优先级提交：交互查询优先，排队过久的行被丢弃并在结果里标记为可重试
+    with priority(BULK), open(output_path, "w", newline="", encoding="utf-8") as out, ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="bulk-import"
+    ) as pool:
+        writer = csv.DictWriter(out, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+        pending: set[Future] = set()
+        rows_by_future: dict[Future, tuple[int, dict[str, Any]]] = {}
+
+        def _collect(done: set[Future]) -> None:
+            for fut in done:
+                row_number, fields = rows_by_future.pop(fut)
+                try:
+                    resp = fut.result()
+                except Exception as e:
+                    resp = {"status": "error", "data": None, "error": {"message": "row failed", "reason": str(e)}}
+                ok = resp.get("status") == "success"
+                with write_lock:
+                    counts["succeeded" if ok else "failed"] += 1
+                    writer.writerow(_result_row(row_number, fields, resp))
+
+        # Keep a bounded window of in-flight rows so memory stays flat.
+        window = concurrency * 2
+        for row_number, fields in iter_order_rows(path):
+            counts["rows"] += 1
+            # 行在线程池中提交：带上调用方的 context（当前 span、租户、优先级）
+            fut = pool.submit(propagate(submit), fields)
+            rows_by_future[fut] = (row_number, fields)
+            pending.add(fut)
+            if len(pending) >= window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                _collect(done)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            _collect(done)
+
+    elapsed = time.perf_counter() - started
+    return {
+        **counts,
+        "output_path": output_path,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(counts["rows"] / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def confine_path(root: str, path: str) -> str:
+    """``path`` resolved against ``root`` with symlinks followed; ValueError when it lands outside ``root``."""
+
+    root = os.path.realpath(root)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"{path} is outside {root}")
+    return resolved
+
+
+def default_output_path(path: str) -> str:
+    base, _ = os.path.splitext(path)
+    return f"{base}.results.csv"
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="批量导入预报订单（CSV/XLSX）")
+    parser.add_argument("path", help="CSV 或 XLSX 文件")
+    parser.add_argument("-o", "--output", help="结果 CSV（默认 <输入文件>.results.csv）")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    args = parser.parse_args(argv)
+
+    summary = import_orders(args.path, args.output or default_output_path(args.path), concurrency=args.concurrency)
+    print(
+        f"rows={summary['rows']} succeeded={summary['succeeded']} failed={summary['failed']} "
+        f"seconds={summary['seconds']} rows/s={summary['rows_per_sec']} -> {summary['output_path']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import logging
+import zlib
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Iterable, Iterator
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CHUNK_SIZE = 64
+
+
+def shard_for(customernumber1: Any, shards: int) -> int:
+    """Stable shard index for an order; the same customernumber1 always lands on the same worker."""
+
+    key = str(customernumber1 or "").encode("utf-8")
+    return zlib.crc32(key) % shards
+
+
+def worker_bulk_slots(workers: int) -> int:
+    """Backend calls each worker may have in flight: an equal share of this process's bulk slots (0 = unlimited)."""
+
+    from .scheduler import scheduler
+
+    if not scheduler.enabled:
+        return 0
+    return max(1, scheduler.bulk_max_concurrency // workers)
+
+
+def _init_worker(bulk_slots: int = 0) -> None:
+    from .scheduler import scheduler
+
+    # 工作进程有自己的调度器（fork 时还带着父进程的在途计数）：按分到的批量槽位重新开始
+    if bulk_slots:
+        scheduler.reset(bulk_slots, bulk_max_concurrency=bulk_slots)
+    # Import once per worker so the first chunk does not pay for it.
+    from . import agent  # noqa: F401
+
+
+def _submit_chunk(chunk: list[tuple[int, dict]]) -> list[tuple[int, dict]]:
+    from . import agent
+    from .scheduler import BULK, priority
+
+    with priority(BULK):
+        return [(index, agent.submit_order_fields_idempotent(order)) for index, order in chunk]
+
+
+def _chunk_failed(error: BaseException) -> dict:
+    # 与 agent._err 同形：分片进程崩溃或参数无法序列化时，这一块的每个订单各得一条错误
+    return {"status": "error", "data": None, "error": {"message": "bulk worker failed", "reason": repr(error)}}
+
+
+def _record_locally(resp: dict) -> None:
+    from . import agent
+
+    agent._record_order_response(resp)
+
+
+class BulkOrderSubmitter:
+    """Spread forecast orders over a pool of single-process shards.
+
+    Each shard owns its own agent/mock state, so routing by customernumber1
+    keeps idempotency and order lookups consistent within a shard. Shards are
+    separate processes, so the parent's scheduler cannot order their calls
+    against its interactive ones; when it is enabled, each shard is limited to
+    ``worker_bulk_slots(workers)`` concurrent backend calls, so together they
+    stay within the slots the parent gives to bulk work. Orders the
+    shards create are also recorded in this process's order store (``record``),
+    so list_orders and tracking status updates see them.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        *,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_pending_chunks: int | None = None,
+        mp_context: Any = None,
+        record: bool = True,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1")
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.max_pending_chunks = max_pending_chunks or workers * 4
+        self.record = record
+        self._executors = [
+            ProcessPoolExecutor(
+                max_workers=1, mp_context=mp_context, initializer=_init_worker, initargs=(worker_bulk_slots(workers),)
+            )
+            for _ in range(workers)
+        ]
+
+    def close(self) -> None:
+        for ex in self._executors:
+            ex.shutdown(wait=True)
+
+    def __enter__(self) -> "BulkOrderSubmitter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def submit(self, orders: Iterable[dict]) -> Iterator[tuple[int, dict]]:
+        """Yield (input_index, tool_response) pairs as shards complete them."""
+
+        buffers: list[list[tuple[int, dict]]] = [[] for _ in range(self.workers)]
+        pending: set[Future] = set()
+        indexes: dict[Future, list[int]] = {}
+
+        def _dispatch(shard: int, chunk: list[tuple[int, dict]]) -> None:
+            try:
+                fut = self._executors[shard].submit(_submit_chunk, chunk)
+            except Exception as e:
+                # 分片进程池已损坏时 submit 直接抛错：记成失败的 future，按块返回错误
+                fut = Future()
+                fut.set_exception(e)
+            indexes[fut] = [index for index, _ in chunk]
+            pending.add(fut)
+
+        def _drain(block_until_below: int) -> Iterator[tuple[int, dict]]:
+            nonlocal pending
+            while len(pending) > block_until_below:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    chunk_indexes = indexes.pop(fut)
+                    try:
+                        results = fut.result()
+                    except Exception as e:
+                        logger.warning("bulk chunk of %d orders failed", len(chunk_indexes), exc_info=True)
+                        results = [(index, _chunk_failed(e)) for index in chunk_indexes]
+                    for index, resp in results:
+                        if self.record:
+                            _record_locally(resp)
+                        yield index, resp
+
+        for index, order in enumerate(orders):
+            shard = shard_for(order.get("customernumber1") if isinstance(order, dict) else None, self.workers)
+            buf = buffers[shard]
+            buf.append((index, order if isinstance(order, dict) else {}))
+            if len(buf) >= self.chunk_size:
+                _dispatch(shard, buf)
+                buffers[shard] = []
+                yield from _drain(self.max_pending_chunks)
+
+        for shard, buf in enumerate(buffers):
+            if buf:
+                _dispatch(shard, buf)
+        yield from _drain(0)
+
+
+def submit_orders_bulk(
+    orders: Iterable[dict],
+    *,
+    workers: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    record: bool = True,
+) -> Iterator[tuple[int, dict]]:
+    with BulkOrderSubmitter(workers, chunk_size=chunk_size, record=record) as submitter:
+        yield from submitter.submit(orders)
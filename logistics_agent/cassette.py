@@ -0,0 +1,467 @@
+"""Record real API traffic to a cassette file and replay it offline.
+
+A cassette is append-only text, one call per line::
+
+    <key>\\t{"m": method, "q": request, "t": started_at, "d": duration, "r": response | "e": error}\\n
+
+``key`` is a 32-hex digest of the normalized request (method plus keyword
+arguments with sorted keys, stripped strings, ``None`` dropped and any
+``ignore`` fields removed), so identical requests recorded at different times
+share a key. When recording, positional arguments are bound to the wrapped
+method's parameter names first, so ``track("W1")`` and
+``track(waybillnumber="W1")`` are the same request; replay binds them the same
+way against the stub client's method.
+Credentials (``authorization`` objects) are redacted before hashing and
+before writing: a cassette never holds a token, and it replays for any token.
+
+Replay never loads the cassette: a sidecar ``<cassette>.idx`` holds fixed-width
+``(digest, offset, length)`` records sorted by digest and is bisected in place
+through mmap; each hit reads just its line with ``pread``. The index is
+(re)built with one streaming pass whenever it is missing or older than the
+cassette. A key recorded several times is replayed in recorded order and then
+cycles, so sequences (a shipment moving through states) and latency spreads
+are preserved.
+
+``speed`` scales the recorded durations: 1.0 replays at original speed, 10.0
+ten times faster, 0 returns immediately.
+
+Environment variables (read when the API client is built):
+
+    LOGISTICS_CASSETTE_RECORD   append every backend call to this cassette
+    LOGISTICS_CASSETTE_REPLAY   serve calls from this cassette instead of the backend
+    LOGISTICS_CASSETTE_SPEED    replay speed factor (default 1.0)
+    LOGISTICS_CASSETTE_IGNORE   comma-separated request fields left out of matching
+
+CLI::
+
+    python -m logistics_agent.cassette index traffic.cassette
+    python -m logistics_agent.cassette stats traffic.cassette
+"""
+
+import argparse
+import hashlib
+import inspect
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import Counter
+from typing import Any, Iterable, Iterator
+
+from .http_api import ENDPOINT_PATHS, HttpApiError
+
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"CASSIDX1"
+# 头部：magic + 建索引时的 cassette 字节数 + 记录数
+_INDEX_HEADER = struct.Struct("<8sQQ")
+# 每条记录：16 字节摘要 + 行偏移 + 行长度
+_INDEX_RECORD = struct.Struct("<16sQI")
+KEY_BYTES = 16
+# 请求里的凭据字段：算键和写盘前都替换掉
+REDACTED_FIELDS = frozenset({"authorization"})
+REDACTED = "<redacted>"
+
+
+class CassetteMissError(LookupError):
+    """Raised on replay when the cassette has no recording for a request."""
+
+
+def normalize_request(value: Any, ignore: frozenset[str] = frozenset()) -> Any:
+    if isinstance(value, dict):
+        return {
+            k: normalize_request(v, ignore)
+            for k, v in sorted(value.items())
+            if v is not None and k not in ignore
+        }
+    if isinstance(value, (list, tuple)):
+        return [normalize_request(v, ignore) for v in value]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def redact_request(value: Any) -> Any:
+    """Copy of ``value`` with every credential field replaced by a placeholder."""
+
+    if isinstance(value, dict):
+        return {k: REDACTED if k in REDACTED_FIELDS else redact_request(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact_request(v) for v in value]
+    return value
+
+
+def call_arguments(func: Any, args: tuple, kwargs: dict[str, Any]) -> dict[str, Any]:
+    """Keyword view of a call: positional arguments are bound to ``func``'s parameter names."""
+
+    if not args:
+        return dict(kwargs)
+    return dict(inspect.signature(func).bind(*args, **kwargs).arguments)
+
+
+def request_key(method: str, request: dict[str, Any], ignore: frozenset[str] = frozenset()) -> str:
+    canonical = json.dumps(
+        [method, normalize_request(redact_request(request), ignore)],
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=KEY_BYTES).hexdigest()
+
+
+def parse_ignore(value: str | None) -> frozenset[str]:
+    return frozenset(part.strip() for part in (value or "").split(",") if part.strip())
+
+
+def _encode_error(exc: BaseException) -> dict[str, Any]:
+    error: dict[str, Any] = {"type": type(exc).__name__, "msg": str(exc)}
+    status = getattr(exc, "status", None)
+    if status is not None:
+        error["status"] = status
+        error["body"] = getattr(exc, "body", None)
+    elif isinstance(exc, TimeoutError):
+        error["kind"] = "timeout"
+    elif isinstance(exc, ConnectionError):
+        error["kind"] = "connection"
+    return error
+
+
+def _decode_error(error: dict[str, Any]) -> BaseException:
+    """Rebuild a recorded failure as the closest built-in type, so retry/overload handling behaves the same."""
+
+    if "status" in error:
+        return HttpApiError(error["status"], error.get("body"))
+    msg = f"{error.get('type')}: {error.get('msg')}"
+    if error.get("kind") == "timeout":
+        return TimeoutError(msg)
+    if error.get("kind") == "connection":
+        return ConnectionError(msg)
+    return RuntimeError(msg)
+
+
+class CassetteWriter:
+    """Append-only writer shared by every recording client of one cassette path."""
+
+    def __init__(self, path: str, *, ignore: frozenset[str] = frozenset()):
+        self.path = path
+        self.ignore = ignore
+        self._file = open(path, "ab")
+        self._lock = threading.Lock()
+        self._epoch = time.monotonic()
+        self.records = 0
+
+    def append(
+        self,
+        method: str,
+        request: dict[str, Any],
+        started: float,
+        duration: float,
+        *,
+        response: Any = None,
+        error: BaseException | None = None,
+    ) -> None:
+        request = redact_request(request)
+        entry: dict[str, Any] = {
+            "m": method,
+            "q": request,
+            "t": round(started - self._epoch, 6),
+            "d": round(duration, 6),
+        }
+        if error is not None:
+            entry["e"] = _encode_error(error)
+        else:
+            entry["r"] = response
+        line = (
+            request_key(method, request, self.ignore)
+            + "\t"
+            + json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str)
+            + "\n"
+        ).encode("utf-8")
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.records += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class RecordingApi:
+    """Wrap an API client; every public method call is forwarded and appended to the cassette."""
+
+    def __init__(self, api: Any, writer: CassetteWriter):
+        self._api = api
+        self.writer = writer
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._api, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        writer = self.writer
+
+        def call(*args, **kwargs):
+            request = call_arguments(attr, args, kwargs)
+            started = time.monotonic()
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                writer.append(name, request, started, time.monotonic() - started, error=e)
+                raise
+            writer.append(name, request, started, time.monotonic() - started, response=result)
+            return result
+
+        call.__name__ = name
+        return call
+
+
+def build_index(path: str) -> int:
+    """Stream the cassette once and write its sorted sidecar index; returns the record count."""
+
+    entries: list[tuple[bytes, int, int]] = []
+    offset = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                # 录制中断留下的半行不进索引
+                break
+            key, sep, _ = line.partition(b"\t")
+            if sep and len(key) == KEY_BYTES * 2:
+                entries.append((bytes.fromhex(key.decode("ascii")), offset, len(line)))
+            offset += len(line)
+    entries.sort()
+    tmp = path + INDEX_SUFFIX + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_INDEX_HEADER.pack(INDEX_MAGIC, offset, len(entries)))
+        f.writelines(_INDEX_RECORD.pack(*e) for e in entries)
+    os.replace(tmp, path + INDEX_SUFFIX)
+    return len(entries)
+
+
+class Cassette:
+    """Read side of a cassette: indexed lookup by request key, one ``pread`` per hit."""
+
+    def __init__(self, path: str, *, ignore: frozenset[str] = frozenset()):
+        self.path = path
+        self.ignore = ignore
+        index_path = path + INDEX_SUFFIX
+        if not self._index_is_fresh(index_path):
+            build_index(path)
+        self._fd = os.open(path, os.O_RDONLY)
+        with open(index_path, "rb") as f:
+            magic, self.size, self.records = _INDEX_HEADER.unpack(f.read(_INDEX_HEADER.size))
+            if magic != INDEX_MAGIC:
+                raise ValueError(f"{index_path}: not a cassette index")
+            self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._served: Counter[bytes] = Counter()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _index_is_fresh(self, index_path: str) -> bool:
+        try:
+            with open(index_path, "rb") as f:
+                magic, size, _ = _INDEX_HEADER.unpack(f.read(_INDEX_HEADER.size))
+        except (OSError, struct.error):
+            return False
+        # 追加录制后 cassette 变长：索引需要重建
+        return magic == INDEX_MAGIC and size == os.path.getsize(self.path)
+
+    def _digest_at(self, i: int) -> bytes:
+        start = _INDEX_HEADER.size + i * _INDEX_RECORD.size
+        return self._index[start : start + KEY_BYTES]
+
+    def _range(self, digest: bytes) -> tuple[int, int]:
+        lo, hi = 0, self.records
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._digest_at(mid) < digest:
+                lo = mid + 1
+            else:
+                hi = mid
+        end = lo
+        while end < self.records and self._digest_at(end) == digest:
+            end += 1
+        return lo, end
+
+    def _read(self, i: int) -> dict[str, Any]:
+        _, offset, length = _INDEX_RECORD.unpack_from(self._index, _INDEX_HEADER.size + i * _INDEX_RECORD.size)
+        line = os.pread(self._fd, length, offset)
+        return json.loads(line[KEY_BYTES * 2 + 1 :])
+
+    def lookup(self, method: str, request: dict[str, Any]) -> dict[str, Any] | None:
+        """Next recording for this request (recorded order, then cycling), or None."""
+
+        digest = bytes.fromhex(request_key(method, request, self.ignore))
+        lo, hi = self._range(digest)
+        with self._lock:
+            if lo == hi:
+                self.misses += 1
+                return None
+            self.hits += 1
+            n = self._served[digest]
+            self._served[digest] = n + 1
+        return self._read(lo + n % (hi - lo))
+
+    def entries(self) -> Iterator[dict[str, Any]]:
+        """Stream every recording in file order."""
+
+        with open(self.path, "rb") as f:
+            for line in f:
+                if line.endswith(b"\n"):
+                    yield json.loads(line.partition(b"\t")[2])
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "path": self.path,
+                "records": self.records,
+                "bytes": self.size,
+                "distinct_requests": len(self._served),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def close(self) -> None:
+        self._index.close()
+        os.close(self._fd)
+
+
+class ReplayApi:
+    """Serve API calls from a cassette, sleeping ``duration / speed`` to reproduce recorded latency.
+
+    Endpoint calls never reach ``stub``; every other attribute (``customer_code``, ``token``
+    used to build payloads, ...) is read from it, so code that builds requests from the
+    client works the same under replay. Positional arguments are bound to the stub
+    method's parameter names, as when recording.
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        *,
+        speed: float = 1.0,
+        endpoints: Iterable[str] = ENDPOINT_PATHS,
+        stub: Any = None,
+    ):
+        if speed < 0:
+            raise ValueError("speed must be >= 0")
+        self.cassette = cassette
+        self.speed = speed
+        self._endpoints = frozenset(endpoints)
+        self._stub = stub
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name not in self._endpoints:
+            if self._stub is None:
+                raise AttributeError(name)
+            return getattr(self._stub, name)
+        cassette = self.cassette
+        speed = self.speed
+        method = getattr(self._stub, name, None)
+
+        def call(*args, **kwargs):
+            if args:
+                if method is None:
+                    raise TypeError(f"{name}: positional arguments need a stub client to bind them")
+                kwargs = call_arguments(method, args, kwargs)
+            entry = cassette.lookup(name, kwargs)
+            if entry is None:
+                raise CassetteMissError(
+                    f"{name}: no recording for {normalize_request(redact_request(kwargs), cassette.ignore)}"
+                )
+            if speed and entry["d"]:
+                time.sleep(entry["d"] / speed)
+            if "e" in entry:
+                raise _decode_error(entry["e"])
+            return entry["r"]
+
+        call.__name__ = name
+        return call
+
+
+_writers: dict[str, CassetteWriter] = {}
+_cassettes: dict[str, Cassette] = {}
+_open_lock = threading.Lock()
+
+
+def open_writer(path: str, *, ignore: frozenset[str] = frozenset()) -> CassetteWriter:
+    """One writer per path, so every tenant client appends to the same file under one lock."""
+
+    path = os.path.abspath(path)
+    with _open_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = CassetteWriter(path, ignore=ignore)
+        return writer
+
+
+def open_cassette(path: str, *, ignore: frozenset[str] = frozenset()) -> Cassette:
+    path = os.path.abspath(path)
+    with _open_lock:
+        cassette = _cassettes.get(path)
+        if cassette is None:
+            cassette = _cassettes[path] = Cassette(path, ignore=ignore)
+        return cassette
+
+
+def wrap_from_env(api: Any) -> Any:
+    ignore = parse_ignore(os.environ.get("LOGISTICS_CASSETTE_IGNORE"))
+    replay = os.environ.get("LOGISTICS_CASSETTE_REPLAY")
+    if replay:
+        speed = float(os.environ.get("LOGISTICS_CASSETTE_SPEED", 1.0) or 1.0)
+        # 后端客户端只提供 customer_code / token 等属性，接口调用全部由 cassette 应答
+        return ReplayApi(open_cassette(replay, ignore=ignore), speed=speed, stub=api)
+    record = os.environ.get("LOGISTICS_CASSETTE_RECORD")
+    if record:
+        return RecordingApi(api, open_writer(record, ignore=ignore))
+    return api
+
+
+def cassette_stats(api: Any) -> dict[str, Any] | None:
+    """Stats of the recording/replay layer anywhere in a wrapper stack (followed through ``_api``)."""
+
+    while api is not None:
+        if isinstance(api, ReplayApi):
+            return {"mode": "replay", "speed": api.speed, **api.cassette.stats()}
+        if isinstance(api, RecordingApi):
+            return {"mode": "record", "path": api.writer.path, "records": api.writer.records}
+        api = vars(api).get("_api") if hasattr(api, "__dict__") else None
+    return None
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="API 录制回放 cassette：建索引与统计")
+    sub = parser.add_subparsers(dest="command", required=True)
+    i = sub.add_parser("index", help="重建 <cassette>.idx")
+    i.add_argument("path")
+    s = sub.add_parser("stats", help="按接口统计录制条数与耗时")
+    s.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "index":
+        t0 = time.perf_counter()
+        n = build_index(args.path)
+        print(f"{n} records -> {args.path}{INDEX_SUFFIX} ({time.perf_counter() - t0:.2f}s)")
+        return
+    cassette = Cassette(args.path)
+    per_method: dict[str, list[float]] = {}
+    errors: Counter[str] = Counter()
+    for entry in cassette.entries():
+        per_method.setdefault(entry["m"], []).append(entry["d"])
+        if "e" in entry:
+            errors[entry["m"]] += 1
+    print(f"{cassette.records} records, {cassette.size / 1024:.1f} KiB")
+    for method, durations in sorted(per_method.items()):
+        durations.sort()
+        p50 = durations[len(durations) // 2] * 1000
+        p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))] * 1000
+        print(f"{method:<24} {len(durations):>8} calls  p50 {p50:7.1f} ms  p99 {p99:7.1f} ms  errors {errors[method]}")
+
+
+if __name__ == "__main__":
+    main()
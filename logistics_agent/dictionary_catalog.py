@@ -0,0 +1,343 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any
+
+from .fuzzy_match import DICTIONARY_ALIASES, NgramIndex, build_option_index
+
+
+logger = logging.getLogger(__name__)
+
+
+# 字典名 -> MockLogisticsApi 方法名
+DICTIONARY_ENDPOINTS: dict[str, str] = {
+    "insurance": "insurance",
+    "currency": "currency",
+    "declaretype": "declaretype",
+    "customstype": "customstype",
+    "termsofsalecode": "termsofsalecode",
+    "exportreasoncode": "exportreasoncode",
+    "producttype": "get_product_type",
+}
+
+NAME_KEYS: tuple[str, ...] = ("name", "cnname", "enname", "productname")
+
+# 需要容错名称匹配的字典
+FUZZY_DICTIONARIES: tuple[str, ...] = ("insurance", "producttype", "declaretype", "currency")
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+DEFAULT_SNAPSHOT_MAX_AGE_SECONDS = 24 * 3600
+SNAPSHOT_MAX_AGE_ENV = "LOGISTICS_DICTIONARY_SNAPSHOT_MAX_AGE"
+
+
+def snapshot_max_age_from_env() -> float:
+    """``LOGISTICS_DICTIONARY_SNAPSHOT_MAX_AGE`` in seconds; the default when unset or not a number."""
+
+    raw = os.environ.get(SNAPSHOT_MAX_AGE_ENV)
+    if not raw:
+        return DEFAULT_SNAPSHOT_MAX_AGE_SECONDS
+    try:
+        return float(raw)
+    except ValueError:
+        logger.warning("%s=%r is not a number; using %s", SNAPSHOT_MAX_AGE_ENV, raw, DEFAULT_SNAPSHOT_MAX_AGE_SECONDS)
+        return DEFAULT_SNAPSHOT_MAX_AGE_SECONDS
+
+
+def _normalize_name(s: str) -> str:
+    return " ".join(s.strip().lower().split())
+
+
+def _canonical_bytes(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def dictionaries_digest(dictionaries: dict[str, list[dict]]) -> str:
+    return hashlib.sha256(_canonical_bytes(dictionaries)).hexdigest()
+
+
+def build_indexes(dictionaries: dict[str, list[dict]]) -> dict[str, dict[str, dict[str, Any]]]:
+    """Precompute code/name lookup indexes (values are positions in the option list)."""
+
+    indexes: dict[str, dict[str, dict[str, Any]]] = {}
+    for name, options in dictionaries.items():
+        by_code: dict[str, int] = {}
+        by_name: dict[str, list[int]] = {}
+        for pos, opt in enumerate(options):
+            if not isinstance(opt, dict):
+                continue
+            by_code.setdefault(str(opt.get("code")), pos)
+            for k in NAME_KEYS:
+                v = opt.get(k)
+                if not isinstance(v, str) or v.strip() == "":
+                    continue
+                positions = by_name.setdefault(_normalize_name(v), [])
+                if pos not in positions:
+                    positions.append(pos)
+        indexes[name] = {"by_code": by_code, "by_name": by_name}
+    return indexes
+
+
+class DictionaryCatalog:
+    """Immutable view over all dictionary endpoints plus their lookup indexes.
+
+    Option lists are shared, not copied: callers must treat them as read-only.
+    """
+
+    def __init__(
+        self,
+        dictionaries: dict[str, list[dict]],
+        *,
+        indexes: dict[str, dict[str, dict[str, Any]]] | None = None,
+        digest: str | None = None,
+        source: str = "live",
+        fetched_at: float | None = None,
+    ):
+        self.dictionaries = dictionaries
+        self.indexes = indexes if indexes is not None else build_indexes(dictionaries)
+        self.digest = digest or dictionaries_digest(dictionaries)
+        self.source = source
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+        self._fuzzy_indexes = {
+            name: build_option_index(
+                dictionaries[name], name_keys=(*NAME_KEYS, "code"), aliases=DICTIONARY_ALIASES.get(name)
+            )
+            for name in FUZZY_DICTIONARIES
+            if name in dictionaries
+        }
+
+    def options(self, name: str) -> list[dict]:
+        if name not in self.dictionaries:
+            raise KeyError(f"Unknown dictionary: {name}")
+        return self.dictionaries[name]
+
+    def by_code(self, name: str, code: Any) -> dict | None:
+        pos = self.indexes.get(name, {}).get("by_code", {}).get(str(code))
+        if pos is None:
+            return None
+        return self.dictionaries[name][pos]
+
+    def by_name(self, name: str, text: str) -> list[dict]:
+        positions = self.indexes.get(name, {}).get("by_name", {}).get(_normalize_name(text), [])
+        options = self.dictionaries.get(name, [])
+        return [options[p] for p in positions]
+
+    def fuzzy_index(self, name: str) -> NgramIndex | None:
+        return self._fuzzy_indexes.get(name)
+
+    def info(self) -> dict[str, Any]:
+        return {
+            "source": self.source,
+            "digest": self.digest,
+            "fetched_at": self.fetched_at,
+            "dictionaries": {k: len(v) for k, v in self.dictionaries.items()},
+        }
+
+
+def fetch_live_catalog(api: Any) -> DictionaryCatalog:
+    dictionaries: dict[str, list[dict]] = {}
+    for name, method in DICTIONARY_ENDPOINTS.items():
+        resp = getattr(api, method)()
+        if not isinstance(resp, dict) or resp.get("code") != 0 or not isinstance(resp.get("data"), list):
+            raise ValueError(f"dictionary endpoint {name} returned an invalid response")
+        dictionaries[name] = resp["data"]
+    return DictionaryCatalog(dictionaries, source="live")
+
+
+def write_snapshot(catalog: DictionaryCatalog, path: str, *, customer_code: str | None = None) -> None:
+    """Write a versioned snapshot: one JSON header line followed by the JSON body.
+
+    The header carries the body checksum so corruption is detected before the
+    body is parsed. The file is replaced atomically.
+    """
+
+    body = _canonical_bytes({"dictionaries": catalog.dictionaries, "indexes": catalog.indexes})
+    header = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "customer_code": customer_code,
+        "written_at": time.time(),
+        "digest": catalog.digest,
+        "body_sha256": hashlib.sha256(body).hexdigest(),
+        "body_length": len(body),
+    }
+
+    _replace_file(path, header, body)
+
+
+def _replace_file(path: str, header: dict[str, Any], body: bytes | memoryview) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, "wb") as f:
+        f.write(_canonical_bytes(header))
+        f.write(b"\n")
+        f.write(body)
+    os.replace(tmp_path, path)
+
+
+def touch_snapshot(path: str, digest: str) -> bool:
+    """Move ``written_at`` to now without re-serializing the body.
+
+    Only done when the file still holds ``digest`` with an intact body; returns False
+    otherwise (the caller then writes a full snapshot).
+    """
+
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+        header_end = raw.index(b"\n")
+        header = json.loads(raw[:header_end])
+        body = memoryview(raw)[header_end + 1:]
+        if header.get("digest") != digest or hashlib.sha256(body).hexdigest() != header.get("body_sha256"):
+            return False
+        _replace_file(path, {**header, "written_at": time.time()}, body)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def load_snapshot(
+    path: str,
+    *,
+    customer_code: str | None = None,
+    max_age_seconds: float = DEFAULT_SNAPSHOT_MAX_AGE_SECONDS,
+) -> DictionaryCatalog | None:
+    """Load a snapshot, or return None when it is missing, stale or corrupt."""
+
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+
+    try:
+        header_end = raw.index(b"\n")
+        header = json.loads(raw[:header_end])
+        body = memoryview(raw)[header_end + 1:]
+        if header.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            logger.info("dictionary snapshot %s has unsupported version", path)
+            return None
+        if customer_code is not None and header.get("customer_code") != customer_code:
+            logger.info("dictionary snapshot %s belongs to another customer", path)
+            return None
+        written_at = float(header.get("written_at") or 0)
+        if time.time() - written_at > max_age_seconds:
+            logger.info("dictionary snapshot %s is stale", path)
+            return None
+        if len(body) != header.get("body_length") or hashlib.sha256(body).hexdigest() != header.get("body_sha256"):
+            logger.warning("dictionary snapshot %s is corrupt", path)
+            return None
+        parsed = json.loads(bytes(body))
+        dictionaries = parsed["dictionaries"]
+        indexes = parsed["indexes"]
+        if set(dictionaries) != set(DICTIONARY_ENDPOINTS):
+            return None
+    except Exception:
+        logger.warning("dictionary snapshot %s could not be read", path, exc_info=True)
+        return None
+
+    return DictionaryCatalog(
+        dictionaries,
+        indexes=indexes,
+        digest=header.get("digest"),
+        source="snapshot",
+        fetched_at=written_at,
+    )
+
+
+class DictionaryCatalogManager:
+    """Process-wide catalog holder: snapshot warm start + background revalidation.
+
+    ``max_age_seconds=None`` reads ``LOGISTICS_DICTIONARY_SNAPSHOT_MAX_AGE`` when the
+    snapshot is first loaded, not at construction.
+    """
+
+    def __init__(
+        self,
+        api: Any,
+        *,
+        snapshot_path: str | None = None,
+        max_age_seconds: float | None = None,
+        revalidate: bool = True,
+    ):
+        self._api = api
+        self.snapshot_path = snapshot_path
+        self.max_age_seconds = max_age_seconds
+        self.revalidate = revalidate
+        self._catalog: DictionaryCatalog | None = None
+        self._lock = threading.Lock()
+        self._revalidation_thread: threading.Thread | None = None
+
+    def get(self) -> DictionaryCatalog:
+        catalog = self._catalog
+        if catalog is not None:
+            return catalog
+        with self._lock:
+            if self._catalog is None:
+                self._catalog = self._load()
+            return self._catalog
+
+    def refresh(self) -> DictionaryCatalog:
+        catalog = fetch_live_catalog(self._api)
+        self._catalog = catalog
+        self._write(catalog)
+        return catalog
+
+    def wait_for_revalidation(self, timeout: float | None = None) -> None:
+        t = self._revalidation_thread
+        if t is not None:
+            t.join(timeout)
+
+    def _customer_code(self) -> str | None:
+        return getattr(self._api, "customer_code", None)
+
+    def _write(self, catalog: DictionaryCatalog) -> None:
+        if not self.snapshot_path:
+            return
+        try:
+            write_snapshot(catalog, self.snapshot_path, customer_code=self._customer_code())
+        except OSError:
+            logger.warning("failed to write dictionary snapshot %s", self.snapshot_path, exc_info=True)
+
+    def _touch(self, catalog: DictionaryCatalog) -> None:
+        if self.snapshot_path and not touch_snapshot(self.snapshot_path, catalog.digest):
+            self._write(catalog)
+
+    def _load(self) -> DictionaryCatalog:
+        if self.snapshot_path:
+            snapshot = load_snapshot(
+                self.snapshot_path,
+                customer_code=self._customer_code(),
+                max_age_seconds=self.max_age_seconds if self.max_age_seconds is not None else snapshot_max_age_from_env(),
+            )
+            if snapshot is not None:
+                if self.revalidate:
+                    self._start_revalidation(snapshot)
+                return snapshot
+
+        catalog = fetch_live_catalog(self._api)
+        self._write(catalog)
+        return catalog
+
+    def _start_revalidation(self, snapshot: DictionaryCatalog) -> None:
+        def _run() -> None:
+            try:
+                live = fetch_live_catalog(self._api)
+            except Exception:
+                logger.warning("dictionary revalidation failed; keeping snapshot", exc_info=True)
+                return
+            # 内容没变：只刷新快照头里的 written_at，下次启动仍能直接用快照
+            if live.digest == snapshot.digest:
+                self._touch(live)
+                return
+            logger.info("dictionary snapshot out of date; switching to live data")
+            self._catalog = live
+            self._write(live)
+
+        self._revalidation_thread = threading.Thread(
+            target=_run, name="dictionary-revalidate", daemon=True
+        )
+        self._revalidation_thread.start()
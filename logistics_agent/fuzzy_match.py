@@ -0,0 +1,111 @@
+from collections import defaultdict
+from typing import Any, Iterable
+
+
+# 自动选择所需的最低分数，以及领先第二名的最小差距
+AUTO_SELECT_SCORE = 0.6
+AUTO_SELECT_MARGIN = 0.15
+
+
+# 字典选项的常见别名（按 code 归属）
+DICTIONARY_ALIASES: dict[str, dict[Any, tuple[str, ...]]] = {
+    "currency": {
+        "USD": ("美元", "美金", "us dollar", "dollar"),
+        "CNY": ("人民币", "人名币", "rmb", "元"),
+        "HKG": ("港币", "港元", "hkd"),
+    },
+    "producttype": {
+        1: ("普通货物", "一般货物", "general cargo", "general"),
+        2: ("带电", "含电池", "带电池", "battery", "电子产品"),
+    },
+    "insurance": {
+        1: ("运输险", "货运险", "cargo insurance"),
+        9: ("高价值险", "贵重物品险"),
+    },
+}
+
+
+def _normalize(s: str) -> str:
+    return " ".join(s.strip().lower().split())
+
+
+def char_ngrams(s: str, n: int = 2) -> set[str]:
+    """Padded character n-grams; work for both CJK and Latin text."""
+
+    padded = f"^{_normalize(s)}$"
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class NgramIndex:
+    """Inverted character n-gram index scored with the Dice coefficient."""
+
+    def __init__(self, entries: Iterable[tuple[str, Any]], *, n: int = 2):
+        self.n = n
+        self._texts: list[str] = []
+        self._payloads: list[Any] = []
+        self._sizes: list[int] = []
+        self._postings: dict[str, list[int]] = defaultdict(list)
+        for text, payload in entries:
+            if not isinstance(text, str) or text.strip() == "":
+                continue
+            grams = char_ngrams(text, n)
+            entry_id = len(self._texts)
+            self._texts.append(text)
+            self._payloads.append(payload)
+            self._sizes.append(len(grams))
+            for g in grams:
+                self._postings[g].append(entry_id)
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def search(self, query: str, *, limit: int = 5) -> list[tuple[Any, float, str]]:
+        """Return up to ``limit`` (payload, score, matched_text), best first, one per payload."""
+
+        grams = char_ngrams(query, self.n)
+        overlap: dict[int, int] = defaultdict(int)
+        for g in grams:
+            for entry_id in self._postings.get(g, ()):
+                overlap[entry_id] += 1
+
+        best: dict[int, tuple[float, int]] = {}
+        for entry_id, shared in overlap.items():
+            score = 2.0 * shared / (len(grams) + self._sizes[entry_id])
+            key = id(self._payloads[entry_id])
+            if key not in best or score > best[key][0]:
+                best[key] = (score, entry_id)
+
+        ranked = sorted(best.values(), key=lambda x: (-x[0], x[1]))[:limit]
+        return [(self._payloads[i], round(score, 3), self._texts[i]) for score, i in ranked]
+
+
+def build_option_index(
+    options: list[dict],
+    *,
+    name_keys: tuple[str, ...],
+    aliases: dict[Any, tuple[str, ...]] | None = None,
+) -> NgramIndex:
+    entries: list[tuple[str, Any]] = []
+    for opt in options:
+        for k in name_keys:
+            v = opt.get(k)
+            if isinstance(v, str):
+                entries.append((v, opt))
+        for alias in (aliases or {}).get(opt.get("code"), ()):
+            entries.append((alias, opt))
+    return NgramIndex(entries)
+
+
+def auto_select(
+    ranked: list[tuple[Any, float, str]],
+    *,
+    min_score: float = AUTO_SELECT_SCORE,
+    min_margin: float = AUTO_SELECT_MARGIN,
+) -> Any | None:
+    if not ranked or ranked[0][1] < min_score:
+        return None
+    if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < min_margin:
+        return None
+    return ranked[0][0]
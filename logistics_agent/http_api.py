@@ -0,0 +1,185 @@
+"""HTTP client with the same method surface as ``MockLogisticsApi``.
+
+Point the agent at a running ``mock_http_server`` (or a real deployment with
+the same paths) with ``LOGISTICS_API_BASE_URL=http://127.0.0.1:8765``.
+"""
+
+import gzip
+import http.client
+import json
+import threading
+from typing import Any, Dict
+from urllib.parse import urlsplit
+
+
+# MockLogisticsApi 方法名 -> HTTP 路径。createForecast/waybillnumber/create 取自接口文档；
+# 轨迹与字典接口文档未给出固定路径，这里按方法名约定。
+ENDPOINT_PATHS: dict[str, str] = {
+    "create_forecast_order": "/api/order/createForecast",
+    "create_order": "/api/order/create",
+    "waybillnumber": "/api/order/waybillnumber",
+    "track": "/api/order/track",
+    "track_many": "/api/order/trackMany",
+    "insurance": "/api/base/insurance",
+    "currency": "/api/base/currency",
+    "declaretype": "/api/base/declaretype",
+    "customstype": "/api/base/customstype",
+    "termsofsalecode": "/api/base/termsofsalecode",
+    "exportreasoncode": "/api/base/exportreasoncode",
+    "get_product_type": "/api/base/producttype",
+}
+
+# 会在服务端建单的接口：响应丢失时不能盲目重发
+NON_IDEMPOTENT_METHODS = frozenset({"create_order", "create_forecast_order"})
+
+
+class HttpApiError(RuntimeError):
+    def __init__(self, status: int, body: Any):
+        super().__init__(f"HTTP {status}: {body}")
+        self.status = status
+        self.body = body
+
+
+class HttpLogisticsApi:
+    """Keep-alive JSON client; one persistent connection per calling thread."""
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        customer_code: str = "KJHB",
+        token: str = "mock-token",
+        timeout: float = 30.0,
+        accept_gzip: bool = True,
+    ):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"invalid base_url: {base_url}")
+        self.base_url = base_url.rstrip("/")
+        self.customer_code = customer_code
+        self.token = token
+        self.timeout = timeout
+        self.accept_gzip = accept_gzip
+        self._scheme = parts.scheme
+        self._host = parts.hostname
+        self._port = parts.port
+        self._prefix = parts.path.rstrip("/")
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self._scheme == "https" else http.client.HTTPConnection
+            conn = cls(self._host, self._port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _post(self, method: str, body: dict | None = None, *, path: str | None = None) -> Dict[str, Any]:
+        path = self._prefix + (path or ENDPOINT_PATHS[method])
+        data = json.dumps(
+            {"authorization": {"code": self.customer_code, "token": self.token}, **(body or {})},
+            ensure_ascii=False,
+        ).encode("utf-8")
+        headers = {"Content-Type": "application/json; charset=utf-8"}
+        if self.accept_gzip:
+            headers["Accept-Encoding"] = "gzip"
+
+        # 服务端可能已关闭空闲的 keep-alive 连接：重连后重试一次。下单接口不是幂等的，
+        # 请求发出后才断开时服务端可能已经建单，只有在发送阶段失败时才重试
+        for attempt in (1, 2):
+            conn = self._connection()
+            sent = False
+            try:
+                conn.request("POST", path, body=data, headers=headers)
+                sent = True
+                resp = conn.getresponse()
+                raw = resp.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.close()
+                if attempt == 2 or (sent and method in NON_IDEMPOTENT_METHODS):
+                    raise
+        if resp.getheader("Content-Encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        if resp.getheader("Connection", "").lower() == "close":
+            self.close()
+        payload = json.loads(raw) if raw else None
+        if resp.status != 200:
+            raise HttpApiError(resp.status, payload)
+        return payload
+
+    def insurance(self) -> Dict[str, Any]:
+        return self._post("insurance")
+
+    def currency(self) -> Dict[str, Any]:
+        return self._post("currency")
+
+    def declaretype(self) -> Dict[str, Any]:
+        return self._post("declaretype")
+
+    def customstype(self) -> Dict[str, Any]:
+        return self._post("customstype")
+
+    def termsofsalecode(self) -> Dict[str, Any]:
+        return self._post("termsofsalecode")
+
+    def exportreasoncode(self) -> Dict[str, Any]:
+        return self._post("exportreasoncode")
+
+    def get_product_type(self) -> Dict[str, Any]:
+        return self._post("get_product_type")
+
+    def create_order(
+        self,
+        *,
+        origin_city: str,
+        destination_city: str,
+        customernumber1: str | None = None,
+        number: int | None = None,
+        endpoint: str = ENDPOINT_PATHS["create_order"],
+    ) -> Dict[str, Any]:
+        return self._post(
+            "create_order",
+            {
+                "origin_city": origin_city,
+                "destination_city": destination_city,
+                "customernumber1": customernumber1,
+                "number": number,
+            },
+            path=endpoint,
+        )
+
+    def create_forecast_order(
+        self,
+        *,
+        origin_city: str,
+        destination_city: str,
+        request_payload: Dict[str, Any] | None = None,
+    ) -> Dict[str, Any]:
+        return self._post(
+            "create_forecast_order",
+            {"origin_city": origin_city, "destination_city": destination_city, **(request_payload or {})},
+        )
+
+    def waybillnumber(
+        self, *, customernumber: list[str], child_offset: int = 0, child_limit: int | None = None
+    ) -> Dict[str, Any]:
+        datas: dict[str, Any] = {"customernumber": list(customernumber), "childOffset": child_offset}
+        if child_limit is not None:
+            datas["childLimit"] = child_limit
+        return self._post("waybillnumber", {"datas": datas})
+
+    def track(self, *, waybillnumber: str, child_offset: int = 0, child_limit: int | None = None) -> Dict[str, Any]:
+        datas: dict[str, Any] = {"waybillnumber": waybillnumber, "childOffset": child_offset}
+        if child_limit is not None:
+            datas["childLimit"] = child_limit
+        return self._post("track", {"datas": datas})
+
+    def track_many(self, *, waybillnumbers: list[str]) -> Dict[str, Any]:
+        return self._post("track_many", {"datas": {"waybillnumbers": list(waybillnumbers)}})
@@ -0,0 +1,439 @@
+"""Serve ``MockLogisticsApi`` over HTTP on the documented endpoint paths.
+
+CLI::
+
+    python -m logistics_agent.mock_http_server --port 8765 --workers 4 --gzip --profile typical
+    python -m logistics_agent.mock_http_server --bench --clients 16 --requests 20000
+    python -m logistics_agent.mock_http_server --cassette traffic.cassette --cassette-speed 10
+
+The event loop only parses requests and applies the latency/fault profile;
+mock calls, JSON encoding and gzip run on a thread pool of ``workers``.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from urllib.parse import parse_qsl, urlsplit
+
+from .http_api import ENDPOINT_PATHS
+from .mock_logistics_api import FAULT_TIMEOUT_SECONDS, BUSY_RESPONSE, FaultInjector, MockLogisticsApi
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 4
+GZIP_MIN_BYTES = 512
+MAX_BODY_BYTES = 8 * 1024 * 1024
+KEEPALIVE_TIMEOUT_SECONDS = 30.0
+
+ROUTES: dict[str, str] = {path: method for method, path in ENDPOINT_PATHS.items()}
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _datas(body: dict) -> dict:
+    datas = body.get("datas")
+    return datas if isinstance(datas, dict) else {}
+
+
+def _child_paging(body: dict, query: dict[str, str]) -> dict[str, int]:
+    """``datas.childOffset`` / ``datas.childLimit`` (or the query string) -> child_offset / child_limit."""
+
+    out: dict[str, int] = {}
+    for field, kwarg in (("childOffset", "child_offset"), ("childLimit", "child_limit")):
+        value = _datas(body).get(field, query.get(field))
+        if value is None:
+            continue
+        try:
+            out[kwarg] = int(value)
+        except (TypeError, ValueError):
+            raise BadRequest(f"datas.{field} must be an integer")
+    return out
+
+
+def call_kwargs(method: str, body: dict, query: dict[str, str]) -> dict[str, Any]:
+    """Translate a request body (plus query string) into MockLogisticsApi keyword arguments."""
+
+    if method == "create_forecast_order":
+        payload = dict(body)
+        origin = payload.pop("origin_city", None) or query.get("origin_city") or ""
+        destination = payload.pop("destination_city", None) or query.get("destination_city") or ""
+        return {"origin_city": origin, "destination_city": destination, "request_payload": payload}
+    if method == "create_order":
+        if not body.get("origin_city") or not body.get("destination_city"):
+            raise BadRequest("origin_city and destination_city are required")
+        return {
+            "origin_city": body["origin_city"],
+            "destination_city": body["destination_city"],
+            "customernumber1": body.get("customernumber1"),
+            "number": body.get("number"),
+        }
+    if method == "waybillnumber":
+        numbers = _datas(body).get("customernumber", query.get("customernumber"))
+        if isinstance(numbers, str):
+            numbers = numbers.split(",")
+        if not isinstance(numbers, list):
+            raise BadRequest("datas.customernumber must be a list")
+        return {"customernumber": numbers, **_child_paging(body, query)}
+    if method == "track":
+        number = _datas(body).get("waybillnumber", query.get("waybillnumber"))
+        if not isinstance(number, str):
+            raise BadRequest("datas.waybillnumber is required")
+        return {"waybillnumber": number, **_child_paging(body, query)}
+    if method == "track_many":
+        numbers = _datas(body).get("waybillnumbers", query.get("waybillnumbers"))
+        if isinstance(numbers, str):
+            numbers = numbers.split(",")
+        if not isinstance(numbers, list):
+            raise BadRequest("datas.waybillnumbers must be a list")
+        return {"waybillnumbers": numbers}
+    return {}
+
+
+class MockHttpServer:
+    def __init__(
+        self,
+        api: Any | None = None,
+        *,
+        host: str = "127.0.0.1",
+        port: int = DEFAULT_PORT,
+        workers: int = DEFAULT_WORKERS,
+        gzip_enabled: bool = False,
+        profile: str | dict[str, float] = "none",
+        seed: int | None = None,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.api = api if api is not None else MockLogisticsApi()
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.gzip_enabled = gzip_enabled
+        self.faults = FaultInjector(profile, seed=seed)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mock-http")
+        self._server: asyncio.AbstractServer | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self.stats = {"connections": 0, "requests": 0, "faults": 0, "bytes_out": 0}
+
+    # -- request handling -------------------------------------------------
+
+    def _execute(self, method: str, body_bytes: bytes, query: dict[str, str], accept_gzip: bool) -> tuple[int, bytes, bool]:
+        """Runs on a worker thread: decode, call the mock, encode (and gzip)."""
+
+        try:
+            body = json.loads(body_bytes) if body_bytes else {}
+            if not isinstance(body, dict):
+                raise BadRequest("request body must be a JSON object")
+            result = getattr(self.api, method)(**call_kwargs(method, body, query))
+            status = 200
+        except (BadRequest, json.JSONDecodeError) as e:
+            status, result = 400, {"code": -1, "msg": str(e), "data": []}
+        except Exception as e:
+            logger.exception("mock call %s failed", method)
+            status, result = 500, {"code": -1, "msg": f"internal error: {e}", "data": []}
+        return self._encode(status, result, accept_gzip)
+
+    def _encode(self, status: int, result: Any, accept_gzip: bool) -> tuple[int, bytes, bool]:
+        out = json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if accept_gzip and self.gzip_enabled and len(out) >= GZIP_MIN_BYTES:
+            return status, gzip.compress(out, compresslevel=5), True
+        return status, out, False
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, body: bytes, *, gzipped: bool, keep_alive: bool) -> None:
+        head = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if gzipped:
+            head.append("Content-Encoding: gzip")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        self.stats["bytes_out"] += len(body)
+        await writer.drain()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> tuple[str, str, str, dict[str, str], bytes] | None:
+        line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT_SECONDS)
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise BadRequest("malformed request line")
+        headers: dict[str, str] = {}
+        while True:
+            h = await reader.readline()
+            if h in (b"\r\n", b"\n", b""):
+                break
+            k, _, v = h.decode("latin-1").partition(":")
+            headers[k.strip().lower()] = v.strip()
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise BadRequest("chunked request bodies are not supported")
+        length = int(headers.get("content-length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise BadRequest("request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method, target, version, headers, body
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats["connections"] += 1
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except BadRequest as e:
+                    status, body, _ = self._encode(400, {"code": -1, "msg": str(e), "data": []}, False)
+                    await self._respond(writer, status, body, gzipped=False, keep_alive=False)
+                    return
+                if request is None:
+                    return
+                method, target, version, headers, body_bytes = request
+                self.stats["requests"] += 1
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                accept_gzip = "gzip" in headers.get("accept-encoding", "")
+
+                url = urlsplit(target)
+                api_method = ROUTES.get(url.path.rstrip("/") or "/")
+                if url.path == "/healthz":
+                    status, out, gz = self._encode(200, {"status": "ok", **self.stats}, False)
+                elif api_method is None:
+                    status, out, gz = self._encode(404, {"code": -1, "msg": f"no route for {url.path}", "data": []}, False)
+                elif method not in ("POST", "GET"):
+                    status, out, gz = self._encode(405, {"code": -1, "msg": "use POST", "data": []}, False)
+                else:
+                    with self.faults.track() as in_flight:
+                        latency, fault = self.faults.decide(in_flight)
+                        if latency:
+                            await asyncio.sleep(latency)
+                        if fault is not None:
+                            self.stats["faults"] += 1
+                        if fault == "timeout":
+                            await asyncio.sleep(FAULT_TIMEOUT_SECONDS)
+                            return
+                        if fault == "unavailable":
+                            status, out, gz = self._encode(503, {"code": -1, "msg": "service unavailable", "data": []}, False)
+                        elif fault == "busy":
+                            status, out, gz = self._encode(200, BUSY_RESPONSE, False)
+                        else:
+                            query = dict(parse_qsl(url.query))
+                            status, out, gz = await loop.run_in_executor(
+                                self._executor, self._execute, api_method, body_bytes, query, accept_gzip
+                            )
+                await self._respond(writer, status, out, gzipped=gz, keep_alive=keep_alive)
+                if not keep_alive:
+                    return
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            return
+        except asyncio.CancelledError:
+            # Server shutdown; finish quietly so the stream callback does not log it.
+            return
+        finally:
+            writer.close()
+
+    # -- lifecycle --------------------------------------------------------
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        logger.info("mock logistics API listening on http://%s:%d", self.host, self.port)
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start_in_thread(self) -> str:
+        """Run the server on a background event loop; returns the base URL."""
+
+        started = threading.Event()
+
+        def _run() -> None:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start())
+            started.set()
+            loop.run_forever()
+            loop.close()
+
+        self._thread = threading.Thread(target=_run, name="mock-http-server", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.base_url
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def _shutdown(self) -> None:
+        self._server.close()
+        # Idle keep-alive connections are parked in readline(); cancel them.
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._server.wait_closed()
+
+    def stop(self) -> None:
+        if self._loop is not None and self._thread is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+        self._executor.shutdown(wait=False)
+
+
+def run_benchmark(
+    *,
+    clients: int,
+    requests: int,
+    workers: int,
+    gzip_enabled: bool,
+    profile: str,
+    keep_alive: bool = True,
+) -> dict[str, Any]:
+    """Drive a loopback server with a track/waybill/dictionary/createForecast mix."""
+
+    from .http_api import HttpLogisticsApi
+
+    server = MockHttpServer(port=0, workers=workers, gzip_enabled=gzip_enabled, profile=profile, seed=0)
+    base_url = server.start_in_thread()
+    api = HttpLogisticsApi(base_url, accept_gzip=gzip_enabled)
+    seeded = [
+        server.api.create_order(origin_city="深圳", destination_city="洛杉矶", customernumber1=f"HB-{i:05d}")["data"][0]
+        for i in range(200)
+    ]
+    latencies: list[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    per_client = max(1, requests // clients)
+
+    def client(cid: int) -> None:
+        local: list[float] = []
+        for i in range(per_client):
+            rec = seeded[(cid * per_client + i) % len(seeded)]
+            t0 = time.perf_counter()
+            kind = i % 10
+            try:
+                if kind < 5:
+                    api.track(waybillnumber=rec["systemnumber"])
+                elif kind < 7:
+                    api.waybillnumber(customernumber=[rec["customernumber"]])
+                elif kind < 9:
+                    api.insurance()
+                else:
+                    api.create_order(origin_city="深圳", destination_city="洛杉矶", customernumber1=f"HB-{cid}-{i}")
+            except Exception:
+                api.close()
+                with lock:
+                    errors[0] += 1
+            local.append(time.perf_counter() - t0)
+            if not keep_alive:
+                api.close()
+        api.close()
+        with lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    server.stop()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        "errors": errors[0],
+        "connections": server.stats["connections"],
+        "bytes_out": server.stats["bytes_out"],
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Mock 物流 API 的本地 HTTP 服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--gzip", action="store_true", help="客户端声明 Accept-Encoding: gzip 时压缩响应")
+    parser.add_argument("--profile", default="none", help="延迟/故障画像：none, lan, typical, degraded, throttled")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--cassette", default=None, help="按录制的 cassette 回放响应与耗时，代替 mock")
+    parser.add_argument("--cassette-speed", type=float, default=1.0, help="回放加速倍数，0 为不等待")
+    parser.add_argument("--bench", action="store_true", help="在回环地址上运行内置吞吐基准")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--no-keepalive", action="store_true", help="基准中每个请求新建连接")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        result = run_benchmark(
+            clients=args.clients,
+            requests=args.requests,
+            workers=args.workers,
+            gzip_enabled=args.gzip,
+            profile=args.profile,
+            keep_alive=not args.no_keepalive,
+        )
+        print(
+            f"clients={args.clients} workers={args.workers} gzip={args.gzip} profile={args.profile} "
+            f"keepalive={not args.no_keepalive}"
+        )
+        print(
+            f"requests={result['requests']} seconds={result['seconds']} rps={result['rps']} "
+            f"p50={result['p50_ms']}ms p99={result['p99_ms']}ms errors={result['errors']} connections={result['connections']} "
+            f"bytes_out={result['bytes_out']}"
+        )
+        return
+
+    logging.basicConfig(level=logging.INFO)
+    api = None
+    if args.cassette:
+        from .cassette import Cassette, ReplayApi
+
+        api = ReplayApi(Cassette(args.cassette), speed=args.cassette_speed)
+    server = MockHttpServer(
+        api,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        gzip_enabled=args.gzip,
+        profile=args.profile,
+        seed=args.seed,
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
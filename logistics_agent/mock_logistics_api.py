@@ -1,6 +1,13 @@
+import contextlib
 import datetime
 import hashlib
-from typing import Any, Dict
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator
+
+from .rate_quote import rate_card
+from .shipment_lifecycle import ShipmentLifecycle, format_utc8
 
 
 def _stable_id(*parts: str) -> str:
@@ -8,15 +15,46 @@ def _stable_id(*parts: str) -> str:
     return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12]
 
 
+# 子单（件）按需从主单派生；响应里的 childs / subOrderList 按页返回
+DEFAULT_CHILD_PAGE_SIZE = 100
+MAX_CHILD_PAGE_SIZE = 1000
+
+
+def _child(customernumber: str, systemnumber: str, waybillnumber: str, i: int) -> Dict[str, Any]:
+    return {
+        "customernumber": f"CH-{_stable_id(customernumber, str(i)).upper()}",
+        "systemnumber": f"{systemnumber}-{i}",
+        "tracknumber": f"1Z{_stable_id(waybillnumber, str(i)).upper()}",
+    }
+
+
+def child_page(record: dict, offset: int = 0, limit: int = DEFAULT_CHILD_PAGE_SIZE) -> tuple[list[Dict[str, Any]], int | None]:
+    """Children ``offset+1 .. offset+limit`` of an order record and the next offset (None on the last page)."""
+
+    count = record["child_count"]
+    offset = max(0, int(offset or 0))
+    limit = max(1, min(int(limit or DEFAULT_CHILD_PAGE_SIZE), MAX_CHILD_PAGE_SIZE))
+    end = min(count, offset + limit)
+    parent = (record["customernumber"], record["systemnumber"], record["waybillnumber"])
+    return [_child(*parent, i) for i in range(offset + 1, end + 1)], (end if end < count else None)
+
+
 def _now_str() -> str:
     return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
 class MockLogisticsApi:
-    def __init__(self, customer_code: str = "KJHB", token: str = "mock-token"):
+    def __init__(self, customer_code: str = "KJHB", token: str = "mock-token", *, clock: Any | None = None):
         self.customer_code = customer_code
         self.token = token
+        # 传入 clock（如 VirtualClock）后，轨迹按每单预先计算的时间线随时钟推进；默认保持固定的两条轨迹
+        self.clock = clock
+        self._lifecycle = ShipmentLifecycle(clock) if clock is not None else None
         self._orders_by_customernumber: dict[str, dict[str, Any]] = {}
+        # 运单号/订单号/客户参考号 -> customernumber，轨迹查询免全表扫描
+        self._customernumber_by_search_number: dict[str, str] = {}
+        # 只串行化写入；读路径是单次 dict.get，记录写入后不再修改
+        self._write_lock = threading.Lock()
 
     def insurance(self) -> Dict[str, Any]:
         return {
@@ -136,6 +174,8 @@ class MockLogisticsApi:
         customernumber1: str | None = None,
         number: int | None = None,
         endpoint: str = "/api/order/create",
+        is_remote: bool | None = None,
+        countrycode: str | None = None,
     ) -> Dict[str, Any]:
         """Mock create order response matching the API documentation."""
 
@@ -148,43 +188,50 @@ class MockLogisticsApi:
 
         customernumber = customernumber1 or f"MOCK-{_stable_id(computed_waybillnumber)}"
 
-        child_count = int(number or 1)
-        if child_count < 1:
-            child_count = 1
-        if child_count > 10:
-            child_count = 10
+        child_count = max(1, int(number or 1))
 
-        is_remote = bool(int(hashlib.sha256(computed_waybillnumber.encode("utf-8")).hexdigest()[:2], 16) % 2)
+        if is_remote is None:
+            is_remote = bool(int(hashlib.sha256(computed_waybillnumber.encode("utf-8")).hexdigest()[:2], 16) % 2)
 
         # Simulate: waybillnumber may be empty and needs a follow-up call to /api/order/waybillnumber.
         defer_waybill = bool(int(hashlib.sha256(customernumber.encode("utf-8")).hexdigest()[:2], 16) % 5 == 0)
         waybillnumber = "" if defer_waybill else computed_waybillnumber
         shortnumber = (computed_waybillnumber[-6:] if computed_waybillnumber else systemnumber[-6:])
 
-        childs: list[Dict[str, Any]] = []
-        for i in range(1, child_count + 1):
-            child_customernumber = f"CH-{_stable_id(customernumber, str(i)).upper()}"
-            childs.append(
-                {
-                    "customernumber": child_customernumber,
-                    "systemnumber": f"{systemnumber}-{i}",
-                    "tracknumber": f"1Z{_stable_id(computed_waybillnumber, str(i)).upper()}",
-                }
-            )
-
         msg = "下单成功"
         if is_remote:
             msg = f"{msg}（偏远）"
 
+        created_at = format_utc8(self.clock.now()) if self.clock is not None else _now_str()
         record = {
             "customernumber": customernumber,
             "systemnumber": systemnumber,
             "waybillnumber": computed_waybillnumber,
             "shortnumber": shortnumber,
             "isRemote": is_remote,
-            "childs": childs,
+            "created_at": created_at,
+            # 轨迹响应的 countrycode 取自下单时的收件国家
+            "countrycode": str(countrycode).strip().upper() if countrycode else None,
+            # 只存件数，子单在响应时按页派生，大件数订单的记录大小不变
+            "child_count": child_count,
         }
-        self._orders_by_customernumber[customernumber] = record
+        childs, next_offset = child_page(record)
+        if self._lifecycle is not None:
+            # 到达与签收节点在订单的目的城市与收件国家
+            self._lifecycle.register(systemnumber, destination=", ".join(filter(None, (destination_city, record["countrycode"]))))
+
+        search_numbers = (computed_waybillnumber, systemnumber, customernumber)
+        with self._write_lock:
+            # 先发布记录再发布索引，读者通过索引拿到的记录总是完整的
+            replaced = self._orders_by_customernumber.get(customernumber)
+            self._orders_by_customernumber[customernumber] = record
+            if replaced is not None:
+                # 同一客户参考号重新下单（城市不同则单号不同）：旧单号不再指向新记录
+                for old in (replaced["waybillnumber"], replaced["systemnumber"]):
+                    if old not in search_numbers and self._customernumber_by_search_number.get(old) == customernumber:
+                        del self._customernumber_by_search_number[old]
+            for search_number in search_numbers:
+                self._customernumber_by_search_number.setdefault(search_number, customernumber)
 
         return {
             "code": 0,
@@ -199,10 +246,12 @@ class MockLogisticsApi:
                     "shortnumber": shortnumber,
                     "isRemote": is_remote,
                     "childs": childs,
+                    "childCount": child_count,
+                    "childNextOffset": next_offset,
                     "meta": {
                         "origin_city": origin_city,
                         "destination_city": destination_city,
-                        "created_at": _now_str(),
+                        "created_at": created_at,
                         "endpoint": endpoint,
                     },
                 }
@@ -292,6 +341,9 @@ class MockLogisticsApi:
             customernumber1=customernumber1,
             number=number,
             endpoint="/api/order/createForecast",
+            # 偏远判定与报价引擎一致：按收件国家 + 邮编查运价表的偏远地区
+            is_remote=rate_card.is_remote(order_data["countrycode"], order_data["consigneezipcode"]),
+            countrycode=order_data["countrycode"],
         )
         
         if request_payload is not None:
@@ -299,11 +351,18 @@ class MockLogisticsApi:
             
         return payload
 
-    def waybillnumber(self, *, customernumber: list[str]) -> Dict[str, Any]:
+    def waybillnumber(
+        self,
+        *,
+        customernumber: list[str],
+        child_offset: int = 0,
+        child_limit: int = DEFAULT_CHILD_PAGE_SIZE,
+    ) -> Dict[str, Any]:
         """Mock /api/order/waybillnumber.
 
         Request datas.customernumber: ["T...", ...]
-        Response data.customernumber: list of per-item results.
+        Response data.customernumber: list of per-item results; each item's childs
+        is one page (datas.childOffset / datas.childLimit), with childNextOffset.
         """
 
         items: list[dict[str, Any]] = []
@@ -317,12 +376,8 @@ class MockLogisticsApi:
                 continue
 
             # In the doc, tracknumber is top-level for the main order as well.
-            top_track = None
-            childs = rec.get("childs")
-            if isinstance(childs, list) and childs:
-                first = childs[0]
-                if isinstance(first, dict) and isinstance(first.get("tracknumber"), str):
-                    top_track = first.get("tracknumber")
+            top_track = _child(rec["customernumber"], rec["systemnumber"], rec["waybillnumber"], 1)["tracknumber"]
+            childs, next_offset = child_page(rec, child_offset, child_limit)
 
             items.append(
                 {
@@ -333,7 +388,9 @@ class MockLogisticsApi:
                     "waybillnumber": rec.get("waybillnumber"),
                     "tracknumber": top_track,
                     "shortnumber": rec.get("shortnumber"),
-                    "childs": rec.get("childs"),
+                    "childs": childs,
+                    "childCount": rec["child_count"],
+                    "childNextOffset": next_offset,
                 }
             )
 
@@ -343,13 +400,21 @@ class MockLogisticsApi:
             "data": {"customernumber": items},
         }
 
-    def track(self, *, waybillnumber: str) -> Dict[str, Any]:
+    def track(
+        self,
+        *,
+        waybillnumber: str,
+        child_offset: int = 0,
+        child_limit: int = DEFAULT_CHILD_PAGE_SIZE,
+    ) -> Dict[str, Any]:
         """Mock track API - 查询轨迹接口
         
         支持通过以下方式查询：
         1. 运单号 (waybillnumber)
         2. 订单号 (systemnumber) 
         3. 客户参考号 (customernumber)
+
+        subOrderList 按页返回（child_offset / child_limit），附 subOrderCount 与 subOrderNextOffset。
         """
         if not waybillnumber or waybillnumber.strip() == "":
             return {"msg": "success", "code": 0, "data": []}
@@ -402,19 +467,11 @@ class MockLogisticsApi:
                 ],
             }
 
-        # 检查是否是已创建的订单 - 支持多种查询方式
-        for customernumber, record in self._orders_by_customernumber.items():
-            # 1. 通过运单号查询
-            if record.get("waybillnumber") == search_number:
-                return self._build_track_response(record, search_number)
-            
-            # 2. 通过订单号（systemnumber）查询
-            if str(record.get("systemnumber")) == search_number:
-                return self._build_track_response(record, search_number)
-            
-            # 3. 通过客户参考号查询
-            if record.get("customernumber") == search_number:
-                return self._build_track_response(record, search_number)
+        # 检查是否是已创建的订单 - 支持运单号、订单号（systemnumber）、客户参考号
+        customernumber = self._customernumber_by_search_number.get(search_number)
+        record = self._orders_by_customernumber.get(customernumber) if customernumber else None
+        if record is not None:
+            return self._build_track_response(record, search_number, child_offset, child_limit)
 
         # 无效单号
         return {
@@ -429,38 +486,159 @@ class MockLogisticsApi:
             ],
         }
 
-    def _build_track_response(self, record: dict, search_number: str) -> Dict[str, Any]:
+    def track_many(self, *, waybillnumbers: list[str]) -> Dict[str, Any]:
+        """批量查询轨迹：响应 data 为每个单号一条，与单号查询的 data 元素结构一致"""
+
+        data: list[Dict[str, Any]] = []
+        for number in waybillnumbers:
+            if not isinstance(number, str) or number.strip() == "":
+                continue
+            data.extend(self.track(waybillnumber=number).get("data", []))
+        return {"msg": "success", "code": 0, "data": data}
+
+    def _build_track_response(
+        self, record: dict, search_number: str, child_offset: int = 0, child_limit: int = DEFAULT_CHILD_PAGE_SIZE
+    ) -> Dict[str, Any]:
         """构建轨迹查询响应"""
+        sub_orders, next_offset = child_page(record, child_offset, child_limit)
+        page = {
+            "tracknumber": _child(record["customernumber"], record["systemnumber"], record["waybillnumber"], 1)["tracknumber"],
+            "subOrderList": sub_orders,
+            "subOrderCount": record["child_count"],
+            "subOrderNextOffset": next_offset,
+        }
+        if self._lifecycle is not None:
+            status, status_name, items = self._lifecycle.state_at(record["systemnumber"])
+        else:
+            # 轨迹时间取下单时间：同一事件每次查询都相同，像真实承运商一样
+            at = record.get("created_at") or _now_str()
+            status, status_name = "InTransit", "运输中"
+            items = [
+                {"location": "Shenzhen, CN", "trackdate_utc8": at, "trackdate": at, "info": "已揽收", "responsecode": "OT001"},
+                {"location": "Processing Center", "trackdate_utc8": at, "trackdate": at, "info": "运输中", "responsecode": "OT002"},
+            ]
         return {
-            "msg": "success", 
+            "msg": "success",
             "code": 0,
             "data": [
                 {
                     "searchNumber": search_number,
                     "systemnumber": record.get("systemnumber"),
                     "waybillnumber": record.get("waybillnumber"),
-                    "tracknumber": record.get("childs", [{}])[0].get("tracknumber", ""),
-                    "countrycode": "US",
-                    "orderstatus": "InTransit",
-                    "orderstatusName": "运输中",
-                    "trackItems": [
-                        {
-                            "location": "Shenzhen, CN",
-                            "trackdate_utc8": f"{_now_str()}",
-                            "trackdate": f"{_now_str()}",
-                            "info": "已揽收",
-                            "responsecode": "OT001",
-                        },
-                        {
-                            "location": "Processing Center",
-                            "trackdate_utc8": f"{_now_str()}",
-                            "trackdate": f"{_now_str()}",
-                            "info": "运输中",
-                            "responsecode": "OT002",
-                        },
-                    ],
-                    "subOrderList": record.get("childs", []),
+                    "tracknumber": page["tracknumber"],
+                    "countrycode": record.get("countrycode"),
+                    "orderstatus": status,
+                    "orderstatusName": status_name,
+                    "trackItems": items,
+                    "subOrderList": page["subOrderList"],
+                    "subOrderCount": page["subOrderCount"],
+                    "subOrderNextOffset": page["subOrderNextOffset"],
                     "subOrderTrackItems": {},
                 }
             ],
-        }
\ No newline at end of file
+        }
+
+
+# 延迟与故障画像：进程内（FaultInjectingApi）与 HTTP 服务（mock_http_server）共用
+# capacity：服务端同时处理的请求数（0 为不限）；超出后延迟按超载倍数放大，超出部分按比例返回繁忙
+API_PROFILES: dict[str, dict[str, float]] = {
+    "none": {"latency_ms": 0, "jitter_ms": 0, "unavailable_rate": 0.0, "busy_rate": 0.0, "timeout_rate": 0.0, "capacity": 0},
+    "lan": {"latency_ms": 2, "jitter_ms": 1, "unavailable_rate": 0.0, "busy_rate": 0.0, "timeout_rate": 0.0, "capacity": 0},
+    "typical": {"latency_ms": 40, "jitter_ms": 20, "unavailable_rate": 0.002, "busy_rate": 0.005, "timeout_rate": 0.0, "capacity": 0},
+    "degraded": {"latency_ms": 250, "jitter_ms": 150, "unavailable_rate": 0.03, "busy_rate": 0.05, "timeout_rate": 0.01, "capacity": 0},
+    "throttled": {"latency_ms": 20, "jitter_ms": 5, "unavailable_rate": 0.0, "busy_rate": 0.0, "timeout_rate": 0.0, "capacity": 8},
+}
+
+# 触发 timeout 故障时挂起的时长
+FAULT_TIMEOUT_SECONDS = 10.0
+
+BUSY_RESPONSE: Dict[str, Any] = {"code": -1, "msg": "系统繁忙，请稍后重试", "data": []}
+
+
+class MockApiUnavailableError(ConnectionError):
+    """Simulated transport failure (HTTP 503 / connection reset)."""
+
+
+class FaultInjector:
+    """Draw per-call latency and fault decisions from a profile."""
+
+    def __init__(self, profile: str | dict[str, float] = "none", *, seed: int | None = None):
+        if isinstance(profile, str):
+            if profile not in API_PROFILES:
+                raise ValueError(f"unknown api profile: {profile} (choose from {', '.join(API_PROFILES)})")
+            self.name = profile
+            profile = API_PROFILES[profile]
+        else:
+            self.name = "custom"
+        self.profile = {**API_PROFILES["none"], **profile}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.overloaded = 0
+
+    @contextlib.contextmanager
+    def track(self) -> Iterator[int]:
+        """Count one in-flight request for the duration of the block; yields the count including it."""
+
+        with self._lock:
+            self.in_flight += 1
+            n = self.in_flight
+        try:
+            yield n
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def decide(self, in_flight: int = 1) -> tuple[float, str | None]:
+        """Return (latency_seconds, fault) where fault is None, "unavailable", "busy" or "timeout"."""
+
+        p = self.profile
+        with self._lock:
+            latency_ms = max(0.0, p["latency_ms"] + self._rng.uniform(-p["jitter_ms"], p["jitter_ms"]))
+            r = self._rng.random()
+            r_overload = self._rng.random()
+        fault = None
+        if r < p["timeout_rate"]:
+            fault = "timeout"
+        elif r < p["timeout_rate"] + p["unavailable_rate"]:
+            fault = "unavailable"
+        elif r < p["timeout_rate"] + p["unavailable_rate"] + p["busy_rate"]:
+            fault = "busy"
+        capacity = p["capacity"]
+        if capacity and in_flight > capacity:
+            with self._lock:
+                self.overloaded += 1
+            latency_ms *= in_flight / capacity
+            if fault is None and r_overload < (in_flight - capacity) / in_flight:
+                fault = "busy"
+        return latency_ms / 1000.0, fault
+
+
+class FaultInjectingApi:
+    """Wrap an API object so every public method call pays the profile's latency and faults."""
+
+    def __init__(self, api: Any, profile: str | dict[str, float] = "typical", *, seed: int | None = None):
+        self._api = api
+        self.injector = FaultInjector(profile, seed=seed)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._api, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            with self.injector.track() as in_flight:
+                latency, fault = self.injector.decide(in_flight)
+                if latency:
+                    time.sleep(latency)
+                if fault == "timeout":
+                    time.sleep(FAULT_TIMEOUT_SECONDS)
+                    raise TimeoutError(f"{name} timed out")
+                if fault == "unavailable":
+                    raise MockApiUnavailableError(f"{name}: service unavailable")
+                if fault == "busy":
+                    return dict(BUSY_RESPONSE)
+                return attr(*args, **kwargs)
+
+        call.__name__ = name
+        return call
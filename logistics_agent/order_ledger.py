@@ -0,0 +1,245 @@
+import datetime
+import threading
+from typing import Any
+
+import numpy as np
+
+
+DEFAULT_INITIAL_CAPACITY = 1024
+
+# 按天分组时使用的时区偏移（UTC+8）
+_UTC8_OFFSET_SECONDS = 8 * 3600
+
+GROUP_BY = ("channelid", "countrycode", "isRemote", "day")
+METRICS = ("orders", "pieces", "weight_kg", "remote_orders", "insurance_value")
+
+
+class OrderLedger:
+    """Append-only columnar ledger of created orders, one NumPy array per field.
+
+    String fields (channelid, countrycode) are dictionary-encoded to int32
+    codes, so a group-by is a masked ``np.bincount`` over the code column.
+    Columns grow by doubling; readers take ``[:n]`` views, which stay valid
+    after a later append reallocates.
+    """
+
+    def __init__(self, initial_capacity: int = DEFAULT_INITIAL_CAPACITY):
+        capacity = max(1, initial_capacity)
+        self._n = 0
+        self._ts = np.empty(capacity, dtype=np.float64)
+        self._channel = np.empty(capacity, dtype=np.int32)
+        self._country = np.empty(capacity, dtype=np.int32)
+        self._weight = np.empty(capacity, dtype=np.float64)
+        self._number = np.empty(capacity, dtype=np.int32)
+        self._remote = np.empty(capacity, dtype=np.bool_)
+        self._insurance = np.empty(capacity, dtype=np.float64)
+        self._labels: dict[str, list[str]] = {"channelid": [], "countrycode": []}
+        self._codes: dict[str, dict[str, int]] = {"channelid": {}, "countrycode": {}}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _code(self, field: str, value: Any) -> int:
+        label = str(value or "").strip().upper()
+        codes = self._codes[field]
+        code = codes.get(label)
+        if code is None:
+            code = len(self._labels[field])
+            self._labels[field].append(label)
+            codes[label] = code
+        return code
+
+    def _ensure_capacity(self, needed: int) -> None:
+        capacity = len(self._ts)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("_ts", "_channel", "_country", "_weight", "_number", "_remote", "_insurance"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[: self._n] = old[: self._n]
+            setattr(self, name, new)
+
+    def append(
+        self,
+        *,
+        timestamp: float,
+        channelid: str | None,
+        countrycode: str | None,
+        forecastweight: float = 0.0,
+        number: int = 1,
+        is_remote: bool = False,
+        insurance_value: float = 0.0,
+    ) -> None:
+        with self._lock:
+            i = self._n
+            self._ensure_capacity(i + 1)
+            self._ts[i] = timestamp
+            self._channel[i] = self._code("channelid", channelid)
+            self._country[i] = self._code("countrycode", countrycode)
+            self._weight[i] = forecastweight
+            self._number[i] = number
+            self._remote[i] = is_remote
+            self._insurance[i] = insurance_value
+            self._n = i + 1
+
+    def extend(
+        self,
+        *,
+        timestamp: Any,
+        channelid: Any,
+        countrycode: Any,
+        forecastweight: Any,
+        number: Any,
+        is_remote: Any,
+        insurance_value: Any,
+    ) -> None:
+        """Bulk append equal-length columns (used for backfills and benchmarks)."""
+
+        ts = np.asarray(timestamp, dtype=np.float64)
+        k = len(ts)
+        with self._lock:
+            channel = self._encode("channelid", channelid)
+            country = self._encode("countrycode", countrycode)
+            i = self._n
+            self._ensure_capacity(i + k)
+            self._ts[i:i + k] = ts
+            self._channel[i:i + k] = channel
+            self._country[i:i + k] = country
+            self._weight[i:i + k] = np.asarray(forecastweight, dtype=np.float64)
+            self._number[i:i + k] = np.asarray(number, dtype=np.int32)
+            self._remote[i:i + k] = np.asarray(is_remote, dtype=np.bool_)
+            self._insurance[i:i + k] = np.asarray(insurance_value, dtype=np.float64)
+            self._n = i + k
+
+    def _encode(self, field: str, values: Any) -> np.ndarray:
+        arr = np.asarray(values)
+        if arr.dtype.kind != "U":
+            arr = np.array(["" if v is None else str(v) for v in arr.tolist()])
+        uniques, inverse = np.unique(arr, return_inverse=True)
+        mapping = np.array([self._code(field, u) for u in uniques.tolist()], dtype=np.int32)
+        return mapping[inverse]
+
+    def aggregate(
+        self,
+        *,
+        group_by: str | None = None,
+        countrycode: str | None = None,
+        channelid: str | None = None,
+        is_remote: bool | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        sort_by: str = "orders",
+        limit: int | None = None,
+    ) -> dict[str, Any]:
+        """Totals per group (or overall when ``group_by`` is None) for rows matching every filter."""
+
+        if group_by is not None and group_by not in GROUP_BY:
+            raise ValueError(f"unknown group_by: {group_by} (choose from {', '.join(GROUP_BY)})")
+        if sort_by not in METRICS:
+            raise ValueError(f"unknown sort_by: {sort_by} (choose from {', '.join(METRICS)})")
+
+        with self._lock:
+            n = self._n
+            ts, channel, country = self._ts[:n], self._channel[:n], self._country[:n]
+            weight, number, remote, insurance = self._weight[:n], self._number[:n], self._remote[:n], self._insurance[:n]
+            labels = {k: list(v) for k, v in self._labels.items()}
+            codes = {k: dict(v) for k, v in self._codes.items()}
+
+        mask: np.ndarray | None = None
+
+        def narrow(condition: np.ndarray) -> None:
+            nonlocal mask
+            mask = condition if mask is None else mask & condition
+
+        for field, value, column in (("countrycode", countrycode, country), ("channelid", channelid, channel)):
+            if value:
+                code = codes[field].get(str(value).strip().upper())
+                narrow(np.zeros(n, dtype=np.bool_) if code is None else column == code)
+        if is_remote is not None:
+            narrow(remote == bool(is_remote))
+        if since is not None:
+            narrow(ts >= since)
+        if until is not None:
+            narrow(ts < until)
+
+        # 无过滤条件时直接使用整列，省去 7 次布尔索引拷贝
+        def pick(column: np.ndarray) -> np.ndarray:
+            return column if mask is None else column[mask]
+
+        matched = n if mask is None else int(np.count_nonzero(mask))
+        if group_by is None:
+            k = None
+            group_labels: list[Any] = ["all"]
+        elif group_by == "channelid":
+            k, group_labels = pick(channel), labels["channelid"]
+        elif group_by == "countrycode":
+            k, group_labels = pick(country), labels["countrycode"]
+        elif group_by == "isRemote":
+            k, group_labels = pick(remote).astype(np.int64), [False, True]
+        else:
+            # 天数跨度远小于行数：减去最小值后直接 bincount，避免 np.unique 的整列排序
+            days = ((pick(ts) + _UTC8_OFFSET_SECONDS) // 86400).astype(np.int64)
+            first_day = int(days.min()) if len(days) else 0
+            k = days - first_day
+            span = int(k.max()) + 1 if len(k) else 0
+            group_labels = [
+                datetime.datetime.fromtimestamp((first_day + d) * 86400, datetime.timezone.utc).strftime("%Y-%m-%d")
+                for d in range(span)
+            ]
+
+        size = len(group_labels)
+        if group_by is None:
+            # 总计不需要分组键：直接求和
+            totals = {
+                "orders": np.array([matched]),
+                "pieces": np.array([pick(number).sum(dtype=np.int64)]),
+                "weight_kg": np.array([pick(weight).sum()]),
+                "remote_orders": np.array([np.count_nonzero(pick(remote))]),
+                "insurance_value": np.array([pick(insurance).sum()]),
+            }
+        else:
+            k = k.astype(np.intp, copy=False)  # bincount 每次调用都会把非 intp 键转换一遍
+            totals = {
+                "orders": np.bincount(k, minlength=size),
+                "pieces": np.bincount(k, weights=pick(number), minlength=size),
+                "weight_kg": np.bincount(k, weights=pick(weight), minlength=size),
+                "remote_orders": np.bincount(k[pick(remote)], minlength=size),
+                "insurance_value": np.bincount(k, weights=pick(insurance), minlength=size),
+            }
+        present = np.nonzero(totals["orders"])[0]
+        if group_by is None:
+            order = np.zeros(1, dtype=np.int64)  # 总计行始终返回，即使没有匹配
+        elif group_by == "day":
+            order = present  # 按日期升序
+        else:
+            order = present[np.argsort(-totals[sort_by][present], kind="stable")]
+        if limit is not None:
+            order = order[: max(1, int(limit))]
+
+        groups = [
+            {
+                "group": group_labels[g],
+                "orders": int(totals["orders"][g]),
+                "pieces": int(totals["pieces"][g]),
+                "weight_kg": round(float(totals["weight_kg"][g]), 3),
+                "remote_orders": int(totals["remote_orders"][g]),
+                "insurance_value": round(float(totals["insurance_value"][g]), 2),
+            }
+            for g in order
+        ]
+        return {"group_by": group_by, "matched_orders": matched, "groups": groups}
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "rows": self._n,
+            "capacity": len(self._ts),
+            "bytes": sum(
+                a.nbytes
+                for a in (self._ts, self._channel, self._country, self._weight, self._number, self._remote, self._insurance)
+            ),
+            "channels": len(self._labels["channelid"]),
+            "countries": len(self._labels["countrycode"]),
+        }
@@ -0,0 +1,288 @@
+import base64
+import bisect
+import datetime
+import threading
+from array import array
+from typing import Any, Iterator
+
+from .shipment_lifecycle import SystemClock, format_utc8
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+
+INITIAL_STATUS = "Created"
+
+# 时间过滤按 UTC+8 解释（与轨迹时间 trackdate_utc8 一致）
+_UTC8 = datetime.timezone(datetime.timedelta(hours=8))
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def _key(value: Any) -> str | None:
+    if value is None:
+        return None
+    s = " ".join(str(value).strip().lower().split())
+    return s or None
+
+
+def parse_time_bound(value: Any, *, now: float, end: bool = False) -> float | None:
+    """Epoch seconds from a timestamp, ``YYYY-MM-DD[ HH:MM[:SS]]`` (UTC+8), today/yesterday or this week/month.
+
+    A bare date used as an upper bound (``end=True``) means the end of that day
+    (of that week/month for the relative periods).
+    """
+
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().lower()
+    today = datetime.datetime.fromtimestamp(now, _UTC8).replace(hour=0, minute=0, second=0, microsecond=0)
+    if text in ("today", "今天", "今日"):
+        day = today
+    elif text in ("yesterday", "昨天", "昨日"):
+        day = today - datetime.timedelta(days=1)
+    elif text in ("this week", "本周", "这周"):
+        start = today - datetime.timedelta(days=today.weekday())
+        return (start + datetime.timedelta(days=7 if end else 0)).timestamp()
+    elif text in ("this month", "本月", "这个月"):
+        start = today.replace(day=1)
+        if end:
+            start = (start + datetime.timedelta(days=32)).replace(day=1)
+        return start.timestamp()
+    else:
+        for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S"):
+            try:
+                return datetime.datetime.strptime(text, fmt).replace(tzinfo=_UTC8).timestamp()
+            except ValueError:
+                pass
+        try:
+            day = datetime.datetime.strptime(text, "%Y-%m-%d").replace(tzinfo=_UTC8)
+        except ValueError:
+            raise ValueError(
+                f"invalid time: {value} (use YYYY-MM-DD, YYYY-MM-DD HH:MM:SS, today, yesterday, this week or this month)"
+            )
+    if end:
+        day += datetime.timedelta(days=1)
+    return day.timestamp()
+
+
+def encode_cursor(seq: int) -> str:
+    return base64.urlsafe_b64encode(f"o:{seq}".encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        prefix, seq = raw.split(":", 1)
+        if prefix != "o":
+            raise ValueError(prefix)
+        return int(seq)
+    except Exception:
+        raise InvalidCursorError(f"invalid cursor: {cursor}")
+
+
+class OrderRecord:
+    __slots__ = (
+        "seq", "created_at", "order_id", "waybillnumber", "customernumber",
+        "origin_city", "destination_city", "consigneecity", "countrycode", "status",
+    )
+
+    def __init__(self, seq: int, created_at: float, **fields: Any):
+        self.seq = seq
+        self.created_at = created_at
+        for name in self.__slots__[2:]:
+            setattr(self, name, fields.get(name))
+        if self.status is None:
+            self.status = INITIAL_STATUS
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "order_id": self.order_id,
+            "waybillnumber": self.waybillnumber,
+            "customernumber": self.customernumber,
+            "origin_city": self.origin_city,
+            "destination_city": self.destination_city,
+            "consigneecity": self.consigneecity,
+            "countrycode": self.countrycode,
+            "status": self.status,
+            "created_at": format_utc8(self.created_at),
+        }
+
+
+class OrderStore:
+    """Append-only record of orders created through the agent, with indexes maintained on insert.
+
+    Records are numbered in insertion order and ``created_at`` never decreases,
+    so a time range maps to a contiguous ``seq`` range by bisection. Equality
+    filters (city, country, status) each keep a seq-sorted posting list; a
+    query walks the shortest one backwards from the cursor and checks the
+    remaining filters per record. A page therefore visits only records in that
+    posting list (and time range), but when the remaining filters reject most
+    of them it still walks it to the end.
+
+    The status index follows ``update_status``: the agent calls it from status
+    queries and from every tracking-store ingest (carrier pushes and refreshes).
+    """
+
+    def __init__(self, clock: Any | None = None):
+        self.clock = clock or SystemClock()
+        self._records: list[OrderRecord] = []
+        self._created_at = array("d")
+        self._seq_by_number: dict[str, int] = {}
+        # 城市索引同时收录 destination_city（如 洛杉矶）和收件城市（如 Los Angeles）
+        self._by_city: dict[str, list[int]] = {}
+        self._by_country: dict[str, list[int]] = {}
+        self._by_status: dict[str, list[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def add(self, *, order_id: str, created_at: float | None = None, **fields: Any) -> OrderRecord:
+        """Record one order; re-adding a known order_id returns the existing record."""
+
+        with self._lock:
+            seq = self._seq_by_number.get(order_id)
+            if seq is not None:
+                return self._records[seq]
+            seq = len(self._records)
+            at = self.clock.now() if created_at is None else float(created_at)
+            if self._created_at and at < self._created_at[-1]:
+                at = self._created_at[-1]
+            record = OrderRecord(seq, at, order_id=order_id, **fields)
+            self._records.append(record)
+            self._created_at.append(at)
+            for number in (record.order_id, record.waybillnumber, record.customernumber):
+                if number:
+                    self._seq_by_number.setdefault(number, seq)
+            for city in {_key(record.destination_city), _key(record.consigneecity)} - {None}:
+                self._by_city.setdefault(city, []).append(seq)
+            country = _key(record.countrycode)
+            if country:
+                self._by_country.setdefault(country, []).append(seq)
+            self._by_status.setdefault(_key(record.status), []).append(seq)
+            return record
+
+    def get(self, number: str) -> OrderRecord | None:
+        seq = self._seq_by_number.get(number.strip()) if number else None
+        return self._records[seq] if seq is not None else None
+
+    def update_status(self, number: str, status: str) -> bool:
+        """Move an order to ``status``; returns False for unknown orders or no change."""
+
+        new_key = _key(status)
+        if not new_key:
+            return False
+        with self._lock:
+            seq = self._seq_by_number.get(number.strip()) if number else None
+            if seq is None:
+                return False
+            record = self._records[seq]
+            old_key = _key(record.status)
+            if old_key == new_key:
+                return False
+            postings = self._by_status[old_key]
+            i = bisect.bisect_left(postings, seq)
+            if i < len(postings) and postings[i] == seq:
+                del postings[i]
+            bisect.insort(self._by_status.setdefault(new_key, []), seq)
+            record.status = status
+            return True
+
+    def set_waybillnumber(self, number: str, waybillnumber: str) -> None:
+        with self._lock:
+            seq = self._seq_by_number.get(number)
+            if seq is None:
+                return
+            self._records[seq].waybillnumber = waybillnumber
+            self._seq_by_number.setdefault(waybillnumber, seq)
+
+    def _candidates(self, lo: int, hi: int, postings: list[list[int]]) -> Iterator[int]:
+        """Seqs in [lo, hi), newest first, drawn from the shortest posting list (or the range itself)."""
+
+        if not postings:
+            yield from range(hi - 1, lo - 1, -1)
+            return
+        shortest = min(postings, key=len)
+        i = bisect.bisect_left(shortest, hi) - 1
+        while i >= 0:
+            seq = shortest[i]
+            if seq < lo:
+                return
+            yield seq
+            i -= 1
+
+    def query(
+        self,
+        *,
+        destination_city: str | None = None,
+        countrycode: str | None = None,
+        status: str | None = None,
+        created_after: float | None = None,
+        created_before: float | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+    ) -> dict[str, Any]:
+        """One page of matching orders, newest first, plus ``next_cursor`` when more may follow."""
+
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        with self._lock:
+            records = self._records
+            created = self._created_at
+            hi = len(records)
+            lo = 0
+            if created_after is not None:
+                lo = bisect.bisect_left(created, created_after)
+            if created_before is not None:
+                hi = bisect.bisect_left(created, created_before)
+            if cursor:
+                hi = min(hi, decode_cursor(cursor))
+
+            filters: list[tuple[str, str]] = []
+            postings: list[list[int]] = []
+            for attr, value, index in (
+                ("city", destination_city, self._by_city),
+                ("countrycode", countrycode, self._by_country),
+                ("status", status, self._by_status),
+            ):
+                key = _key(value)
+                if key is None:
+                    continue
+                plist = index.get(key)
+                if not plist:
+                    return {"orders": [], "next_cursor": None}
+                filters.append((attr, key))
+                postings.append(plist)
+
+            page: list[OrderRecord] = []
+            more = False
+            for seq in self._candidates(lo, hi, postings):
+                record = records[seq]
+                if not all(self._matches(record, attr, key) for attr, key in filters):
+                    continue
+                if len(page) == limit:
+                    more = True
+                    break
+                page.append(record)
+            orders = [r.to_dict() for r in page]
+        return {"orders": orders, "next_cursor": encode_cursor(page[-1].seq) if more else None}
+
+    @staticmethod
+    def _matches(record: OrderRecord, attr: str, key: str) -> bool:
+        if attr == "city":
+            return key in (_key(record.destination_city), _key(record.consigneecity))
+        if attr == "countrycode":
+            return _key(record.countrycode) == key
+        return _key(record.status) == key
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "orders": len(self._records),
+            "cities": len(self._by_city),
+            "countries": len(self._by_country),
+            "statuses": {k: len(v) for k, v in self._by_status.items()},
+        }
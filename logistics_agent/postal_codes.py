@@ -0,0 +1,320 @@
+"""Local postal-code index: postal code -> (province/state, city), one fixed-width file per country.
+
+Files live in ``data/postal_codes/<COUNTRY>.txt`` (or ``LOGISTICS_POSTAL_CODE_DIR``).
+The first line is a header ``POSTAL1 <country> <code_width> <region_width> <city_width>``;
+every following line is one range record of exactly the same width::
+
+    <start><end><region><city>\\n
+
+Records are sorted by ``start`` and do not overlap, so a lookup bisects the
+memory-mapped file in place: nothing is parsed up front and pages are only
+touched when probed. Countries are opened lazily on their first lookup.
+
+Add a country by writing a CSV of ``start,end,region,city`` rows and running::
+
+    python -m logistics_agent.postal_codes build CA ca_ranges.csv --code-width 3
+
+For numeric codes, ranges may nest (a city range inside a state range); the
+narrowest range wins.
+"""
+
+import argparse
+import csv
+import mmap
+import os
+import re
+import threading
+import time
+from typing import Any, Iterable
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data", "postal_codes")
+HEADER_MAGIC = "POSTAL1"
+DEFAULT_REGION_WIDTH = 2
+DEFAULT_CITY_WIDTH = 30
+
+
+US_STATE_NAMES = {
+    "ALABAMA": "AL", "ALASKA": "AK", "ARIZONA": "AZ", "ARKANSAS": "AR", "CALIFORNIA": "CA", "COLORADO": "CO",
+    "CONNECTICUT": "CT", "DELAWARE": "DE", "DISTRICT OF COLUMBIA": "DC", "FLORIDA": "FL", "GEORGIA": "GA",
+    "HAWAII": "HI", "IDAHO": "ID", "ILLINOIS": "IL", "INDIANA": "IN", "IOWA": "IA", "KANSAS": "KS",
+    "KENTUCKY": "KY", "LOUISIANA": "LA", "MAINE": "ME", "MARYLAND": "MD", "MASSACHUSETTS": "MA",
+    "MICHIGAN": "MI", "MINNESOTA": "MN", "MISSISSIPPI": "MS", "MISSOURI": "MO", "MONTANA": "MT",
+    "NEBRASKA": "NE", "NEVADA": "NV", "NEW HAMPSHIRE": "NH", "NEW JERSEY": "NJ", "NEW MEXICO": "NM",
+    "NEW YORK": "NY", "NORTH CAROLINA": "NC", "NORTH DAKOTA": "ND", "OHIO": "OH", "OKLAHOMA": "OK",
+    "OREGON": "OR", "PENNSYLVANIA": "PA", "RHODE ISLAND": "RI", "SOUTH CAROLINA": "SC", "SOUTH DAKOTA": "SD",
+    "TENNESSEE": "TN", "TEXAS": "TX", "UTAH": "UT", "VERMONT": "VT", "VIRGINIA": "VA", "WASHINGTON": "WA",
+    "WEST VIRGINIA": "WV", "WISCONSIN": "WI", "WYOMING": "WY", "PUERTO RICO": "PR", "GUAM": "GU",
+    "VIRGIN ISLANDS": "VI",
+}
+
+# 各国邮编归一化：返回与数据文件同宽的检索键，无法识别时返回 None
+_NORMALIZERS = {
+    "US": lambda code: (m.group(1) if (m := re.fullmatch(r"(\d{5})(?:-?\d{4})?", code)) else None),
+}
+
+
+def normalize_code(country: str, code: Any, width: int) -> str | None:
+    text = str(code or "").strip().upper()
+    if not text:
+        return None
+    normalizer = _NORMALIZERS.get(country)
+    if normalizer is not None:
+        return normalizer(text)
+    text = text.replace(" ", "").replace("-", "")
+    return text[:width].ljust(width) if text else None
+
+
+def normalize_region(country: str, value: Any) -> str:
+    """``"California"`` / ``"ca"`` -> ``"CA"`` for US states; other countries are upper-cased as is."""
+
+    text = " ".join(str(value or "").strip().upper().split())
+    if country == "US":
+        return US_STATE_NAMES.get(text, text)
+    return text
+
+
+def normalize_city(value: Any) -> str:
+    return " ".join(str(value or "").replace(".", " ").strip().casefold().split())
+
+
+class PostalCodeIndex:
+    """One country's range file, memory-mapped on first use and bisected in place."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mm: mmap.mmap | None = None
+        self._file: Any = None
+        self.country = ""
+        self.code_width = 0
+        self.region_width = 0
+        self.city_width = 0
+        self._base = 0
+        self._record = 0
+        self.records = 0
+        self.lookups = 0
+
+    def _open(self) -> mmap.mmap:
+        mm = self._mm
+        if mm is not None:
+            return mm
+        with self._lock:
+            if self._mm is None:
+                f = open(self.path, "rb")
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                header_end = mm.find(b"\n") + 1
+                magic, country, code_w, region_w, city_w = mm[:header_end].decode("ascii").split()
+                if magic != HEADER_MAGIC:
+                    mm.close()
+                    f.close()
+                    raise ValueError(f"{self.path}: not a postal code file")
+                self.country = country
+                self.code_width, self.region_width, self.city_width = int(code_w), int(region_w), int(city_w)
+                self._base = header_end
+                self._record = 2 * self.code_width + self.region_width + self.city_width + 1
+                self.records = (len(mm) - header_end) // self._record
+                self._file = f
+                self._mm = mm
+            return self._mm
+
+    def lookup(self, code: Any) -> dict[str, str] | None:
+        """``{"postal_code", "province", "city"}`` for the range containing ``code``; city may be empty."""
+
+        mm = self._open()
+        key = normalize_code(self.country, code, self.code_width)
+        if key is None or len(key) != self.code_width:
+            return None
+        probe = key.encode("ascii", "replace")
+        base, rec, cw = self._base, self._record, self.code_width
+        # 找最后一个 start <= key 的记录
+        lo, hi = 0, self.records
+        while lo < hi:
+            mid = (lo + hi) // 2
+            off = base + mid * rec
+            if mm[off:off + cw] <= probe:
+                lo = mid + 1
+            else:
+                hi = mid
+        with self._lock:
+            self.lookups += 1
+        if lo == 0:
+            return None
+        raw = mm[base + (lo - 1) * rec:base + lo * rec - 1]
+        if probe > raw[cw:2 * cw]:
+            return None
+        region = raw[2 * cw:2 * cw + self.region_width].decode("utf-8").strip()
+        city = raw[2 * cw + self.region_width:].decode("utf-8").strip()
+        return {"postal_code": key.strip(), "province": region, "city": city}
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "loaded": self._mm is not None,
+            "records": self.records,
+            "bytes": os.path.getsize(self.path),
+            "lookups": self.lookups,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mm is not None:
+                self._mm.close()
+                self._file.close()
+                self._mm = self._file = None
+
+
+class PostalCodeDirectory:
+    """Per-country indexes under ``data_dir``; a country without a file simply has no coverage."""
+
+    def __init__(self, data_dir: str = DATA_DIR):
+        self.data_dir = data_dir
+        self._indexes: dict[str, PostalCodeIndex | None] = {}
+        self._lock = threading.Lock()
+
+    def index(self, country: str) -> PostalCodeIndex | None:
+        country = str(country or "").strip().upper()
+        if country in self._indexes:
+            return self._indexes[country]
+        with self._lock:
+            if country not in self._indexes:
+                path = os.path.join(self.data_dir, f"{country}.txt")
+                self._indexes[country] = PostalCodeIndex(path) if re.fullmatch(r"[A-Z]{2}", country) and os.path.exists(path) else None
+            return self._indexes[country]
+
+    def lookup(self, country: str, code: Any) -> dict[str, str] | None:
+        index = self.index(country)
+        return index.lookup(code) if index is not None else None
+
+    def check(self, country: str, code: Any, *, city: Any = None, province: Any = None) -> dict[str, Any] | None:
+        """Compare a city/province pair with the code's entry.
+
+        Returns None when the code is not covered, otherwise ``{"place", "fill", "mismatches"}``:
+        ``fill`` holds the values to use for missing fields and ``mismatches`` maps a given field
+        to the expected value when they disagree.
+        """
+
+        place = self.lookup(country, code)
+        if place is None:
+            return None
+        c = str(country).strip().upper()
+        fill: dict[str, str] = {}
+        mismatches: dict[str, str] = {}
+        if place["province"]:
+            if not province:
+                fill["consigneeprovince"] = place["province"]
+            elif normalize_region(c, province) != place["province"]:
+                mismatches["consigneeprovince"] = place["province"]
+        if place["city"]:
+            if not city:
+                fill["consigneecity"] = place["city"]
+            elif normalize_city(city) != normalize_city(place["city"]):
+                mismatches["consigneecity"] = place["city"]
+        return {"place": place, "fill": fill, "mismatches": mismatches}
+
+    def stats(self) -> dict[str, Any]:
+        return {country: idx.stats() for country, idx in sorted(self._indexes.items()) if idx is not None}
+
+
+def _flatten_numeric(rows: list[tuple[str, str, str, str]], width: int) -> list[tuple[str, str, str, str]]:
+    """Resolve nested numeric ranges into disjoint ones; the narrowest covering range wins."""
+
+    spans = [(int(s), int(e), region, city) for s, e, region, city in rows]
+    points = sorted({s for s, _, _, _ in spans} | {e + 1 for _, e, _, _ in spans})
+    out: list[tuple[int, int, str, str]] = []
+    for lo, nxt in zip(points, points[1:]):
+        covering = [r for r in spans if r[0] <= lo and nxt - 1 <= r[1]]
+        if not covering:
+            continue
+        _, _, region, city = min(covering, key=lambda r: r[1] - r[0])
+        if out and out[-1][1] == lo - 1 and out[-1][2:] == (region, city):
+            out[-1] = (out[-1][0], nxt - 1, region, city)
+        else:
+            out.append((lo, nxt - 1, region, city))
+    return [(str(s).zfill(width), str(e).zfill(width), region, city) for s, e, region, city in out]
+
+
+def build(
+    rows: Iterable[tuple[str, str, str, str]],
+    path: str,
+    *,
+    country: str,
+    code_width: int,
+    region_width: int = DEFAULT_REGION_WIDTH,
+    city_width: int = DEFAULT_CITY_WIDTH,
+) -> int:
+    """Write ``(start, end, region, city)`` ranges as a fixed-width index file; returns the record count."""
+
+    country = country.strip().upper()
+    cleaned = []
+    for start, end, region, city in rows:
+        start, end = str(start).strip().upper(), str(end or start).strip().upper()
+        region = normalize_region(country, region)
+        city = " ".join(str(city or "").split())
+        if len(start) != code_width or len(end) != code_width or start > end:
+            raise ValueError(f"bad range {start}-{end} (codes must be {code_width} characters, start <= end)")
+        if len(region.encode("utf-8")) > region_width or len(city.encode("utf-8")) > city_width:
+            raise ValueError(f"region/city too long for {start}-{end}: {region!r} {city!r}")
+        cleaned.append((start, end, region, city))
+    cleaned.sort()
+    if all(s.isdigit() and e.isdigit() for s, e, _, _ in cleaned):
+        cleaned = _flatten_numeric(cleaned, code_width)
+    else:
+        for prev, cur in zip(cleaned, cleaned[1:]):
+            if cur[0] <= prev[1]:
+                raise ValueError(f"overlapping ranges {prev[0]}-{prev[1]} and {cur[0]}-{cur[1]}")
+
+    def pad(text: str, width: int) -> bytes:
+        raw = text.encode("utf-8")
+        return raw + b" " * (width - len(raw))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(f"{HEADER_MAGIC} {country} {code_width} {region_width} {city_width}\n".encode("ascii"))
+        for start, end, region, city in cleaned:
+            f.write(start.encode("ascii") + end.encode("ascii") + pad(region, region_width) + pad(city, city_width) + b"\n")
+    os.replace(tmp, path)
+    return len(cleaned)
+
+
+# 进程级默认实例：agent 在邮编已知时用它补齐收件城市与州
+postal_codes = PostalCodeDirectory(os.environ.get("LOGISTICS_POSTAL_CODE_DIR") or DATA_DIR)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="本地邮编索引：构建与查询")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="从 start,end,region,city 的 CSV 构建 <country>.txt")
+    b.add_argument("country")
+    b.add_argument("csv_path")
+    b.add_argument("--code-width", type=int, required=True)
+    b.add_argument("--region-width", type=int, default=DEFAULT_REGION_WIDTH)
+    b.add_argument("--city-width", type=int, default=DEFAULT_CITY_WIDTH)
+    b.add_argument("--data-dir", default=DATA_DIR)
+    q = sub.add_parser("lookup", help="查询邮编")
+    q.add_argument("country")
+    q.add_argument("codes", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        with open(args.csv_path, newline="", encoding="utf-8") as f:
+            rows = [tuple(r[:4]) for r in csv.reader(f) if r and not r[0].startswith("#")]
+        path = os.path.join(args.data_dir, f"{args.country.upper()}.txt")
+        n = build(
+            rows,
+            path,
+            country=args.country,
+            code_width=args.code_width,
+            region_width=args.region_width,
+            city_width=args.city_width,
+        )
+        print(f"{n} ranges -> {path}")
+        return
+    for code in args.codes:
+        t0 = time.perf_counter()
+        place = postal_codes.lookup(args.country, code)
+        print(code, place, f"{(time.perf_counter() - t0) * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Opt-in per-call profiling for agent tools (cProfile + tracemalloc).
+
+Environment variables (read once at import):
+
+    LOGISTICS_PROFILE_TOOLS   comma separated tool names, or "*" for all tools
+    LOGISTICS_PROFILE_SAMPLE  fraction of matching calls to profile (default 1.0)
+    LOGISTICS_PROFILE_DIR     output directory (default ./profiles)
+
+At runtime use ``enable(...)`` / ``disable()``. While disabled a wrapped tool
+costs one attribute check per call.
+"""
+
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+from collections import deque
+from typing import Any, Callable, Iterable
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PROFILE_DIR = "profiles"
+DEFAULT_TOP_N = 15
+DEFAULT_MAX_RECENT = 20
+DEFAULT_SAMPLE_RATE = 1.0
+SAMPLE_RATE_ENV = "LOGISTICS_PROFILE_SAMPLE"
+
+
+def _parse_tools(value: str | Iterable[str] | None) -> frozenset[str] | None:
+    """None means every tool."""
+
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    names = frozenset(v.strip() for v in value if v and v.strip())
+    return None if "*" in names else names
+
+
+def sample_rate_from_env() -> float:
+    """``LOGISTICS_PROFILE_SAMPLE``; the default when unset, not a number or outside [0, 1]."""
+
+    raw = os.environ.get(SAMPLE_RATE_ENV)
+    if not raw:
+        return DEFAULT_SAMPLE_RATE
+    try:
+        rate = float(raw)
+    except ValueError:
+        rate = None
+    if rate is None or not 0.0 <= rate <= 1.0:
+        logger.warning("%s=%r is not a number between 0 and 1; using %s", SAMPLE_RATE_ENV, raw, DEFAULT_SAMPLE_RATE)
+        return DEFAULT_SAMPLE_RATE
+    return rate
+
+
+class ToolProfiler:
+    def __init__(
+        self,
+        *,
+        tools: str | Iterable[str] | None = None,
+        sample_rate: float = 1.0,
+        output_dir: str = DEFAULT_PROFILE_DIR,
+        top_n: int = DEFAULT_TOP_N,
+        max_recent: int = DEFAULT_MAX_RECENT,
+        enabled: bool = False,
+    ):
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.tools: frozenset[str] | None = None
+        self.sample_rate = 1.0
+        self.active = False
+        self._recent: deque[dict[str, Any]] = deque(maxlen=max_recent)
+        self._busy = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._seq = 0
+        self._skipped_busy = 0
+        if enabled:
+            self.enable(tools=tools, sample_rate=sample_rate)
+
+    @classmethod
+    def from_env(cls) -> "ToolProfiler":
+        tools = os.environ.get("LOGISTICS_PROFILE_TOOLS", "").strip()
+        return cls(
+            tools=tools or None,
+            sample_rate=sample_rate_from_env(),
+            output_dir=os.environ.get("LOGISTICS_PROFILE_DIR") or DEFAULT_PROFILE_DIR,
+            enabled=bool(tools),
+        )
+
+    def enable(
+        self,
+        *,
+        tools: str | Iterable[str] | None = None,
+        sample_rate: float = 1.0,
+        output_dir: str | None = None,
+    ) -> None:
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.tools = _parse_tools(tools)
+        self.sample_rate = sample_rate
+        if output_dir:
+            self.output_dir = output_dir
+        self.active = True
+
+    def disable(self) -> None:
+        self.active = False
+
+    def should_profile(self, tool_name: str) -> bool:
+        if self.tools is not None and tool_name not in self.tools:
+            return False
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def wrap(self, func: Callable) -> Callable:
+        """Wrap a tool function; name, docstring and signature are preserved for tool registration."""
+
+        tool_name = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.active or not self.should_profile(tool_name):
+                return func(*args, **kwargs)
+            return self._profile_call(tool_name, func, args, kwargs)
+
+        wrapper.__profiled__ = True
+        return wrapper
+
+    def wrap_tools(self, tools: Iterable[Callable]) -> list[Callable]:
+        return [self.wrap(t) for t in tools]
+
+    def recent(self) -> list[dict[str, Any]]:
+        return list(self._recent)
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "enabled": self.active,
+            "tools": "*" if self.tools is None else sorted(self.tools),
+            "sample_rate": self.sample_rate,
+            "output_dir": self.output_dir,
+            "profiled_calls": self._seq,
+            "skipped_busy": self._skipped_busy,
+            "recent": self.recent(),
+        }
+
+    def _profile_call(self, tool_name: str, func: Callable, args: tuple, kwargs: dict) -> Any:
+        # cProfile can only be active once per process on 3.12+; concurrent calls run unprofiled.
+        if not self._busy.acquire(blocking=False):
+            with self._stats_lock:
+                self._skipped_busy += 1
+            return func(*args, **kwargs)
+        try:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+            profile = cProfile.Profile()
+            started_at = time.time()
+            t0 = time.perf_counter()
+            error: str | None = None
+            try:
+                return profile.runcall(func, *args, **kwargs)
+            except Exception as e:
+                error = repr(e)
+                raise
+            finally:
+                seconds = time.perf_counter() - t0
+                _, peak = tracemalloc.get_traced_memory()
+                after = tracemalloc.take_snapshot()
+                if started_tracing:
+                    tracemalloc.stop()
+                try:
+                    self._write_report(tool_name, profile, before, after, started_at, seconds, peak, error)
+                except Exception:
+                    logger.warning("failed to write profile for %s", tool_name, exc_info=True)
+        finally:
+            self._busy.release()
+
+    def _write_report(
+        self,
+        tool_name: str,
+        profile: cProfile.Profile,
+        before: tracemalloc.Snapshot,
+        after: tracemalloc.Snapshot,
+        started_at: float,
+        seconds: float,
+        peak: int,
+        error: str | None,
+    ) -> None:
+        self._seq += 1
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(started_at))
+        base = os.path.join(self.output_dir, f"{stamp}-{re.sub(r'[^A-Za-z0-9_]', '_', tool_name)}-{self._seq:05d}")
+        profile.dump_stats(f"{base}.prof")
+
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+        diffs = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+        top_allocations = [
+            {"where": str(d.traceback[0]), "size_diff_kb": round(d.size_diff / 1024, 1), "count_diff": d.count_diff}
+            for d in diffs[: self.top_n]
+        ]
+
+        stats_text = io.StringIO()
+        pstats.Stats(profile, stream=stats_text).sort_stats("cumulative").print_stats(self.top_n)
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            f.write(f"tool={tool_name} seconds={seconds:.6f} peak_kb={peak / 1024:.1f} error={error}\n\n")
+            f.write(f"== allocations (top {self.top_n}, by size diff) ==\n")
+            for a in top_allocations:
+                f.write(f"{a['size_diff_kb']:>10.1f} KiB {a['count_diff']:>+8d}  {a['where']}\n")
+            f.write(f"\n== cProfile (top {self.top_n}, cumulative) ==\n")
+            f.write(stats_text.getvalue())
+
+        self._recent.append(
+            {
+                "tool": tool_name,
+                "started_at": started_at,
+                "seconds": round(seconds, 6),
+                "peak_kb": round(peak / 1024, 1),
+                "error": error,
+                "profile_path": f"{base}.prof",
+                "report_path": f"{base}.txt",
+                "top_allocations": top_allocations[:3],
+            }
+        )
+
+
+# 进程级默认实例：agent 在注册工具时用它包装
+profiler = ToolProfiler.from_env()
+
+
+def enable(
+    tools: str | Iterable[str] | None = None,
+    *,
+    sample_rate: float = 1.0,
+    output_dir: str | None = None,
+) -> None:
+    profiler.enable(tools=tools, sample_rate=sample_rate, output_dir=output_dir)
+
+
+def disable() -> None:
+    profiler.disable()
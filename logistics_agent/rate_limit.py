@@ -0,0 +1,346 @@
+"""Client-side shaping for outbound API calls: token buckets plus an AIMD concurrency limit.
+
+Each API method (endpoint) gets its own limiter; tenants each wrap their own
+client, so limits are per endpoint and per tenant.
+
+Environment variables (read when the API client is built):
+
+    LOGISTICS_API_RATE_LIMITS      requests/second per endpoint, e.g. "*=50,create_forecast_order=20"
+    LOGISTICS_API_MAX_CONCURRENCY  upper bound for the adaptive in-flight limit per endpoint
+
+Setting either one enables the limiter.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_INITIAL_CONCURRENCY = 4
+DEFAULT_MAX_CONCURRENCY = 64
+DEFAULT_BACKOFF_RATIO = 0.7
+DEFAULT_LATENCY_TOLERANCE = 2.0
+# 亚毫秒级调用（进程内 mock、缓存命中）的抖动不算拥塞
+LATENCY_FLOOR_SECONDS = 0.001
+DEFAULT_WAIT_SAMPLES = 1024
+
+
+class RateLimitTimeout(TimeoutError):
+    """Raised when a call cannot be admitted within its queueing deadline."""
+
+
+def is_overload_response(result: Any) -> bool:
+    """Backend throttling shows up as ``code: -1`` in the response envelope."""
+
+    return isinstance(result, dict) and str(result.get("code")) == "-1"
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    status = getattr(exc, "status", None)
+    if status is not None:
+        return status in (429, 502, 503, 504)
+    return isinstance(exc, (ConnectionError, TimeoutError))
+
+
+class TokenBucket:
+    """Tokens refill at ``rate`` per second up to ``burst``; callers reserve and sleep off any deficit.
+
+    Reservations are taken in arrival order, so waiting callers are served FIFO.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float | None = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1.0, *, max_wait: float | None = None) -> float:
+        """Take ``tokens`` now and return how long the caller must wait before using them."""
+
+        with self._lock:
+            self._refill(self._clock())
+            wait = max(0.0, (tokens - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                raise RateLimitTimeout(f"rate limit wait {wait:.3f}s exceeds {max_wait:.3f}s")
+            self._tokens -= tokens
+            return wait
+
+    def acquire(self, tokens: float = 1.0, *, max_wait: float | None = None) -> float:
+        wait = self.reserve(tokens, max_wait=max_wait)
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+
+class AimdLimiter:
+    """Adaptive in-flight limit: additive increase on healthy calls, multiplicative decrease on overload.
+
+    A call counts as overloaded when the backend throttles it (``code: -1``,
+    429/503, timeouts) or when smoothed latency exceeds ``latency_tolerance``
+    times the best latency seen recently. Decreases happen at most once per
+    smoothed round trip so one burst of failures does not collapse the limit.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial_limit: int = DEFAULT_INITIAL_CONCURRENCY,
+        min_limit: int = 1,
+        max_limit: int = DEFAULT_MAX_CONCURRENCY,
+        backoff_ratio: float = DEFAULT_BACKOFF_RATIO,
+        latency_tolerance: float = DEFAULT_LATENCY_TOLERANCE,
+        smoothing: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError("require 1 <= min_limit <= max_limit")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self._clock = clock
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self._smoothed: float | None = None
+        self._baseline: float | None = None
+        self._last_decrease = float("-inf")
+        self.decreases = 0
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    def acquire(self, *, max_wait: float | None = None) -> float:
+        started = self._clock()
+        deadline = None if max_wait is None else started + max_wait
+        with self._cond:
+            while self.in_flight >= self.limit:
+                remaining = None if deadline is None else deadline - self._clock()
+                if remaining is not None and remaining <= 0:
+                    raise RateLimitTimeout(f"concurrency limit {self.limit} still full after {max_wait:.3f}s")
+                self._cond.wait(remaining)
+            self.in_flight += 1
+        return self._clock() - started
+
+    def release(self, latency: float, *, overloaded: bool = False) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            a = self.smoothing
+            self._smoothed = latency if self._smoothed is None else (1 - a) * self._smoothed + a * latency
+            # 基线取近期最小延迟，并缓慢上浮，以适应后端整体变慢
+            self._baseline = latency if self._baseline is None else min(self._baseline * 1.01, latency)
+            congested = self._smoothed > max(self._baseline, LATENCY_FLOOR_SECONDS) * self.latency_tolerance
+            now = self._clock()
+            if overloaded or congested:
+                if now - self._last_decrease >= self._smoothed:
+                    self._limit = max(float(self.min_limit), self._limit * self.backoff_ratio)
+                    self._last_decrease = now
+                    self.decreases += 1
+            elif self.in_flight + 1 >= self._limit / 2:
+                # 只有真正用到一半以上的额度时才增长，空闲时不虚涨
+                self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+            self._cond.notify_all()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "smoothed_latency_ms": round(self._smoothed * 1000, 2) if self._smoothed is not None else None,
+            "baseline_latency_ms": round(self._baseline * 1000, 2) if self._baseline is not None else None,
+            "decreases": self.decreases,
+        }
+
+
+class EndpointLimiter:
+    """Token bucket (optional) + AIMD limit (optional) + queueing-delay metrics for one endpoint."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        rate: float | None = None,
+        burst: float | None = None,
+        max_concurrency: int | None = None,
+        initial_concurrency: int = DEFAULT_INITIAL_CONCURRENCY,
+        max_wait: float | None = None,
+    ):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.concurrency = (
+            AimdLimiter(initial_limit=min(initial_concurrency, max_concurrency), max_limit=max_concurrency)
+            if max_concurrency
+            else None
+        )
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._waits: deque[float] = deque(maxlen=DEFAULT_WAIT_SAMPLES)
+        self.calls = 0
+        self.rejected = 0
+        self.overload_signals = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        started = time.perf_counter()
+        try:
+            if self.bucket is not None:
+                self.bucket.acquire(max_wait=self.max_wait)
+            if self.concurrency is not None:
+                remaining = None if self.max_wait is None else max(0.0, self.max_wait - (time.perf_counter() - started))
+                self.concurrency.acquire(max_wait=remaining)
+        except RateLimitTimeout:
+            with self._lock:
+                self.rejected += 1
+            raise
+        waited = time.perf_counter() - started
+        with self._lock:
+            self.calls += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            self._waits.append(waited)
+
+        t0 = time.perf_counter()
+        overloaded = False
+        try:
+            result = fn(*args, **kwargs)
+            overloaded = is_overload_response(result)
+            return result
+        except BaseException as e:
+            overloaded = is_overload_error(e)
+            raise
+        finally:
+            if overloaded:
+                with self._lock:
+                    self.overload_signals += 1
+            if self.concurrency is not None:
+                self.concurrency.release(time.perf_counter() - t0, overloaded=overloaded)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+            calls = self.calls
+            out: dict[str, Any] = {
+                "calls": calls,
+                "rejected": self.rejected,
+                "overload_signals": self.overload_signals,
+                "queue_wait_ms": {
+                    "mean": round(self.wait_total / calls * 1000, 3) if calls else 0.0,
+                    "p50": round(waits[len(waits) // 2] * 1000, 3) if waits else 0.0,
+                    "p99": round(waits[min(len(waits) - 1, int(len(waits) * 0.99))] * 1000, 3) if waits else 0.0,
+                    "max": round(self.wait_max * 1000, 3),
+                },
+            }
+        if self.bucket is not None:
+            out["rate_per_s"] = self.bucket.rate
+            out["burst"] = self.bucket.burst
+        if self.concurrency is not None:
+            out["concurrency"] = self.concurrency.stats()
+        return out
+
+
+class RateLimitedApi:
+    """Wrap an API client; every public method call goes through its endpoint's limiter."""
+
+    def __init__(
+        self,
+        api: Any,
+        *,
+        rates: dict[str, float] | None = None,
+        max_concurrency: int | None = None,
+        initial_concurrency: int = DEFAULT_INITIAL_CONCURRENCY,
+        max_wait: float | None = None,
+    ):
+        self._api = api
+        self._rates = dict(rates or {})
+        self._max_concurrency = max_concurrency
+        self._initial_concurrency = initial_concurrency
+        self._max_wait = max_wait
+        self._limiters: dict[str, EndpointLimiter] = {}
+        self._limiters_lock = threading.Lock()
+
+    def limiter(self, endpoint: str) -> EndpointLimiter:
+        limiter = self._limiters.get(endpoint)
+        if limiter is None:
+            with self._limiters_lock:
+                limiter = self._limiters.get(endpoint)
+                if limiter is None:
+                    limiter = EndpointLimiter(
+                        endpoint,
+                        rate=self._rates.get(endpoint, self._rates.get("*")),
+                        max_concurrency=self._max_concurrency,
+                        initial_concurrency=self._initial_concurrency,
+                        max_wait=self._max_wait,
+                    )
+                    self._limiters[endpoint] = limiter
+        return limiter
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._api, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        limiter = self.limiter(name)
+
+        def call(*args, **kwargs):
+            return limiter.call(attr, *args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+    def limiter_stats(self) -> dict[str, Any]:
+        with self._limiters_lock:
+            limiters = dict(self._limiters)
+        return {name: lim.stats() for name, lim in sorted(limiters.items())}
+
+
+def parse_rates(value: str | None) -> dict[str, float]:
+    """``"*=50,create_forecast_order=20"`` -> {"*": 50.0, "create_forecast_order": 20.0}"""
+
+    rates: dict[str, float] = {}
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, rate = part.partition("=")
+        if not sep:
+            name, rate = "*", name
+        try:
+            rates[name.strip() or "*"] = float(rate)
+        except ValueError:
+            raise ValueError(f"invalid rate limit entry: {part!r} (expected endpoint=requests_per_second)")
+    return rates
+
+
+def wrap_from_env(api: Any) -> Any:
+    rates = parse_rates(os.environ.get("LOGISTICS_API_RATE_LIMITS"))
+    max_concurrency = int(os.environ.get("LOGISTICS_API_MAX_CONCURRENCY", 0) or 0)
+    if not rates and not max_concurrency:
+        return api
+    return RateLimitedApi(api, rates=rates, max_concurrency=max_concurrency or None)
+
+
+def limiter_stats(api: Any) -> dict[str, Any] | None:
+    return api.limiter_stats() if isinstance(api, RateLimitedApi) else None
@@ -0,0 +1,285 @@
+"""Shipping rate quotes for every channel at once, from a local rate card.
+
+The rate card (``data/rate_cards.json`` or ``LOGISTICS_RATE_CARDS``) maps
+destination countries to zones, lists remote-area postal-code prefixes per
+country and, per channel, its weight breaks with a CNY/kg rate per zone and
+break, minimum charge, rounding increment, volumetric divisor, fuel surcharge,
+remote-area fee and transit days. A zone a channel does not serve is ``null``.
+
+On load the card becomes padded NumPy arrays (channels × zones × breaks), so a
+quote for N shipments is a handful of ``[N, channels]`` array operations:
+
+    chargeable = ceil(max(weight, volume / divisor) / increment) * increment
+    base       = max(min_charge[zone], rate[zone, break(chargeable)] * chargeable)
+    total      = base * (1 + fuel) + remote_fee          (remote: max(min, per_kg * chargeable))
+
+Remote areas are the same signal the mock uses for ``isRemote`` on forecast
+orders, so a quote and the order it leads to agree.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Iterable
+
+import numpy as np
+
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "data", "rate_cards.json")
+DEFAULT_ZONE_KEY = "*"
+SORT_KEYS = ("price", "transit")
+# 运价表未写 volumetric_divisor 的渠道、以及不在运价表里的渠道使用的体积重除数
+DEFAULT_VOLUMETRIC_DIVISOR = float(os.environ.get("LOGISTICS_VOLUMETRIC_DIVISOR") or 5000)
+
+
+def _postal_key(code: Any) -> str:
+    return str(code or "").replace(" ", "").replace("-", "").upper()
+
+
+def _transit_days(lo: float, hi: float) -> list[int] | None:
+    return [int(lo), int(hi)] if np.isfinite(lo) and np.isfinite(hi) else None
+
+
+def _slowest(quote: dict[str, Any]) -> float:
+    return quote["transit_days"][1] if quote["transit_days"] else float("inf")
+
+
+class RateCard:
+    """A rate card compiled to arrays; loaded lazily from ``path`` or built from a ``card`` dict."""
+
+    def __init__(self, path: str | None = DEFAULT_PATH, *, card: dict[str, Any] | None = None):
+        self.path = path
+        self._card = card
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            card = self._card
+            if card is None:
+                with open(self.path, encoding="utf-8") as f:
+                    card = json.load(f)
+            self._compile(card)
+            self._loaded = True
+
+    def _compile(self, card: dict[str, Any]) -> None:
+        self.currency = card.get("currency", "CNY")
+        zones = {k.upper(): int(v) for k, v in card["zones"].items()}
+        self.zone_count = max(zones.values())
+        self._default_zone = zones.pop(DEFAULT_ZONE_KEY, None)
+        self._zones = zones
+        self._remote_areas = {
+            country.upper(): [(_postal_key(lo), _postal_key(hi)) for lo, hi in ranges]
+            for country, ranges in (card.get("remote_areas") or {}).items()
+        }
+
+        channels = card["channels"]
+        c, z = len(channels), self.zone_count
+        b = max(len(ch["weight_breaks"]) for ch in channels)
+        self.channel_ids = [ch["channelid"] for ch in channels]
+        self.channel_names = [ch.get("name", ch["channelid"]) for ch in channels]
+        # 断点按通道右侧补 inf，费率补 nan：所有通道共用一组 [C, Z, B] 数组
+        self._breaks = np.full((c, b), np.inf)
+        self._rates = np.full((c, z, b), np.nan)
+        self._min_charge = np.full((c, z), np.nan)
+        self._transit = np.full((c, z, 2), np.nan)
+        self._increment = np.empty(c)
+        self._divisor = np.empty(c)
+        self._fuel = np.empty(c)
+        self._max_weight = np.empty(c)
+        self._remote_per_kg = np.full(c, np.nan)
+        self._remote_min = np.full(c, np.nan)
+        self._countries: list[frozenset[str] | None] = []
+        for i, ch in enumerate(channels):
+            breaks = ch["weight_breaks"]
+            self._breaks[i, : len(breaks)] = breaks
+            for zone in range(z):
+                rates = ch["rates"][zone] if zone < len(ch["rates"]) else None
+                if rates is None:
+                    continue
+                if len(rates) != len(breaks):
+                    raise ValueError(f"{ch['channelid']}: zone {zone + 1} needs one rate per weight break")
+                self._rates[i, zone, : len(rates)] = rates
+                self._min_charge[i, zone] = ch["min_charge"][zone] or 0.0
+                transit = ch.get("transit_days", [None] * z)[zone]
+                if transit is not None:
+                    self._transit[i, zone] = transit
+            self._increment[i] = ch.get("increment", 0.5)
+            self._divisor[i] = ch.get("volumetric_divisor", DEFAULT_VOLUMETRIC_DIVISOR)
+            self._fuel[i] = ch.get("fuel_surcharge", 0.0)
+            self._max_weight[i] = ch.get("max_weight", breaks[-1])
+            remote = ch.get("remote_fee")
+            if remote is not None:
+                self._remote_per_kg[i] = remote.get("per_kg", 0.0)
+                self._remote_min[i] = remote.get("min", 0.0)
+            countries = ch.get("countries")
+            self._countries.append(frozenset(x.upper() for x in countries) if countries else None)
+
+    def zone_of(self, country: str) -> int | None:
+        """1-based zone of a destination country, or None when the card has no zone for it."""
+
+        self._ensure_loaded()
+        return self._zones.get(str(country or "").strip().upper(), self._default_zone)
+
+    def volumetric_divisor(self, channelid: str) -> float:
+        """Dimensional-weight divisor (cm³ per kg) of a channel; the default for channels not on the card."""
+
+        self._ensure_loaded()
+        try:
+            return float(self._divisor[self.channel_ids.index(channelid)])
+        except ValueError:
+            return DEFAULT_VOLUMETRIC_DIVISOR
+
+    def is_remote(self, country: str, postal_code: Any) -> bool:
+        self._ensure_loaded()
+        key = _postal_key(postal_code)
+        if not key:
+            return False
+        for lo, hi in self._remote_areas.get(str(country or "").strip().upper(), ()):
+            if lo <= key[: len(lo)] and key[: len(hi)] <= hi:
+                return True
+        return False
+
+    def _country_mask(self, countries: np.ndarray) -> np.ndarray:
+        """[N, C] channel-serves-country mask; one Python step per distinct country, not per channel."""
+
+        uniques, inverse = np.unique(countries, return_inverse=True)
+        per_country = np.array(
+            [[allowed is None or u in allowed for allowed in self._countries] for u in uniques.tolist()],
+            dtype=np.bool_,
+        ).reshape(len(uniques), len(self._countries))
+        return per_country[inverse]
+
+    def quote_batch(
+        self,
+        countries: Iterable[str],
+        weights: Any,
+        *,
+        volumes_cm3: Any = None,
+        postal_codes: Iterable[Any] | None = None,
+        remote: Any = None,
+    ) -> dict[str, Any]:
+        """Quote N shipments against every channel; every array in the result is ``[N, C]``.
+
+        ``remote`` (bool per shipment) overrides the postal-code lookup. Unavailable
+        combinations (zone not served, over the weight limit, no remote delivery) have
+        ``available`` False and a NaN ``total``.
+        """
+
+        self._ensure_loaded()
+        country = np.array([str(x or "").strip().upper() for x in countries])
+        n = len(country)
+        weight = np.asarray(weights, dtype=np.float64).reshape(n)
+        volume = np.zeros(n) if volumes_cm3 is None else np.asarray(volumes_cm3, dtype=np.float64).reshape(n)
+        if remote is None:
+            codes = [None] * n if postal_codes is None else list(postal_codes)
+            remote = [self.is_remote(k, p) for k, p in zip(country.tolist(), codes)]
+        remote = np.asarray(remote, dtype=np.bool_).reshape(n)
+        zone = np.array([self._zones.get(k, self._default_zone) or 0 for k in country.tolist()], dtype=np.int64)
+        has_zone = zone > 0
+        zi = np.where(has_zone, zone - 1, 0)
+
+        chargeable = np.maximum(weight[:, None], volume[:, None] / self._divisor[None, :])
+        chargeable = np.ceil(np.round(chargeable / self._increment, 9)) * self._increment
+        # 所在重量段：小于计费重的断点个数
+        bracket = (chargeable[:, :, None] > self._breaks[None, :, :]).sum(axis=2)
+        over = bracket >= self._breaks.shape[1]
+        bracket = np.minimum(bracket, self._breaks.shape[1] - 1)
+        channel = np.arange(len(self.channel_ids))[None, :]
+        rate = self._rates[channel, zi[:, None], bracket]
+        min_charge = self._min_charge[channel, zi[:, None]]
+
+        base = np.maximum(min_charge, rate * chargeable)
+        fuel = base * self._fuel[None, :]
+        remote_fee = np.where(
+            remote[:, None],
+            np.maximum(self._remote_min[None, :], self._remote_per_kg[None, :] * chargeable),
+            0.0,
+        )
+        total = base + fuel + remote_fee
+        available = (
+            has_zone[:, None]
+            & ~over
+            & (chargeable <= self._max_weight[None, :])
+            & np.isfinite(total)
+            & self._country_mask(country)
+        )
+        total = np.where(available, np.round(total, 2), np.nan)
+        transit = self._transit[channel, zi[:, None]]
+        return {
+            "channel_ids": self.channel_ids,
+            "zone": np.where(has_zone, zone, 0),
+            "remote": remote,
+            "chargeable_weight": chargeable,
+            "base": np.round(base, 2),
+            "fuel": np.round(fuel, 2),
+            "remote_fee": np.round(remote_fee, 2),
+            "total": total,
+            "available": available,
+            "transit_min": transit[..., 0],
+            "transit_max": transit[..., 1],
+        }
+
+    def quote(
+        self,
+        country: str,
+        weight: float,
+        *,
+        volume_cm3: float = 0.0,
+        postal_code: Any = None,
+        sort_by: str = "price",
+        limit: int | None = None,
+    ) -> dict[str, Any]:
+        """Quote one shipment: available channels sorted by price (or transit), plus the cheapest and fastest."""
+
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"unknown sort_by: {sort_by} (choose from {', '.join(SORT_KEYS)})")
+        if weight <= 0 and volume_cm3 <= 0:
+            raise ValueError("weight or dimensions are required")
+        q = self.quote_batch([country], [weight], volumes_cm3=[volume_cm3], postal_codes=[postal_code])
+        quotes = [
+            {
+                "channelid": cid,
+                "name": self.channel_names[i],
+                "chargeable_weight": round(float(q["chargeable_weight"][0, i]), 3),
+                "base": float(q["base"][0, i]),
+                "fuel_surcharge": float(q["fuel"][0, i]),
+                "remote_fee": float(q["remote_fee"][0, i]),
+                "total": float(q["total"][0, i]),
+                "currency": self.currency,
+                "transit_days": _transit_days(q["transit_min"][0, i], q["transit_max"][0, i]),
+            }
+            for i, cid in enumerate(self.channel_ids)
+            if q["available"][0, i]
+        ]
+        by_price = sorted(quotes, key=lambda x: (x["total"], _slowest(x)))
+        by_transit = sorted(quotes, key=lambda x: (_slowest(x), x["total"]))
+        ranked = by_price if sort_by == "price" else by_transit
+        return {
+            "countrycode": str(country).strip().upper(),
+            "zone": int(q["zone"][0]) or None,
+            "remote": bool(q["remote"][0]),
+            "quotes": ranked[:limit] if limit else ranked,
+            "cheapest": by_price[0]["channelid"] if by_price else None,
+            "fastest": by_transit[0]["channelid"] if by_transit else None,
+            "unavailable": [cid for i, cid in enumerate(self.channel_ids) if not q["available"][0, i]],
+        }
+
+    def stats(self) -> dict[str, Any]:
+        if not self._loaded:
+            return {"path": self.path, "loaded": False}
+        return {
+            "path": self.path,
+            "loaded": True,
+            "channels": len(self.channel_ids),
+            "zones": self.zone_count,
+            "weight_breaks": int(self._breaks.shape[1]),
+            "remote_area_countries": sorted(self._remote_areas),
+        }
+
+
+rate_card = RateCard(os.environ.get("LOGISTICS_RATE_CARDS") or DEFAULT_PATH)
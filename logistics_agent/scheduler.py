@@ -0,0 +1,232 @@
+"""Priority admission for backend calls: interactive lookups run before bulk work.
+
+Calls are admitted through one process-wide pool of slots. Queued interactive
+calls are always granted first; bulk calls (spreadsheet imports, background
+tracking/waybill polling) may hold at most ``bulk_max_concurrency`` slots, so
+some capacity is always left for a customer's query. Bulk-submit workers are
+separate processes and cannot queue behind this process's interactive calls;
+each gets an equal share of the bulk slots as its own limit instead (see
+bulk_submit). A bulk call
+that waits longer than ``bulk_queue_deadline`` is shed with ``LoadShedError``
+instead of piling up behind the backlog.
+
+The priority class is taken from the calling context (``with priority(BULK):``)
+and is inherited by work submitted through ``tracing.propagate``.
+
+Environment variables (read at import):
+
+    LOGISTICS_SCHEDULER_MAX_CONCURRENCY   total in-flight backend calls; 0/unset disables the scheduler
+    LOGISTICS_SCHEDULER_BULK_CONCURRENCY  slots bulk work may use (default: three quarters of the total)
+    LOGISTICS_SCHEDULER_BULK_DEADLINE     seconds a bulk call may queue before it is shed (default 5)
+"""
+
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Iterator
+
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+
+DEFAULT_BULK_QUEUE_DEADLINE = 5.0
+DEFAULT_WAIT_SAMPLES = 1024
+
+
+_current_priority: contextvars.ContextVar[str] = contextvars.ContextVar("logistics_priority", default=INTERACTIVE)
+
+
+class LoadShedError(RuntimeError):
+    """Raised when queued bulk work is dropped because it waited past its deadline."""
+
+
+def current_priority() -> str:
+    return _current_priority.get()
+
+
+@contextlib.contextmanager
+def priority(name: str) -> Iterator[None]:
+    """Run the block (and work propagated from it) under priority class ``name``."""
+
+    if name not in PRIORITIES:
+        raise ValueError(f"unknown priority: {name} (choose from {', '.join(PRIORITIES)})")
+    reset = _current_priority.set(name)
+    try:
+        yield
+    finally:
+        _current_priority.reset(reset)
+
+
+class _Waiter:
+    __slots__ = ("priority", "enqueued_at", "granted")
+
+    def __init__(self, priority: str, enqueued_at: float):
+        self.priority = priority
+        self.enqueued_at = enqueued_at
+        self.granted = False
+
+
+class PriorityScheduler:
+    def __init__(
+        self,
+        max_concurrency: int = 0,
+        *,
+        bulk_max_concurrency: int | None = None,
+        bulk_queue_deadline: float | None = DEFAULT_BULK_QUEUE_DEADLINE,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_concurrency < 0:
+            raise ValueError("max_concurrency must be >= 0")
+        self.max_concurrency = max_concurrency
+        if bulk_max_concurrency is None:
+            # 默认给交互调用预留四分之一（至少一个）槽位
+            bulk_max_concurrency = max(1, max_concurrency - max(1, max_concurrency // 4))
+        self.bulk_max_concurrency = max(1, min(bulk_max_concurrency, max_concurrency or 1))
+        self.bulk_queue_deadline = bulk_queue_deadline
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._queues: dict[str, deque[_Waiter]] = {p: deque() for p in PRIORITIES}
+        self.in_flight = {p: 0 for p in PRIORITIES}
+        self.completed = {p: 0 for p in PRIORITIES}
+        self.shed = {p: 0 for p in PRIORITIES}
+        self._waits: dict[str, deque[float]] = {p: deque(maxlen=DEFAULT_WAIT_SAMPLES) for p in PRIORITIES}
+
+    @classmethod
+    def from_env(cls) -> "PriorityScheduler":
+        bulk = os.environ.get("LOGISTICS_SCHEDULER_BULK_CONCURRENCY")
+        deadline = os.environ.get("LOGISTICS_SCHEDULER_BULK_DEADLINE")
+        return cls(
+            int(os.environ.get("LOGISTICS_SCHEDULER_MAX_CONCURRENCY", 0) or 0),
+            bulk_max_concurrency=int(bulk) if bulk else None,
+            bulk_queue_deadline=float(deadline) if deadline else DEFAULT_BULK_QUEUE_DEADLINE,
+        )
+
+    def reset(self, max_concurrency: int, *, bulk_max_concurrency: int | None = None) -> None:
+        """Start over with new limits and no slot state (for a freshly started, possibly forked, worker process)."""
+
+        fresh = PriorityScheduler(
+            max_concurrency,
+            bulk_max_concurrency=bulk_max_concurrency,
+            bulk_queue_deadline=self.bulk_queue_deadline,
+            clock=self._clock,
+        )
+        self.__dict__.update(fresh.__dict__)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrency > 0
+
+    def _dispatch_locked(self) -> None:
+        granted = False
+        while sum(self.in_flight.values()) < self.max_concurrency:
+            if self._queues[INTERACTIVE]:
+                waiter = self._queues[INTERACTIVE].popleft()
+            elif self._queues[BULK] and self.in_flight[BULK] < self.bulk_max_concurrency:
+                waiter = self._queues[BULK].popleft()
+            else:
+                break
+            waiter.granted = True
+            self.in_flight[waiter.priority] += 1
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def acquire(self, priority: str | None = None) -> float:
+        """Block until a slot is granted; returns the queue wait in seconds."""
+
+        p = priority or current_priority()
+        with self._cond:
+            waiter = _Waiter(p, self._clock())
+            self._queues[p].append(waiter)
+            self._dispatch_locked()
+            deadline = None
+            if p == BULK and self.bulk_queue_deadline is not None:
+                deadline = waiter.enqueued_at + self.bulk_queue_deadline
+            while not waiter.granted:
+                remaining = None if deadline is None else deadline - self._clock()
+                if remaining is not None and remaining <= 0:
+                    self._queues[p].remove(waiter)
+                    self.shed[p] += 1
+                    raise LoadShedError(
+                        f"{p} call shed after queueing {self.bulk_queue_deadline:.1f}s "
+                        f"({len(self._queues[BULK])} bulk calls still queued)"
+                    )
+                self._cond.wait(remaining)
+            wait = self._clock() - waiter.enqueued_at
+            self._waits[p].append(wait)
+        return wait
+
+    def release(self, priority: str) -> None:
+        with self._cond:
+            self.in_flight[priority] -= 1
+            self.completed[priority] += 1
+            self._dispatch_locked()
+
+    @contextlib.contextmanager
+    def slot(self, priority: str | None = None) -> Iterator[float]:
+        p = priority or current_priority()
+        if not self.enabled:
+            yield 0.0
+            return
+        wait = self.acquire(p)
+        try:
+            yield wait
+        finally:
+            self.release(p)
+
+    def wrap(self, api: Any, *, priority: str | None = None) -> Any:
+        """API proxy whose calls go through a slot; ``priority`` pins the class (e.g. for background pollers)."""
+
+        if not self.enabled:
+            return api
+        return ScheduledApi(api, self, priority)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            out: dict[str, Any] = {
+                "max_concurrency": self.max_concurrency,
+                "bulk_max_concurrency": self.bulk_max_concurrency,
+                "bulk_queue_deadline": self.bulk_queue_deadline,
+            }
+            for p in PRIORITIES:
+                waits = sorted(self._waits[p])
+                out[p] = {
+                    "in_flight": self.in_flight[p],
+                    "queued": len(self._queues[p]),
+                    "completed": self.completed[p],
+                    "shed": self.shed[p],
+                    "queue_wait_ms": {
+                        "p50": round(waits[len(waits) // 2] * 1000, 3) if waits else 0.0,
+                        "p99": round(waits[min(len(waits) - 1, int(len(waits) * 0.99))] * 1000, 3) if waits else 0.0,
+                    },
+                }
+        return out
+
+
+class ScheduledApi:
+    """Wrap an API client; each public method call holds a scheduler slot while it runs."""
+
+    def __init__(self, api: Any, scheduler: PriorityScheduler, priority: str | None = None):
+        self._api = api
+        self._scheduler = scheduler
+        self._priority = priority
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._api, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            with self._scheduler.slot(self._priority):
+                return attr(*args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+
+# 进程级默认实例：所有租户共享同一份后端容量
+scheduler = PriorityScheduler.from_env()
@@ -0,0 +1,124 @@
+import datetime
+import hashlib
+import threading
+import time
+from typing import Any
+
+
+# 时区：轨迹时间统一按 UTC+8 输出（与接口文档的 trackdate_utc8 一致）
+_UTC8 = datetime.timezone(datetime.timedelta(hours=8))
+
+
+# 生命周期里程碑：(key, info, location, orderstatus, orderstatusName, responsecode, 距上一节点的最小/最大小时数)
+MILESTONES: tuple[tuple[str, str, str, str, str, str, float, float], ...] = (
+    ("collected", "已揽收", "Shenzhen, CN", "PickedUp", "已揽收", "OT001", 2, 8),
+    ("departed", "离港", "Hong Kong, CN", "InTransit", "运输中", "OT002", 12, 36),
+    ("arrived", "抵达目的地分拨中心", "Los Angeles, CA, US", "Arrived", "到达目的地", "OT003", 24, 72),
+    ("delivered", "已签收", "Los Angeles, CA, US", "Delivered", "已签收", "OT004", 12, 48),
+)
+
+CREATED_STATUS = ("Created", "已下单")
+
+# 这两个节点发生在目的地：订单登记了目的地时用它替换上表里的默认地点
+DESTINATION_MILESTONES = frozenset({"arrived", "delivered"})
+
+
+class SystemClock:
+    def now(self) -> float:
+        return time.time()
+
+
+class VirtualClock:
+    """Manually advanced clock; share one instance between the mock and the code under test."""
+
+    def __init__(self, start: float | None = None):
+        self._now = time.time() if start is None else float(start)
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        return self._now
+
+    def advance(self, seconds: float) -> float:
+        if seconds < 0:
+            raise ValueError("cannot move a clock backwards")
+        with self._lock:
+            self._now += seconds
+            return self._now
+
+    def set(self, timestamp: float) -> None:
+        with self._lock:
+            if timestamp < self._now:
+                raise ValueError("cannot move a clock backwards")
+            self._now = float(timestamp)
+
+
+def format_utc8(timestamp: float) -> str:
+    return datetime.datetime.fromtimestamp(timestamp, _UTC8).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def build_timeline(order_id: str, created_at: float, *, destination: str | None = None) -> list[dict[str, Any]]:
+    """Deterministic milestone timestamps for one order: same ID and creation time, same timeline.
+
+    ``destination`` (e.g. ``"London, GB"``) is the location of the arrival and delivery milestones.
+    """
+
+    digest = hashlib.sha256(order_id.encode("utf-8")).digest()
+    timeline: list[dict[str, Any]] = []
+    at = created_at
+    for i, (key, info, location, status, status_name, code, min_h, max_h) in enumerate(MILESTONES):
+        fraction = int.from_bytes(digest[i * 4:i * 4 + 4], "big") / 0xFFFFFFFF
+        at += (min_h + (max_h - min_h) * fraction) * 3600
+        timeline.append(
+            {
+                "milestone": key,
+                "at": at,
+                "orderstatus": status,
+                "orderstatusName": status_name,
+                "item": {
+                    "location": destination if destination and key in DESTINATION_MILESTONES else location,
+                    "trackdate_utc8": format_utc8(at),
+                    "trackdate": format_utc8(at),
+                    "info": info,
+                    "responsecode": code,
+                },
+            }
+        )
+    return timeline
+
+
+class ShipmentLifecycle:
+    """Per-order timelines evaluated against a clock."""
+
+    def __init__(self, clock: Any | None = None):
+        self.clock = clock or SystemClock()
+        self._timelines: dict[str, list[dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def register(
+        self, order_id: str, created_at: float | None = None, *, destination: str | None = None
+    ) -> list[dict[str, Any]]:
+        with self._lock:
+            timeline = self._timelines.get(order_id)
+            if timeline is None:
+                timeline = build_timeline(
+                    order_id, self.clock.now() if created_at is None else created_at, destination=destination
+                )
+                self._timelines[order_id] = timeline
+            return timeline
+
+    def timeline(self, order_id: str) -> list[dict[str, Any]] | None:
+        return self._timelines.get(order_id)
+
+    def state_at(self, order_id: str, at: float | None = None) -> tuple[str, str, list[dict[str, Any]]]:
+        """Return (orderstatus, orderstatusName, trackItems) as seen at virtual time ``at`` (default: now)."""
+
+        timeline = self._timelines.get(order_id) or self.register(order_id)
+        now = self.clock.now() if at is None else at
+        reached = [m for m in timeline if m["at"] <= now]
+        if not reached:
+            return CREATED_STATUS[0], CREATED_STATUS[1], []
+        last = reached[-1]
+        return last["orderstatus"], last["orderstatusName"], [m["item"] for m in reached]
+
+    def delivered_at(self, order_id: str) -> float:
+        return (self._timelines.get(order_id) or self.register(order_id))[-1]["at"]
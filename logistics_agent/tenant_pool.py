@@ -0,0 +1,266 @@
+import contextlib
+import contextvars
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Iterator
+
+from .dictionary_catalog import DictionaryCatalogManager
+from .cassette import wrap_from_env as _cassette_from_env
+from .rate_limit import wrap_from_env
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_IDLE_TTL_SECONDS = 600.0
+DEFAULT_MAX_CONCURRENCY_PER_TENANT = 8
+DEFAULT_MAX_TENANTS = 1000
+
+
+# 当前调用所属的租户；未设置时 agent 使用默认的 _api
+_current_tenant: contextvars.ContextVar["Tenant | None"] = contextvars.ContextVar("logistics_tenant", default=None)
+
+
+class TenantBusyError(RuntimeError):
+    """Raised when a tenant's concurrency limit is not available within the timeout."""
+
+
+def current_tenant() -> "Tenant | None":
+    return _current_tenant.get()
+
+
+def _token_fingerprint(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+
+def default_api_factory(customer_code: str, token: str) -> Any:
+    """HTTP client per tenant when LOGISTICS_API_BASE_URL is set, otherwise an in-process mock; rate limited per env."""
+
+    base_url = os.environ.get("LOGISTICS_API_BASE_URL")
+    if base_url:
+        from .http_api import HttpLogisticsApi
+
+        api = HttpLogisticsApi(base_url, customer_code=customer_code, token=token)
+    else:
+        from .mock_logistics_api import MockLogisticsApi
+
+        api = MockLogisticsApi(customer_code=customer_code, token=token)
+    # 每个租户各自包装：限流按接口、按租户独立；录制/回放共用同一个 cassette 文件
+    return wrap_from_env(_cassette_from_env(api))
+
+
+class Tenant:
+    """One shipper account: its API client, dictionary cache and per-tenant helpers."""
+
+    def __init__(
+        self,
+        customer_code: str,
+        token: str,
+        api: Any,
+        *,
+        max_concurrency: int,
+        snapshot_path: str | None = None,
+        snapshot_max_age_seconds: float | None = None,
+    ):
+        self.customer_code = customer_code
+        self.token_fingerprint = _token_fingerprint(token)
+        self.api = api
+        self.catalog = DictionaryCatalogManager(
+            api, snapshot_path=snapshot_path, max_age_seconds=snapshot_max_age_seconds
+        )
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._services: dict[str, Any] = {}
+        # 与 agent._LAST_ORDER 相同的写时复制语义，按租户隔离
+        self.last_order: dict[str, Any] = {}
+        self.in_flight = 0
+        self.calls = 0
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        # 已移出池（淘汰或令牌轮换）：不再接新租约，最后一个租约结束后关闭
+        self.retired = False
+        self._closed = False
+
+    def service(self, name: str, factory: Callable[[Any], Any]) -> Any:
+        """Lazily attach a per-tenant helper (e.g. a waybill resolver bound to this tenant's API)."""
+
+        svc = self._services.get(name)
+        if svc is None:
+            with self._lock:
+                svc = self._services.get(name)
+                if svc is None:
+                    svc = factory(self.api)
+                    self._services[name] = svc
+        return svc
+
+    def pinned(self) -> bool:
+        """True while a helper holds long-lived state for the tenant (e.g. tracking subscriptions)."""
+
+        return any(callable(getattr(svc, "active", None)) and svc.active() for svc in list(self._services.values()))
+
+    def retire(self) -> bool:
+        """Take the tenant out of service; returns True when no lease is in flight and it can be closed now."""
+
+        with self._lock:
+            self.retired = True
+            return not self.in_flight
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for svc in list(self._services.values()) + [self.api]:
+            for method in ("close", "stop"):
+                fn = getattr(svc, method, None)
+                if callable(fn):
+                    try:
+                        fn()
+                    except Exception:
+                        logger.warning("failed to %s %r for tenant %s", method, svc, self.customer_code, exc_info=True)
+                    break
+        self._services.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "customer_code": self.customer_code,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "max_concurrency": self.max_concurrency,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1) if not self.in_flight else 0.0,
+        }
+
+
+class TenantPool:
+    """Lazily created per-tenant clients with idle eviction and per-tenant concurrency limits."""
+
+    def __init__(
+        self,
+        api_factory: Callable[[str, str], Any] = default_api_factory,
+        *,
+        idle_ttl_seconds: float = DEFAULT_IDLE_TTL_SECONDS,
+        max_concurrency_per_tenant: int = DEFAULT_MAX_CONCURRENCY_PER_TENANT,
+        max_tenants: int = DEFAULT_MAX_TENANTS,
+        snapshot_dir: str | None = None,
+    ):
+        if max_concurrency_per_tenant < 1:
+            raise ValueError("max_concurrency_per_tenant must be >= 1")
+        self._api_factory = api_factory
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_concurrency_per_tenant = max_concurrency_per_tenant
+        self.max_tenants = max_tenants
+        self.snapshot_dir = snapshot_dir
+        self._tenants: dict[str, Tenant] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._tenants)
+
+    def get(self, customer_code: str, token: str) -> Tenant:
+        if not customer_code or not token:
+            raise ValueError("customer_code and token are required")
+        fingerprint = _token_fingerprint(token)
+        retired: list[Tenant] = []
+        with self._lock:
+            tenant = self._tenants.get(customer_code)
+            if tenant is not None and tenant.token_fingerprint == fingerprint:
+                tenant.last_used = time.monotonic()
+                return tenant
+            if tenant is None:
+                # 新租户上线时顺带清理空闲租户；达到上限时至少淘汰最久未用的一个
+                retired = self._evict_locked(force_oldest=len(self._tenants) >= self.max_tenants)
+            else:
+                # 令牌轮换：旧客户端不再分配新调用，仍在进行的调用结束后才关闭
+                retired = [tenant]
+                if tenant.pinned():
+                    logger.warning("token rotated for tenant %s; its tracking subscriptions end", customer_code)
+            snapshot_path = (
+                os.path.join(self.snapshot_dir, f"dictionaries-{customer_code}.json") if self.snapshot_dir else None
+            )
+            tenant = Tenant(
+                customer_code,
+                token,
+                self._api_factory(customer_code, token),
+                max_concurrency=self.max_concurrency_per_tenant,
+                snapshot_path=snapshot_path,
+            )
+            self._tenants[customer_code] = tenant
+            self.created += 1
+        self._close_retired(retired)
+        return tenant
+
+    @staticmethod
+    def _close_retired(tenants: list[Tenant]) -> None:
+        # 在池锁外关闭：关闭客户端与后台线程可能很慢，不能阻塞其他租户
+        for t in tenants:
+            if t.retire():
+                t.close()
+
+    @contextlib.contextmanager
+    def lease(self, customer_code: str, token: str, *, timeout: float | None = None) -> Iterator[Tenant]:
+        """Bind the tenant to the current context for the duration of the block, within its concurrency limit."""
+
+        while True:
+            tenant = self.get(customer_code, token)
+            acquired = tenant._slots.acquire(timeout=timeout) if timeout is not None else tenant._slots.acquire()
+            if not acquired:
+                raise TenantBusyError(f"tenant {customer_code} is at its concurrency limit ({tenant.max_concurrency})")
+            with tenant._lock:
+                if not tenant.retired:
+                    tenant.in_flight += 1
+                    tenant.calls += 1
+                    break
+            # 拿到之后恰好被淘汰：换池里的新实例
+            tenant._slots.release()
+        reset = _current_tenant.set(tenant)
+        try:
+            yield tenant
+        finally:
+            _current_tenant.reset(reset)
+            with tenant._lock:
+                tenant.in_flight -= 1
+                tenant.last_used = time.monotonic()
+                close = tenant.retired and not tenant.in_flight
+            tenant._slots.release()
+            if close:
+                tenant.close()
+
+    def evict_idle(self) -> int:
+        with self._lock:
+            evicted = self._evict_locked()
+        self._close_retired(evicted)
+        return len(evicted)
+
+    def _evict_locked(self, *, force_oldest: bool = False) -> list[Tenant]:
+        """Remove idle tenants from the pool; the caller closes them after releasing the pool lock.
+
+        Tenants with calls in flight or with tracking subscriptions are never evicted.
+        """
+
+        now = time.monotonic()
+        candidates = [t for t in self._tenants.values() if not t.in_flight and not t.pinned()]
+        idle = [t for t in candidates if now - t.last_used >= self.idle_ttl_seconds]
+        if not idle and force_oldest:
+            idle = sorted(candidates, key=lambda t: t.last_used)[:1]
+        for t in idle:
+            del self._tenants[t.customer_code]
+        self.evicted += len(idle)
+        return idle
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            tenants = list(self._tenants.values())
+        return {
+            "tenants": len(tenants),
+            "in_flight": sum(t.in_flight for t in tenants),
+            "created": self.created,
+            "evicted": self.evicted,
+            "idle_ttl_seconds": self.idle_ttl_seconds,
+            "max_concurrency_per_tenant": self.max_concurrency_per_tenant,
+        }
@@ -0,0 +1,503 @@
+"""Lightweight span tracing shaped like the OpenTelemetry data model.
+
+Spans nest through a ``contextvars`` variable, so they follow asyncio tasks
+automatically; use ``propagate(fn)`` when handing work to a thread pool.
+
+Environment variables (read once at import):
+
+    LOGISTICS_TRACE_FILE     append finished spans as JSONL to this path (enables tracing)
+
+At runtime use ``enable(exporter)`` / ``disable()``. While disabled a traced
+function costs one attribute check per call.
+
+Critical path per conversation::
+
+    python -m logistics_agent.tracing traces.jsonl
+"""
+
+import argparse
+import contextlib
+import contextvars
+import datetime
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Iterable, Iterator
+
+
+logger = logging.getLogger(__name__)
+
+
+SERVICE_NAME = "logistics_agent"
+
+# 与 OpenTelemetry SpanKind / StatusCode 的字符串形式一致
+KIND_INTERNAL = "SpanKind.INTERNAL"
+KIND_SERVER = "SpanKind.SERVER"
+KIND_CLIENT = "SpanKind.CLIENT"
+
+STATUS_UNSET = "UNSET"
+STATUS_OK = "OK"
+STATUS_ERROR = "ERROR"
+
+
+def _iso(ns: int) -> str:
+    return datetime.datetime.fromtimestamp(ns / 1e9, datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class Span:
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "kind", "attributes",
+        "events", "status", "status_message", "start_ns", "end_ns",
+    )
+
+    def __init__(self, name: str, *, trace_id: str, parent_id: str | None, kind: str, attributes: dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        # 与 OpenTelemetry SDK 的 RandomIdGenerator 相同：非加密随机数即可
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = attributes
+        self.events: list[dict[str, Any]] = []
+        self.status = STATUS_UNSET
+        self.status_message: str | None = None
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes: Any) -> None:
+        self.events.append({"name": name, "timestamp": _iso(time.time_ns()), "attributes": attributes})
+
+    def set_status(self, status: str, message: str | None = None) -> None:
+        self.status = status
+        self.status_message = message
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.add_event("exception", **{"exception.type": type(exc).__name__, "exception.message": str(exc)})
+        self.set_status(STATUS_ERROR, f"{type(exc).__name__}: {exc}")
+
+    @property
+    def duration_ms(self) -> float | None:
+        return None if self.end_ns is None else (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict[str, Any]:
+        """Same layout as the OpenTelemetry SDK's ``ReadableSpan.to_json()``, plus raw nanosecond timestamps."""
+
+        status: dict[str, Any] = {"status_code": self.status}
+        if self.status_message:
+            status["description"] = self.status_message
+        return {
+            "name": self.name,
+            "context": {"trace_id": f"0x{self.trace_id}", "span_id": f"0x{self.span_id}"},
+            "kind": self.kind,
+            "parent_id": f"0x{self.parent_id}" if self.parent_id else None,
+            "start_time": _iso(self.start_ns),
+            "end_time": _iso(self.end_ns) if self.end_ns is not None else None,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "status": status,
+            "attributes": self.attributes,
+            "events": self.events,
+            "resource": {"attributes": {"service.name": SERVICE_NAME}},
+        }
+
+
+class InMemoryExporter:
+    """In-process collector, mainly for tests and ad-hoc inspection."""
+
+    def __init__(self, max_spans: int | None = None):
+        # 保存 Span 对象，读取时才转换成 dict，导出路径上不做格式化
+        self._spans: deque[Span] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self.max_spans = max_spans
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    @property
+    def spans(self) -> list[dict[str, Any]]:
+        with self._lock:
+            spans = list(self._spans)
+        return [s.to_dict() for s in spans]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+    def close(self) -> None:
+        pass
+
+
+class JsonlExporter:
+    """Appends one JSON object per finished span."""
+
+    def __init__(self, path: str):
+        self.path = path
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("logistics_span", default=None)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def propagate(fn: Callable) -> Callable:
+    """Bind ``fn`` to the caller's context (current span, tenant) for execution on another thread."""
+
+    ctx = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        return ctx.run(fn, *args, **kwargs)
+
+    return run
+
+
+class Tracer:
+    def __init__(self, exporter: Any | None = None, *, enabled: bool = False):
+        self.exporter = exporter
+        self.active = False
+        self.dropped = 0
+        # ADK 的 before/after 回调可能不在同一个 context 中执行：按 invocation_id 记录未结束的 span
+        self._open: dict[tuple[str, str], tuple[Span, contextvars.Token | None]] = {}
+        self._open_lock = threading.Lock()
+        if enabled:
+            self.enable(exporter)
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        path = os.environ.get("LOGISTICS_TRACE_FILE", "").strip()
+        if not path:
+            return cls()
+        return cls(JsonlExporter(path), enabled=True)
+
+    def enable(self, exporter: Any | None = None) -> None:
+        if exporter is not None:
+            self.exporter = exporter
+        if self.exporter is None:
+            self.exporter = InMemoryExporter()
+        self.active = True
+
+    def disable(self) -> None:
+        self.active = False
+
+    def status(self) -> dict[str, Any]:
+        with self._open_lock:
+            open_spans = len(self._open)
+        return {
+            "enabled": self.active,
+            "exporter": type(self.exporter).__name__ if self.exporter is not None else None,
+            "path": getattr(self.exporter, "path", None),
+            "open_spans": open_spans,
+            "dropped": self.dropped,
+        }
+
+    def start_span(
+        self,
+        name: str,
+        *,
+        kind: str = KIND_INTERNAL,
+        parent: Span | None = None,
+        attributes: dict[str, Any] | None = None,
+    ) -> Span:
+        parent = parent if parent is not None else _current_span.get()
+        attrs = dict(attributes or {})
+        if parent is not None:
+            # 对话 ID 沿调用链下传，导出后可按对话聚合
+            conversation = parent.attributes.get("conversation.id")
+            if conversation is not None:
+                attrs.setdefault("conversation.id", conversation)
+        return Span(
+            name,
+            trace_id=parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}",
+            parent_id=parent.span_id if parent is not None else None,
+            kind=kind,
+            attributes=attrs,
+        )
+
+    def end_span(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        if span.status == STATUS_UNSET:
+            span.status = STATUS_OK
+        try:
+            self.exporter.export(span)
+        except Exception:
+            self.dropped += 1
+            logger.warning("failed to export span %s", span.name, exc_info=True)
+
+    @contextlib.contextmanager
+    def span(self, name: str, *, kind: str = KIND_INTERNAL, **attributes: Any) -> Iterator[Span | None]:
+        if not self.active:
+            yield None
+            return
+        span = self.start_span(name, kind=kind, attributes=attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    def traced(self, name: str | None = None, *, kind: str = KIND_INTERNAL) -> Callable[[Callable], Callable]:
+        """Decorator; name, docstring and signature are preserved for tool registration."""
+
+        def decorate(func: Callable) -> Callable:
+            span_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.active:
+                    return func(*args, **kwargs)
+                with self.span(span_name, kind=kind) as span:
+                    result = func(*args, **kwargs)
+                    # 工具把异常转成 _err 信封返回，这里同样记为失败
+                    if isinstance(result, dict) and result.get("status") == "error":
+                        error = result.get("error") or {}
+                        span.set_status(STATUS_ERROR, str(error.get("message", "")) if isinstance(error, dict) else None)
+                    return result
+
+            return wrapper
+
+        return decorate
+
+    def wrap_tools(self, tools: Iterable[Callable]) -> list[Callable]:
+        return [self.traced(f"tool {t.__name__}")(t) for t in tools]
+
+    def instrument_api(self, api: Any) -> Any:
+        return TracedApi(api, self) if self.active else api
+
+    # ---- ADK 回调：一个 invocation 为一轮对话（一条 trace），模型调用为其子 span ----
+
+    def _begin(self, key: tuple[str, str], span: Span) -> None:
+        token = _current_span.set(span)
+        with self._open_lock:
+            self._open[key] = (span, token)
+
+    def _finish(self, key: tuple[str, str]) -> Span | None:
+        with self._open_lock:
+            entry = self._open.pop(key, None)
+        if entry is None:
+            return None
+        span, token = entry
+        try:
+            _current_span.reset(token)
+        except (ValueError, RuntimeError):
+            # 在另一个 context 中结束时 token 不可用：清除当前 span
+            _current_span.set(None)
+        self.end_span(span)
+        return span
+
+    def _turn(self, invocation_id: str) -> Span | None:
+        entry = self._open.get(("turn", invocation_id))
+        return entry[0] if entry else None
+
+    def before_agent_callback(self, callback_context: Any) -> None:
+        if not self.active:
+            return None
+        session = getattr(callback_context, "session", None)
+        invocation_id = str(getattr(callback_context, "invocation_id", ""))
+        attrs = {"conversation.id": str(getattr(session, "id", "") or invocation_id), "invocation.id": invocation_id}
+        span = self.start_span("agent turn", kind=KIND_SERVER, parent=None, attributes=attrs)
+        self._begin(("turn", invocation_id), span)
+        return None
+
+    def after_agent_callback(self, callback_context: Any) -> None:
+        if self.active:
+            self._finish(("turn", str(getattr(callback_context, "invocation_id", ""))))
+        return None
+
+    def before_model_callback(self, callback_context: Any, llm_request: Any) -> None:
+        if not self.active:
+            return None
+        invocation_id = str(getattr(callback_context, "invocation_id", ""))
+        attrs = {"gen_ai.request.model": str(getattr(llm_request, "model", "") or "")}
+        span = self.start_span("llm generate", kind=KIND_CLIENT, parent=self._turn(invocation_id), attributes=attrs)
+        self._begin(("llm", invocation_id), span)
+        return None
+
+    def after_model_callback(self, callback_context: Any, llm_response: Any) -> None:
+        if not self.active:
+            return None
+        span = self._finish(("llm", str(getattr(callback_context, "invocation_id", ""))))
+        usage = getattr(llm_response, "usage_metadata", None)
+        if span is not None and usage is not None:
+            span.attributes["gen_ai.usage.input_tokens"] = getattr(usage, "prompt_token_count", None)
+            span.attributes["gen_ai.usage.output_tokens"] = getattr(usage, "candidates_token_count", None)
+        return None
+
+    def before_tool_callback(self, tool: Any, args: dict[str, Any], tool_context: Any) -> None:
+        # 工具在线程中执行时 ADK 会复制当前 context：在这里把本轮 span 设为当前 span，工具 span 就能挂到它下面
+        if self.active:
+            turn = self._turn(str(getattr(tool_context, "invocation_id", "")))
+            if turn is not None:
+                _current_span.set(turn)
+        return None
+
+
+class TracedApi:
+    """Wraps an API client; each public method call becomes a CLIENT span."""
+
+    def __init__(self, api: Any, tracer: Tracer):
+        self._api = api
+        self._tracer = tracer
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._api, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            with self._tracer.span(f"api {name}", kind=KIND_CLIENT, **{"rpc.method": name}):
+                return attr(*args, **kwargs)
+
+        return call
+
+
+# 进程级默认实例：agent 用它包装工具、API 调用和 ADK 回调
+tracer = Tracer.from_env()
+
+
+def enable(exporter: Any | None = None) -> None:
+    tracer.enable(exporter)
+
+
+def disable() -> None:
+    tracer.disable()
+
+
+# ---- 离线分析：按对话计算关键路径 ----
+
+
+def load_spans(path: str) -> list[dict[str, Any]]:
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                spans.append(json.loads(line))
+    return spans
+
+
+def _layer(name: str) -> str:
+    return name.split(" ", 1)[0]
+
+
+def critical_path(spans: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Walk back from each root's end, always descending into the child that finished last.
+
+    Returns segments ``{"name", "self_ms"}`` whose durations sum to the root durations.
+    """
+
+    children: dict[str | None, list[dict[str, Any]]] = defaultdict(list)
+    ids = {s["context"]["span_id"] for s in spans}
+    for s in spans:
+        parent = s.get("parent_id")
+        children[parent if parent in ids else None].append(s)
+
+    segments: list[dict[str, Any]] = []
+
+    def walk(span: dict[str, Any]) -> None:
+        start, end = span["start_time_unix_nano"], span["end_time_unix_nano"]
+        cursor = end
+        self_ns = 0
+        kids = sorted(children.get(span["context"]["span_id"], []), key=lambda c: c["end_time_unix_nano"], reverse=True)
+        for child in kids:
+            c_end = min(child["end_time_unix_nano"], cursor)
+            if c_end <= start or child["start_time_unix_nano"] >= cursor:
+                continue
+            self_ns += cursor - c_end
+            walk(child)
+            cursor = max(child["start_time_unix_nano"], start)
+        self_ns += cursor - start
+        segments.append({"name": span["name"], "self_ms": self_ns / 1e6})
+
+    for root in sorted(children.get(None, []), key=lambda s: s["start_time_unix_nano"]):
+        walk(root)
+    return segments
+
+
+def summarize(spans: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Per conversation: wall time, critical-path time by layer and the slowest critical-path spans."""
+
+    by_conversation: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    for s in spans:
+        if s.get("end_time_unix_nano") is None:
+            continue
+        by_conversation[str(s.get("attributes", {}).get("conversation.id") or s["context"]["trace_id"])].append(s)
+
+    report = []
+    for conversation, group in by_conversation.items():
+        segments = critical_path(group)
+        by_layer: dict[str, float] = defaultdict(float)
+        by_name: dict[str, float] = defaultdict(float)
+        for seg in segments:
+            by_layer[_layer(seg["name"])] += seg["self_ms"]
+            by_name[seg["name"]] += seg["self_ms"]
+        total = sum(by_layer.values())
+        report.append(
+            {
+                "conversation": conversation,
+                "traces": len({s["context"]["trace_id"] for s in group}),
+                "spans": len(group),
+                "critical_path_ms": round(total, 3),
+                "by_layer": {k: round(v, 3) for k, v in sorted(by_layer.items(), key=lambda kv: -kv[1])},
+                "top_spans": [
+                    {"name": k, "self_ms": round(v, 3)}
+                    for k, v in sorted(by_name.items(), key=lambda kv: -kv[1])[:10]
+                ],
+            }
+        )
+    report.sort(key=lambda r: -r["critical_path_ms"])
+    return report
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Critical-path breakdown per conversation from a span JSONL file")
+    parser.add_argument("path")
+    parser.add_argument("--conversation", help="only this conversation id")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = summarize(load_spans(args.path))
+    if args.conversation:
+        report = [r for r in report if r["conversation"] == args.conversation]
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    for r in report:
+        print(f"conversation={r['conversation']} traces={r['traces']} spans={r['spans']} critical_path={r['critical_path_ms']:.1f}ms")
+        for layer, ms in r["by_layer"].items():
+            share = ms / r["critical_path_ms"] * 100 if r["critical_path_ms"] else 0.0
+            print(f"  {layer:<12} {ms:>10.1f} ms  {share:5.1f}%")
+        for s in r["top_spans"][:5]:
+            print(f"    {s['self_ms']:>10.1f} ms  {s['name']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+"""Local per-order timeline of track events, fed by carrier pushes and API refreshes.
+
+Events are ingested in batches, from Python (``TrackingStore.ingest``) or over
+HTTP (``TrackingIngestServer``, ``POST /api/track/push``). Each order keeps one
+timeline sorted by ``trackdate_utc8``; an event is a tuple of interned strings,
+so a duplicate (same waybill, time, code, location and info) is found by the
+same bisection that places a new one and no separate seen-set is kept.
+
+An order is addressable by any of its numbers (waybill, system, customer or
+track number). When an ingest or refresh changes an order's status, ``on_status``
+is called with the order's numbers, the new status and its customer code, so the
+agent's order store keeps its status index in step with pushed events. ``fresh`` answers from the store while the timeline was updated
+within ``max_age_seconds`` (or the order is delivered); otherwise the caller
+refreshes from the track API and hands the entry back to ``record_snapshot``.
+
+Environment variables (read by the agent):
+
+    LOGISTICS_TRACKING_MAX_AGE        seconds a timeline answers status queries without the API
+                                      (default 300; 0 always asks the API)
+    LOGISTICS_TRACKING_INGEST_PORT    start the HTTP ingestion endpoint on this port
+    LOGISTICS_TRACKING_INGEST_HOST    bind address (default 127.0.0.1)
+    LOGISTICS_TRACKING_INGEST_TOKEN   require ``Authorization: Bearer <token>`` on pushes
+    LOGISTICS_TRACKING_INGEST_CUSTOMER_CODE
+                                      tenant the token belongs to; pushed orders are visible
+                                      only to it (a ``customerCode`` in the body is ignored)
+
+Push body::
+
+    {"events": [{"waybillnumber": "...", "trackdate_utc8": "2025-12-10 10:00:00", "info": "已揽收",
+                 "location": "Shenzhen, CN", "responsecode": "OT001", "orderstatus": "PickedUp"}, ...]}
+
+A track-response entry (``{"waybillnumber": ..., "trackItems": [...]}``) is accepted in place of a flat event.
+"""
+
+import bisect
+import hmac
+import json
+import logging
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterable
+
+from .shipment_lifecycle import SystemClock
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MAX_AGE_SECONDS = 300.0
+DEFAULT_INGEST_PORT = 8766
+MAX_PUSH_BYTES = 8 * 1024 * 1024
+PUSH_PATH = "/api/track/push"
+# 终态订单的轨迹不会再变：不论多久以前更新都直接用本地时间线
+TERMINAL_STATUSES = frozenset({"Delivered"})
+_NUMBER_FIELDS = ("waybillnumber", "systemnumber", "customernumber", "tracknumber")
+_MAX_REJECT_SAMPLES = 5
+
+
+def _number(value: Any) -> str | None:
+    if value is None:
+        return None
+    s = str(value).strip()
+    return s or None
+
+
+def _text(value: Any) -> str:
+    return sys.intern(str(value).strip()) if value is not None else ""
+
+
+class _Timeline:
+    __slots__ = (
+        "numbers", "customer_code", "countrycode", "status", "status_name", "status_at", "events", "updated_at", "source"
+    )
+
+    def __init__(self, customer_code: str | None):
+        self.numbers: dict[str, str] = {}
+        self.customer_code = customer_code
+        self.countrycode: str | None = None
+        self.status: str | None = None
+        self.status_name: str | None = None
+        self.status_at = ""
+        # (trackdate_utc8, trackdate, responsecode, location, info)，按时间排序
+        self.events: list[tuple[str, str, str, str, str]] = []
+        self.updated_at = 0.0
+        self.source = ""
+
+    def add(self, event: tuple[str, str, str, str, str]) -> bool:
+        i = bisect.bisect_left(self.events, event)
+        if i < len(self.events) and self.events[i] == event:
+            return False
+        self.events.insert(i, event)
+        return True
+
+    def set_status(self, at: str, status: Any, status_name: Any) -> None:
+        # 乱序到达的旧事件不覆盖较新的状态
+        if status and at >= self.status_at:
+            self.status = _text(status)
+            self.status_name = _text(status_name) if status_name else self.status_name
+            self.status_at = at
+
+    def to_entry(self, search_number: str) -> dict[str, Any]:
+        """Same shape as one ``data`` element of the track API."""
+
+        return {
+            "searchNumber": search_number,
+            "systemnumber": self.numbers.get("systemnumber"),
+            "waybillnumber": self.numbers.get("waybillnumber"),
+            "tracknumber": self.numbers.get("tracknumber"),
+            "countrycode": self.countrycode,
+            "orderstatus": self.status,
+            "orderstatusName": self.status_name,
+            "trackItems": [
+                {"trackdate_utc8": a, "trackdate": b, "responsecode": c, "location": d, "info": e}
+                for a, b, c, d, e in self.events
+            ],
+        }
+
+
+def _flatten(batch: Iterable[Any]) -> Iterable[dict[str, Any]]:
+    """Flat events pass through; track-response entries expand into one event per track item."""
+
+    for item in batch:
+        if isinstance(item, dict) and isinstance(item.get("trackItems"), list):
+            head = {k: v for k, v in item.items() if k not in ("trackItems", "subOrderList", "subOrderTrackItems")}
+            for track_item in item["trackItems"]:
+                yield {**head, **track_item} if isinstance(track_item, dict) else track_item
+        else:
+            yield item
+
+
+class TrackingStore:
+    """Per-order track timelines keyed by every known order number."""
+
+    def __init__(
+        self,
+        *,
+        max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+        clock: Any | None = None,
+        on_status: Callable[[list[str], str, str | None], None] | None = None,
+    ):
+        self.max_age_seconds = max_age_seconds
+        self.clock = clock or SystemClock()
+        self.on_status = on_status
+        self._timelines: dict[str, _Timeline] = {}
+        self._lock = threading.Lock()
+        self.events = 0
+        self.ingested = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+
+    def _timeline_locked(self, numbers: dict[str, str], customer_code: str | None) -> _Timeline | None:
+        """The order's timeline (created if new), or None when any of its numbers belongs to another tenant."""
+
+        timeline = None
+        for number in numbers.values():
+            found = self._timelines.get(number)
+            if found is None:
+                continue
+            # 属于其他租户的时间线既不能认领也不能改写
+            if found.customer_code and found.customer_code != customer_code:
+                return None
+            timeline = timeline or found
+        if timeline is None:
+            timeline = _Timeline(customer_code)
+        elif customer_code and not timeline.customer_code:
+            timeline.customer_code = customer_code
+        for field, number in numbers.items():
+            timeline.numbers.setdefault(field, number)
+            self._timelines.setdefault(number, timeline)
+        return timeline
+
+    def ingest(self, batch: Iterable[Any], *, customer_code: str | None = None, source: str = "push") -> dict[str, Any]:
+        """Append a batch of events; returns accepted / duplicate / rejected counts.
+
+        ``customer_code`` is the tenant the caller is bound to; a ``customer_code`` inside
+        the events is not trusted. Events for an order owned by a different tenant are
+        rejected.
+        """
+
+        with self._lock:
+            out, notify = self._ingest_locked(batch, customer_code, source)
+        self._notify(notify)
+        return out
+
+    def _ingest_locked(
+        self, batch: Iterable[Any], customer_code: str | None, source: str
+    ) -> tuple[dict[str, Any], list[tuple[list[str], str, str | None]]]:
+        accepted = duplicates = rejected = 0
+        samples: list[dict[str, Any]] = []
+        now = self.clock.now()
+        touched: set[int] = set()
+        changed: dict[int, tuple[_Timeline, str | None]] = {}
+        for event in _flatten(batch):
+            reason = None
+            if not isinstance(event, dict):
+                reason = "event must be an object"
+            else:
+                numbers = {f: n for f in _NUMBER_FIELDS if (n := _number(event.get(f)))}
+                at = _text(event.get("trackdate_utc8") or event.get("trackdate") or "")
+                if not numbers:
+                    reason = "waybillnumber is required"
+                elif not at:
+                    reason = "trackdate is required"
+            if reason is not None:
+                rejected += 1
+                if len(samples) < _MAX_REJECT_SAMPLES:
+                    samples.append({"event": event, "reason": reason})
+                continue
+            timeline = self._timeline_locked(numbers, customer_code)
+            if timeline is None:
+                rejected += 1
+                if len(samples) < _MAX_REJECT_SAMPLES:
+                    samples.append({"event": event, "reason": "order belongs to another customer"})
+                continue
+            if event.get("countrycode"):
+                timeline.countrycode = _text(event["countrycode"])
+            added = timeline.add(
+                (
+                    at,
+                    _text(event.get("trackdate") or at),
+                    _text(event.get("responsecode")),
+                    _text(event.get("location")),
+                    _text(event.get("info")),
+                )
+            )
+            if added:
+                accepted += 1
+                changed.setdefault(id(timeline), (timeline, timeline.status))
+                timeline.set_status(at, event.get("orderstatus"), event.get("orderstatusName"))
+            else:
+                duplicates += 1
+            if id(timeline) not in touched:
+                touched.add(id(timeline))
+                timeline.updated_at = now
+                timeline.source = source
+        self.events += accepted
+        self.ingested += accepted + duplicates + rejected
+        self.duplicates += duplicates
+        self.rejected += rejected
+        notify = [
+            (list(t.numbers.values()), t.status, t.customer_code)
+            for t, before in changed.values()
+            if t.status and t.status != before
+        ]
+        out: dict[str, Any] = {"accepted": accepted, "duplicates": duplicates, "rejected": rejected, "orders": len(touched)}
+        if samples:
+            out["rejected_samples"] = samples
+        return out, notify
+
+    def record_snapshot(self, entry: dict[str, Any], *, customer_code: str | None = None) -> bool:
+        """Replace an order's timeline with a full track-API entry (the API is authoritative).
+
+        Clearing and re-filling happen under one lock acquisition, so a reader never sees
+        the timeline empty or half rebuilt.
+        """
+
+        if not isinstance(entry, dict) or entry.get("errormsg") or not isinstance(entry.get("trackItems"), list):
+            return False
+        numbers = {f: n for f in _NUMBER_FIELDS if (n := _number(entry.get(f)))}
+        if not numbers:
+            return False
+        with self._lock:
+            timeline = self._timeline_locked(numbers, customer_code)
+            if timeline is None:
+                return False
+            before = timeline.status
+            self.events -= len(timeline.events)
+            timeline.events = []
+            timeline.status_at = ""
+            self._ingest_locked([entry], customer_code, "api")
+            timeline.updated_at = self.clock.now()
+            timeline.source = "api"
+            # 接口给出的订单状态以条目为准（可能没有逐条状态）
+            if entry.get("orderstatus"):
+                timeline.status = _text(entry["orderstatus"])
+                timeline.status_name = _text(entry.get("orderstatusName")) or timeline.status_name
+            changed = timeline.status and timeline.status != before
+            notify = [(list(timeline.numbers.values()), timeline.status, timeline.customer_code)] if changed else []
+        self._notify(notify)
+        return True
+
+    def _notify(self, changes: list[tuple[list[str], str, str | None]]) -> None:
+        # 在锁外回调：回调会去更新订单库
+        if self.on_status is None:
+            return
+        for numbers, status, customer_code in changes:
+            try:
+                self.on_status(numbers, status, customer_code)
+            except Exception:
+                logger.exception("tracking on_status callback failed for %s", numbers)
+
+    def get(self, number: str, *, customer_code: str | None = None) -> dict[str, Any] | None:
+        """Timeline as a track-API entry plus ``updated_at`` / ``source``, regardless of age."""
+
+        key = _number(number)
+        with self._lock:
+            timeline = self._timelines.get(key) if key else None
+            if timeline is None or (customer_code and timeline.customer_code and timeline.customer_code != customer_code):
+                return None
+            return {**timeline.to_entry(key), "updated_at": timeline.updated_at, "source": timeline.source}
+
+    def fresh(self, number: str, *, customer_code: str | None = None) -> dict[str, Any] | None:
+        """The timeline if it can answer a status query without the API, else None."""
+
+        entry = self.get(number, customer_code=customer_code)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            age = self.clock.now() - entry["updated_at"]
+            if self.max_age_seconds <= 0 or age > self.max_age_seconds and entry["orderstatus"] not in TERMINAL_STATUSES:
+                self.stale += 1
+                return None
+            self.hits += 1
+        entry["age_seconds"] = round(max(0.0, age), 3)
+        return entry
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            orders = len({id(t) for t in self._timelines.values()})
+            return {
+                "orders": orders,
+                "numbers": len(self._timelines),
+                "events": self.events,
+                "ingested": self.ingested,
+                "duplicates": self.duplicates,
+                "rejected": self.rejected,
+                "hits": self.hits,
+                "stale": self.stale,
+                "misses": self.misses,
+                "max_age_seconds": self.max_age_seconds,
+            }
+
+
+def parse_push(body: bytes) -> list[Any]:
+    """Push body -> events; accepts ``{"events": [...]}``, ``{"datas": {"events": [...]}}`` or a bare list.
+
+    A ``customerCode`` in the body is ignored: the tenant comes from the server's token binding.
+    """
+
+    data = json.loads(body) if body else {}
+    if isinstance(data, list):
+        return data
+    if not isinstance(data, dict):
+        raise ValueError("push body must be a JSON object or list")
+    datas = data.get("datas") if isinstance(data.get("datas"), dict) else data
+    events = datas.get("events")
+    if not isinstance(events, list):
+        raise ValueError("events must be a list")
+    return events
+
+
+class TrackingIngestServer:
+    """``POST /api/track/push`` into a ``TrackingStore``; threaded, HTTP/1.1 keep-alive.
+
+    Pushed timelines belong to ``customer_code`` (the tenant the token was issued for),
+    or to no tenant when it is None.
+    """
+
+    def __init__(
+        self,
+        store: TrackingStore,
+        *,
+        host: str = "127.0.0.1",
+        port: int = DEFAULT_INGEST_PORT,
+        token: str | None = None,
+        customer_code: str | None = None,
+    ):
+        self.store = store
+        self.token = token
+        self.customer_code = customer_code
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # 响应头与响应体分两次写出：不关 Nagle 会撞上客户端的延迟 ACK（每个请求多约 40 ms）
+            disable_nagle_algorithm = True
+
+            def log_message(self, fmt: str, *args: Any) -> None:
+                logger.debug("ingest %s", fmt % args)
+
+            def _reply(self, status: int, payload: dict[str, Any]) -> None:
+                out = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+            def do_GET(self) -> None:
+                if self.path == "/healthz":
+                    self._reply(200, {"status": "ok", **server.store.stats()})
+                else:
+                    self._reply(404, {"code": -1, "msg": f"no route for {self.path}", "data": []})
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                if self.path.rstrip("/") != PUSH_PATH:
+                    self.rfile.read(length)
+                    self._reply(404, {"code": -1, "msg": f"no route for {self.path}", "data": []})
+                    return
+                if length > MAX_PUSH_BYTES:
+                    self.close_connection = True
+                    self._reply(400, {"code": -1, "msg": "request body too large", "data": []})
+                    return
+                body = self.rfile.read(length)
+                if server.token and not hmac.compare_digest(
+                    self.headers.get("Authorization", ""), f"Bearer {server.token}"
+                ):
+                    self._reply(401, {"code": -1, "msg": "unauthorized", "data": []})
+                    return
+                try:
+                    events = parse_push(body)
+                except ValueError as e:
+                    self._reply(400, {"code": -1, "msg": str(e), "data": []})
+                    return
+                result = server.store.ingest(events, customer_code=server.customer_code)
+                self._reply(200, {"code": 0, "msg": "success", "data": result})
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self.host, self.port = self._httpd.server_address[:2]
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start_in_thread(self) -> str:
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="tracking-ingest", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
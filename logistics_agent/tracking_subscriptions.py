@@ -0,0 +1,321 @@
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_POLL_INTERVAL_SECONDS = 60.0
+DEFAULT_TRACK_BATCH_SIZE = 100
+DEFAULT_MAX_BUFFERED_EVENTS = 1000
+# 超过这么久没有读取的订阅在轮询时自动退订（0 为不过期）
+DEFAULT_SUBSCRIPTION_TTL_SECONDS = 3600.0
+
+
+class TrackingSubscription:
+    """Incremental track events for a set of waybills.
+
+    Every delivered event carries a monotonically increasing ``seq``; a cursor
+    is simply the last ``seq`` the consumer has seen. The last ``max_buffered``
+    events stay in a log, so reading again from an older cursor replays them.
+    """
+
+    def __init__(self, hub: "TrackingHub", waybillnumbers: set[str], *, max_buffered: int):
+        self.id = uuid.uuid4().hex[:16]
+        self.waybillnumbers = waybillnumbers
+        self._hub = hub
+        self._cond = threading.Condition()
+        self._buffer: deque[dict[str, Any]] = deque(maxlen=max_buffered)
+        self._cursor = 0
+        self.last_read = hub._now()
+        self._async_waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self.closed = False
+
+    @property
+    def cursor(self) -> int:
+        return self._cursor
+
+    def updates(self, cursor: int | None = None) -> tuple[list[dict[str, Any]], int]:
+        """Return logged events after ``cursor`` (default: own cursor) and acknowledge them."""
+
+        with self._cond:
+            self.last_read = self._hub._now()
+            since = self._cursor if cursor is None else cursor
+            events = [e for e in self._buffer if e["seq"] > since]
+            new_cursor = events[-1]["seq"] if events else since
+            self._cursor = max(self._cursor, new_cursor)
+            return events, new_cursor
+
+    def poll(self) -> list[dict[str, Any]]:
+        return self.updates()[0]
+
+    def wait(self, timeout: float | None = None) -> list[dict[str, Any]]:
+        with self._cond:
+            if not self._has_pending():
+                self._cond.wait(timeout)
+        return self.poll()
+
+    def close(self) -> None:
+        self._hub.unsubscribe(self.id)
+
+    def __aiter__(self) -> "TrackingSubscription":
+        return self
+
+    async def __anext__(self) -> list[dict[str, Any]]:
+        while True:
+            if self.closed:
+                raise StopAsyncIteration
+            events = self.poll()
+            if events:
+                return events
+            loop = asyncio.get_running_loop()
+            fut = loop.create_future()
+            with self._cond:
+                if self._has_pending() or self.closed:
+                    continue
+                self._async_waiters.append((loop, fut))
+            await fut
+
+    def _has_pending(self) -> bool:
+        return bool(self._buffer) and self._buffer[-1]["seq"] > self._cursor
+
+    def _push(self, events: list[dict[str, Any]]) -> None:
+        with self._cond:
+            self._buffer.extend(events)
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, fut in waiters:
+            loop.call_soon_threadsafe(_resolve_waiter, fut)
+
+    def _close(self) -> None:
+        self.closed = True
+        self._push([])
+
+
+def _event_key(item: Any) -> str:
+    """Identity of a track item: its full content, independent of its position in trackItems."""
+
+    return json.dumps(item, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def _resolve_waiter(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+class TrackingHub:
+    """One shared polling loop for every subscribed waybill.
+
+    Each tick queries all distinct subscribed numbers in batches through the
+    track endpoint and fans out only the track items not seen before, compared
+    by content rather than position, so corrected or reordered carrier feeds do
+    not replay or skip events. Subscriptions not read for ``subscription_ttl``
+    seconds are dropped on the next tick.
+    """
+
+    def __init__(
+        self,
+        api: Any,
+        *,
+        poll_interval: float = DEFAULT_POLL_INTERVAL_SECONDS,
+        batch_size: int = DEFAULT_TRACK_BATCH_SIZE,
+        max_buffered_events: int = DEFAULT_MAX_BUFFERED_EVENTS,
+        subscription_ttl: float = DEFAULT_SUBSCRIPTION_TTL_SECONDS,
+        clock: Any | None = None,
+    ):
+        self._api = api
+        self._now = clock.now if clock is not None else time.time
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_buffered_events = max_buffered_events
+        self.subscription_ttl = subscription_ttl
+
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._subscriptions: dict[str, TrackingSubscription] = {}
+        self._subscribers: dict[str, set[str]] = {}
+        self._history: dict[str, list[dict[str, Any]]] = {}
+        # 每个单号已见过的轨迹条目（按内容），用于识别新事件
+        self._seen: dict[str, set[str]] = {}
+        self._status: dict[str, dict[str, Any]] = {}
+
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+        self.backend_calls = 0
+        self.ticks = 0
+        self.expired = 0
+        self.last_poll_at: float | None = None
+
+    def subscribe(self, waybillnumbers: list[str], *, prime: bool = True) -> TrackingSubscription:
+        """Register waybills; with ``prime`` the not-yet-tracked ones are fetched immediately."""
+
+        numbers = {n.strip() for n in waybillnumbers if isinstance(n, str) and n.strip()}
+        if not numbers:
+            raise ValueError("waybillnumbers is required")
+        sub = TrackingSubscription(self, numbers, max_buffered=self.max_buffered_events)
+        with self._lock:
+            self._subscriptions[sub.id] = sub
+            replay: list[dict[str, Any]] = []
+            untracked: list[str] = []
+            for n in sorted(numbers):
+                if n not in self._subscribers:
+                    untracked.append(n)
+                self._subscribers.setdefault(n, set()).add(sub.id)
+                replay.extend(self._history.get(n, []))
+        if replay:
+            replay.sort(key=lambda e: e["seq"])
+            sub._push(replay)
+        if prime and untracked:
+            self._poll_numbers(untracked)
+        return sub
+
+    def unsubscribe(self, subscription_id: str) -> None:
+        with self._lock:
+            sub = self._subscriptions.pop(subscription_id, None)
+            if sub is None:
+                return
+            for n in sub.waybillnumbers:
+                ids = self._subscribers.get(n)
+                if ids is None:
+                    continue
+                ids.discard(subscription_id)
+                if not ids:
+                    del self._subscribers[n]
+                    self._history.pop(n, None)
+                    self._seen.pop(n, None)
+                    self._status.pop(n, None)
+        sub._close()
+
+    def active(self) -> bool:
+        """True while anyone is subscribed; the tenant pool keeps such tenants alive."""
+
+        with self._lock:
+            return bool(self._subscriptions)
+
+    def get(self, subscription_id: str) -> TrackingSubscription | None:
+        with self._lock:
+            return self._subscriptions.get(subscription_id)
+
+    def status(self, waybillnumber: str) -> dict[str, Any] | None:
+        with self._lock:
+            return self._status.get(waybillnumber)
+
+    def poll_once(self) -> int:
+        """Run one polling tick; return the number of new events delivered."""
+
+        self.expire_idle()
+        with self._lock:
+            numbers = list(self._subscribers)
+        delivered = self._poll_numbers(numbers)
+        with self._lock:
+            self.ticks += 1
+            self.last_poll_at = self._now()
+        return delivered
+
+    def expire_idle(self) -> int:
+        """Unsubscribe subscriptions nobody has read for ``subscription_ttl`` seconds."""
+
+        if not self.subscription_ttl:
+            return 0
+        cutoff = self._now() - self.subscription_ttl
+        with self._lock:
+            stale = [sub.id for sub in self._subscriptions.values() if sub.last_read < cutoff]
+        for subscription_id in stale:
+            self.unsubscribe(subscription_id)
+        with self._lock:
+            self.expired += len(stale)
+        return len(stale)
+
+    def _poll_numbers(self, numbers: list[str]) -> int:
+        delivered = 0
+        for start in range(0, len(numbers), self.batch_size):
+            batch = numbers[start:start + self.batch_size]
+            with self._lock:
+                self.backend_calls += 1
+            try:
+                resp = self._api.track_many(waybillnumbers=batch)
+            except Exception:
+                logger.warning("tracking poll for %d waybills failed", len(batch), exc_info=True)
+                continue
+            for entry in resp.get("data", []) if isinstance(resp, dict) else []:
+                delivered += self._apply(entry)
+        return delivered
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="tracking-hub", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        t = self._thread
+        if t is not None:
+            t.join()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "subscriptions": len(self._subscriptions),
+                "waybills": len(self._subscribers),
+                "backend_calls": self.backend_calls,
+                "ticks": self.ticks,
+                "expired": self.expired,
+                "poll_interval": self.poll_interval,
+                "subscription_ttl": self.subscription_ttl,
+                "last_poll_at": self.last_poll_at,
+            }
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception:
+                logger.exception("tracking hub tick failed")
+            self._stop.wait(self.poll_interval)
+
+    def _apply(self, entry: dict[str, Any]) -> int:
+        if not isinstance(entry, dict) or entry.get("errormsg"):
+            return 0
+        number = entry.get("searchNumber")
+        items = entry.get("trackItems")
+        if not isinstance(number, str) or not isinstance(items, list):
+            return 0
+        with self._lock:
+            ids = self._subscribers.get(number)
+            if not ids:
+                return 0
+            history = self._history.setdefault(number, [])
+            seen = self._seen.setdefault(number, set())
+            self._status[number] = {
+                "orderstatus": entry.get("orderstatus"),
+                "orderstatusName": entry.get("orderstatusName"),
+            }
+            new_events = []
+            for item in items:
+                key = _event_key(item)
+                if key in seen:
+                    continue
+                seen.add(key)
+                event = {
+                    "seq": next(self._seq),
+                    "waybillnumber": number,
+                    "orderstatus": entry.get("orderstatus"),
+                    **item,
+                }
+                history.append(event)
+                new_events.append(event)
+            subs = [self._subscriptions[i] for i in ids if i in self._subscriptions]
+        if new_events:
+            for sub in subs:
+                sub._push(new_events)
+        return len(new_events)
@@ -0,0 +1,197 @@
+"""Per-piece dimensions for forecast orders: parsing, Volume rows and chargeable weight.
+
+Pieces can be given as
+
+- a list of piece groups ``{"length", "width", "height", "weight", "count"}`` (cm / kg per piece,
+  count defaults to 1), or a JSON string of that list (``{"volumes": [...]}`` also works);
+- CSV text with a header row: ``length,width,height,weight[,count]`` (or 长,宽,高,重量,件数);
+- free text, one piece spec per line or separated by ``;``: ``40x30x20cm 5kg x3``,
+  ``3箱 40*30*20 每箱5kg``, ``120×100×15 cm, 20 kg``.
+
+Parsed pieces are NumPy arrays, one entry per listed group. Dimensional weight is
+``length * width * height / divisor`` with the divisor configured per channel in the
+rate card, so the weights for every group and every channel are one ``[groups, channels]``
+array operation. The shipment's chargeable weight is the larger of the total actual and
+the total dimensional weight, which is also what the rate quote bills.
+"""
+
+import csv
+import io
+import json
+import re
+from typing import Any, Iterable
+
+import numpy as np
+
+
+FIELDS = ("length", "width", "height", "weight")
+CSV_ALIASES = {
+    "length": "length", "长": "length", "长度": "length", "l": "length",
+    "width": "width", "宽": "width", "宽度": "width", "w": "width",
+    "height": "height", "高": "height", "高度": "height", "h": "height",
+    "weight": "weight", "重量": "weight", "重": "weight", "kg": "weight",
+    "count": "count", "数量": "count", "件数": "count", "qty": "count", "pcs": "count",
+}
+
+_NUM = r"\d+(?:\.\d+)?"
+_UNIT = r"(?:件|箱|托|个|pcs?|ctns?|cartons?|pieces?)"
+# 一个件组：[件数 单位] 长x宽x高 [cm] [每件] 重量kg [x件数 | 件数 单位]
+PIECE_PATTERN = re.compile(
+    rf"(?:(?P<count_before>\d+)\s*{_UNIT}\s*[x×X*@:：,，]?\s*)?"
+    rf"(?P<length>{_NUM})\s*[x×X*]\s*(?P<width>{_NUM})\s*[x×X*]\s*(?P<height>{_NUM})\s*(?:cm|厘米)?"
+    rf"\s*[,，/、]?\s*(?:每件|每箱|单件|单箱|each|@)?\s*(?:重量?|weight)?\s*[:：=]?\s*"
+    rf"(?P<weight>{_NUM})\s*(?:kgs?|公斤|千克)"
+    rf"(?:\s*(?:each|/件|/箱))?"
+    rf"(?:\s*[x×X*]\s*(?P<count_x>\d+)(?![\d.]|\s*[x×X*]\s*\d)|\s*[,，]?\s*(?P<count_after>\d+)\s*{_UNIT})?",
+    re.IGNORECASE,
+)
+
+
+def _groups_from_csv(text: str) -> list[dict]:
+    reader = csv.reader(io.StringIO(text.strip()))
+    header = [CSV_ALIASES.get(h.strip().lower(), h.strip().lower()) for h in next(reader)]
+    missing = [f for f in FIELDS if f not in header]
+    if missing:
+        raise ValueError(f"CSV volumes need columns {', '.join(FIELDS)} (missing {', '.join(missing)})")
+    return [dict(zip(header, row)) for row in reader if any(cell.strip() for cell in row)]
+
+
+def _groups_from_text(text: str) -> list[dict]:
+    groups = []
+    for m in PIECE_PATTERN.finditer(text):
+        group: dict[str, Any] = {f: float(m.group(f)) for f in FIELDS}
+        group["count"] = int(m.group("count_before") or m.group("count_x") or m.group("count_after") or 1)
+        groups.append(group)
+    if not groups:
+        raise ValueError(f"no piece dimensions found in {text!r} (expected e.g. '40x30x20cm 5kg x3')")
+    return groups
+
+
+def parse_groups(value: Any) -> list[dict]:
+    """Piece groups from a list, a JSON string, CSV text or free text (see the module docstring)."""
+
+    if isinstance(value, str):
+        s = value.strip()
+        if s.startswith("[") or s.startswith("{"):
+            value = json.loads(s)
+        elif "\n" in s and "," in s.split("\n", 1)[0] and not PIECE_PATTERN.search(s.split("\n", 1)[0]):
+            value = _groups_from_csv(s)
+        else:
+            value = _groups_from_text(s)
+    if isinstance(value, dict):
+        value = value.get("volumes", value.get("pieces"))
+    if not isinstance(value, list):
+        raise ValueError("volumes must be a list of {length, width, height, weight, count} objects, CSV or text")
+    return value
+
+
+class Pieces:
+    """Piece groups as parallel NumPy arrays (cm, kg per piece, pieces per group)."""
+
+    __slots__ = ("length", "width", "height", "weight", "count")
+
+    def __init__(self, length: Any, width: Any, height: Any, weight: Any, count: Any):
+        self.length = np.asarray(length, dtype=np.float64)
+        self.width = np.asarray(width, dtype=np.float64)
+        self.height = np.asarray(height, dtype=np.float64)
+        self.weight = np.asarray(weight, dtype=np.float64)
+        self.count = np.asarray(count, dtype=np.int64)
+
+    @classmethod
+    def from_groups(cls, groups: Iterable[Any]) -> "Pieces":
+        groups = list(groups)
+        columns: dict[str, list] = {f: [] for f in (*FIELDS, "count")}
+        for i, g in enumerate(groups):
+            if not isinstance(g, dict):
+                raise ValueError(f"volumes[{i}] must be an object with length/width/height/weight")
+            try:
+                for f in FIELDS:
+                    columns[f].append(float(g[f]))
+                columns["count"].append(int(g.get("count") or 1))
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"volumes[{i}] needs numeric length, width, height and weight")
+        pieces = cls(*(columns[f] for f in (*FIELDS, "count")))
+        bad = np.flatnonzero(
+            (pieces.length <= 0) | (pieces.width <= 0) | (pieces.height <= 0) | (pieces.weight <= 0) | (pieces.count < 1)
+        )
+        if bad.size:
+            raise ValueError(f"volumes[{int(bad[0])}] dimensions, weight and count must be positive")
+        return pieces
+
+    @classmethod
+    def parse(cls, value: Any) -> "Pieces":
+        return cls.from_groups(parse_groups(value))
+
+    def __len__(self) -> int:
+        return len(self.count)
+
+    def groups(self) -> list[dict[str, Any]]:
+        """Numeric piece groups (floats, int count): the same pieces give the same list whatever the input form."""
+
+        return [
+            {"length": length, "width": width, "height": height, "weight": weight, "count": count}
+            for length, width, height, weight, count in zip(
+                self.length.tolist(),
+                self.width.tolist(),
+                self.height.tolist(),
+                self.weight.tolist(),
+                self.count.tolist(),
+            )
+        ]
+
+    @property
+    def pieces(self) -> int:
+        return int(self.count.sum())
+
+    @property
+    def actual_weight(self) -> float:
+        return round(float(self.weight @ self.count), 3)
+
+    @property
+    def volume_cm3(self) -> float:
+        return float((self.length * self.width * self.height) @ self.count)
+
+    def chargeable_weights(self, divisors: Any) -> dict[str, np.ndarray]:
+        """Per-piece dimensional and chargeable weight for every divisor: ``[groups, len(divisors)]`` arrays."""
+
+        divisors = np.atleast_1d(np.asarray(divisors, dtype=np.float64))
+        dimensional = (self.length * self.width * self.height)[:, None] / divisors[None, :]
+        return {"dimensional": dimensional, "chargeable": np.maximum(self.weight[:, None], dimensional)}
+
+    def summary(self, divisor: float) -> dict[str, Any]:
+        """Shipment totals for one channel's divisor: the chargeable weight is max(actual, dimensional)."""
+
+        dimensional = round(self.volume_cm3 / divisor, 3)
+        return {
+            "pieces": self.pieces,
+            "actual_weight": self.actual_weight,
+            "volume_cm3": round(self.volume_cm3, 1),
+            "volumetric_divisor": divisor,
+            "dimensional_weight": dimensional,
+            "chargeable_weight": max(self.actual_weight, dimensional),
+        }
+
+    def volume_rows(self, customernumber1: str) -> list[dict]:
+        """createForecast ``volumes`` rows, one per group; ``prerweight`` is the group's total weight."""
+
+        group_weight = np.round(self.weight * self.count, 3)
+        return [
+            {
+                "customerchildnumber": f"{customernumber1}-CH{i}",
+                "prenum": str(count),
+                "prewidth": f"{width:g}",
+                "prelength": f"{length:g}",
+                "preheight": f"{height:g}",
+                "prerweight": f"{weight:g}",
+            }
+            for i, (length, width, height, weight, count) in enumerate(
+                zip(
+                    self.length.tolist(),
+                    self.width.tolist(),
+                    self.height.tolist(),
+                    group_weight.tolist(),
+                    self.count.tolist(),
+                ),
+                1,
+            )
+        ]
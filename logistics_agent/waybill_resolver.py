@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL_SECONDS = 0.2
+DEFAULT_MAX_ATTEMPTS = 5
+# 已补齐结果的保留上限：超出后淘汰最早的，再查时重新走接口
+DEFAULT_MAX_RESOLVED = 10000
+
+
+class WaybillNotFoundError(LookupError):
+    pass
+
+
+class WaybillResolver:
+    """Resolve empty waybillnumbers in the background, batching customernumbers.
+
+    Pending customernumbers are flushed to /api/order/waybillnumber when
+    ``batch_size`` is reached or ``flush_interval`` has elapsed, whichever
+    comes first. Callers can poll, block on or await each resolution.
+    """
+
+    def __init__(
+        self,
+        api: Any,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        max_resolved: int = DEFAULT_MAX_RESOLVED,
+        on_resolved: Callable[[str, str], None] | None = None,
+    ):
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        self._api = api
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.max_resolved = max_resolved
+        self.on_resolved = on_resolved
+
+        self._cond = threading.Condition()
+        self._queue: list[str] = []
+        self._futures: dict[str, Future] = {}
+        self._attempts: dict[str, int] = {}
+        self._resolved: OrderedDict[str, str] = OrderedDict()
+        self._oldest_enqueued_at: float | None = None
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+        self.calls = 0
+        self.resolved_count = 0
+        self.failed_count = 0
+
+    def enqueue(self, customernumber: str) -> Future:
+        key = customernumber.strip()
+        with self._cond:
+            fut = self._futures.get(key)
+            if fut is not None:
+                return fut
+            fut = Future()
+            waybill = self._resolved.get(key)
+            if waybill is not None:
+                fut.set_result(waybill)
+                return fut
+            self._futures[key] = fut
+            self._push(key)
+            self._ensure_thread()
+            return fut
+
+    def poll(self, customernumber: str) -> str | None:
+        with self._cond:
+            return self._resolved.get(customernumber.strip())
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._futures)
+
+    def result(self, customernumber: str, timeout: float | None = None) -> str:
+        return self.enqueue(customernumber).result(timeout)
+
+    async def wait(self, customernumber: str) -> str:
+        return await asyncio.wrap_future(self.enqueue(customernumber))
+
+    def flush(self) -> None:
+        """Resolve everything currently queued on the calling thread."""
+
+        while True:
+            batch = self._take_batch(force=True)
+            if not batch:
+                return
+            self._resolve_batch(batch)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        t = self._thread
+        if t is not None:
+            t.join()
+        self.flush()
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            return {
+                "calls": self.calls,
+                "resolved": self.resolved_count,
+                "failed": self.failed_count,
+                "pending": len(self._futures),
+                "batch_size": self.batch_size,
+                "flush_interval": self.flush_interval,
+            }
+
+    def _push(self, key: str) -> None:
+        self._queue.append(key)
+        if self._oldest_enqueued_at is None:
+            self._oldest_enqueued_at = time.monotonic()
+        # Wake the worker on every push: it may be in an untimed wait on an empty
+        # queue (first item arms its flush timer) or waiting for a full batch.
+        self._cond.notify()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="waybill-resolver", daemon=True)
+            self._thread.start()
+
+    def _take_batch(self, *, force: bool = False) -> list[str]:
+        with self._cond:
+            if not self._queue:
+                return []
+            due = (
+                self._oldest_enqueued_at is not None
+                and time.monotonic() - self._oldest_enqueued_at >= self.flush_interval
+            )
+            if not (force or due or len(self._queue) >= self.batch_size):
+                return []
+            batch = self._queue[: self.batch_size]
+            del self._queue[: self.batch_size]
+            self._oldest_enqueued_at = time.monotonic() if self._queue else None
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if len(self._queue) >= self.batch_size:
+                        break
+                    if self._oldest_enqueued_at is None:
+                        self._cond.wait()
+                        continue
+                    remaining = self.flush_interval - (time.monotonic() - self._oldest_enqueued_at)
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+            batch = self._take_batch()
+            if batch:
+                self._resolve_batch(batch)
+
+    def _resolve_batch(self, batch: list[str]) -> None:
+        with self._cond:
+            self.calls += 1
+        try:
+            resp = self._api.waybillnumber(customernumber=batch)
+            items = resp.get("data", {}).get("customernumber", []) if resp.get("code") == 0 else []
+        except Exception as e:
+            logger.warning("waybill batch of %d failed", len(batch), exc_info=True)
+            items = []
+            error: Exception | None = e
+        else:
+            error = None
+
+        by_key = {str(it.get("customernumber")): it for it in items if isinstance(it, dict)}
+        resolved: list[tuple[str, str]] = []
+        settle: list[tuple[Future, str | None, Exception | None]] = []
+        with self._cond:
+            for key in batch:
+                item = by_key.get(key)
+                waybill = item.get("waybillnumber") if item and item.get("code") == 0 else None
+                fut = self._futures.get(key)
+                if waybill:
+                    self._resolved[key] = waybill
+                    if len(self._resolved) > self.max_resolved:
+                        self._resolved.popitem(last=False)
+                    self._futures.pop(key, None)
+                    self._attempts.pop(key, None)
+                    self.resolved_count += 1
+                    resolved.append((key, waybill))
+                    if fut is not None:
+                        settle.append((fut, waybill, None))
+                    continue
+
+                attempts = self._attempts.get(key, 0) + 1
+                not_found = item is not None and item.get("code") != 0
+                if not_found or attempts >= self.max_attempts:
+                    self._futures.pop(key, None)
+                    self._attempts.pop(key, None)
+                    self.failed_count += 1
+                    if fut is not None:
+                        msg = item.get("msg") if item else str(error or "waybillnumber still empty")
+                        settle.append((fut, None, WaybillNotFoundError(f"{key}: {msg}")))
+                    continue
+                self._attempts[key] = attempts
+                self._push(key)
+
+        if self.on_resolved is not None:
+            for key, waybill in resolved:
+                try:
+                    self.on_resolved(key, waybill)
+                except Exception:
+                    logger.exception("waybill on_resolved callback failed for %s", key)
+
+        # Settle futures after the callback so waiters observe updated state.
+        for fut, waybill, exc in settle:
+            if exc is not None:
+                fut.set_exception(exc)
+            else:
+                fut.set_result(waybill)
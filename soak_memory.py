@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+长时间内存浸泡测试 - 循环驱动混合工具调用，按间隔采样 RSS / tracemalloc，
+当每次操作的内存增长斜率超过阈值时失败，并把增长归因到具体的进程级结构。
+
+示例：
+    python soak_memory.py --ops 2000000                  # 每单唯一客户参考号：暴露无界增长
+    python soak_memory.py --ops 2000000 --keyspace 5000  # 有界键空间：应当稳定
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from logistics_agent import agent
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        # ru_maxrss 是峰值（Linux 上单位为 KiB），只能作为近似
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def deep_size(obj: Any, _seen: set[int] | None = None) -> int:
+    """递归估算容器占用（dict/list/tuple/set + 叶子对象）"""
+
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(v, seen) for v in obj)
+    elif hasattr(type(obj), "__slots__"):
+        size += sum(deep_size(getattr(obj, k, None), seen) for k in type(obj).__slots__)
+    return size
+
+
+def estimate_size(container: Any, *, sample: int = 200) -> int:
+    """按抽样条目外推容器总大小，避免每次采样遍历百万级结构"""
+
+    n = len(container)
+    if n == 0:
+        return sys.getsizeof(container)
+    items = list(container.items())[:sample] if isinstance(container, dict) else list(container)[:sample]
+    # 共用一个 seen 集合：条目之间共享的对象（字典选项、驻留字符串）只计一次
+    seen: set[int] = set()
+    per_item = sum(deep_size(it, seen) for it in items) / len(items)
+    return int(sys.getsizeof(container) + per_item * n)
+
+
+def tracked_structures() -> dict[str, Callable[[], Any]]:
+    """名称 -> 返回当前结构对象的函数（每次采样时重新取，兼容被替换的全局变量）"""
+
+    return {
+        "agent._IDEMPOTENT_CACHE": lambda: agent._IDEMPOTENT_CACHE,
+        "mock._orders_by_customernumber": lambda: agent._api._orders_by_customernumber,
+        "mock._customernumber_by_search_number": lambda: agent._api._customernumber_by_search_number,
+        "waybill_resolver._futures": lambda: agent._waybill_resolver._futures,
+        "waybill_resolver._resolved": lambda: agent._waybill_resolver._resolved,
+        "tracking_hub._subscriptions": lambda: agent._tracking_hub._subscriptions,
+        "order_store._records": lambda: agent._order_store._records,
+        "order_store._seq_by_number": lambda: agent._order_store._seq_by_number,
+        "agent._order_draft.fields": lambda: agent._order_draft.fields,
+    }
+
+
+def linear_slope(xs: list[float], ys: list[float]) -> float:
+    """最小二乘斜率"""
+
+    n = len(xs)
+    if n < 2:
+        return 0.0
+    mx, my = sum(xs) / n, sum(ys) / n
+    var = sum((x - mx) ** 2 for x in xs)
+    if var == 0:
+        return 0.0
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / var
+
+
+class Workload:
+    """混合工具调用：下单（结构化/文本）、查询、草稿、订阅"""
+
+    MIX = (
+        ("submit_fields", 35),
+        ("submit_text", 10),
+        ("query_order_status", 25),
+        ("last_order", 10),
+        ("draft", 12),
+        ("subscribe", 8),
+    )
+
+    def __init__(self, *, keyspace: int | None, seed: int = 0):
+        self.keyspace = keyspace
+        self.rng = random.Random(seed)
+        self.counter = 0
+        self.known_waybills: list[str] = []
+        self.errors = 0
+        names, weights = zip(*self.MIX)
+        self._names = names
+        self._weights = weights
+
+    def _customernumber(self) -> str:
+        self.counter += 1
+        key = self.counter if self.keyspace is None else self.rng.randrange(self.keyspace)
+        return f"SOAK-{key:09d}"
+
+    def _order(self) -> dict[str, Any]:
+        return {
+            "origin_city": "深圳",
+            "destination_city": "洛杉矶",
+            "customernumber1": self._customernumber(),
+            "consignee_countrycode": "US",
+            "consigneename": "Soak Tester",
+            "consigneeaddress1": "1 Main St",
+            "consigneecity": "Los Angeles",
+            "consigneezipcode": "90001",
+            "consigneeprovince": "CA",
+        }
+
+    def _remember(self, resp: dict) -> None:
+        data = resp.get("data") if isinstance(resp, dict) else None
+        tracking = data.get("tracking_id") if isinstance(data, dict) else None
+        if tracking and len(self.known_waybills) < 1000:
+            self.known_waybills.append(tracking)
+        elif tracking:
+            self.known_waybills[self.rng.randrange(1000)] = tracking
+
+    def step(self) -> None:
+        op = self.rng.choices(self._names, self._weights)[0]
+        if op == "submit_fields":
+            resp = agent.submit_order_fields_idempotent(self._order())
+            self._remember(resp)
+        elif op == "submit_text":
+            o = self._order()
+            resp = agent.submit_forecast_order_from_text(
+                f"从{o['origin_city']}到{o['destination_city']}；customernumber1={o['customernumber1']}；"
+                "收件国家=US；收件人=Soak Tester；收件地址=1 Main St；城市=Los Angeles；邮编=90001；省州=CA"
+            )
+            self._remember(resp)
+        elif op == "query_order_status":
+            if not self.known_waybills:
+                return
+            resp = agent.query_order_status(self.rng.choice(self.known_waybills))
+        elif op == "last_order":
+            agent.get_last_order_reference()  # 没有最近订单时返回 error，属于正常情况
+            return
+        elif op == "draft":
+            resp = agent.update_forecast_order_draft(
+                f"从深圳到纽约；customernumber1={self._customernumber()}；邮编=10001", reset=True
+            )
+        else:
+            if not self.known_waybills:
+                return
+            resp = agent.subscribe_tracking([self.rng.choice(self.known_waybills)])
+            if resp["status"] == "success":
+                sub_id = resp["data"]["subscription_id"]
+                agent.get_tracking_updates(sub_id)
+                agent.unsubscribe_tracking(sub_id)
+        if resp.get("status") != "success":
+            self.errors += 1
+
+
+def run_soak(
+    *,
+    ops: int,
+    sample_every: int,
+    keyspace: int | None = None,
+    use_tracemalloc: bool = False,
+    warmup_fraction: float = 0.2,
+    seed: int = 0,
+    on_sample: Callable[[dict[str, Any]], None] | None = None,
+) -> dict[str, Any]:
+    structures = tracked_structures()
+    workload = Workload(keyspace=keyspace, seed=seed)
+    if use_tracemalloc:
+        tracemalloc.start()
+    first_snapshot = None
+    samples: list[dict[str, Any]] = []
+    started = time.perf_counter()
+
+    def _sample(done: int) -> None:
+        gc.collect()
+        s: dict[str, Any] = {
+            "ops": done,
+            "seconds": round(time.perf_counter() - started, 2),
+            "rss": rss_bytes(),
+            "structures": {
+                name: {"entries": len(get()), "bytes": estimate_size(get())} for name, get in structures.items()
+            },
+        }
+        if use_tracemalloc:
+            s["traced"] = tracemalloc.get_traced_memory()[0]
+        samples.append(s)
+        if on_sample is not None:
+            on_sample(s)
+
+    try:
+        _sample(0)
+        for i in range(1, ops + 1):
+            workload.step()
+            if i % sample_every == 0 or i == ops:
+                _sample(i)
+                if use_tracemalloc and first_snapshot is None and i >= ops * warmup_fraction:
+                    first_snapshot = tracemalloc.take_snapshot()
+        top_files = []
+        if use_tracemalloc and first_snapshot is not None:
+            diffs = tracemalloc.take_snapshot().compare_to(first_snapshot, "filename")
+            top_files = [
+                {"file": str(d.traceback[0].filename), "size_diff": d.size_diff, "count_diff": d.count_diff}
+                for d in diffs[:10]
+            ]
+    finally:
+        if use_tracemalloc:
+            tracemalloc.stop()
+
+    # 跳过预热阶段（缓存填充、分配器扩容）再拟合斜率
+    steady = [s for s in samples if s["ops"] >= ops * warmup_fraction] or samples
+    xs = [float(s["ops"]) for s in steady]
+    slope_rss = linear_slope(xs, [float(s["rss"]) for s in steady])
+    slope_traced = linear_slope(xs, [float(s["traced"]) for s in steady]) if use_tracemalloc else None
+
+    first, last = steady[0], steady[-1]
+    attribution = []
+    for name in structures:
+        a, b = first["structures"][name], last["structures"][name]
+        attribution.append(
+            {
+                "structure": name,
+                "entries": b["entries"],
+                "entries_growth": b["entries"] - a["entries"],
+                "bytes": b["bytes"],
+                "bytes_growth": b["bytes"] - a["bytes"],
+                "bytes_per_op": round(linear_slope(xs, [float(s["structures"][name]["bytes"]) for s in steady]), 1),
+            }
+        )
+    attribution.sort(key=lambda r: -r["bytes_growth"])
+
+    return {
+        "ops": ops,
+        "keyspace": keyspace,
+        "seconds": round(time.perf_counter() - started, 2),
+        "errors": workload.errors,
+        "rss_start": samples[0]["rss"],
+        "rss_end": samples[-1]["rss"],
+        "slope_rss_bytes_per_op": round(slope_rss, 2),
+        "slope_traced_bytes_per_op": None if slope_traced is None else round(slope_traced, 2),
+        "attribution": attribution,
+        "tracemalloc_top_files": top_files,
+        "samples": samples,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=1_000_000)
+    parser.add_argument("--sample-every", type=int, default=50_000)
+    parser.add_argument("--keyspace", type=int, default=None, help="客户参考号取值数量；默认每次唯一")
+    parser.add_argument("--max-slope", type=float, default=64.0, help="稳定阶段允许的 RSS 增长（字节/操作）")
+    parser.add_argument("--warmup", type=float, default=0.2, help="拟合斜率前跳过的比例")
+    parser.add_argument("--tracemalloc", action="store_true", help="同时采样 tracemalloc（明显变慢）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    def _progress(s: dict[str, Any]) -> None:
+        cache = s["structures"]["agent._IDEMPOTENT_CACHE"]["entries"]
+        traced = f" traced={s['traced'] / 1e6:.1f}MB" if "traced" in s else ""
+        print(f"  ops={s['ops']:>9} t={s['seconds']:>7.1f}s rss={s['rss'] / 1e6:>7.1f}MB{traced} cache={cache}")
+
+    print(f"🧪 soak ops={args.ops} keyspace={args.keyspace or 'unbounded'} max_slope={args.max_slope} B/op")
+    report = run_soak(
+        ops=args.ops,
+        sample_every=args.sample_every,
+        keyspace=args.keyspace,
+        use_tracemalloc=args.tracemalloc,
+        warmup_fraction=args.warmup,
+        seed=args.seed,
+        on_sample=_progress,
+    )
+
+    print(f"\nRSS {report['rss_start'] / 1e6:.1f} -> {report['rss_end'] / 1e6:.1f} MB in {report['seconds']}s "
+          f"(errors={report['errors']})")
+    print(f"steady-state slope: {report['slope_rss_bytes_per_op']} B/op (RSS)"
+          + (f", {report['slope_traced_bytes_per_op']} B/op (tracemalloc)" if args.tracemalloc else ""))
+    print(f"\n{'structure':<40} {'entries':>10} {'+entries':>10} {'est. MB':>9} {'+MB':>8} {'B/op':>8}")
+    for r in report["attribution"]:
+        print(
+            f"{r['structure']:<40} {r['entries']:>10} {r['entries_growth']:>+10} {r['bytes'] / 1e6:>9.1f} "
+            f"{r['bytes_growth'] / 1e6:>+8.1f} {r['bytes_per_op']:>8.1f}"
+        )
+    if report["tracemalloc_top_files"]:
+        print("\ntracemalloc growth by file (after warmup):")
+        for f in report["tracemalloc_top_files"]:
+            print(f"  {f['size_diff'] / 1e6:>+8.2f} MB {f['count_diff']:>+9}  {f['file']}")
+
+    if report["slope_rss_bytes_per_op"] > args.max_slope:
+        print(f"\n❌ memory keeps growing: {report['slope_rss_bytes_per_op']} B/op > {args.max_slope} B/op")
+        sys.exit(1)
+    print("\n✅ memory per operation is flat")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+表格批量导入测试 - 验证表头映射、逐行校验、幂等与结果文件
+"""
+
+import csv
+
+from logistics_agent import agent
+from logistics_agent.bulk_import import import_orders, map_columns
+
+
+HEADER = ["起运城市", "目的城市", "客户参考号", "收件国家", "收件人", "收件地址", "城市", "邮编", "省州", "物品类别", "报关类型", "重量"]
+
+
+def _write_csv(path: str, rows: int) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            zipcode = "9000" if i % 100 == 99 else f"{90001 + i % 80}"  # 第 100 行邮编不合法
+            writer.writerow(["深圳", "洛杉矶", f"XLS-{i:08d}", "US", f"Consignee {i}", f"{i} Main St", "Los Angeles", zipcode, "CA", "普货", "不需报关", 1 + i % 5])
+
+
+def test_header_aliases():
+    mapping = map_columns(["客户参考号", "Consigneename", "unknown", "邮编"])
+    assert mapping == {0: "customernumber1", 1: "consigneename", 3: "consigneezipcode"}
+
+
+def test_import_streams_results_to_csv(tmp_path):
+    src = tmp_path / "orders.csv"
+    _write_csv(str(src), 120)
+    with open(src, "a", newline="", encoding="utf-8") as f:
+        # 重复第一行：应走幂等重放
+        f.write("深圳,洛杉矶,XLS-00000000,US,Consignee 0,0 Main St,Los Angeles,90001,CA,普货,不需报关,1\n")
+    out = tmp_path / "results.csv"
+
+    summary = import_orders(str(src), str(out), concurrency=4)
+
+    assert summary["rows"] == 121
+    assert summary["failed"] == 1
+    with open(out, newline="", encoding="utf-8") as f:
+        rows = {int(r["row"]): r for r in csv.DictReader(f)}
+    assert len(rows) == 121
+    assert rows[101]["status"] == "error" and "consigneezipcode" in rows[101]["error"]
+    assert rows[122]["idempotent_replay"] == "True"
+    assert rows[122]["order_id"] == rows[2]["order_id"]
+
+
+def test_import_tool_reports_missing_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOGISTICS_IMPORT_DIR", str(tmp_path))
+    resp = agent.import_orders_file("missing.csv")
+    assert resp["status"] == "error" and resp["error"]["message"] == "file not found"
+
+
+def test_import_tool_is_confined_to_the_import_directory(tmp_path, monkeypatch):
+    monkeypatch.delenv("LOGISTICS_IMPORT_DIR", raising=False)
+    assert agent.import_orders_file("orders.csv")["error"]["message"] == "file import is not enabled"
+
+    root = tmp_path / "imports"
+    root.mkdir()
+    _write_csv(str(root / "orders.csv"), 3)
+    (tmp_path / "secret.csv").write_text("x\n")
+    (root / "link.csv").symlink_to(tmp_path / "secret.csv")
+    monkeypatch.setenv("LOGISTICS_IMPORT_DIR", str(root))
+    for path, output in [
+        ("../secret.csv", None),
+        (str(tmp_path / "secret.csv"), None),
+        ("link.csv", None),
+        ("orders.csv", "../results.csv"),
+    ]:
+        resp = agent.import_orders_file(path, output)
+        assert resp["error"]["message"] == "path is outside the import directory", (path, output)
+
+    resp = agent.import_orders_file("orders.csv", "out/../results.csv")
+    assert resp["status"] == "success" and resp["data"]["rows"] == 3
+    assert resp["data"]["output_path"] == str(root / "results.csv")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+多进程批量下单测试 - 验证分片路由、结果流式返回、幂等、本进程订单库记录、单块失败隔离与工作进程的批量槽位
+"""
+
+from logistics_agent import agent
+from logistics_agent import scheduler as scheduler_module
+from logistics_agent.bulk_submit import BulkOrderSubmitter, shard_for, submit_orders_bulk, worker_bulk_slots
+from logistics_agent.scheduler import PriorityScheduler
+
+
+def _order(i: int) -> dict:
+    return {
+        "origin_city": "深圳",
+        "destination_city": "洛杉矶",
+        "customernumber1": f"BULK-T-{i:06d}",
+        "consignee_countrycode": "US",
+        "consigneename": f"Consignee {i}",
+        "consigneeaddress1": f"{i} Main St",
+        "consigneecity": "Los Angeles",
+        "consigneezipcode": "90001",
+        "consigneeprovince": "CA",
+        "insurance_enabled": i % 2 == 0,
+        "insurance_value": 100 + i,
+        "insurance_type_name": "货物运输险",
+        "insurance_currency_code": "USD",
+    }
+
+
+def test_shard_is_stable():
+    assert shard_for("T620200611-1001", 4) == shard_for("T620200611-1001", 4)
+    assert {shard_for(f"T-{i}", 4) for i in range(100)} == {0, 1, 2, 3}
+
+
+def test_bulk_submit_streams_all_results_and_replays_duplicates():
+    orders = [_order(i) for i in range(30)]
+    orders.append(dict(orders[3]))
+    orders.append({"customernumber1": "MISSING-FIELDS"})
+
+    results = dict(submit_orders_bulk(orders, workers=2, chunk_size=4))
+
+    assert sorted(results) == list(range(len(orders)))
+    assert results[3]["status"] == "success"
+    assert results[30]["data"]["request_id"] == results[3]["data"]["request_id"]
+    assert results[30]["data"]["order_id"] == results[3]["data"]["order_id"]
+    assert {results[3]["data"]["idempotent_replay"], results[30]["data"]["idempotent_replay"]} == {False, True}
+    assert results[31]["status"] == "error"
+    assert "consigneename" in results[31]["error"]["missing_fields"]
+    # 子进程建的单也记入本进程的订单库
+    assert agent._order_store.get(results[3]["data"]["order_id"]).customernumber == orders[3]["customernumber1"]
+
+
+def test_failed_chunk_yields_errors_and_keeps_other_results():
+    orders = [_order(100 + i) for i in range(6)]
+    # 无法序列化到子进程：这一块（4、5）失败，其它块照常返回
+    orders[4]["note"] = lambda: None
+
+    results = dict(submit_orders_bulk(orders, workers=1, chunk_size=2))
+
+    assert sorted(results) == list(range(6))
+    assert [results[i]["status"] for i in range(4)] == ["success"] * 4
+    assert results[4]["status"] == results[5]["status"] == "error"
+    assert results[5]["error"]["message"] == "bulk worker failed"
+
+
+def _worker_limits(_):
+    from logistics_agent.scheduler import scheduler
+
+    return scheduler.max_concurrency, scheduler.bulk_max_concurrency
+
+
+def test_workers_split_the_parent_bulk_budget(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "scheduler", PriorityScheduler(0))
+    assert worker_bulk_slots(2) == 0  # 调度器关闭时不限
+    monkeypatch.setattr(scheduler_module, "scheduler", PriorityScheduler(8, bulk_max_concurrency=6))
+    assert worker_bulk_slots(2) == 3 and worker_bulk_slots(10) == 1
+    with BulkOrderSubmitter(2) as submitter:
+        assert submitter._executors[1].submit(_worker_limits, None).result() == (3, 3)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+录制回放测试 - 录制请求/响应/耗时、按归一化请求匹配、凭据脱敏、重复请求按序回放、错误回放、索引重建、加速回放、回放下单
+"""
+
+import time
+
+import pytest
+
+from logistics_agent import agent
+from logistics_agent.cassette import (
+    Cassette,
+    CassetteMissError,
+    CassetteWriter,
+    RecordingApi,
+    ReplayApi,
+    build_index,
+    cassette_stats,
+)
+from logistics_agent.http_api import HttpApiError
+from logistics_agent.mock_logistics_api import FaultInjectingApi, MockApiUnavailableError, MockLogisticsApi
+
+
+def _record(path, calls, api=None):
+    writer = CassetteWriter(str(path))
+    recording = RecordingApi(api or MockLogisticsApi(), writer)
+    results = [getattr(recording, method)(**kwargs) for method, kwargs in calls]
+    writer.close()
+    return results
+
+
+def test_replay_matches_normalized_requests(tmp_path):
+    path = tmp_path / "traffic.cassette"
+    created, tracked = _record(
+        path,
+        [
+            ("create_order", {"origin_city": "深圳", "destination_city": "洛杉矶", "customernumber1": "CS-1"}),
+            ("track", {"waybillnumber": "CS-1"}),
+        ],
+    )
+
+    replay = ReplayApi(Cassette(str(path)), speed=0)
+    # 键顺序、首尾空白、值为 None 的参数不影响匹配
+    assert replay.track(waybillnumber=" CS-1 ", child_limit=None) == tracked
+    assert replay.create_order(customernumber1="CS-1", destination_city="洛杉矶", origin_city="深圳") == created
+    with pytest.raises(CassetteMissError):
+        replay.track(waybillnumber="CS-2")
+    with pytest.raises(AttributeError):
+        replay.not_an_endpoint
+    assert cassette_stats(replay)["hits"] == 2 and cassette_stats(replay)["misses"] == 1
+
+
+class _PositionalApi:
+    def track(self, waybillnumber, child_offset=0):
+        return {"waybillnumber": waybillnumber, "child_offset": child_offset}
+
+
+def test_credentials_are_redacted_and_positional_args_bound(tmp_path):
+    path = tmp_path / "auth.cassette"
+    writer = CassetteWriter(str(path))
+    recording = RecordingApi(MockLogisticsApi(), writer)
+    payload = {"authorization": {"code": "KJHB", "token": "secret-1"}, "datas": [{"order": {"customernumber1": "A-1"}}]}
+    created = recording.create_forecast_order(origin_city="深圳", destination_city="洛杉矶", request_payload=payload)
+    tracked = RecordingApi(_PositionalApi(), writer).track("A-1", 2)
+    writer.close()
+
+    assert b"secret-1" not in path.read_bytes()
+    replay = ReplayApi(Cassette(str(path)), speed=0)
+    # 换了 token 仍命中同一条录制；录制时的位置参数按参数名匹配
+    rotated = {**payload, "authorization": {"code": "KJHB", "token": "secret-2"}}
+    assert replay.create_forecast_order(origin_city="深圳", destination_city="洛杉矶", request_payload=rotated) == created
+    assert replay.track(waybillnumber="A-1", child_offset=2) == tracked
+    # 回放时的位置参数按 stub 方法的参数名绑定
+    positional = ReplayApi(Cassette(str(path)), speed=0, stub=_PositionalApi())
+    assert positional.track("A-1", 2) == tracked
+    with pytest.raises(TypeError):
+        replay.track("A-1", 2)
+
+
+def test_repeated_requests_replay_in_order_then_cycle(tmp_path):
+    path = tmp_path / "seq.cassette"
+    writer = CassetteWriter(str(path))
+    for status in ("Created", "InTransit", "Delivered"):
+        writer.append("track", {"waybillnumber": "W1"}, time.monotonic(), 0.0, response={"status": status})
+    writer.close()
+
+    replay = ReplayApi(Cassette(str(path)), speed=0)
+    seen = [replay.track(waybillnumber="W1")["status"] for _ in range(4)]
+    assert seen == ["Created", "InTransit", "Delivered", "Created"]
+
+
+def test_errors_are_recorded_and_replayed(tmp_path):
+    path = tmp_path / "errors.cassette"
+    flaky = FaultInjectingApi(MockLogisticsApi(), {"latency_ms": 0, "unavailable_rate": 1.0})
+    with pytest.raises(MockApiUnavailableError):
+        _record(path, [("currency", {})], api=flaky)
+
+    writer = CassetteWriter(str(path))
+    writer.append("insurance", {}, time.monotonic(), 0.0, error=HttpApiError(503, {"msg": "busy"}))
+    writer.close()
+
+    replay = ReplayApi(Cassette(str(path)), speed=0)
+    with pytest.raises(ConnectionError):
+        replay.currency()
+    with pytest.raises(HttpApiError) as info:
+        replay.insurance()
+    assert info.value.status == 503
+
+
+def test_index_is_rebuilt_after_appending(tmp_path):
+    path = tmp_path / "grow.cassette"
+    _record(path, [("currency", {})])
+    assert build_index(str(path)) == 1
+    _record(path, [("insurance", {})])
+    # 半行（录制被中断）不进索引
+    with open(path, "ab") as f:
+        f.write(b"0123")
+
+    cassette = Cassette(str(path))
+    assert cassette.records == 2
+    assert cassette.lookup("insurance", {})["m"] == "insurance"
+    assert [e["m"] for e in cassette.entries()] == ["currency", "insurance"]
+
+
+def test_replay_reproduces_latency_scaled_by_speed(tmp_path):
+    path = tmp_path / "slow.cassette"
+    writer = CassetteWriter(str(path))
+    writer.append("currency", {}, time.monotonic(), 0.2, response={"code": 0})
+    writer.close()
+    cassette = Cassette(str(path))
+
+    t0 = time.perf_counter()
+    ReplayApi(cassette, speed=1.0).currency()
+    original = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    ReplayApi(cassette, speed=10.0).currency()
+    accelerated = time.perf_counter() - t0
+    assert original >= 0.2 and 0.02 <= accelerated < 0.1
+
+
+def test_order_created_under_replay(tmp_path, monkeypatch):
+    path = tmp_path / "orders.cassette"
+    order = dict(
+        origin_city="深圳",
+        destination_city="洛杉矶",
+        customernumber1="REPLAY-1",
+        consignee_countrycode="US",
+        consigneename="Ann",
+        consigneeaddress1="1 Main St",
+        consigneecity="Los Angeles",
+        consigneezipcode="90001",
+        consigneeprovince="CA",
+        declare_type_name="买单报关",
+    )
+    writer = CassetteWriter(str(path))
+    monkeypatch.setattr(agent, "_api", RecordingApi(MockLogisticsApi(), writer))
+    recorded = agent.create_forecast_order_with_preferences(**order)
+    writer.close()
+    assert recorded["status"] == "success"
+
+    # 回放时 customer_code / token 来自 stub，接口应答来自 cassette
+    replay = ReplayApi(Cassette(str(path)), speed=0, stub=MockLogisticsApi(token="other-token"))
+    monkeypatch.setattr(agent, "_api", replay)
+    replayed = agent.create_forecast_order_with_preferences(**order)
+    assert replayed["status"] == "success"
+    assert replayed["data"]["result"] == recorded["data"]["result"]
+    assert cassette_stats(replay)["hits"] == 1
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+字典快照测试 - 验证快照写入/加载、过期与损坏回退、内容未变只刷新时间、环境变量容错
+"""
+
+import time
+
+from logistics_agent.dictionary_catalog import (
+    DEFAULT_SNAPSHOT_MAX_AGE_SECONDS,
+    DictionaryCatalogManager,
+    fetch_live_catalog,
+    load_snapshot,
+    snapshot_max_age_from_env,
+    write_snapshot,
+)
+from logistics_agent.mock_logistics_api import MockLogisticsApi
+
+
+class CountingApi(MockLogisticsApi):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def insurance(self):
+        self.calls += 1
+        return super().insurance()
+
+
+def test_snapshot_roundtrip(tmp_path):
+    api = MockLogisticsApi()
+    path = str(tmp_path / "dictionaries.snapshot")
+    live = fetch_live_catalog(api)
+    write_snapshot(live, path, customer_code=api.customer_code)
+
+    loaded = load_snapshot(path, customer_code=api.customer_code)
+    assert loaded is not None
+    assert loaded.source == "snapshot"
+    assert loaded.digest == live.digest
+    assert loaded.by_code("insurance", 1)["name"] == "货物运输险"
+    assert [o["code"] for o in loaded.by_name("producttype", "General goods")] == [1]
+
+
+def test_stale_or_corrupt_snapshot_falls_back_to_live(tmp_path):
+    api = MockLogisticsApi()
+    path = str(tmp_path / "dictionaries.snapshot")
+    write_snapshot(fetch_live_catalog(api), path, customer_code=api.customer_code)
+
+    assert load_snapshot(path, customer_code=api.customer_code, max_age_seconds=0) is None
+    assert load_snapshot(path, customer_code="OTHER") is None
+
+    with open(path, "r+b") as f:
+        f.seek(-5, 2)
+        f.write(b"XXXXX")
+    assert load_snapshot(path, customer_code=api.customer_code) is None
+
+    manager = DictionaryCatalogManager(api, snapshot_path=path)
+    assert manager.get().source == "live"
+    # The live fetch rewrote a valid snapshot.
+    assert load_snapshot(path, customer_code=api.customer_code) is not None
+
+
+def test_warm_start_skips_api_and_revalidates(tmp_path):
+    path = str(tmp_path / "dictionaries.snapshot")
+    DictionaryCatalogManager(MockLogisticsApi(), snapshot_path=path).get()
+    before = time.time()
+
+    api = CountingApi()
+    manager = DictionaryCatalogManager(api, snapshot_path=path)
+    catalog = manager.get()
+    assert catalog.source == "snapshot"
+    manager.wait_for_revalidation(timeout=5)
+    assert api.calls == 1
+    assert manager.get() is catalog
+    # 内容没变：只刷新快照头的时间，快照重新计算有效期
+    refreshed = load_snapshot(path)
+    assert refreshed.fetched_at >= before and refreshed.digest == catalog.digest
+
+
+class ChangedApi(MockLogisticsApi):
+    def currency(self):
+        resp = super().currency()
+        return {**resp, "data": [*resp["data"], {"code": "XTS", "cnname": "测试币", "enname": "Test"}]}
+
+
+def test_revalidation_switches_and_rewrites_when_changed(tmp_path):
+    path = str(tmp_path / "dictionaries.snapshot")
+    DictionaryCatalogManager(MockLogisticsApi(), snapshot_path=path).get()
+
+    manager = DictionaryCatalogManager(ChangedApi(), snapshot_path=path)
+    assert manager.get().source == "snapshot"
+    manager.wait_for_revalidation(timeout=5)
+    assert manager.get().source == "live"
+    assert load_snapshot(path).by_code("currency", "XTS")["enname"] == "Test"
+
+
+def test_snapshot_max_age_env_is_read_lazily(monkeypatch):
+    monkeypatch.setenv("LOGISTICS_DICTIONARY_SNAPSHOT_MAX_AGE", "one day")
+    assert snapshot_max_age_from_env() == DEFAULT_SNAPSHOT_MAX_AGE_SECONDS
+    monkeypatch.setenv("LOGISTICS_DICTIONARY_SNAPSHOT_MAX_AGE", "60")
+    assert snapshot_max_age_from_env() == 60.0
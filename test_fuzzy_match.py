@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+字典名称容错匹配测试 - 验证错别字自动选择、低置信度候选与报关类型严格规则
+"""
+
+import pytest
+
+from logistics_agent import agent
+
+
+def _pick(dictionary, name, label, **kwargs):
+    return agent._pick_by_name_or_default(agent._dictionary_options(dictionary), name, label=label, **kwargs)
+
+
+def test_typos_auto_select():
+    assert _pick("insurance", "货运运输险", "insurance", name_keys=("name",))["code"] == 1
+    assert _pick("producttype", "genral goods", "producttype")["code"] == 1
+    assert _pick("declaretype", "贸易报光", "declaretype")["code"] == 3
+
+
+def test_low_confidence_lists_candidates():
+    with pytest.raises(ValueError, match="最接近的选项：普货"):
+        _pick("producttype", "普活", "producttype")
+
+
+def test_ambiguous_declare_type_stays_strict():
+    with pytest.raises(ValueError, match="过于模糊"):
+        _pick("declaretype", "需要报关_请选择具体类型", "declaretype")
+    with pytest.raises(ValueError, match="无法识别"):
+        _pick("declaretype", "需要报关", "declaretype")
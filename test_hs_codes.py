@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+HS 编码索引测试 - 懒加载、编码前缀树、中英文品名归类与不明确时的候选、报关明细自动补齐、classify_hs_codes 工具
+"""
+
+from logistics_agent import agent
+from logistics_agent.hs_codes import DEFAULT_PATH, HsCodeIndex
+
+
+ORDER = dict(
+    customernumber1="HS-1",
+    consignee_countrycode="US",
+    consigneename="Ann",
+    consigneeaddress1="1 Main St",
+    consigneecity="Los Angeles",
+    consigneezipcode="90001",
+    consigneeprovince="CA",
+)
+
+
+def test_lazy_load_and_code_trie():
+    index = HsCodeIndex(DEFAULT_PATH)
+    assert index.stats() == {"path": DEFAULT_PATH, "loaded": False}
+
+    assert index.lookup("8518.30")["cnname"] == "耳机及耳塞机"
+    assert index.stats()["loaded"] is True and index.stats()["codes"] > index.stats()["classifiable"]
+    assert index.lookup("8518.31") is None
+
+    under = [x["hscode"] for x in index.by_prefix("8518")]
+    assert under == ["8518", "851810", "851822", "851830"]
+    assert index.lookup("610910")["chapter"].startswith("61 ")
+    assert index.by_prefix("99") == []
+
+
+def test_classify_chinese_and_english_names():
+    index = HsCodeIndex(DEFAULT_PATH)
+    assert index.classify("蓝牙耳机")["hscode"] == "851830"
+    assert index.classify("wireless earbuds")["hscode"] == "851830"
+    assert index.classify("男士纯棉T恤")["hscode"] == "610910"
+    assert index.classify("8517.13")["hscode"] == "851713"
+
+    # 没有足够明确的匹配：不自动选定，只给候选
+    vague = index.classify("kids stuff")
+    assert vague["hscode"] is None and vague["candidates"]
+    assert index.classify("xyz")["candidates"] == []
+
+
+def test_payload_items_are_filled_from_index():
+    resp = agent.build_create_forecast_payload(
+        items=["蓝牙耳机", {"name": "phone case", "quantity": 2, "price": 3.5}, {"hscode": "6109.10", "cnname": "T恤"}],
+        **ORDER,
+    )
+    items = resp["data"]["payload"]["datas"][0]["items"]
+    assert [(i["hscode"], i["cnname"], i["enname"]) for i in items] == [
+        ("851830", "蓝牙耳机", "Headphones and earphones"),
+        ("392690", "其他塑料制品", "phone case"),
+        ("610910", "T恤", "T-shirts, singlets and other vests of cotton, knitted"),
+    ]
+    assert (items[1]["quantity"], items[1]["price"]) == ("2", "3.5")
+
+    # 不传 items 时保留占位明细
+    plain = agent.build_create_forecast_payload(**ORDER)["data"]["payload"]["datas"][0]["items"]
+    assert [i["hscode"] for i in plain] == [""]
+
+    bad = agent.build_create_forecast_payload(items="kids stuff", **ORDER)
+    assert bad["status"] == "error" and "candidates: 950300" in bad["error"]["reason"]
+
+
+def test_classify_tool_and_order_with_items():
+    resp = agent.classify_hs_codes("蓝牙耳机、手机壳、kids stuff")
+    assert resp["status"] == "success"
+    assert [r["hscode"] for r in resp["data"]["items"]] == ["851830", "392690", None]
+    assert resp["data"]["unmatched"] == ["kids stuff"]
+    assert agent.classify_hs_codes([])["status"] == "error"
+
+    order = {
+        **ORDER,
+        "customernumber1": "HS-2",
+        "origin_city": "深圳",
+        "destination_city": "洛杉矶",
+        "declare_type_name": "买单报关",
+        "items": "充电宝; 数据线",
+    }
+    created = agent.submit_forecast_order(order)
+    assert created["status"] == "success"
+    items = created["data"]["request_payload"]["datas"][0]["items"]
+    assert [i["hscode"] for i in items] == ["850760", "854442"]
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Mock HTTP 服务测试 - 文档路径、keep-alive、gzip 与故障画像
+"""
+
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+from logistics_agent.http_api import HttpApiError, HttpLogisticsApi
+from logistics_agent.mock_http_server import MockHttpServer
+from logistics_agent.mock_logistics_api import MockLogisticsApi
+
+
+@pytest.fixture
+def server():
+    srv = MockHttpServer(port=0, workers=2, gzip_enabled=True)
+    srv.start_in_thread()
+    yield srv
+    srv.stop()
+
+
+def test_endpoints_match_in_process_mock(server):
+    api = HttpLogisticsApi(server.base_url)
+    local = MockLogisticsApi()
+    assert api.insurance() == local.insurance()
+    assert api.get_product_type() == local.get_product_type()
+
+    created = api.create_order(origin_city="深圳", destination_city="洛杉矶", customernumber1="HTTP-1")["data"][0]
+    wb = api.waybillnumber(customernumber=["HTTP-1", "NOPE"])["data"]["customernumber"]
+    assert wb[0]["systemnumber"] == created["systemnumber"] and wb[1]["code"] == -1
+    track = api.track(waybillnumber=created["systemnumber"])["data"][0]
+    assert track["systemnumber"] == created["systemnumber"]
+    assert len(api.track_many(waybillnumbers=[created["systemnumber"], "X"])["data"]) == 2
+
+    # 同一线程的多个请求复用一条 keep-alive 连接
+    assert server.stats["connections"] == 1
+    api.close()
+
+
+def test_create_forecast_over_http(server, monkeypatch):
+    from logistics_agent import agent
+
+    monkeypatch.setattr(agent, "_api", HttpLogisticsApi(server.base_url))
+    resp = agent.submit_forecast_order(
+        {
+            "origin_city": "深圳",
+            "destination_city": "洛杉矶",
+            "customernumber1": "HTTP-FC-1",
+            "consignee_countrycode": "US",
+            "consigneename": "Http",
+            "consigneeaddress1": "1 Main St",
+            "consigneecity": "Los Angeles",
+            "consigneezipcode": "90001",
+            "consigneeprovince": "CA",
+        }
+    )
+    assert resp["status"] == "success", resp
+    assert resp["data"]["order_id"]
+
+
+def test_gzip_and_unknown_route(server):
+    conn = http.client.HTTPConnection(server.host, server.port)
+    conn.request("POST", "/api/base/termsofsalecode", body=b"{}", headers={"Accept-Encoding": "gzip"})
+    resp = conn.getresponse()
+    resp.read()
+    assert resp.getheader("Content-Encoding") == "gzip"
+
+    conn.request("POST", "/api/nope", body=b"{}")
+    resp = conn.getresponse()
+    assert resp.status == 404 and json.loads(resp.read())["code"] == -1
+    conn.close()
+
+
+def test_fault_profile():
+    srv = MockHttpServer(port=0, workers=1, profile={"unavailable_rate": 1.0})
+    srv.start_in_thread()
+    try:
+        with pytest.raises(HttpApiError) as exc:
+            HttpLogisticsApi(srv.base_url).insurance()
+        assert exc.value.status == 503
+    finally:
+        srv.stop()
+
+
+def test_in_process_fault_injection_uses_same_profiles():
+    from logistics_agent.mock_logistics_api import BUSY_RESPONSE, FaultInjectingApi
+
+    api = FaultInjectingApi(MockLogisticsApi(), {"busy_rate": 1.0})
+    assert api.currency() == BUSY_RESPONSE
+    assert api.customer_code == "KJHB"
+
+
+class _DropFirstResponseServer:
+    """读完第一个请求后直接断开（模拟响应丢失），之后的连接正常应答"""
+
+    def __init__(self):
+        self.requests = 0
+        self._sock = socket.create_server(("127.0.0.1", 0))
+        self.base_url = f"http://127.0.0.1:{self._sock.getsockname()[1]}"
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            with conn, conn.makefile("rb") as f:
+                length = 0
+                while (line := f.readline()) not in (b"\r\n", b""):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":")[1])
+                f.read(length)
+                self.requests += 1
+                if self.requests > 1:
+                    body = b'{"code": 0, "data": []}'
+                    conn.sendall(
+                        b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\nConnection: close\r\n\r\n%s" % (len(body), body)
+                    )
+
+    def close(self):
+        self._sock.close()
+
+
+def test_order_creation_is_not_resent_after_the_response_is_lost():
+    srv = _DropFirstResponseServer()
+    try:
+        api = HttpLogisticsApi(srv.base_url)
+        # 请求已送达：服务端可能已经建单，不能重发
+        with pytest.raises(http.client.RemoteDisconnected):
+            api.create_forecast_order(origin_city="深圳", destination_city="洛杉矶", request_payload={})
+        assert srv.requests == 1
+        # 只读接口断开后重连重试一次
+        assert api.track(waybillnumber="W1") == {"code": 0, "data": []}
+        assert srv.requests == 2
+    finally:
+        srv.close()
+
+
+def test_create_order_accepts_endpoint(server):
+    api = HttpLogisticsApi(server.base_url)
+    created = api.create_order(
+        origin_city="深圳", destination_city="洛杉矶", customernumber1="HTTP-EP", endpoint="/api/order/create"
+    )
+    assert created["data"][0]["customernumber"] == "HTTP-EP"
+    api.close()
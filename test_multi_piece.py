@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+多件货测试 - 子单按需派生与分页、按件体积、件数与重量推导、HTTP 分页参数
+"""
+
+from logistics_agent import agent
+from logistics_agent.mock_http_server import call_kwargs
+from logistics_agent.mock_logistics_api import MockLogisticsApi
+
+
+def test_children_are_derived_lazily_and_paged():
+    api = MockLogisticsApi()
+    first = api.create_order(origin_city="深圳", destination_city="洛杉矶", customernumber1="MP-1", number=5000)["data"][0]
+    assert first["childCount"] == 5000
+    assert len(first["childs"]) == 100 and first["childNextOffset"] == 100
+    assert "childs" not in api._orders_by_customernumber["MP-1"]
+
+    item = api.waybillnumber(customernumber=["MP-1"], child_offset=4950, child_limit=100)["data"]["customernumber"][0]
+    assert len(item["childs"]) == 50 and item["childNextOffset"] is None
+    assert item["childs"][-1]["systemnumber"] == f"{first['systemnumber']}-5000"
+    assert item["tracknumber"] == first["childs"][0]["tracknumber"]
+
+    # 同一件在不同页、不同接口里编号一致
+    again = api.waybillnumber(customernumber=["MP-1"], child_offset=0, child_limit=1)["data"]["customernumber"][0]
+    assert again["childs"] == first["childs"][:1]
+
+    entry = api.track(waybillnumber=first["systemnumber"], child_offset=100, child_limit=10)["data"][0]
+    assert entry["subOrderCount"] == 5000 and entry["subOrderNextOffset"] == 110
+    assert [c["systemnumber"] for c in entry["subOrderList"]] == [f"{first['systemnumber']}-{i}" for i in range(101, 111)]
+
+
+def test_single_piece_order_keeps_full_childs():
+    first = MockLogisticsApi().create_order(origin_city="深圳", destination_city="纽约", customernumber1="MP-2")["data"][0]
+    assert len(first["childs"]) == 1 and first["childCount"] == 1 and first["childNextOffset"] is None
+
+
+def test_volumes_define_pieces_and_weight():
+    resp = agent.build_create_forecast_payload(
+        customernumber1="MP-3",
+        consignee_countrycode="US",
+        consigneename="Pallet",
+        consigneeaddress1="1 Dock Rd",
+        consigneecity="Los Angeles",
+        consigneezipcode="90001",
+        consigneeprovince="CA",
+        volumes=[
+            {"length": 40, "width": 30, "height": 20, "weight": 2.5, "count": 4998},
+            {"length": 120, "width": 100, "height": 15, "weight": 20},
+            {"length": 120, "width": 100, "height": 15, "weight": 20},
+        ],
+    )
+    datas = resp["data"]["payload"]["datas"][0]
+    assert [v["prenum"] for v in datas["volumes"]] == ["4998", "1", "1"]
+    assert datas["volumes"][0]["prerweight"] == "12495"
+    assert datas["order"]["number"] == 5000
+    assert datas["order"]["forecastweight"] == "12535.0"
+
+    bad = agent.build_create_forecast_payload(
+        customernumber1="MP-4",
+        consignee_countrycode="US",
+        consigneename="Pallet",
+        consigneeaddress1="1 Dock Rd",
+        consigneecity="Los Angeles",
+        consigneezipcode="90001",
+        consigneeprovince="CA",
+        number=3,
+        volumes=[{"length": 1, "width": 1, "height": 1, "weight": 1, "count": 2}],
+    )
+    assert bad["status"] == "error" and "does not match" in bad["error"]["reason"]
+
+
+def test_agent_order_with_many_pieces_pages_through_children():
+    resp = agent.submit_forecast_order(
+        {
+            "origin_city": "深圳",
+            "destination_city": "洛杉矶",
+            "customernumber1": "MP-5",
+            "consignee_countrycode": "US",
+            "consigneename": "Warehouse",
+            "consigneeaddress1": "9 Port Ave",
+            "consigneecity": "Long Beach",
+            "consigneezipcode": "90802",
+            "consigneeprovince": "CA",
+            "volumes": [{"length": 50, "width": 40, "height": 30, "weight": 8, "count": 2000}],
+        }
+    )
+    assert resp["status"] == "success"
+    assert resp["data"]["child_count"] == 2000
+    order_id = resp["data"]["order_id"]
+
+    page = agent.query_order_status(order_id, child_offset=1990)
+    raw = page["data"]["raw"]["data"][0]
+    assert len(raw["subOrderList"]) == 10 and raw["subOrderNextOffset"] is None
+
+    bad = agent.query_order_status(order_id, child_offset="next")
+    assert bad["status"] == "error" and bad["error"]["message"] == "invalid child page"
+
+
+def test_http_paging_parameters():
+    kwargs = call_kwargs("track", {"datas": {"waybillnumber": "X", "childOffset": "20", "childLimit": 5}}, {})
+    assert kwargs == {"waybillnumber": "X", "child_offset": 20, "child_limit": 5}
+    assert call_kwargs("waybillnumber", {"datas": {"customernumber": ["A"]}}, {}) == {"customernumber": ["A"]}
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+增量草稿测试 - 验证逐字段校验、增量返回与缺失字段集合
+"""
+
+from logistics_agent import agent
+
+
+def test_draft_returns_delta_and_field_errors():
+    resp = agent.update_forecast_order_draft("从深圳到洛杉矶；customernumber1=DR-1；险种=火星险", reset=True)
+    data = resp["data"]
+    assert set(data["delta"]) == {"origin_city", "destination_city", "customernumber1"}
+    assert "insurance_type_name" in data["field_errors"]
+    assert "draft" not in data
+    assert data["missing_fields"][0] == "consignee_countrycode"
+
+    resp = agent.update_forecast_order_draft("收件国家=US；邮编=ABC；险种=货物运输险")
+    data = resp["data"]
+    assert data["delta"] == {"consignee_countrycode": "US", "insurance_type_name": "货物运输险"}
+    assert list(data["field_errors"]) == ["consigneezipcode"]
+    assert "consigneezipcode" in data["missing_fields"]
+
+
+def test_draft_becomes_ready_and_submits():
+    agent.update_forecast_order_draft("从深圳到洛杉矶；customernumber1=DR-2；报关类型=需要报关", reset=True)
+    resp = agent.update_forecast_order_draft("收件国家=US；收件人=John；收件地址=1 Main St；城市=Los Angeles；邮编=90001；省州=CA")
+    assert resp["data"]["missing_fields"] == []
+    assert resp["data"]["ready"] is False
+    assert "declare_type_name" in resp["data"]["pending_field_errors"]
+
+    # 还有字段错误时拒绝提交，并像缺失字段一样返回这些错误
+    refused = agent.submit_forecast_order_draft()
+    assert refused["status"] == "error" and refused["error"]["message"] == "draft has invalid fields"
+    assert list(refused["error"]["field_errors"]) == ["declare_type_name"]
+
+    resp = agent.update_forecast_order_draft("报关类型=买单报关")
+    assert resp["data"]["ready"] is True
+    assert resp["data"]["draft"]["declare_type_name"] == "买单报关"
+
+    assert agent.submit_forecast_order_draft()["status"] == "success"
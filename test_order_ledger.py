@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+列式订单台账测试 - 扩容、分组汇总与纯 Python 结果一致、过滤与 get_shipping_stats 工具
+"""
+
+import random
+from collections import defaultdict
+
+import pytest
+
+from logistics_agent import agent
+from logistics_agent.order_ledger import OrderLedger
+from logistics_agent.order_store import parse_time_bound
+
+T0 = 1_767_225_600.0  # 2026-01-01 08:00:00 UTC+8（周四）
+CHANNELS = ["HK_TNT", "US_UPS", "CN_EMS"]
+COUNTRIES = ["US", "GB", "AU"]
+
+
+def _rows(n: int = 2000, seed: int = 3) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "timestamp": T0 + i * 1800,
+            "channelid": rng.choice(CHANNELS),
+            "countrycode": rng.choice(COUNTRIES),
+            "forecastweight": round(rng.uniform(0.1, 30), 2),
+            "number": rng.randint(1, 5),
+            "is_remote": rng.random() < 0.2,
+            "insurance_value": rng.choice([0.0, 100.0, 250.5]),
+        }
+        for i in range(n)
+    ]
+
+
+def test_group_by_matches_python_loop_across_growth():
+    rows = _rows()
+    ledger = OrderLedger(initial_capacity=4)
+    for r in rows:
+        ledger.append(**r)
+    assert len(ledger) == len(rows) and ledger.stats()["capacity"] >= len(rows)
+
+    expected = defaultdict(lambda: [0, 0.0, 0])
+    for r in rows:
+        if r["countrycode"] == "US":
+            e = expected[r["channelid"]]
+            e[0] += 1
+            e[1] += r["forecastweight"]
+            e[2] += r["is_remote"]
+
+    result = ledger.aggregate(group_by="channelid", countrycode="us", sort_by="remote_orders")
+    got = {g["group"]: [g["orders"], g["weight_kg"], g["remote_orders"]] for g in result["groups"]}
+    assert got.keys() == expected.keys()
+    for ch, (orders, kg, remote) in expected.items():
+        assert got[ch][0] == orders and got[ch][2] == remote
+        assert got[ch][1] == pytest.approx(kg, abs=1e-3)
+    assert [g["remote_orders"] for g in result["groups"]] == sorted((g["remote_orders"] for g in result["groups"]), reverse=True)
+
+
+def test_extend_matches_append_and_filters():
+    rows = _rows(500)
+    a, b = OrderLedger(), OrderLedger()
+    for r in rows:
+        a.append(**r)
+    b.extend(**{k: [r[k] for r in rows] for k in rows[0]})
+    kwargs = dict(group_by="countrycode", is_remote=False, since=T0 + 3600 * 24, until=T0 + 3600 * 120)
+    assert a.aggregate(**kwargs) == b.aggregate(**kwargs)
+
+    total = a.aggregate()
+    assert total["groups"][0]["orders"] == 500
+    assert a.aggregate(countrycode="FR")["groups"][0]["orders"] == 0
+
+
+def test_group_by_day_uses_utc8_dates():
+    ledger = OrderLedger()
+    for r in _rows(96):  # 48 小时
+        ledger.append(**r)
+    days = ledger.aggregate(group_by="day")["groups"]
+    assert [d["group"] for d in days] == ["2026-01-01", "2026-01-02", "2026-01-03"]
+    assert sum(d["orders"] for d in days) == 96
+    assert days[0]["orders"] == 32  # 08:00 到当日 24:00
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        OrderLedger().aggregate(group_by="city")
+    with pytest.raises(ValueError):
+        OrderLedger().aggregate(sort_by="revenue")
+
+
+def test_this_week_bounds():
+    start = parse_time_bound("this week", now=T0)
+    assert parse_time_bound("this week", now=T0, end=True) - start == 7 * 86400
+    assert start == parse_time_bound("2025-12-29", now=T0)  # 周一
+
+
+def test_get_shipping_stats_tool_counts_created_orders():
+    before = agent.get_shipping_stats(countrycode="AU")["data"]["groups"][0]["orders"]
+    order = {
+        "origin_city": "深圳",
+        "destination_city": "悉尼",
+        "customernumber1": "STATS-0001",
+        "consignee_countrycode": "AU",
+        "consigneename": "Stats",
+        "consigneeaddress1": "1 George St",
+        "consigneecity": "Sydney",
+        "consigneezipcode": "2000",
+        "consigneeprovince": "NSW",
+        "forecastweight": 3.5,
+    }
+    agent.submit_order_fields_idempotent(order)
+    agent.submit_order_fields_idempotent(order)  # 幂等重放不重复计入
+    resp = agent.get_shipping_stats(group_by="countrycode", countrycode="AU", since="this week")
+    assert resp["status"] == "success"
+    (group,) = resp["data"]["groups"]
+    assert group["group"] == "AU" and group["orders"] == before + 1
+    assert agent.get_shipping_stats(sort_by="nope")["status"] == "error"
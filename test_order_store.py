@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+订单库测试 - 插入即建索引、过滤组合、游标分页、状态迁移（含推送轨迹）与 list_orders 工具
+"""
+
+import pytest
+
+from logistics_agent import agent
+from logistics_agent.order_store import InvalidCursorError, OrderStore, parse_time_bound
+from logistics_agent.shipment_lifecycle import VirtualClock
+
+T0 = 1_767_225_600.0  # 2026-01-01 08:00:00 UTC+8
+CITIES = [("洛杉矶", "Los Angeles", "US"), ("纽约", "New York", "US"), ("伦敦", "London", "GB")]
+
+
+def _store(n: int = 300) -> OrderStore:
+    store = OrderStore(VirtualClock(T0))
+    for i in range(n):
+        dest, city, country = CITIES[i % 3]
+        store.add(
+            order_id=f"{10_000_000_000_000 + i}",
+            customernumber=f"OS-{i:05d}",
+            origin_city="深圳",
+            destination_city=dest,
+            consigneecity=city,
+            countrycode=country,
+            created_at=T0 + i * 600,
+        )
+    return store
+
+
+def _all_pages(store: OrderStore, **filters) -> list[dict]:
+    out, cursor = [], None
+    while True:
+        page = store.query(cursor=cursor, **filters)
+        out.extend(page["orders"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return out
+
+
+def test_pagination_returns_every_match_once_newest_first():
+    store = _store()
+    orders = _all_pages(store, destination_city="los angeles", limit=7)
+    assert len(orders) == 100
+    assert len({o["order_id"] for o in orders}) == 100
+    assert [o["order_id"] for o in orders] == sorted((o["order_id"] for o in orders), reverse=True)
+    # 中文目的城市与收件城市命中同一索引
+    assert _all_pages(store, destination_city="洛杉矶", limit=50) == orders
+
+
+def test_combined_filters_and_time_range():
+    store = _store()
+    after = T0 + 100 * 600
+    before = T0 + 200 * 600
+    orders = _all_pages(store, countrycode="us", created_after=after, created_before=before, limit=25)
+    expected = [i for i in range(100, 200) if CITIES[i % 3][2] == "US"]
+    assert sorted(int(o["customernumber"][3:]) for o in orders) == expected
+    assert store.query(destination_city="Paris")["orders"] == []
+
+
+def test_status_index_follows_updates():
+    store = _store(30)
+    assert store.update_status("OS-00003", "InTransit")
+    assert not store.update_status("OS-00003", "intransit")
+    assert not store.update_status("missing", "Delivered")
+    assert [o["customernumber"] for o in store.query(status="InTransit")["orders"]] == ["OS-00003"]
+    assert len(_all_pages(store, status="created")) == 29
+
+
+def test_created_at_never_decreases_and_duplicates_are_ignored():
+    store = _store(3)
+    first = store.add(order_id="10000000000000", customernumber="dup")
+    assert first.customernumber == "OS-00000" and len(store) == 3
+    late = store.add(order_id="X", created_at=T0 - 3600)
+    assert late.created_at == T0 + 2 * 600
+
+
+def test_invalid_inputs():
+    with pytest.raises(InvalidCursorError):
+        _store(3).query(cursor="not-a-cursor")
+    with pytest.raises(ValueError):
+        parse_time_bound("next week", now=T0)
+    day = parse_time_bound("2026-01-01", now=T0)
+    assert parse_time_bound("2026-01-01", now=T0, end=True) - day == 86400
+    assert parse_time_bound("today", now=T0) == day
+
+
+def test_list_orders_tool_sees_created_orders():
+    order = {
+        "origin_city": "深圳",
+        "destination_city": "洛杉矶",
+        "customernumber1": "LIST-0001",
+        "consignee_countrycode": "US",
+        "consigneename": "List",
+        "consigneeaddress1": "1 Main St",
+        "consigneecity": "Los Angeles",
+        "consigneezipcode": "90001",
+        "consigneeprovince": "CA",
+    }
+    created = agent.submit_order_fields_idempotent(order)
+    resp = agent.list_orders(destination_city="Los Angeles", created_after="today", limit=200)
+    assert resp["status"] == "success"
+    assert created["data"]["order_id"] in {o["order_id"] for o in resp["data"]["orders"]}
+
+    assert agent.list_orders(created_after="someday")["status"] == "error"
+    assert agent.list_orders(cursor="???")["status"] == "error"
+
+
+def test_pushed_tracking_status_reaches_the_status_index():
+    order = {
+        "origin_city": "深圳",
+        "destination_city": "洛杉矶",
+        "customernumber1": "LIST-PUSH-1",
+        "consignee_countrycode": "US",
+        "consigneename": "Push",
+        "consigneeaddress1": "1 Main St",
+        "consigneecity": "Los Angeles",
+        "consigneezipcode": "90001",
+        "consigneeprovince": "CA",
+    }
+    created = agent.submit_order_fields_idempotent(order)["data"]
+    event = {
+        "systemnumber": created["order_id"],
+        "trackdate_utc8": "2026-01-02 10:00:00",
+        "info": "已签收",
+        "orderstatus": "Delivered",
+    }
+    assert agent.ingest_tracking_events([event])["data"]["accepted"] == 1
+    delivered = agent.list_orders(status="Delivered", limit=200)["data"]["orders"]
+    assert created["order_id"] in {o["order_id"] for o in delivered}
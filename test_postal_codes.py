@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+本地邮编索引测试 - 定长文件二分查询、嵌套区间构建、补齐与不一致提示、草稿与文本下单的自动补齐、不一致时不下单
+"""
+
+import pytest
+
+from logistics_agent import agent
+from logistics_agent.postal_codes import PostalCodeDirectory, build, postal_codes
+
+
+def test_us_lookup_by_range():
+    assert postal_codes.lookup("US", "90001") == {"postal_code": "90001", "province": "CA", "city": "Los Angeles"}
+    assert postal_codes.lookup("us", "10001-1234")["city"] == "New York"
+    # 只覆盖到州的区间：城市为空
+    assert postal_codes.lookup("US", "60007") == {"postal_code": "60007", "province": "IL", "city": ""}
+    assert postal_codes.lookup("US", "9000") is None
+    assert postal_codes.lookup("US", "00100") is None
+    assert postal_codes.lookup("ZZ", "12345") is None
+
+
+def test_build_flattens_nested_numeric_ranges(tmp_path):
+    rows = [("10000", "19999", "AA", ""), ("12000", "12099", "AA", "Inner"), ("30000", "30000", "BB", "Single")]
+    assert build(rows, str(tmp_path / "XX.txt"), country="XX", code_width=5) == 4
+    directory = PostalCodeDirectory(str(tmp_path))
+    assert directory.lookup("XX", "11999")["city"] == ""
+    assert directory.lookup("XX", "12050")["city"] == "Inner"
+    assert directory.lookup("XX", "12100") == {"postal_code": "12100", "province": "AA", "city": ""}
+    assert directory.lookup("XX", "30000")["city"] == "Single"
+    assert directory.lookup("XX", "30001") is None
+    assert directory.stats()["XX"]["records"] == 4
+
+    with pytest.raises(ValueError):
+        build([("A1A", "B9Z", "ON", ""), ("B1A", "C9Z", "QC", "")], str(tmp_path / "YY.txt"), country="YY", code_width=3)
+
+
+def test_check_fills_missing_and_flags_mismatches():
+    check = postal_codes.check("US", "94103", city=None, province="California")
+    assert check["fill"] == {"consigneecity": "San Francisco"}
+    assert check["mismatches"] == {}
+
+    check = postal_codes.check("US", "94103", city="Oakland", province="NY")
+    assert check["fill"] == {}
+    assert check["mismatches"] == {"consigneeprovince": "CA", "consigneecity": "San Francisco"}
+
+
+def test_draft_autofills_city_and_state_from_zipcode():
+    agent.update_forecast_order_draft("从深圳到洛杉矶；customernumber1=PC-1", reset=True)
+    resp = agent.update_forecast_order_draft("收件国家=US；收件人=John；收件地址=1 Main St；邮编=90001")
+    data = resp["data"]
+    assert data["autofilled"] == {"consigneeprovince": "CA", "consigneecity": "Los Angeles"}
+    assert data["ready"] is True and data["missing_fields"] == []
+
+    # 邮编变化：自动补齐的值跟着变
+    data = agent.update_forecast_order_draft("邮编=10001")["data"]
+    assert data["draft"]["consigneecity"] == "New York" and data["draft"]["consigneeprovince"] == "NY"
+
+    # 用户明确填写的值不会被覆盖，只提示不一致
+    data = agent.update_forecast_order_draft("城市=Boston")["data"]
+    assert data["draft"]["consigneecity"] == "Boston"
+    assert list(data["postal_code_warnings"]) == ["consigneecity"]
+
+
+def test_text_order_without_city_and_state_submits():
+    resp = agent.submit_forecast_order_from_text(
+        "从深圳到洛杉矶；customernumber1=PC-TEXT-1；收件国家=US；收件人=Ann；收件地址=9 Pine St；邮编=98101"
+    )
+    assert resp["status"] == "success"
+    assert resp["data"]["autofilled"] == {"consigneeprovince": "WA", "consigneecity": "Seattle"}
+
+
+def test_text_order_with_mismatched_zipcode_is_not_submitted():
+    text = "从深圳到洛杉矶；customernumber1=PC-MISMATCH-1；收件国家=US；收件人=Ann；收件地址=1 Main St；邮编=90001；城市: New York；州: NY"
+    before = agent._order_store.stats()["orders"]
+    resp = agent.submit_forecast_order_from_text(text)
+    assert resp["status"] == "error"
+    assert set(resp["error"]["postal_code_warnings"]) == {"consigneecity", "consigneeprovince"}
+    assert agent._order_store.stats()["orders"] == before
+
+    confirmed = agent.submit_forecast_order_from_text(text, confirm_postal_mismatch=True)
+    assert confirmed["status"] == "success" and confirmed["data"]["postal_code_warnings"]
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+工具级性能剖析测试 - 验证开关、按名称/采样选择与剖析文件输出、环境变量采样率容错
+"""
+
+import inspect
+import logging
+import os
+
+from logistics_agent.profiling import DEFAULT_SAMPLE_RATE, ToolProfiler
+
+
+def build_rows(n: int, label: str = "x") -> list:
+    """构造一些分配，便于 tracemalloc 报告"""
+    return [f"{label}-{i}" * 4 for i in range(n)]
+
+
+def other_tool() -> int:
+    return 1
+
+
+def test_disabled_profiler_is_transparent(tmp_path):
+    prof = ToolProfiler(output_dir=str(tmp_path))
+    wrapped = prof.wrap(build_rows)
+    assert wrapped.__name__ == "build_rows"
+    assert inspect.signature(wrapped) == inspect.signature(build_rows)
+    assert wrapped(3) == build_rows(3)
+    assert prof.recent() == []
+    assert os.listdir(tmp_path) == []
+
+
+def test_profiles_selected_tools_only(tmp_path):
+    prof = ToolProfiler(output_dir=str(tmp_path))
+    prof.enable(tools="build_rows")
+    rows, other = prof.wrap(build_rows), prof.wrap(other_tool)
+
+    assert len(rows(2000, label="y")) == 2000
+    assert other() == 1
+
+    recent = prof.recent()
+    assert [r["tool"] for r in recent] == ["build_rows"]
+    assert os.path.exists(recent[0]["profile_path"])
+    with open(recent[0]["report_path"], encoding="utf-8") as f:
+        report = f.read()
+    assert "== allocations" in report and "build_rows" in report
+
+    prof.disable()
+    rows(10)
+    assert len(prof.recent()) == 1
+
+
+def test_sample_rate_zero_skips_all_calls(tmp_path):
+    prof = ToolProfiler(output_dir=str(tmp_path), tools="*", sample_rate=0.0, enabled=True)
+    wrapped = prof.wrap(other_tool)
+    for _ in range(20):
+        wrapped()
+    assert prof.status()["profiled_calls"] == 0
+
+
+def test_bad_sample_rate_env_falls_back_to_default(monkeypatch, caplog):
+    monkeypatch.setenv("LOGISTICS_PROFILE_TOOLS", "build_rows")
+    for raw in ("abc", "1.5"):
+        monkeypatch.setenv("LOGISTICS_PROFILE_SAMPLE", raw)
+        with caplog.at_level(logging.WARNING, logger="logistics_agent.profiling"):
+            prof = ToolProfiler.from_env()
+        assert prof.active and prof.sample_rate == DEFAULT_SAMPLE_RATE
+        assert "LOGISTICS_PROFILE_SAMPLE" in caplog.text
+    monkeypatch.setenv("LOGISTICS_PROFILE_SAMPLE", "0.25")
+    assert ToolProfiler.from_env().sample_rate == 0.25
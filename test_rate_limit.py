@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+出站限流测试 - 令牌桶、AIMD 并发上限的增减、在有容量上限的 mock 上收敛、环境变量解析
+"""
+
+import threading
+
+import pytest
+
+from logistics_agent.mock_logistics_api import FaultInjectingApi, MockLogisticsApi
+from logistics_agent.rate_limit import (
+    AimdLimiter,
+    EndpointLimiter,
+    RateLimitedApi,
+    RateLimitTimeout,
+    TokenBucket,
+    limiter_stats,
+    parse_rates,
+    wrap_from_env,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def test_token_bucket_allows_burst_then_paces_at_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(10, burst=3, clock=clock, sleep=clock.sleep)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.acquire() == pytest.approx(0.1)
+    assert bucket.acquire() == pytest.approx(0.1)
+    assert clock.now == pytest.approx(0.2)
+    clock.now += 10  # 长时间空闲后最多攒满 burst
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    with pytest.raises(RateLimitTimeout):
+        bucket.acquire(max_wait=0.05)
+
+
+def test_aimd_decreases_on_overload_and_grows_when_healthy():
+    clock = FakeClock()
+    lim = AimdLimiter(initial_limit=10, max_limit=20, clock=clock)
+    lim.acquire()
+    lim.release(0.01, overloaded=True)
+    assert lim.limit == 7 and lim.decreases == 1
+
+    # 同一个往返时间内的连续繁忙只减一次
+    lim.acquire()
+    lim.release(0.01, overloaded=True)
+    assert lim.limit == 7
+
+    for _ in range(100):
+        for _ in range(lim.limit):
+            lim.acquire()
+        clock.now += 0.01
+        for _ in range(lim.limit):
+            lim.release(0.01)
+    assert lim.limit == 20
+
+
+def test_aimd_blocks_at_limit_and_times_out():
+    lim = AimdLimiter(initial_limit=1, max_limit=1)
+    lim.acquire()
+    with pytest.raises(RateLimitTimeout):
+        lim.acquire(max_wait=0.01)
+    lim.release(0.001)
+    assert lim.acquire(max_wait=0.01) < 0.01
+
+
+def test_endpoint_limiter_counts_overload_responses_and_rejections():
+    lim = EndpointLimiter("create", max_concurrency=4)
+    assert lim.call(lambda: {"code": -1, "message": "busy"})["code"] == -1
+    assert lim.call(lambda: {"code": 0})["code"] == 0
+    stats = lim.stats()
+    assert stats["calls"] == 2 and stats["overload_signals"] == 1
+    assert stats["concurrency"]["decreases"] == 1
+
+    throttled = EndpointLimiter("slow", rate=1, burst=1, max_wait=0.01)
+    throttled.call(lambda: None)
+    with pytest.raises(RateLimitTimeout):
+        throttled.call(lambda: None)
+    assert throttled.stats()["rejected"] == 1
+
+
+def test_limit_converges_near_backend_capacity():
+    backend = FaultInjectingApi(MockLogisticsApi(), "throttled", seed=7)
+    api = RateLimitedApi(backend, max_concurrency=32, initial_concurrency=4)
+    busy = 0
+    lock = threading.Lock()
+
+    def worker():
+        nonlocal busy
+        for _ in range(25):
+            resp = api.insurance()
+            if resp.get("code") == -1:
+                with lock:
+                    busy += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(24)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = api.limiter_stats()["insurance"]
+    assert stats["calls"] == 600
+    # 后端容量为 8：上限应在其附近徘徊，而不是涨到 32；繁忙响应只占少数
+    assert 2 <= stats["concurrency"]["limit"] <= 16
+    assert busy < 600 * 0.1
+
+
+def test_parse_rates_and_wrap_from_env(monkeypatch):
+    assert parse_rates("*=50, create_forecast_order=20") == {"*": 50.0, "create_forecast_order": 20.0}
+    assert parse_rates("30") == {"*": 30.0}
+    assert parse_rates("") == {}
+    with pytest.raises(ValueError):
+        parse_rates("track=fast")
+
+    api = MockLogisticsApi()
+    monkeypatch.delenv("LOGISTICS_API_RATE_LIMITS", raising=False)
+    monkeypatch.delenv("LOGISTICS_API_MAX_CONCURRENCY", raising=False)
+    assert wrap_from_env(api) is api
+    assert limiter_stats(api) is None
+
+    monkeypatch.setenv("LOGISTICS_API_RATE_LIMITS", "*=1000,track=5")
+    wrapped = wrap_from_env(api)
+    assert wrapped.insurance()["code"] == 0
+    assert wrapped.limiter("track").bucket.rate == 5
+    assert limiter_stats(wrapped)["insurance"]["rate_per_s"] == 1000
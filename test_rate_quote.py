@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+运价报价测试 - 重量段与计费重、燃油与偏远费、批量与单票一致、渠道可用性、报价工具与下单 isRemote 一致
+"""
+
+import numpy as np
+import pytest
+
+from logistics_agent import agent
+from logistics_agent.rate_quote import RateCard, rate_card
+
+
+def _by_channel(quote):
+    return {q["channelid"]: q for q in quote["quotes"]}
+
+
+def test_weight_breaks_fuel_and_volumetric_weight():
+    quotes = _by_channel(rate_card.quote("US", 3.2, postal_code="90001"))
+    tnt = quotes["HK_TNT"]
+    # 3.2 kg 按 0.5 kg 进位为 3.5 kg，落在 2-5 kg 段（80 CNY/kg），燃油 21.5%
+    assert tnt["chargeable_weight"] == 3.5
+    assert (tnt["base"], tnt["fuel_surcharge"], tnt["remote_fee"], tnt["total"]) == (280.0, 60.2, 0.0, 340.2)
+    # 专线按 0.1 kg 进位
+    assert quotes["SZ_US_ECO"]["chargeable_weight"] == 3.2
+
+    # 体积重 60*40*40/5000 = 19.2 kg 大于实重
+    bulky = _by_channel(rate_card.quote("US", 2, volume_cm3=60 * 40 * 40))
+    assert bulky["HK_TNT"]["chargeable_weight"] == 19.5
+    # EMS 除数 8000：12 kg
+    assert bulky["CN_EMS"]["chargeable_weight"] == 12.0
+
+
+def test_remote_areas_and_channel_availability():
+    quote = rate_card.quote("US", 1, postal_code="99501")
+    assert quote["remote"] is True
+    assert _by_channel(quote)["HK_TNT"]["remote_fee"] == 180.0
+    # 专线不派送偏远地区；只做美国
+    assert "SZ_US_ECO" in quote["unavailable"]
+    assert "SZ_US_ECO" in rate_card.quote("CA", 1)["unavailable"]
+    # 超过 EMS 的 30 kg 上限
+    assert "CN_EMS" in rate_card.quote("DE", 31)["unavailable"]
+    assert rate_card.is_remote("GB", "KW16 3AB") and not rate_card.is_remote("GB", "SW1A 1AA")
+
+
+def test_batch_matches_single_quotes():
+    rng = np.random.default_rng(7)
+    countries = rng.choice(["US", "GB", "DE", "JP", "AU", "BR"], 200)
+    weights = np.round(rng.uniform(0.1, 40, 200), 2)
+    volumes = rng.uniform(0, 150_000, 200)
+    zips = rng.choice(["90001", "99501", "HS1 2AA", "0870", "10115", ""], 200)
+    batch = rate_card.quote_batch(countries, weights, volumes_cm3=volumes, postal_codes=zips)
+    assert batch["total"].shape == (200, len(rate_card.channel_ids))
+    for i in range(0, 200, 17):
+        single = rate_card.quote(countries[i], weights[i], volume_cm3=volumes[i], postal_code=zips[i])
+        for q in single["quotes"]:
+            assert batch["total"][i, rate_card.channel_ids.index(q["channelid"])] == q["total"]
+        for cid in single["unavailable"]:
+            assert not batch["available"][i, rate_card.channel_ids.index(cid)]
+
+
+def test_card_validation_and_stats():
+    card = {"zones": {"US": 1}, "channels": [{"channelid": "X", "weight_breaks": [1, 2], "min_charge": [1], "rates": [[1]]}]}
+    with pytest.raises(ValueError, match="one rate per weight break"):
+        RateCard(card=card).quote("US", 1)
+    assert rate_card.stats()["channels"] == len(rate_card.channel_ids)
+
+
+def test_quote_tool_and_forecast_order_remote_flag_agree():
+    resp = agent.quote_shipping_rates(
+        "US", consigneezipcode="99501", volumes=[{"length": 30, "width": 20, "height": 10, "weight": 1.5, "count": 2}],
+        sort_by="transit", limit=2,
+    )
+    assert resp["status"] == "success"
+    data = resp["data"]
+    assert data["weight"] == 3.0 and data["remote"] is True and len(data["quotes"]) == 2
+    assert data["quotes"][0]["channelid"] == data["fastest"]
+    assert agent.quote_shipping_rates("US", volumes=[{"length": 1}])["status"] == "error"
+
+    order = dict(
+        origin_city="深圳", destination_city="安克雷奇", consignee_countrycode="US", consigneename="Ann",
+        consigneeaddress1="1 Bay Rd", consigneecity="Anchorage", consigneeprovince="AK",
+    )
+    remote = agent.create_forecast_order_with_preferences(customernumber1="RQ-1", consigneezipcode="99501", **order)
+    near = agent.create_forecast_order_with_preferences(customernumber1="RQ-2", consigneezipcode="90001", **order)
+    assert remote["data"]["result"]["data"][0]["isRemote"] is True
+    assert near["data"]["result"]["data"][0]["isRemote"] is False
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+优先级调度测试 - 交互调用优先、批量并发上限、排队超时丢弃、优先级随 context 传递、后台补运单号走批量优先级
+"""
+
+import threading
+import time
+
+import pytest
+
+from logistics_agent import agent
+from logistics_agent.mock_logistics_api import MockLogisticsApi
+from logistics_agent.scheduler import BULK, INTERACTIVE, LoadShedError, PriorityScheduler, current_priority, priority
+from logistics_agent.tenant_pool import TenantPool
+from logistics_agent.tracing import propagate
+
+
+def _wait_queued(sched: PriorityScheduler, p: str, n: int) -> None:
+    deadline = time.monotonic() + 2
+    while sched.stats()[p]["queued"] < n:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_queued_interactive_runs_before_earlier_bulk():
+    sched = PriorityScheduler(1, bulk_queue_deadline=None)
+    order: list[str] = []
+    sched.acquire(BULK)
+
+    def run(p: str):
+        with sched.slot(p):
+            order.append(p)
+
+    bulk = threading.Thread(target=run, args=(BULK,))
+    bulk.start()
+    _wait_queued(sched, BULK, 1)
+    interactive = threading.Thread(target=run, args=(INTERACTIVE,))
+    interactive.start()
+    _wait_queued(sched, INTERACTIVE, 1)
+
+    sched.release(BULK)
+    bulk.join()
+    interactive.join()
+    assert order == [INTERACTIVE, BULK]
+
+
+def test_bulk_is_capped_and_leaves_room_for_interactive():
+    sched = PriorityScheduler(4, bulk_max_concurrency=2, bulk_queue_deadline=0.05)
+    sched.acquire(BULK)
+    sched.acquire(BULK)
+    with pytest.raises(LoadShedError):
+        sched.acquire(BULK)
+    assert sched.acquire(INTERACTIVE) < 0.01
+    stats = sched.stats()
+    assert stats[BULK]["in_flight"] == 2 and stats[BULK]["shed"] == 1 and stats[BULK]["queued"] == 0
+    assert stats[INTERACTIVE]["in_flight"] == 1
+
+
+def test_priority_follows_context_into_worker_threads():
+    sched = PriorityScheduler(2)
+    api = sched.wrap(MockLogisticsApi())
+    seen: list[str] = []
+
+    def worker():
+        seen.append(current_priority())
+        api.insurance()
+
+    with priority(BULK):
+        t = threading.Thread(target=propagate(worker))
+    t.start()
+    t.join()
+    assert seen == [BULK]
+    assert sched.stats()[BULK]["completed"] == 1
+    assert current_priority() == INTERACTIVE
+
+    raw = MockLogisticsApi()
+    assert PriorityScheduler(0).wrap(raw) is raw
+
+
+def test_shed_bulk_order_is_reported_as_retryable(monkeypatch):
+    sched = PriorityScheduler(1, bulk_queue_deadline=0.01)
+    monkeypatch.setattr(agent, "_scheduler", sched)
+    sched.acquire(INTERACTIVE)
+    try:
+        with priority(BULK):
+            resp = agent.submit_order_fields_idempotent(
+                {
+                    "origin_city": "深圳",
+                    "destination_city": "洛杉矶",
+                    "customernumber1": "SHED-0001",
+                    "consignee_countrycode": "US",
+                    "consigneename": "Shed",
+                    "consigneeaddress1": "1 Main St",
+                    "consigneecity": "Los Angeles",
+                    "consigneezipcode": "90001",
+                    "consigneeprovince": "CA",
+                }
+            )
+    finally:
+        sched.release(INTERACTIVE)
+    assert resp["status"] == "error"
+    assert resp["error"]["retryable"] is True
+    assert sched.stats()[BULK]["shed"] == 1
+
+
+def test_tenant_waybill_resolver_runs_as_bulk(monkeypatch):
+    sched = PriorityScheduler(4)
+    monkeypatch.setattr(agent, "_scheduler", sched)
+    pool = TenantPool(lambda code, token: MockLogisticsApi(customer_code=code, token=token), idle_ttl_seconds=0)
+    with pool.lease("SCHED", "tok"):
+        resolver = agent._active_waybill_resolver()
+        resolver.enqueue("NO-SUCH-ORDER")
+        resolver.flush()
+    assert pool.evict_idle() == 1
+    assert sched.stats()[BULK]["completed"] >= 1
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+虚拟时钟与运单生命周期测试 - 时间线确定性、按虚拟时间推进、轨迹国家与到达地取自订单、与轨迹订阅联动
+"""
+
+from logistics_agent.mock_logistics_api import MockLogisticsApi
+from logistics_agent.shipment_lifecycle import MILESTONES, VirtualClock, build_timeline
+from logistics_agent.tracking_subscriptions import TrackingHub
+
+T0 = 1_767_225_600.0  # 2026-01-01 00:00:00 UTC
+
+
+def test_timeline_is_deterministic_and_ordered():
+    a = build_timeline("10000000000001", T0)
+    assert a == build_timeline("10000000000001", T0)
+    assert a != build_timeline("10000000000002", T0)
+    assert [m["milestone"] for m in a] == [m[0] for m in MILESTONES]
+    assert all(x["at"] < y["at"] for x, y in zip(a, a[1:]))
+    assert a[-1]["at"] - T0 <= 7 * 24 * 3600
+
+
+def test_track_follows_virtual_clock():
+    clock = VirtualClock(T0)
+    api = MockLogisticsApi(clock=clock)
+    order = api.create_order(origin_city="深圳", destination_city="洛杉矶", customernumber1="LC-1")["data"][0]
+
+    data = api.track(waybillnumber=order["systemnumber"])["data"][0]
+    assert data["orderstatus"] == "Created" and data["trackItems"] == []
+
+    # 每个节点前一秒与到点时各查一次
+    statuses = []
+    for milestone in build_timeline(order["systemnumber"], T0):
+        for at in (milestone["at"] - 1, milestone["at"]):
+            clock.set(at)
+            statuses.append(api.track(waybillnumber=order["systemnumber"])["data"][0]["orderstatus"])
+    assert statuses == ["Created", "PickedUp", "PickedUp", "InTransit", "InTransit", "Arrived", "Arrived", "Delivered"]
+    data = api.track(waybillnumber=order["systemnumber"])["data"][0]
+    assert [i["info"] for i in data["trackItems"]] == [m[1] for m in MILESTONES]
+
+
+def test_arrival_and_delivery_happen_at_the_destination():
+    api = MockLogisticsApi(clock=VirtualClock(T0))
+    order = api.create_order(origin_city="深圳", destination_city="London", customernumber1="LC-GB", countrycode="GB")["data"][0]
+    api.clock.set(T0 + 30 * 24 * 3600)
+    data = api.track(waybillnumber=order["systemnumber"])["data"][0]
+    assert data["countrycode"] == "GB"
+    assert [i["location"] for i in data["trackItems"]][-2:] == ["London, GB", "London, GB"]
+
+
+def test_track_countrycode_comes_from_the_order():
+    api = MockLogisticsApi(clock=VirtualClock(T0))
+    order = api.create_order(origin_city="深圳", destination_city="悉尼", customernumber1="LC-AU", countrycode="au")["data"][0]
+    assert api.track(waybillnumber=order["systemnumber"])["data"][0]["countrycode"] == "AU"
+
+    # 不带虚拟时钟的默认轨迹同样取订单的收件国家
+    plain_api = MockLogisticsApi()
+    plain = plain_api.create_order(origin_city="深圳", destination_city="悉尼", customernumber1="LC-AU2", countrycode="AU")
+    assert plain_api.track(waybillnumber=plain["data"][0]["systemnumber"])["data"][0]["countrycode"] == "AU"
+
+
+def test_subscription_receives_each_milestone_once():
+    clock = VirtualClock(T0)
+    api = MockLogisticsApi(clock=clock)
+    numbers = [
+        api.create_order(origin_city="深圳", destination_city="洛杉矶", customernumber1=f"LC-S-{i}")["data"][0]["systemnumber"]
+        for i in range(50)
+    ]
+    hub = TrackingHub(api, poll_interval=3600, clock=clock)
+    sub = hub.subscribe(numbers, prime=False)
+
+    events = []
+    for _ in range(8 * 24):
+        clock.advance(3600)
+        hub.poll_once()
+        events.extend(sub.poll())
+
+    assert len(events) == 50 * len(MILESTONES)
+    assert {hub.status(n)["orderstatus"] for n in numbers} == {"Delivered"}
+    assert hub.stats()["last_poll_at"] == clock.now()
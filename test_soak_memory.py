@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+内存浸泡测试工具的冒烟测试 - 斜率计算与有界键空间下的结构规模
+"""
+
+from soak_memory import linear_slope, run_soak
+
+
+def test_linear_slope():
+    assert linear_slope([0, 1, 2, 3], [10, 12, 14, 16]) == 2.0
+    assert linear_slope([5], [1]) == 0.0
+
+
+def test_bounded_keyspace_attribution():
+    report = run_soak(ops=3000, sample_every=1000, keyspace=40, seed=1)
+    rows = {r["structure"]: r for r in report["attribution"]}
+    assert report["errors"] == 0
+    # 其他测试也会写入进程级缓存，这里只看本次运行的增长
+    assert rows["agent._IDEMPOTENT_CACHE"]["entries_growth"] <= 40
+    assert rows["mock._orders_by_customernumber"]["entries_growth"] <= 40
+    assert rows["tracking_hub._subscriptions"]["entries_growth"] == 0
+    assert len(report["samples"]) == 4
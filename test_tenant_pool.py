@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+多租户客户端池测试 - 懒创建、令牌轮换、空闲淘汰、按租户并发上限与调用隔离、按租户的草稿、订单历史跨淘汰保留
+"""
+
+import pytest
+
+from logistics_agent import agent
+from logistics_agent.mock_logistics_api import MockLogisticsApi
+from logistics_agent.tenant_pool import TenantBusyError, TenantPool, current_tenant
+from logistics_agent.tracking_subscriptions import TrackingHub
+
+
+def _pool(**kwargs) -> TenantPool:
+    return TenantPool(lambda code, token: MockLogisticsApi(customer_code=code, token=token), **kwargs)
+
+
+def _order(customernumber: str) -> dict:
+    return {
+        "origin_city": "深圳",
+        "destination_city": "洛杉矶",
+        "customernumber1": customernumber,
+        "consignee_countrycode": "US",
+        "consigneename": "Tenant",
+        "consigneeaddress1": "1 Main St",
+        "consigneecity": "Los Angeles",
+        "consigneezipcode": "90001",
+        "consigneeprovince": "CA",
+    }
+
+
+def test_tenants_are_created_lazily_and_reused():
+    pool = _pool()
+    assert len(pool) == 0
+    a = pool.get("T001", "tok-a")
+    assert pool.get("T001", "tok-a") is a
+    assert pool.get("T002", "tok-b") is not a
+    assert pool.stats()["tenants"] == 2 and pool.created == 2
+
+
+def test_token_rotation_rebuilds_the_client():
+    pool = _pool()
+    old = pool.get("T001", "tok-1")
+    new = pool.get("T001", "tok-2")
+    assert new is not old and new.api.token == "tok-2"
+    assert len(pool) == 1
+
+
+def test_rotated_client_is_closed_after_its_last_lease():
+    pool = _pool()
+    closed = []
+    with pool.lease("T001", "tok-1") as old:
+        old.service("probe", lambda api: type("Probe", (), {"close": lambda self: closed.append(1)})())
+        new = pool.get("T001", "tok-2")
+        # 旧客户端仍在被这次调用使用：轮换不关闭它
+        assert new is not old and old.retired and closed == []
+    assert closed == [1]
+    with pool.lease("T001", "tok-2") as leased:
+        assert leased is new
+
+
+def test_idle_tenants_are_evicted_but_in_flight_ones_are_kept():
+    pool = _pool(idle_ttl_seconds=0)
+    with pool.lease("BUSY", "tok"):
+        pool.get("IDLE", "tok")
+        assert pool.evict_idle() == 1
+        assert list(pool._tenants) == ["BUSY"]
+    assert pool.evict_idle() == 1 and len(pool) == 0
+
+
+def test_tenants_with_tracking_subscriptions_are_not_evicted():
+    pool = _pool(idle_ttl_seconds=0)
+    tenant = pool.get("SUBSCRIBED", "tok")
+    hub = tenant.service("tracking_hub", lambda api: TrackingHub(api))
+    sub = hub.subscribe(["A"], prime=False)
+    assert pool.evict_idle() == 0 and list(pool._tenants) == ["SUBSCRIBED"]
+    sub.close()
+    assert pool.evict_idle() == 1
+
+
+def test_max_tenants_forces_out_the_least_recently_used():
+    pool = _pool(max_tenants=2)
+    pool.get("A", "tok")
+    pool.get("B", "tok")
+    pool.get("A", "tok")
+    pool.get("C", "tok")
+    assert sorted(pool._tenants) == ["A", "C"]
+
+
+def test_per_tenant_concurrency_limit():
+    pool = _pool(max_concurrency_per_tenant=1)
+    with pool.lease("T001", "tok"):
+        with pytest.raises(TenantBusyError):
+            with pool.lease("T001", "tok", timeout=0):
+                pass
+        # 其他租户不受影响
+        with pool.lease("T002", "tok", timeout=0) as other:
+            assert current_tenant() is other
+    assert current_tenant() is None
+
+
+def test_agent_calls_use_the_leased_tenant():
+    fields = {k: v for k, v in _order("TP-0001").items() if k not in ("origin_city", "destination_city")}
+    payload = agent.build_create_forecast_payload(**fields)
+    with agent.tenant_pool.lease("TENANT-X", "tok-x"):
+        scoped = agent.build_create_forecast_payload(**fields)
+        resp = agent.submit_order_fields_idempotent(_order("TP-0001"))
+        assert resp["status"] == "success"
+        last = agent.get_last_order_reference()["data"]["last_order"]
+        assert last["customernumber"] == "TP-0001"
+    assert scoped["data"]["payload"]["authorization"] == {"code": "TENANT-X", "token": "tok-x"}
+    assert payload["data"]["payload"]["authorization"]["code"] != "TENANT-X"
+    outside = agent.get_last_order_reference()
+    assert outside["status"] == "error" or outside["data"]["last_order"].get("customernumber") != "TP-0001"
+
+
+def test_idempotency_key_is_scoped_per_tenant():
+    with agent.tenant_pool.lease("TENANT-A", "tok"):
+        a = agent.submit_order_fields_idempotent(_order("TP-SAME"))
+    with agent.tenant_pool.lease("TENANT-B", "tok"):
+        b = agent.submit_order_fields_idempotent(_order("TP-SAME"))
+    assert a["data"]["request_id"] != b["data"]["request_id"]
+
+
+def test_order_drafts_are_per_tenant():
+    with agent.tenant_pool.lease("TENANT-DA", "tok"):
+        agent.update_forecast_order_draft("从深圳到洛杉矶；客户参考号: TP-DRAFT；收件国家=US", reset=True)
+    with agent.tenant_pool.lease("TENANT-DB", "tok"):
+        # 别的租户看不到、也提交不了 A 的草稿
+        assert agent.submit_forecast_order_draft()["status"] == "error"
+    with agent.tenant_pool.lease("TENANT-DA", "tok"):
+        draft = agent.update_forecast_order_draft("收件人=Ann")["data"]
+        assert "customernumber1" not in draft["missing_fields"]
+        assert "consigneename" not in draft["missing_fields"]
+
+
+def test_order_history_outlives_eviction_and_rotation():
+    pool = _pool(idle_ttl_seconds=0)
+    with pool.lease("TENANT-HIST", "tok-1"):
+        assert agent.submit_order_fields_idempotent(_order("TP-HIST-1"))["status"] == "success"
+    assert pool.evict_idle() == 1 and len(pool) == 0
+
+    with pool.lease("TENANT-HIST", "tok-2"):
+        orders = agent.list_orders()["data"]["orders"]
+        stats = agent.get_shipping_stats()["data"]
+    assert [o["customernumber"] for o in orders] == ["TP-HIST-1"]
+    assert stats["groups"][0]["orders"] == 1
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+并发安全压力测试 - 多线程同时下单、查询轨迹、读取最近订单与更新草稿、幂等缓存不被调用方改动、模拟接口的计数与单号索引
+"""
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from logistics_agent import agent
+from logistics_agent.mock_logistics_api import MockLogisticsApi
+
+
+@pytest.fixture(autouse=True)
+def _fast_switching():
+    # 缩短 GIL 切换间隔，让交错更频繁
+    old = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(old)
+
+
+def _order(customernumber: str) -> dict:
+    return {
+        "origin_city": "深圳",
+        "destination_city": "洛杉矶",
+        "customernumber1": customernumber,
+        "consignee_countrycode": "US",
+        "consigneename": "Stress",
+        "consigneeaddress1": "1 Main St",
+        "consigneecity": "Los Angeles",
+        "consigneezipcode": "90001",
+        "consigneeprovince": "CA",
+    }
+
+
+def test_concurrent_identical_requests_create_one_order():
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda _: agent.submit_order_fields_idempotent(_order("TS-SAME-1")), range(64)))
+
+    assert all(r["status"] == "success" for r in results)
+    assert sum(1 for r in results if not r["data"]["idempotent_replay"]) == 1
+    assert len({r["data"]["order_id"] for r in results}) == 1
+
+
+def test_first_caller_cannot_mutate_cached_response():
+    first = agent.submit_order_fields_idempotent(_order("TS-COPY-1"))
+    first["data"]["order_id"] = "tampered"
+    replay = agent.submit_order_fields_idempotent(_order("TS-COPY-1"))
+    assert replay["data"]["idempotent_replay"] is True
+    assert replay["data"]["order_id"] != "tampered"
+
+
+def test_mixed_tool_calls_from_thread_pool():
+    def work(i: int) -> None:
+        resp = agent.submit_order_fields_idempotent(_order(f"TS-MIX-{i:05d}"))
+        assert resp["status"] == "success", resp
+        tracking = resp["data"]["tracking_id"] or resp["data"]["order_id"]
+        assert agent.query_order_status(str(tracking))["status"] == "success"
+        last = agent.get_last_order_reference()
+        if last["status"] == "success":
+            # 读到的一定是某个完整的订单，而不是被清空到一半的 dict
+            assert last["data"]["last_order"].get("customernumber")
+        agent.update_forecast_order_draft(f"从深圳到纽约；customernumber1=TS-D-{i}；邮编=10001")
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(work, range(800)))
+
+    draft = agent.update_forecast_order_draft("收件国家=US")["data"]
+    assert draft["missing_fields"] == [k for k in agent._REQUIRED_ORDER_KEYS if k in agent._order_draft.missing]
+    agent.update_forecast_order_draft("-", reset=True)
+
+
+def test_mock_tracks_while_orders_are_created():
+    api = MockLogisticsApi()
+    numbers: list[str] = []
+
+    def create(i: int) -> None:
+        resp = api.create_order(origin_city="深圳", destination_city="洛杉矶", customernumber1=f"TS-API-{i}")
+        numbers.append(resp["data"][0]["systemnumber"])
+
+    def track(_: int) -> None:
+        for n in list(numbers[-20:]):
+            data = api.track(waybillnumber=n)["data"][0]
+            assert "errormsg" not in data
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(create if i % 2 else track, i) for i in range(2000)]
+        for f in futures:
+            f.result()
+    assert len(api._orders_by_customernumber) == 1000
+
+
+def test_fault_injector_counts_every_overloaded_call():
+    from logistics_agent.mock_logistics_api import FaultInjector
+
+    injector = FaultInjector({"latency_ms": 0, "jitter_ms": 0, "unavailable_rate": 0.0, "busy_rate": 0.0, "timeout_rate": 0.0, "capacity": 1}, seed=1)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: injector.decide(in_flight=2), range(4000)))
+    assert injector.overloaded == 4000
+
+
+def test_resubmitted_customernumber_drops_old_numbers():
+    api = MockLogisticsApi()
+    old = api.create_order(origin_city="深圳", destination_city="洛杉矶", customernumber1="TS-RESUB")["data"][0]
+    new = api.create_order(origin_city="深圳", destination_city="纽约", customernumber1="TS-RESUB")["data"][0]
+    assert old["systemnumber"] != new["systemnumber"]
+    assert api.track(waybillnumber=old["systemnumber"])["data"][0]["errormsg"] == "无效的单号"
+    assert api.track(waybillnumber=new["systemnumber"])["data"][0]["systemnumber"] == new["systemnumber"]
+    assert api.track(waybillnumber="TS-RESUB")["data"][0]["systemnumber"] == new["systemnumber"]
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Span 追踪测试 - 嵌套层级、跨线程/asyncio 传播、JSONL 导出与按对话的关键路径
+"""
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from logistics_agent import agent, tracing
+from logistics_agent.tracing import InMemoryExporter, JsonlExporter, Tracer, propagate
+
+
+@pytest.fixture
+def collector():
+    exporter = InMemoryExporter()
+    tracing.enable(exporter)
+    try:
+        yield exporter
+    finally:
+        tracing.disable()
+
+
+def _tool(name: str):
+    return next(t for t in agent.root_agent.tools if t.__name__ == name)
+
+
+def test_agent_turn_nests_llm_tool_and_api_spans(collector):
+    ctx = SimpleNamespace(invocation_id="inv-1", session=SimpleNamespace(id="conv-1"))
+    t = tracing.tracer
+    t.before_agent_callback(callback_context=ctx)
+    t.before_model_callback(callback_context=ctx, llm_request=SimpleNamespace(model="gemini-2.0-flash"))
+    t.after_model_callback(callback_context=ctx, llm_response=SimpleNamespace(usage_metadata=None))
+    t.before_tool_callback(tool=None, args={}, tool_context=ctx)
+    assert _tool("get_insurance_types")()["status"] == "success"
+    t.after_agent_callback(callback_context=ctx)
+
+    spans = {s["name"]: s for s in collector.spans}
+    assert set(spans) >= {"agent turn", "llm generate", "tool get_insurance_types", "tool_call", "api insurance"}
+    turn = spans["agent turn"]
+    assert turn["parent_id"] is None and turn["kind"] == "SpanKind.SERVER"
+    assert spans["llm generate"]["parent_id"] == turn["context"]["span_id"]
+    assert spans["tool get_insurance_types"]["parent_id"] == turn["context"]["span_id"]
+    assert spans["tool_call"]["parent_id"] == spans["tool get_insurance_types"]["context"]["span_id"]
+    assert spans["api insurance"]["parent_id"] == spans["tool_call"]["context"]["span_id"]
+    assert {s["context"]["trace_id"] for s in spans.values()} == {turn["context"]["trace_id"]}
+    assert {s["attributes"]["conversation.id"] for s in spans.values()} == {"conv-1"}
+    assert t.status()["open_spans"] == 0
+
+
+def test_error_envelope_marks_span_failed(collector):
+    assert _tool("unsubscribe_tracking")("no-such-subscription")["status"] == "error"
+    (span,) = [s for s in collector.spans if s["name"] == "tool unsubscribe_tracking"]
+    assert span["status"]["status_code"] == "ERROR"
+
+
+def test_context_propagates_to_threads_and_tasks():
+    t = Tracer(InMemoryExporter(), enabled=True)
+
+    async def child():
+        with t.span("task"):
+            pass
+
+    def in_thread():
+        with t.span("thread"):
+            pass
+
+    with t.span("root") as root:
+        with ThreadPoolExecutor(2) as pool:
+            pool.submit(propagate(in_thread)).result()
+            # 未经 propagate 的线程看不到调用方的 span
+            assert pool.submit(tracing.current_span).result() is None
+        asyncio.run(child())
+
+    by_name = {s["name"]: s for s in t.exporter.spans}
+    assert by_name["thread"]["parent_id"] == f"0x{root.span_id}"
+    assert by_name["task"]["parent_id"] == f"0x{root.span_id}"
+
+
+def test_disabled_tracer_is_a_passthrough():
+    t = Tracer()
+    calls = []
+
+    @t.traced("x")
+    def f(v):
+        calls.append(v)
+        return v
+
+    assert f(1) == 1 and calls == [1]
+    with t.span("y") as span:
+        assert span is None
+    api = object()
+    assert t.instrument_api(api) is api
+
+
+def _span(name, span_id, parent, start_ms, end_ms, conversation="c1"):
+    return {
+        "name": name,
+        "context": {"trace_id": "0xt", "span_id": span_id},
+        "parent_id": parent,
+        "start_time_unix_nano": int(start_ms * 1e6),
+        "end_time_unix_nano": int(end_ms * 1e6),
+        "attributes": {"conversation.id": conversation},
+    }
+
+
+def test_critical_path_follows_the_last_finishing_child():
+    spans = [
+        _span("agent turn", "r", None, 0, 100),
+        _span("llm generate", "a", "r", 0, 60),
+        _span("tool x", "b", "r", 60, 95),
+        _span("api create", "c", "b", 65, 90),
+        # 与 llm 并行且更早结束：不在关键路径上
+        _span("dictionary options", "d", "r", 10, 20),
+    ]
+    segments = tracing.critical_path(spans)
+    assert round(sum(s["self_ms"] for s in segments), 6) == 100
+    assert "dictionary options" not in {s["name"] for s in segments}
+
+    (report,) = tracing.summarize(spans)
+    assert report["by_layer"]["llm"] == 60 and report["by_layer"]["api"] == 25
+    assert report["by_layer"]["tool"] == 10 and report["by_layer"]["agent"] == 5
+
+
+def test_jsonl_export_and_cli(tmp_path, capsys):
+    path = tmp_path / "traces.jsonl"
+    t = Tracer(JsonlExporter(str(path)), enabled=True)
+    with t.span("agent turn", **{"conversation.id": "conv-9"}):
+        with t.span("api track", kind=tracing.KIND_CLIENT):
+            pass
+    t.exporter.close()
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [s["name"] for s in lines] == ["api track", "agent turn"]
+    assert lines[0]["attributes"]["conversation.id"] == "conv-9"
+    assert lines[0]["start_time"].endswith("Z")
+
+    tracing.main([str(path)])
+    out = capsys.readouterr().out
+    assert "conversation=conv-9" in out and "api" in out
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+本地轨迹时间线测试 - 按运单/按事件去重、乱序与状态、多单号寻址、新鲜度、HTTP 推送（租户绑定令牌）、query_order_status 本地优先
+"""
+
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from logistics_agent import agent
+from logistics_agent.shipment_lifecycle import VirtualClock
+from logistics_agent.tracking_store import PUSH_PATH, TrackingIngestServer, TrackingStore
+
+
+def _event(waybill, at, info, status=None, **extra):
+    return {"waybillnumber": waybill, "trackdate_utc8": at, "info": info, "location": "Shenzhen, CN",
+            "responsecode": "OT001", "orderstatus": status, **extra}
+
+
+def test_ingest_deduplicates_and_keeps_timeline_sorted():
+    store = TrackingStore()
+    result = store.ingest(
+        [
+            _event("W1", "2025-12-11 01:20:00", "离港", "InTransit", systemnumber="SYS1"),
+            _event("W1", "2025-12-10 10:00:00", "已揽收", "PickedUp"),
+            _event("W1", "2025-12-10 10:00:00", "已揽收", "PickedUp"),
+            _event("W2", "2025-12-10 10:00:00", "已揽收", "PickedUp"),
+            {"info": "no number", "trackdate": "2025-12-10 10:00:00"},
+            {"waybillnumber": "W3"},
+        ]
+    )
+    assert (result["accepted"], result["duplicates"], result["rejected"], result["orders"]) == (3, 1, 2, 2)
+    assert [r["reason"] for r in result["rejected_samples"]] == ["waybillnumber is required", "trackdate is required"]
+
+    # 再推一次同一批：全部是重复
+    assert store.ingest([_event("W1", "2025-12-10 10:00:00", "已揽收", "PickedUp")])["duplicates"] == 1
+
+    entry = store.get("SYS1")
+    assert entry["waybillnumber"] == "W1"
+    assert [i["info"] for i in entry["trackItems"]] == ["已揽收", "离港"]
+    # 晚到的旧事件不覆盖较新的状态
+    assert entry["orderstatus"] == "InTransit"
+    assert store.stats()["events"] == 3
+
+
+def test_freshness_terminal_status_and_snapshot_replace():
+    clock = VirtualClock(1_000_000)
+    store = TrackingStore(max_age_seconds=60, clock=clock)
+    store.ingest([_event("W1", "2025-12-10 10:00:00", "已揽收", "PickedUp")])
+    assert store.fresh("W1")["age_seconds"] == 0
+    clock.advance(61)
+    assert store.fresh("W1") is None and store.stats()["stale"] == 1
+
+    # 接口刷新：整条时间线以接口为准
+    store.record_snapshot(
+        {
+            "searchNumber": "W1",
+            "waybillnumber": "W1",
+            "orderstatus": "Delivered",
+            "trackItems": [{"trackdate_utc8": "2025-12-12 09:00:00", "info": "已签收", "responsecode": "OT004"}],
+        }
+    )
+    assert [i["info"] for i in store.fresh("W1")["trackItems"]] == ["已签收"]
+    clock.advance(3600)
+    assert store.fresh("W1")["orderstatus"] == "Delivered"
+
+    store.ingest([_event("T1", "2025-12-10 10:00:00", "已揽收")], customer_code="KJHB")
+    assert store.get("T1", customer_code="OTHER") is None
+    assert store.get("T1", customer_code="KJHB") is not None
+
+
+def test_tenant_cannot_write_another_tenants_timeline():
+    changes = []
+    store = TrackingStore(on_status=lambda numbers, status, code: changes.append((status, code)))
+    store.record_snapshot(
+        {
+            "waybillnumber": "A1",
+            "systemnumber": "SYS-A1",
+            "orderstatus": "InTransit",
+            "trackItems": [{"trackdate_utc8": "2025-12-10 10:00:00", "info": "已揽收"}],
+        },
+        customer_code="A",
+    )
+    forged = store.ingest([_event("A1", "2025-12-12 10:00:00", "已签收", "Delivered")], customer_code="B")
+    assert (forged["accepted"], forged["rejected"]) == (0, 1)
+    assert forged["rejected_samples"][0]["reason"] == "order belongs to another customer"
+    # 用另一个单号也认领不了
+    assert store.ingest([_event("NEW", "2025-12-12 10:00:00", "x", "Delivered", systemnumber="SYS-A1")], customer_code="B")["rejected"] == 1
+    assert store.get("NEW") is None
+    assert not store.record_snapshot({"waybillnumber": "A1", "orderstatus": "Delivered", "trackItems": []}, customer_code="B")
+
+    entry = store.get("A1", customer_code="A")
+    assert entry["orderstatus"] == "InTransit" and len(entry["trackItems"]) == 1
+    assert changes == [("InTransit", "A")]
+
+
+def test_http_push_requires_token():
+    store = TrackingStore()
+    server = TrackingIngestServer(store, port=0, token="secret")
+    base = server.start_in_thread()
+    try:
+        body = json.dumps({"events": [_event("H1", "2025-12-10 10:00:00", "已揽收", "PickedUp")]}).encode()
+
+        def post(headers):
+            req = urllib.request.Request(base + PUSH_PATH, data=body, headers=headers, method="POST")
+            with urllib.request.urlopen(req) as resp:
+                return json.loads(resp.read())
+
+        with pytest.raises(urllib.error.HTTPError) as info:
+            post({})
+        assert info.value.code == 401
+        assert post({"Authorization": "Bearer secret"})["data"]["accepted"] == 1
+        assert post({"Authorization": "Bearer secret"})["data"]["duplicates"] == 1
+        assert store.get("H1")["orderstatus"] == "PickedUp"
+    finally:
+        server.stop()
+
+
+def test_http_push_tenant_comes_from_server_not_body():
+    store = TrackingStore()
+    server = TrackingIngestServer(store, port=0, token="secret", customer_code="KJHB")
+    base = server.start_in_thread()
+    try:
+        event = _event("B1", "2025-12-10 10:00:00", "已揽收", "PickedUp", customer_code="OTHER", countrycode="US")
+        body = json.dumps({"customerCode": "OTHER", "events": [event]}).encode()
+        req = urllib.request.Request(
+            base + PUSH_PATH, data=body, headers={"Authorization": "Bearer secret"}, method="POST"
+        )
+        with urllib.request.urlopen(req) as resp:
+            assert json.loads(resp.read())["data"]["accepted"] == 1
+    finally:
+        server.stop()
+    assert store.get("B1", customer_code="OTHER") is None
+    # 本地回答与接口条目同形，带 countrycode
+    assert store.get("B1", customer_code="KJHB")["countrycode"] == "US"
+
+
+def test_query_order_status_answers_locally_until_stale(monkeypatch):
+    clock = VirtualClock(2_000_000)
+    store = TrackingStore(max_age_seconds=300, clock=clock)
+    monkeypatch.setattr(agent, "_tracking_store", store)
+
+    created = agent.create_forecast_order_with_preferences(
+        origin_city="深圳",
+        destination_city="洛杉矶",
+        customernumber1="TS-1",
+        consignee_countrycode="US",
+        consigneename="John",
+        consigneeaddress1="1 Main St",
+        consigneecity="Los Angeles",
+        consigneezipcode="90001",
+        consigneeprovince="CA",
+    )
+    order_id = str(created["data"]["order_id"])
+
+    first = agent.query_order_status(order_id)
+    assert first["data"]["source"] == "api"
+    second = agent.query_order_status(order_id)
+    assert second["data"]["source"] == "local"
+    assert second["data"]["query_info"]["systemnumber"] == first["data"]["query_info"]["systemnumber"]
+
+    waybill = first["data"]["query_info"]["waybillnumber"]
+    agent.ingest_tracking_events([_event(waybill, "2099-01-01 10:00:00", "已签收", "Delivered")])
+    clock.advance(301)
+    delivered = agent.query_order_status(order_id)
+    # 推送刷新了时间线：仍从本地回答，状态为推送的终态
+    assert delivered["data"]["source"] == "local"
+    assert delivered["data"]["raw"]["data"][0]["orderstatus"] == "Delivered"
+
+    store.max_age_seconds = 0
+    assert agent.query_order_status(order_id)["data"]["source"] == "api"
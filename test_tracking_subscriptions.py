@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+轨迹订阅测试 - 验证只推送新增事件（按内容识别）、游标回放、空闲过期与异步迭代
+"""
+
+import asyncio
+import time
+
+from logistics_agent import agent
+from logistics_agent.tenant_pool import TenantPool
+from logistics_agent.tracking_subscriptions import TrackingHub
+
+
+class GrowingTrackApi:
+    """每次查询多一条轨迹的假后端"""
+
+    def __init__(self):
+        self.calls = 0
+        self.events = {}
+
+    def track_many(self, *, waybillnumbers):
+        self.calls += 1
+        data = []
+        for n in waybillnumbers:
+            count = self.events[n] = self.events.get(n, 0) + 1
+            items = [{"info": f"event-{i}", "responsecode": "OT001"} for i in range(count)]
+            data.append({"searchNumber": n, "orderstatus": "InTransit", "trackItems": items})
+        return {"code": 0, "data": data}
+
+
+def test_only_new_events_are_delivered():
+    api = GrowingTrackApi()
+    hub = TrackingHub(api, batch_size=2)
+    sub_a = hub.subscribe(["A", "B", "C"], prime=False)
+    sub_b = hub.subscribe(["C"], prime=False)
+
+    hub.poll_once()
+    assert api.calls == 2
+    assert [e["info"] for e in sub_a.poll()] == ["event-0"] * 3
+    assert sub_a.poll() == []
+
+    hub.poll_once()
+    events, cursor = sub_b.updates()
+    assert [e["info"] for e in events] == ["event-0", "event-1"]
+    assert sub_b.updates(cursor) == ([], cursor)
+
+    sub_a.close()
+    assert hub.stats()["waybills"] == 1
+
+
+class FeedApi:
+    """返回预设 trackItems 的假后端"""
+
+    def __init__(self, items):
+        self.items = items
+
+    def track_many(self, *, waybillnumbers):
+        return {"code": 0, "data": [{"searchNumber": n, "trackItems": list(self.items)} for n in waybillnumbers]}
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def now(self):
+        return self.t
+
+
+def test_events_are_diffed_by_identity_and_replayable_by_cursor():
+    a, b, c = ({"info": name, "trackdate": f"2025-12-1{i} 10:00:00"} for i, name in enumerate("abc"))
+    api = FeedApi([a, b])
+    hub = TrackingHub(api)
+    sub = hub.subscribe(["W"], prime=False)
+    hub.poll_once()
+    first, cursor = sub.updates()
+    assert [e["info"] for e in first] == ["a", "b"]
+
+    # 承运商补录了更早的事件 c 并重排：只有 c 是新的
+    api.items = [c, b, a]
+    hub.poll_once()
+    events, latest = sub.updates()
+    assert [e["info"] for e in events] == ["c"]
+    assert sub.updates() == ([], latest)
+    # 旧游标仍可回放之后的事件
+    assert [e["info"] for e in sub.updates(cursor)[0]] == ["c"]
+    assert [e["info"] for e in sub.updates(0)[0]] == ["a", "b", "c"]
+
+
+def test_unread_subscriptions_expire():
+    clock = FakeClock()
+    hub = TrackingHub(FeedApi([]), subscription_ttl=60, clock=clock)
+    idle = hub.subscribe(["A"], prime=False)
+    read = hub.subscribe(["B"], prime=False)
+    clock.t += 50
+    read.updates()
+    clock.t += 20
+    hub.poll_once()
+    assert hub.get(idle.id) is None and idle.closed
+    assert hub.get(read.id) is read
+    assert hub.stats()["expired"] == 1 and hub.stats()["waybills"] == 1
+
+
+def test_async_iteration_receives_updates():
+    api = GrowingTrackApi()
+    hub = TrackingHub(api)
+    sub = hub.subscribe(["A"], prime=False)
+
+    async def consume():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.01, hub.poll_once)
+        async for events in sub:
+            return events
+
+    events = asyncio.run(asyncio.wait_for(consume(), timeout=5))
+    assert events[0]["waybillnumber"] == "A"
+
+
+def test_agent_subscription_tools():
+    resp = agent.subscribe_tracking('["12345"]')
+    assert resp["status"] == "success"
+    assert len(resp["data"]["events"]) == 3
+
+    updates = agent.get_tracking_updates(resp["data"]["subscription_id"])
+    assert updates["data"]["events"] == []
+    assert len(agent.get_tracking_updates(resp["data"]["subscription_id"], cursor=0)["data"]["events"]) == 3
+    bad = agent.get_tracking_updates(resp["data"]["subscription_id"], cursor="abc")
+    assert bad["status"] == "error" and bad["error"]["message"] == "failed to get tracking updates"
+    assert agent.unsubscribe_tracking(resp["data"]["subscription_id"])["status"] == "success"
+
+
+def test_tenant_subscription_receives_updates():
+    api = GrowingTrackApi()
+    pool = TenantPool(lambda code, token: api)
+    with pool.lease("TENANT-T", "tok"):
+        resp = agent.subscribe_tracking(["A"])
+        seen = [e["info"] for e in resp["data"]["events"]]
+        # 订阅所在的租户 hub 被启动，后台轮询把新事件送到这个订阅
+        deadline = time.monotonic() + 5
+        while len(seen) < 2 and time.monotonic() < deadline:
+            seen += [e["info"] for e in agent.get_tracking_updates(resp["data"]["subscription_id"])["data"]["events"]]
+            time.sleep(0.01)
+        assert seen == ["event-0", "event-1"]
+        agent._active_tracking_hub().stop()
+        assert agent.unsubscribe_tracking(resp["data"]["subscription_id"])["status"] == "success"
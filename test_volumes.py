@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+件组尺寸测试 - 文本/CSV/JSON 解析、按渠道除数的体积重与计费重、下单载荷的 volumes 与 weights、自然语言下单带尺寸、幂等键
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from logistics_agent import agent
+from logistics_agent.rate_quote import DEFAULT_VOLUMETRIC_DIVISOR, rate_card
+from logistics_agent.volumes import Pieces, parse_groups
+
+
+EXPECTED = [
+    {"length": 40.0, "width": 30.0, "height": 20.0, "weight": 5.0, "count": 3},
+    {"length": 60.0, "width": 40.0, "height": 40.0, "weight": 12.0, "count": 1},
+]
+
+
+def _normalized(groups):
+    return [{k: float(g[k]) if k != "count" else int(g.get("count") or 1) for k in EXPECTED[0]} for g in groups]
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "40x30x20cm 5kg x3; 60x40x40cm 12kg",
+        "3箱 40*30*20 每箱5kg\n60×40×40 厘米，12公斤",
+        "40 x 30 x 20 cm, 5 kg, 3 pcs；1件 60x40x40 12kg",
+        "length,width,height,weight,count\n40,30,20,5,3\n60,40,40,12,",
+        "长,宽,高,重量,件数\n40,30,20,5,3\n60,40,40,12,1",
+        json.dumps({"volumes": EXPECTED}),
+        EXPECTED,
+    ],
+)
+def test_parse_text_csv_and_json(value):
+    assert _normalized(parse_groups(value)) == EXPECTED
+
+
+def test_dimensional_and_chargeable_weight_per_channel_divisor():
+    pieces = Pieces.parse("40x30x20cm 5kg x3; 60x40x40cm 12kg")
+    weights = pieces.chargeable_weights([5000, 8000])
+    # 60*40*40 = 96000 cm³：除数 5000 时 19.2 kg 超过实重 12 kg，除数 8000 时 12 kg
+    np.testing.assert_allclose(weights["dimensional"], [[4.8, 3.0], [19.2, 12.0]])
+    np.testing.assert_allclose(weights["chargeable"], [[5.0, 5.0], [19.2, 12.0]])
+
+    summary = pieces.summary(5000)
+    assert (summary["pieces"], summary["actual_weight"], summary["dimensional_weight"]) == (4, 27.0, 33.6)
+    assert summary["chargeable_weight"] == 33.6
+    assert pieces.summary(8000)["chargeable_weight"] == 27.0
+
+    assert rate_card.volumetric_divisor("CN_EMS") == 8000
+    assert rate_card.volumetric_divisor("NO_SUCH_CHANNEL") == DEFAULT_VOLUMETRIC_DIVISOR
+    with pytest.raises(ValueError, match=r"volumes\[1\] dimensions"):
+        Pieces.parse([EXPECTED[0], {**EXPECTED[1], "height": 0}])
+    with pytest.raises(ValueError, match="no piece dimensions"):
+        Pieces.parse("two big boxes")
+
+
+def test_payload_rows_and_weights_use_channel_divisor():
+    resp = agent.build_create_forecast_payload(
+        customernumber1="VOL-1",
+        consignee_countrycode="US",
+        consigneename="Ann",
+        consigneeaddress1="1 Main St",
+        consigneecity="Los Angeles",
+        consigneezipcode="90001",
+        consigneeprovince="CA",
+        channelid="CN_EMS",
+        volumes="length,width,height,weight,count\n40,30,20,5,3\n60,40,40,12,1",
+    )
+    data = resp["data"]
+    rows = data["payload"]["datas"][0]["volumes"]
+    assert [(r["prelength"], r["prewidth"], r["preheight"], r["prenum"], r["prerweight"]) for r in rows] == [
+        ("40", "30", "20", "3", "15"),
+        ("60", "40", "40", "1", "12"),
+    ]
+    assert data["payload"]["datas"][0]["order"]["number"] == 4
+    assert data["weights"]["volumetric_divisor"] == 8000
+    assert data["weights"]["chargeable_weight"] == 27.0
+
+
+def test_text_order_and_draft_accept_dimensions():
+    text = (
+        "从深圳到洛杉矶；客户参考号: VOL-2；收件国家=US；收件人=Ann；收件地址=1 Main St；"
+        "城市=Los Angeles；邮编=90001；州=CA\n尺寸=40x30x20cm 5kg x3；60x40x40cm 12kg"
+    )
+    resp = agent.submit_forecast_order_from_text(text)
+    assert resp["status"] == "success"
+    order = resp["data"]["request_payload"]["datas"][0]
+    assert order["order"]["number"] == 4 and order["order"]["forecastweight"] == "27.0"
+    assert len(order["volumes"]) == 2
+
+    bad = agent.update_forecast_order_draft("尺寸=两个大箱子", reset=True)
+    assert "volumes" in bad["data"]["field_errors"]
+    agent.update_forecast_order_draft("", reset=True)
+
+
+def test_volume_forms_share_one_idempotency_key():
+    order = dict(
+        origin_city="深圳",
+        destination_city="洛杉矶",
+        customernumber1="VOL-KEY",
+        consignee_countrycode="US",
+        consigneename="Ann",
+        consigneeaddress1="1 Main St",
+        consigneecity="Los Angeles",
+        consigneezipcode="90001",
+        consigneeprovince="CA",
+    )
+    forms = [
+        "40x30x20cm 5kg x3",
+        "length,width,height,weight,count\n40,30,20,5,3",
+        [{"length": 40, "width": 30, "height": 20, "weight": 5, "count": 3}],
+    ]
+    canonical = [agent._canonical_order({**order, "volumes": v})["volumes"] for v in forms]
+    assert canonical[0] == canonical[1] == canonical[2] == [
+        {"length": 40.0, "width": 30.0, "height": 20.0, "weight": 5.0, "count": 3}
+    ]
+    ids = {agent.submit_order_fields_idempotent({**order, "volumes": v})["data"]["request_id"] for v in forms}
+    assert len(ids) == 1
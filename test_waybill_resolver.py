@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+后台运单号解析测试 - 验证批量、轮询/等待与 _LAST_ORDER 更新
+"""
+
+import asyncio
+
+import pytest
+
+from logistics_agent import agent
+from logistics_agent.mock_logistics_api import MockLogisticsApi
+from logistics_agent.waybill_resolver import WaybillNotFoundError, WaybillResolver
+
+
+class CountingApi(MockLogisticsApi):
+    def __init__(self):
+        super().__init__()
+        self.waybill_calls = 0
+
+    def waybillnumber(self, *, customernumber):
+        self.waybill_calls += 1
+        return super().waybillnumber(customernumber=customernumber)
+
+
+def _create_deferred(api: MockLogisticsApi, count: int) -> list[str]:
+    """Create ``count`` orders; return the customernumbers the mock left without a waybillnumber."""
+
+    deferred = []
+    for i in range(count):
+        first = api.create_order(origin_city="深圳", destination_city="洛杉矶", customernumber1=f"WBT-{i:05d}")["data"][0]
+        if not first["waybillnumber"]:
+            deferred.append(first["customernumber"])
+    return deferred
+
+
+def test_resolver_batches_pending_customernumbers():
+    api = CountingApi()
+    deferred = _create_deferred(api, 200)
+    assert deferred
+
+    resolver = WaybillResolver(api, batch_size=10, flush_interval=0.01)
+    futures = [resolver.enqueue(cn) for cn in deferred]
+    waybills = [f.result(timeout=5) for f in futures]
+    resolver.close()
+
+    assert all(w.startswith("EV") for w in waybills)
+    assert api.waybill_calls == -(-len(deferred) // 10)
+    assert resolver.poll(deferred[0]) == waybills[0]
+    assert asyncio.run(resolver.wait(deferred[0])) == waybills[0]
+
+
+def test_unknown_customernumber_fails():
+    resolver = WaybillResolver(CountingApi(), batch_size=5, flush_interval=0.01)
+    with pytest.raises(WaybillNotFoundError):
+        resolver.result("NOT-CREATED", timeout=5)
+    resolver.close()
+
+
+def test_agent_fills_last_order_waybill():
+    api = CountingApi()
+    customernumber = _create_deferred(api, 50)[0]
+    agent._api._orders_by_customernumber.update(api._orders_by_customernumber)
+    agent._LAST_ORDER.clear()
+    agent._LAST_ORDER.update({"customernumber": customernumber, "waybillnumber": ""})
+
+    resp = agent.wait_for_waybillnumber(customernumber, timeout_seconds=5)
+
+    assert resp["status"] == "success"
+    assert resp["data"]["pending"] is False
+    assert agent._LAST_ORDER["waybillnumber"] == resp["data"]["waybillnumber"]
+
+
+def test_single_enqueue_wakes_idle_worker_and_resolved_is_bounded():
+    api = CountingApi()
+    deferred = _create_deferred(api, 30)
+    resolver = WaybillResolver(api, batch_size=50, flush_interval=0.01, max_resolved=2)
+    # 工作线程在空队列上无限期等待：单个请求也必须唤醒它
+    for cn in deferred[:3]:
+        assert resolver.result(cn, timeout=5).startswith("EV")
+    resolver.close()
+
+    assert resolver.stats()["calls"] == 3
+    assert list(resolver._resolved) == deferred[1:3]
+    assert resolver.poll(deferred[0]) is None